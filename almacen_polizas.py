@@ -0,0 +1,229 @@
+#########################################################################################
+#                                                                                       #
+#   ALMACÉN COMPARTIDO DE PÓLIZAS - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA                #
+#                                                                                       #
+#   - Direccionado por contenido: cada PDF fuente se guarda con su huella SHA-256, así  #
+#     el mismo banco de pólizas nunca se escanea dos veces (ni entre sesiones, ni       #
+#     entre procesos del servidor, ni después de recargar la página).                   #
+#   - Por cada fuente: el PDF original, un archivo con las páginas de cada póliza       #
+#     (leído con mmap bajo demanda) y un índice JSON cuenta -> ubicación.               #
+#   - Bloqueo de archivo por huella para que dos procesos no indexen lo mismo a la vez. #
+#   - La sesión de Streamlit guarda solo un manejador liviano (PolizasAlmacenadas).     #
+#                                                                                       #
+#   Estructura en disco:                                                                #
+#     almacen_polizas/fuentes/<huella>.pdf      PDF tal como se subió                   #
+#     almacen_polizas/paginas/<huella>.<id>.bin pólizas separadas, una tras otra        #
+#     almacen_polizas/indices/<huella>.json     cuenta -> offset, largo y páginas       #
+#     almacen_polizas/bloqueos/<huella>.lock                                            #
+#     almacen_polizas/miniaturas/<huella>.<pág>.<ancho>.jpg  vistas previas (caché)     #
+#                                                                                       #
+#########################################################################################
+
+import functools
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (la escritura sigue siendo atómica)
+    fcntl = None
+
+CARPETA_ALMACEN = os.environ.get("ITA_ALMACEN_POLIZAS", "almacen_polizas")
+
+# Días que se conservan las fuentes sin uso antes de purgarlas
+DIAS_RETENCION = int(os.environ.get("ITA_ALMACEN_DIAS", "14"))
+
+_SUBCARPETAS = ("fuentes", "paginas", "indices", "bloqueos", "miniaturas")
+
+# PyMuPDF no es seguro entre hilos: todo uso de fitz dentro de un proceso (trabajos en
+# segundo plano, sesiones de Streamlit, servidor de descargas) pasa por este candado
+CANDADO_PDF = threading.RLock()
+
+def con_candado_pdf(funcion):
+    """Decorador: la función usa PyMuPDF y se ejecuta con CANDADO_PDF tomado."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with CANDADO_PDF:
+            return funcion(*args, **kwargs)
+    return envoltura
+
+def huella(contenido):
+    """Huella SHA-256 (hex) del contenido de un PDF."""
+    return hashlib.sha256(contenido).hexdigest()
+
+def _escribir_atomico(ruta, datos):
+    ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(ruta_tmp, "wb") as f:
+        f.write(datos)
+    os.replace(ruta_tmp, ruta)
+
+# =======================================================================================
+# ALMACÉN EN DISCO
+# =======================================================================================
+
+class AlmacenPolizas:
+    """Acceso al almacén en disco. Es liviano y se puede enviar a otros procesos."""
+
+    def __init__(self, carpeta=CARPETA_ALMACEN):
+        self.carpeta = os.path.abspath(carpeta)
+        for sub in _SUBCARPETAS:
+            os.makedirs(os.path.join(self.carpeta, sub), exist_ok=True)
+
+    def ruta_fuente(self, h):
+        return os.path.join(self.carpeta, "fuentes", f"{h}.pdf")
+
+    def ruta_indice(self, h):
+        return os.path.join(self.carpeta, "indices", f"{h}.json")
+
+    def guardar_fuente(self, contenido):
+        """Guarda el PDF (si no existía) y retorna su huella."""
+        h = huella(contenido)
+        ruta = self.ruta_fuente(h)
+        if not os.path.exists(ruta):
+            _escribir_atomico(ruta, contenido)
+        return h
+
+    def tiene_indice(self, h):
+        """True si la fuente ya está indexada (y la marca como usada para la purga)."""
+        try:
+            os.utime(self.ruta_indice(h))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def bloqueo(self, h):
+        """Bloqueo exclusivo entre procesos para indexar una fuente."""
+        with open(os.path.join(self.carpeta, "bloqueos", f"{h}.lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def guardar_indice(self, h, fragmentos, total_paginas):
+        """
+        Escribe las pólizas separadas de una fuente y su índice.
+        - fragmentos: iterable de (pagina_inicio, pagina_fin, cuentas, bytes_pdf).
+        El índice se escribe de último: su existencia marca la fuente como lista.
+        """
+        cuentas = {}
+        offset = 0
+        # Nombre único por indexación: un mmap abierto nunca apunta a un archivo reemplazado
+        archivo_paginas = f"{h}.{os.getpid()}{time.time_ns()}.bin"
+        ruta_paginas = os.path.join(self.carpeta, "paginas", archivo_paginas)
+        ruta_tmp = f"{ruta_paginas}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(ruta_tmp, "wb") as f:
+            for pagina_inicio, pagina_fin, cuentas_fragmento, pdf_bytes in fragmentos:
+                f.write(pdf_bytes)
+                for cuenta in cuentas_fragmento:
+                    cuentas[cuenta] = [offset, len(pdf_bytes), pagina_inicio, pagina_fin]
+                offset += len(pdf_bytes)
+        os.replace(ruta_tmp, ruta_paginas)
+
+        indice = {"huella": h, "paginas": total_paginas, "archivo_paginas": archivo_paginas, "cuentas": cuentas}
+        _escribir_atomico(self.ruta_indice(h), json.dumps(indice).encode("utf-8"))
+        return len(cuentas)
+
+    def polizas(self, huellas):
+        """Manejador liviano sobre una o varias fuentes ya indexadas (la última manda)."""
+        return PolizasAlmacenadas(self.carpeta, tuple(huellas))
+
+    def purgar(self, dias=DIAS_RETENCION):
+        """Elimina las fuentes cuyo índice no se ha usado en 'dias' días. Retorna cuántas."""
+        limite = time.time() - dias * 86400
+        eliminadas = 0
+        for nombre in os.listdir(os.path.join(self.carpeta, "indices")):
+            if not nombre.endswith(".json"):
+                continue
+            h = nombre[:-5]
+            if os.path.getmtime(self.ruta_indice(h)) >= limite:
+                continue
+            with self.bloqueo(h):
+                rutas = [os.path.join(self.carpeta, sub, n) for sub in ("paginas", "miniaturas")
+                         for n in os.listdir(os.path.join(self.carpeta, sub)) if n.startswith(f"{h}.")]
+                for ruta in [self.ruta_indice(h), self.ruta_fuente(h)] + rutas:
+                    try:
+                        os.remove(ruta)
+                    except FileNotFoundError:
+                        pass
+            eliminadas += 1
+        return eliminadas
+
+# =======================================================================================
+# LECTURA BAJO DEMANDA (CACHÉ POR PROCESO)
+# =======================================================================================
+
+_candado_mapas = threading.Lock()
+_mapas_abiertos = {}
+
+def _paginas_mapeadas(ruta):
+    """mmap de solo lectura del archivo de páginas, abierto una vez por proceso."""
+    with _candado_mapas:
+        mapa = _mapas_abiertos.get(ruta)
+        if mapa is None:
+            with open(ruta, "rb") as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _mapas_abiertos[ruta] = mapa
+        return mapa
+
+@functools.lru_cache(maxsize=32)
+def _indice_combinado(carpeta, huellas):
+    """Índice unificado cuenta -> (huella, archivo, offset, largo, pág_ini, pág_fin)."""
+    combinado = {}
+    for h in huellas:
+        with open(os.path.join(carpeta, "indices", f"{h}.json"), encoding="utf-8") as f:
+            indice = json.load(f)
+        archivo = indice["archivo_paginas"]
+        for cuenta, (offset, largo, pag_ini, pag_fin) in indice["cuentas"].items():
+            combinado[cuenta] = (h, archivo, offset, largo, pag_ini, pag_fin)
+    return combinado
+
+class PolizasAlmacenadas(Mapping):
+    """
+    Se comporta como el diccionario { cuenta: bytes_pdf } del escáner, pero solo guarda la
+    carpeta y las huellas: los bytes se leen del disco (mmap) cuando alguien los pide.
+    """
+
+    __slots__ = ("carpeta", "huellas")
+
+    def __init__(self, carpeta, huellas):
+        self.carpeta = carpeta
+        self.huellas = tuple(huellas)
+
+    @property
+    def _indice(self):
+        return _indice_combinado(self.carpeta, self.huellas)
+
+    def __getitem__(self, cuenta):
+        _, archivo, offset, largo, _, _ = self._indice[cuenta]
+        mapa = _paginas_mapeadas(os.path.join(self.carpeta, "paginas", archivo))
+        return mapa[offset:offset + largo]
+
+    def __contains__(self, cuenta):
+        return cuenta in self._indice
+
+    def __iter__(self):
+        return iter(self._indice)
+
+    def __len__(self):
+        return len(self._indice)
+
+    def __reduce__(self):
+        return (PolizasAlmacenadas, (self.carpeta, self.huellas))
+
+    def __repr__(self):
+        return f"PolizasAlmacenadas({len(self.huellas)} fuente(s))"
+
+    def ubicacion(self, cuenta):
+        """(ruta del PDF fuente, página inicial, página final) de la póliza de una cuenta."""
+        h, _, _, _, pag_ini, pag_fin = self._indice[cuenta]
+        return os.path.join(self.carpeta, "fuentes", f"{h}.pdf"), pag_ini, pag_fin
@@ -23,19 +23,32 @@
 # =======================================================================================
 # IMPORTACIÓN DE LIBRERÍAS
 # =======================================================================================
+# Solo lo mínimo para la Zona de Descargas: pandas, PyMuPDF, FPDF y xlsxwriter
+# se importan únicamente en la vista del administrador (ver SECCIÓN 4).
 import streamlit as st
-import fitz  # PyMuPDF: Motor avanzado de procesamiento de PDFs
-import pandas as pd
-import re
-import io
-import zipfile
-import unicodedata
-from fpdf import FPDF
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
-import shutil
 import time
-import base64
+from functools import partial
+from portal_publico import (
+    CARPETA_PUBLICA,
+    ARCHIVO_HOJA_RUTA,
+    ARCHIVO_TABLA_DIGITAL,
+    ARCHIVO_PAQUETE,
+    ARCHIVO_TODO_EN_UNO,
+    marca_manifiesto,
+    leer_manifiesto,
+    leer_archivo_publicado,
+    tamano_legible,
+)
+from publicacion_diferida import artefactos_bajo_demanda, es_diferida
+from servidor_descargas import (
+    URL_DESCARGAS,
+    PUERTO_DESCARGAS,
+    iniciar_en_segundo_plano,
+    secreto_descargas,
+    url_descarga,
+)
 
 # =======================================================================================
 # SECCIÓN 1: CONFIGURACIÓN VISUAL Y VARIABLES DE SESIÓN
@@ -65,12 +78,10 @@ if 'df_simulado' not in st.session_state:
 if 'col_map_final' not in st.session_state:
     st.session_state['col_map_final'] = None
 
+# Pólizas escaneadas: manejador liviano sobre el almacén compartido en disco (no los bytes)
 if 'mapa_polizas_cargado' not in st.session_state:
     st.session_state['mapa_polizas_cargado'] = {}
 
-if 'zip_admin_ready' not in st.session_state:
-    st.session_state['zip_admin_ready'] = None
-
 if 'tecnicos_activos_manual' not in st.session_state:
     st.session_state['tecnicos_activos_manual'] = []
 
@@ -80,245 +91,14 @@ if 'ultimo_archivo_procesado' not in st.session_state:
 if 'limites_cupo' not in st.session_state:
     st.session_state['limites_cupo'] = {}
 
-# Inyección de CSS (Expandida línea por línea)
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700;900&display=swap');
-    
-    /* Tipografía global */
-    .stApp { 
-        font-family: 'Roboto', sans-serif; 
-    }
-    
-    /* Contenedor del Logo en la barra lateral */
-    .logo-container {
-        display: flex; 
-        flex-direction: column; 
-        align-items: center; 
-        justify-content: center;
-        padding: 25px; 
-        background: linear-gradient(180deg, rgba(100, 116, 139, 0.1) 0%, rgba(15, 23, 42, 0) 100%);
-        border-radius: 16px; 
-        border: 1px solid rgba(100, 116, 139, 0.2); 
-        margin-bottom: 25px;
-    }
-    
-    /* Imagen del logo */
-    .logo-img { 
-        width: 100px; 
-        height: auto; 
-        filter: drop-shadow(0 0 10px rgba(56, 189, 248, 0.4)); 
-        transition: transform 0.3s ease; 
-    }
-    
-    .logo-img:hover { 
-        transform: scale(1.05); 
-    }
-    
-    /* Texto del logo */
-    .logo-text { 
-        font-family: 'Roboto', sans-serif; 
-        font-weight: 900; 
-        font-size: 26px; 
-        background: -webkit-linear-gradient(45deg, #0284C7, #4F46E5); 
-        -webkit-background-clip: text; 
-        -webkit-text-fill-color: transparent; 
-        margin-top: 10px; 
-        letter-spacing: 1.5px; 
-    }
-    
-    /* Botones primarios generales */
-    div.stButton > button:first-child { 
-        background: linear-gradient(135deg, #2563EB 0%, #1E40AF 100%); 
-        color: white !important; 
-        border-radius: 10px; 
-        height: 52px; 
-        width: 100%; 
-        font-size: 16px; 
-        font-weight: 700; 
-        border: 1px solid #1D4ED8; 
-        box-shadow: 0 4px 6px rgba(0,0,0,0.2); 
-        text-transform: uppercase; 
-    }
-    
-    div.stButton > button:first-child:hover { 
-        background: linear-gradient(135deg, #3B82F6 0%, #2563EB 100%); 
-        transform: translateY(-1px); 
-    }
-    
-    /* Botones de descarga */
-    div.stDownloadButton > button:first-child { 
-        background: linear-gradient(135deg, #059669 0%, #047857 100%); 
-        color: white !important; 
-        border-radius: 10px; 
-        height: 58px; 
-        width: 100%; 
-        font-size: 17px; 
-        font-weight: 700; 
-        border: 1px solid #059669; 
-    }
-    
-    div.stDownloadButton > button:first-child:hover { 
-        background: linear-gradient(135deg, #10B981 0%, #059669 100%); 
-    }
+# Inyección de CSS (hoja de estilos en estilos.css, leída una sola vez por proceso)
+@st.cache_resource
+def cargar_estilos():
+    ruta_css = os.path.join(os.path.dirname(os.path.abspath(__file__)), "estilos.css")
+    with open(ruta_css, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}\n</style>"
 
-    /* ========================================================================= */
-    /* CSS RECONSTRUIDO PARA CUADRÍCULA ULTRA COMPACTA (SIN ESPACIOS)            */
-    /* ========================================================================= */
-    
-    /* Botones AZULES para los operarios activos (Más pequeños y juntos) */
-    .btn-barrio > button:first-child {
-        background: transparent !important;
-        color: #0284C7 !important;
-        border: 1px solid #0284C7 !important; 
-        border-radius: 4px !important;
-        height: 32px !important; /* ALTURA AÚN MÁS REDUCIDA */
-        min-height: 32px !important;
-        max-height: 32px !important;
-        padding: 0px 2px !important; /* CERO PADDING VERTICAL */
-        font-size: 10px !important; /* LETRA MÁS PEQUEÑA */
-        line-height: 1.0 !important;
-        text-transform: none !important;
-        font-weight: 600 !important;
-        margin-bottom: 2px !important; /* MARGEN MÍNIMO PARA QUE ESTÉN CASI PEGADOS */
-        box-shadow: none !important;
-        width: 100% !important;
-        display: flex !important;
-        flex-direction: column !important;
-        justify-content: center !important;
-        align-items: center !important;
-        overflow: hidden !important; 
-    }
-    
-    .btn-barrio > button:first-child:hover {
-        background: #F0F9FF !important;
-        transform: scale(1.02) !important;
-    }
-
-    /* Botones NARANJAS para barrios en la Bolsa Pendiente */
-    .btn-bolsa-naranja > button:first-child {
-        background: transparent !important;
-        color: #EA580C !important;
-        border: 1px solid #EA580C !important;
-        border-radius: 4px !important;
-        height: 32px !important; /* ALTURA AÚN MÁS REDUCIDA */
-        min-height: 32px !important;
-        max-height: 32px !important;
-        padding: 0px 2px !important; /* CERO PADDING VERTICAL */
-        font-size: 10px !important; /* LETRA MÁS PEQUEÑA */
-        line-height: 1.0 !important;
-        text-transform: none !important;
-        font-weight: 600 !important;
-        margin-bottom: 2px !important; /* MARGEN MÍNIMO */
-        box-shadow: none !important;
-        width: 100% !important;
-        display: flex !important;
-        flex-direction: column !important;
-        justify-content: center !important;
-        align-items: center !important;
-        overflow: hidden !important; 
-    }
-    
-    .btn-bolsa-naranja > button:first-child:hover {
-        background: #FFF7ED !important;
-        transform: scale(1.02) !important;
-    }
-
-    /* Botón MASIVO NARANJA OSCURO */
-    .btn-masivo-naranja > button:first-child {
-        background: #C2410C !important;
-        color: white !important;
-        font-size: 10px !important;
-        height: 28px !important; /* Súper compacto */
-        min-height: 28px !important;
-        margin-bottom: 4px !important;
-        padding: 0px 2px !important;
-        border: 1px solid #9A3412 !important;
-        border-radius: 4px !important;
-        font-weight: 800 !important;
-        width: 100% !important;
-    }
-    
-    .btn-masivo-naranja > button:first-child:hover { 
-        background: #9A3412 !important; 
-        transform: translateY(-1px);
-    }
-
-    /* Botón ROJO de traslado masivo para técnicos activos */
-    .btn-masivo > button:first-child {
-        background: #DC2626 !important;
-        color: white !important;
-        font-size: 10px !important;
-        height: 28px !important; /* Súper compacto */
-        min-height: 28px !important;
-        margin-bottom: 4px !important;
-        padding: 0px 2px !important;
-        border: 1px solid #991B1B !important;
-        border-radius: 4px !important;
-        font-weight: 800 !important;
-        width: 100% !important;
-    }
-    
-    .btn-masivo > button:first-child:hover { 
-        background: #B91C1C !important; 
-        transform: translateY(-1px);
-    }
-
-    /* Reduce la separación nativa de componentes en Streamlit */
-    div[data-testid="stVerticalBlock"] > div {
-        padding-bottom: 0rem !important; /* Evita que Streamlit agregue espacio extra debajo de cada bloque */
-    }
-    /* ========================================================================= */
-    
-    /* Tarjeta informativa de la Bolsa Inteligente */
-    .bolsa-card {
-        background-color: #FFF7ED;
-        color: #9A3412;
-        padding: 8px 12px;
-        border-radius: 8px;
-        border-left: 6px solid #EA580C;
-        font-weight: bold;
-        margin-bottom: 8px;
-        font-size: 13px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-
-    /* Alertas de bloqueo y desbloqueo */
-    .locked-msg { 
-        background-color: #FEE2E2; 
-        color: #991B1B; 
-        padding: 15px; 
-        border-radius: 8px; 
-        border: 1px solid #F87171; 
-        text-align: center; 
-        font-weight: bold; 
-    }
-    
-    .unlocked-msg { 
-        background-color: #D1FAE5; 
-        color: #065F46; 
-        padding: 10px; 
-        border-radius: 8px; 
-        border: 1px solid #34D399; 
-        text-align: center; 
-        margin-top: 10px; 
-        font-weight: bold; 
-    }
-    
-    /* Encabezado del área de técnicos */
-    .tech-header { 
-        font-size: 32px; 
-        font-weight: 800; 
-        background: -webkit-linear-gradient(0deg, #0284C7, #4F46E5); 
-        -webkit-background-clip: text; 
-        -webkit-text-fill-color: transparent; 
-        text-align: center; 
-        margin-bottom: 20px; 
-        border-bottom: 2px solid #38BDF8; 
-        padding-bottom: 10px; 
-    }
-    </style>
-""", unsafe_allow_html=True)
+st.markdown(cargar_estilos(), unsafe_allow_html=True)
 
 # =======================================================================================
 # SECCIÓN 2: DIÁLOGOS INTERACTIVOS (MODALES)
@@ -357,6 +137,7 @@ def modal_traslado(origen, barrio_limpio, max_cant, opciones_destino, df_estado,
                 df_work.loc[idx, 'TECNICO_FINAL'] = dst
                 
             # === REORGANIZACIÓN AUTOMÁTICA (Conserva Orden Motor V74) ===
+            from motor_logistico import reordenar_operacion_global
             df_work = reordenar_operacion_global(df_work, st.session_state.get('col_map_final', {}))
             
             # Actualizamos la memoria global y refrescamos
@@ -390,6 +171,7 @@ def modal_masivo(tecnico_origen, opciones_destino, df_estado):
                 df_work.loc[idx, 'TECNICO_FINAL'] = dst
                 
             # === REORGANIZACIÓN AUTOMÁTICA (Conserva Orden Motor V74) ===
+            from motor_logistico import reordenar_operacion_global
             df_work = reordenar_operacion_global(df_work, st.session_state.get('col_map_final', {}))
             
             st.session_state['df_simulado'] = df_work
@@ -423,6 +205,7 @@ def modal_reasignar_bolsa(dueno_original, opciones_destino, df_estado):
                 df_work.loc[idx, 'TECNICO_FINAL'] = dst
                 
             # === REORGANIZACIÓN AUTOMÁTICA (Conserva Orden Motor V74) ===
+            from motor_logistico import reordenar_operacion_global
             df_work = reordenar_operacion_global(df_work, st.session_state.get('col_map_final', {}))
             
             st.session_state['df_simulado'] = df_work
@@ -430,16 +213,51 @@ def modal_reasignar_bolsa(dueno_original, opciones_destino, df_estado):
         else:
             st.error("Por favor, selecciona un operario destino válido (No puedes enviarlo a la bolsa de nuevo).")
 
+@st.dialog("🤖 Auto-Balanceo de la Bolsa Pendiente", width="large")
+def modal_auto_balanceo(df_estado, tecnicos_activos, limites_cupo):
+    """
+    Propuesta automática para vaciar la bolsa respetando cupos, sin partir barrios cuando
+    se puede y prefiriendo técnicos del mismo barrio, dueños de la zona o barrios vecinos.
+    Nada cambia hasta confirmar.
+    """
+    from balanceo import aplicar_balanceo, proponer_balanceo
+
+    col_map = st.session_state.get('col_map_final', {})
+    resultado = proponer_balanceo(df_estado, col_map, tecnicos_activos, limites_cupo)
+    propuesta = resultado["propuesta"]
+
+    col_m1, col_m2, col_m3 = st.columns(3)
+    col_m1.metric("Visitas a reasignar", len(resultado["asignacion"]))
+    col_m2.metric("Sin cupo disponible", resultado["sin_cupo"])
+    col_m3.metric("Técnicos que reciben", propuesta['DESTINO'].nunique())
+
+    if propuesta.empty:
+        st.warning("Ningún técnico activo tiene cupo libre. Ajusta los cupos en la Pestaña 2 o mueve carga manualmente.")
+        return
+
+    st.dataframe(
+        propuesta.rename(columns={
+            'BARRIO': 'Barrio', 'TECNICO_IDEAL': 'Zona de', 'DESTINO': 'Asignar a', 'VISITAS': 'Visitas', 'MOTIVO': 'Motivo'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+    if resultado["sin_cupo"]:
+        st.info(f"{resultado['sin_cupo']} visitas quedarán en la bolsa: no caben en el cupo de ningún técnico activo.")
+
+    if st.button("✅ APLICAR PROPUESTA", type="primary"):
+        st.session_state['df_simulado'] = aplicar_balanceo(df_estado, col_map, resultado["asignacion"])
+        st.rerun()
+
 # =======================================================================================
 # SECCIÓN 3: GESTIÓN DEL SISTEMA DE ARCHIVOS Y CARPETAS PÚBLICAS
 # =======================================================================================
 
-CARPETA_PUBLICA = "public_files"
-
 def gestionar_sistema_archivos(accion="iniciar"):
     """
-    Controla la creación y limpieza de la carpeta donde se publican 
-    los archivos para que los técnicos los descarguen en su móvil.
+    Controla la creación de la carpeta donde se publican los archivos para que
+    los técnicos los descarguen en su móvil. Ya no se borra al republicar: cada
+    publicación va a su propia versión (ver portal_publico.activar_version).
     """
     if accion == "iniciar":
         if not os.path.exists(CARPETA_PUBLICA):
@@ -447,291 +265,179 @@ def gestionar_sistema_archivos(accion="iniciar"):
                 os.makedirs(CARPETA_PUBLICA)
             except OSError as e: 
                 st.error(f"Error al crear sistema de archivos: {e}")
-    elif accion == "limpiar":
-        if os.path.exists(CARPETA_PUBLICA):
-            try:
-                shutil.rmtree(CARPETA_PUBLICA)
-                time.sleep(0.3) # Pequeña pausa para asegurar liberación de memoria
-                os.makedirs(CARPETA_PUBLICA)
-            except Exception:
-                # Método de borrado alternativo si rmtree falla por bloqueos de Windows
-                try:
-                    for filename in os.listdir(CARPETA_PUBLICA):
-                        file_path = os.path.join(CARPETA_PUBLICA, filename)
-                        if os.path.isfile(file_path): 
-                            os.unlink(file_path)
-                        elif os.path.isdir(file_path): 
-                            shutil.rmtree(file_path)
-                except: 
-                    pass
-        else: 
-            os.makedirs(CARPETA_PUBLICA)
-
-# Iniciar sistema de archivos al cargar el script
-gestionar_sistema_archivos("iniciar")
 
-# =======================================================================================
-# SECCIÓN 4: FUNCIONES DE LÓGICA CORE Y NORMALIZACIÓN DE DATOS
-# =======================================================================================
+# Iniciar sistema de archivos una sola vez por proceso (no en cada recarga del script)
+@st.cache_resource
+def iniciar_sistema_archivos():
+    gestionar_sistema_archivos("iniciar")
+    return True
 
-def limpiar_estricto(txt):
-    """Limpia tildes, espacios extra y convierte a mayúsculas para un match perfecto."""
-    if pd.isna(txt) or not txt: 
-        return ""
-    txt = str(txt).upper().strip()
-    # Normalización para eliminar acentos diacríticos
-    txt = "".join(c for c in unicodedata.normalize('NFD', txt) if unicodedata.category(c) != 'Mn')
-    return txt
-
-def normalizar_numero(txt):
-    """Extrae únicamente los caracteres numéricos de una cadena, ideal para cuentas y celulares."""
-    if pd.isna(txt) or not txt: 
-        return ""
-    txt_str = str(txt)
-    if txt_str.endswith('.0'): 
-        txt_str = txt_str[:-2]
-    nums = re.sub(r'\D', '', txt_str)
-    return str(int(nums)) if nums else ""
-
-def natural_sort_key(txt):
-    """Permite ordenar direcciones alfanuméricas de forma lógica humana (ej: Calle 2 antes que Calle 10)."""
-    if pd.isna(txt) or not txt: 
-        return tuple()
-    txt = str(txt).upper()
-    return tuple(int(s) if s.isdigit() else s for s in re.split(r'(\d+)', txt))
-
-def buscar_tecnico_exacto(barrio_input, mapa_barrios):
-    """
-    Motor de asignación de barrios. 
-    Intenta coincidencia exacta, si falla, usa eliminación de prefijos.
-    """
-    if pd.isna(barrio_input) or not barrio_input: 
-        return "SIN_ASIGNAR"
-        
-    b_raw = limpiar_estricto(str(barrio_input))
-    if not b_raw: 
-        return "SIN_ASIGNAR"
-    
-    # 1. Intento de coincidencia exacta
-    if b_raw in mapa_barrios: 
-        return mapa_barrios[b_raw]
-    
-    # 2. Intento eliminando palabras genéricas que suelen estorbar
-    patrones = r'\b(BARRIO|URB|URBANIZACION|SECTOR|ETAPA|VILLA|CIUDADELA|RESIDENCIAL|CONJUNTO|ZONA|UNIDAD)\b'
-    b_flex = re.sub(patrones, '', b_raw).strip()
-    if b_flex in mapa_barrios: 
-        return mapa_barrios[b_flex]
-    
-    # 3. Búsqueda por subcadena (fallback)
-    for k, v in mapa_barrios.items():
-        if len(k) > 4 and k in b_raw: 
-            return v
-            
-    return "SIN_ASIGNAR"
+iniciar_sistema_archivos()
 
-def cargar_maestro_dinamico(file):
-    """
-    Lee el archivo maestro.
-    Reconoce el archivo 'OPERARIOS REINSTALACION' buscando columnas 
-    como 'Nombre Unidad' (como Barrio) y 'Nombre funcionarios' (como Técnico).
-    """
-    mapa = {}
-    telefonos = {}
+# Servidor de descargas estáticas (ETag, Range, enlaces firmados) en un hilo del mismo proceso.
+# Opcional: también puede correr aparte con 'python servidor_descargas.py'.
+@st.cache_resource
+def iniciar_servidor_descargas():
+    if PUERTO_DESCARGAS is None:
+        return None
     try:
-        if file.name.endswith('.csv'): 
-            df = pd.read_csv(file, sep=None, engine='python', encoding='utf-8-sig')
-        else: 
-            df = pd.read_excel(file)
-            
-        # Limpiar nombres de columnas
-        df.columns = [str(c).upper().strip() for c in df.columns]
-        
-        # Diccionario ampliado de sinónimos para detectar las columnas correctas
-        col_barrio = next((c for c in df.columns if 'BARRIO' in c or 'ZONA' in c or 'UNIDAD' in c), None)
-        col_tecnico = next((c for c in df.columns if 'TECNICO' in c or 'OPERARIO' in c or 'NOMBRE FUNCIONARIO' in c or 'FUNCIONARIO' in c), None)
-        col_celular = next((c for c in df.columns if 'CEL' in c or 'TEL' in c or 'MOVIL' in c), None)
-
-        if not col_barrio or not col_tecnico:
-            st.error("❌ Error: No se encontraron las columnas clave. El maestro debe tener algo parecido a 'Barrio/Unidad' y 'Técnico/Funcionario'.")
-            return {}, {}
-
-        # Llenar el diccionario de cruce
-        for _, row in df.iterrows():
-            b = limpiar_estricto(str(row[col_barrio]))
-            t = str(row[col_tecnico]).upper().strip()
-            
-            if t and t != "NAN" and b: 
-                mapa[b] = t
-                if col_celular and pd.notna(row[col_celular]):
-                    tel = normalizar_numero(row[col_celular])
-                    if tel: 
-                        telefonos[t] = tel
-                        
-    except Exception as e:
-        st.error(f"Error crítico leyendo el archivo maestro: {str(e)}")
-        return {}, {}
-        
-    return mapa, telefonos
+        return iniciar_en_segundo_plano(PUERTO_DESCARGAS)
+    except OSError as e:
+        st.error(f"No se pudo iniciar el servidor de descargas en el puerto {PUERTO_DESCARGAS}: {e}")
+        return None
 
-def procesar_pdf_polizas_avanzado(file_obj):
-    """
-    Usa PyMuPDF (fitz) para escanear el PDF hoja por hoja buscando números de cuenta o póliza.
-    Retorna un diccionario: { "Cuenta123": <Bytes_Del_PDF_Separado>, ... }
-    """
-    file_obj.seek(0)
-    doc = fitz.open(stream=file_obj.read(), filetype="pdf")
-    diccionario_extraido = {}
-    total_paginas = len(doc)
-    
-    for i in range(total_paginas):
-        texto_pagina = doc[i].get_text()
-        
-        # Regex tolerante para encontrar la cuenta
-        matches = re.findall(r'(?:Póliza|Poliza|Cuenta)\D{0,20}(\d{4,15})', texto_pagina, re.IGNORECASE)
-        
-        if matches:
-            # Crear un nuevo documento PDF en memoria solo con esta página
-            sub_doc = fitz.open()
-            sub_doc.insert_pdf(doc, from_page=i, to_page=i)
-            
-            # Revisar si la siguiente página también pertenece a esta póliza (Ej: anexos o revesos)
-            if i + 1 < total_paginas:
-                texto_siguiente = doc[i+1].get_text()
-                # Si la página siguiente NO tiene la palabra "Cuenta", asumimos que es continuación
-                if not re.search(r'(?:Póliza|Poliza|Cuenta)', texto_siguiente, re.IGNORECASE):
-                    sub_doc.insert_pdf(doc, from_page=i+1, to_page=i+1)
-                    
-            pdf_bytes = sub_doc.tobytes()
-            sub_doc.close()
-            
-            # Guardar en el diccionario asociándolo a la cuenta encontrada
-            for m in matches: 
-                cuenta_limpia = normalizar_numero(m)
-                diccionario_extraido[cuenta_limpia] = pdf_bytes
-                
-    return diccionario_extraido
-
-def preparar_tabla_digital_excel(df_tec, col_map):
-    """
-    FUNCIÓN ESTRICTA DE 5 COLUMNAS CON ORDEN REAL:
-    Garantiza que el Excel que recibe el operario SOLO tenga las columnas solicitadas en la imagen,
-    pero esta vez extrae el número de Orden real seleccionado por el usuario en lugar de inventar uno.
-    [Cuenta, Dirección, Barrio, Orden, TECNICOS]
-    """
-    df_mini = df_tec.copy().reset_index(drop=True)
-    
-    # 2. Definir el mapeo de los nombres reales de la ruta vs los nombres estéticos para el técnico
-    mapping = {
-        col_map['CUENTA']: 'Cuenta',
-        col_map['DIRECCION']: 'Dirección',
-        col_map['BARRIO']: 'Barrio',
-        col_map['ORDEN']: 'Orden',       # AHORA MAPEA LA COLUMNA DE ORDEN VERDADERA
-        'TECNICO_FINAL': 'TECNICOS'
-    }
-    
-    # 3. Filtrar para evitar errores si alguna columna de ruta no existe
-    cols_presentes = {k: v for k, v in mapping.items() if k in df_mini.columns}
-    
-    # 4. Renombrar
-    df_final = df_mini[list(cols_presentes.keys())].rename(columns=cols_presentes)
-    
-    # 5. Ordenar las columnas explícitamente según requerimiento de la imagen
-    orden_deseado = ['Cuenta', 'Dirección', 'Barrio', 'Orden', 'TECNICOS']
-    df_resultado = df_final[[c for c in orden_deseado if c in df_final.columns]]
-    
-    return df_resultado
-
-def reordenar_operacion_global(df_estado, col_map):
-    """
-    Organiza automáticamente los registros conservando el orden original del Motor V74
-    (que venía en la planilla de Excel), agrupando primero por Técnico y luego por Barrio.
-    Garantiza que no se desorganice ninguna ruta al mover barrios de la bolsa.
-    """
-    df_w = df_estado.copy()
-    if col_map and 'BARRIO' in col_map:
-        col_barrio = col_map['BARRIO']
-        
-        # Garantizar que se respete el orden nativo con el que subieron el archivo
-        if 'ORDEN_ORIGINAL' in df_w.columns:
-            df_w = df_w.sort_values(by=['TECNICO_FINAL', col_barrio, 'ORDEN_ORIGINAL'])
-        else:
-            df_w = df_w.sort_values(by=['TECNICO_FINAL', col_barrio])
-            
-        df_w = df_w.reset_index(drop=True)
-    return df_w
+iniciar_servidor_descargas()
 
 # =======================================================================================
-# SECCIÓN 5: GENERACIÓN DE HOJA DE RUTA FÍSICA (PDF)
+# SECCIÓN 4: NÚCLEO LOGÍSTICO (motor_logistico.py)
 # =======================================================================================
+# La lógica de negocio vive en un módulo importable sin Streamlit para poder medirla
+# y reutilizarla fuera de la interfaz. Cada función y cada pestaña del Centro de Comando
+# (SECCIÓN 8) importa lo que usa, para que la Zona de Descargas y el login arranquen
+# livianos (plotly solo se carga al pintar la analítica de la Pestaña 5).
+
+@st.cache_resource
+def almacen_compartido():
+    """Almacén de pólizas en disco, compartido por todas las sesiones (purga una vez por proceso)."""
+    from almacen_polizas import AlmacenPolizas
+    almacen = AlmacenPolizas()
+    almacen.purgar()
+    return almacen
+
+@st.cache_resource
+def cola_trabajos():
+    """Cola de trabajos en segundo plano del proceso: sigue corriendo aunque se recargue la página."""
+    from trabajos import ColaTrabajos
+    return ColaTrabajos()
+
+@st.cache_resource
+def historial_operaciones():
+    """Histórico de días finalizados (Parquet por día + acumulados en SQLite), compartido por las sesiones."""
+    from historial import HistorialOperaciones
+    return HistorialOperaciones()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def consultar_historial(marca, consulta, desde=None, hasta=None):
+    """Consulta de acumulados; se repite contra SQLite solo cuando se registra un día nuevo (marca)."""
+    return getattr(historial_operaciones(), consulta)(desde, hasta)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def ruta_unificada(ids_archivos, _archivos):
+    """Ruta del día unida desde uno o varios archivos; se vuelve a leer solo si cambian los archivos subidos."""
+    from ingesta_rutas import PROCESOS_INGESTA, unir_rutas
+    return unir_rutas(_archivos, procesos=PROCESOS_INGESTA)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def simulador_cupos(ids_archivos, col_barrio, mapa_barrios, _df_ruta):
+    """Volúmenes por técnico y barrio de la ruta del día para el simulador de cupos (uno por ruta y columna de barrio)."""
+    from escenarios_cupo import SimuladorCupos
+    return SimuladorCupos.desde_ruta(_df_ruta, col_barrio, mapa_barrios)
+
+ETIQUETAS_TRABAJO = {
+    "PENDIENTE": "⏳ En cola",
+    "EN_CURSO": "⚙️ Generando",
+    "FALLIDO": "❌ El trabajo falló",
+    "CANCELADO": "🚫 Trabajo cancelado",
+    "REEMPLAZADO": "🔁 Reemplazado por una solicitud con asignaciones más recientes",
+}
+
+@st.fragment(run_every=2)
+def seguimiento_trabajo(tipo):
+    """Avance por técnico del trabajo en curso (se refresca solo cada 2 segundos)."""
+    from trabajos import ESTADOS_ACTIVOS
+    trabajo = cola_trabajos().ultimo(tipo)
+    if trabajo["estado"] not in ESTADOS_ACTIVOS:
+        st.rerun()
+    total = trabajo["total"] or 0
+    texto = f"{ETIQUETAS_TRABAJO[trabajo['estado']]}: {trabajo['hechos']}/{total or '?'} técnicos"
+    if trabajo["detalle"]:
+        texto += f" · último: {trabajo['detalle']}"
+    st.progress(trabajo["hechos"] / total if total else 0.0, text=texto)
+    if st.button("🛑 Cancelar", key=f"cancelar_{tipo}"):
+        cola_trabajos().cancelar(trabajo["id"])
+
+def mostrar_trabajo(tipo):
+    """Pinta el estado del último trabajo del tipo y lo retorna (None si nunca se ha lanzado)."""
+    from trabajos import ESTADOS_ACTIVOS
+    trabajo = cola_trabajos().ultimo(tipo)
+    if trabajo is None:
+        return None
+    if trabajo["estado"] in ESTADOS_ACTIVOS:
+        seguimiento_trabajo(tipo)
+    elif trabajo["estado"] == "FALLIDO":
+        st.error(f"{ETIQUETAS_TRABAJO['FALLIDO']}: {trabajo['error']}")
+    elif trabajo["estado"] != "COMPLETADO":
+        st.warning(ETIQUETAS_TRABAJO[trabajo["estado"]])
+    return trabajo
+
+def leer_bytes(ruta):
+    with open(ruta, "rb") as f:
+        return f.read()
+
+@st.cache_resource
+def purgar_sesiones_antiguas():
+    """Puntos de control de días anteriores: se purgan una vez por proceso."""
+    from punto_control import purgar_puntos_control
+    return purgar_puntos_control()
+
+# Variables de sesión que viajan en el punto de control junto con df_simulado
+CLAVES_PUNTO_CONTROL = (
+    'mapa_actual', 'mapa_telefonos', 'col_map_final', 'tecnicos_activos_manual',
+    'ultimo_archivo_procesado', 'limites_cupo',
+)
 
-class PDFListado(FPDF):
-    def header(self):
-        # Fondo del encabezado azul oscuro institucional
-        self.set_fill_color(0, 51, 102) 
-        self.rect(0, 0, 297, 20, 'F')
-        self.set_font('Arial', 'B', 16)
-        self.set_text_color(255, 255, 255)
-        self.set_xy(10, 5)
-        self.cell(0, 10, 'UT ITA RADIAN - HOJA DE RUTA DE OPERACIONES', 0, 1, 'C')
-        self.ln(10)
-
-def crear_pdf_lista_final(df, tecnico, col_map):
-    pdf = PDFListado(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    
-    # Metadatos del Gestor
-    pdf.set_font('Arial', 'B', 12)
-    pdf.set_text_color(0, 0, 0)
-    fecha = datetime.now().strftime('%d/%m/%Y')
-    pdf.cell(0, 10, f"GESTOR: {tecnico} | FECHA: {fecha} | TOTAL VISITAS ASIGNADAS: {len(df)}", 0, 1)
-    
-    # Definición de tabla
-    headers = ['#', 'CUENTA', 'MEDIDOR', 'BARRIO', 'DIRECCION', 'CLIENTE']
-    widths = [10, 25, 25, 65, 85, 60]
-    
-    # Pintar Cabeceras
-    pdf.set_fill_color(220, 220, 220)
-    pdf.set_font('Arial', 'B', 9)
-    for h, w in zip(headers, widths): 
-        pdf.cell(w, 8, h, 1, 0, 'C', 1)
-    pdf.ln()
-    
-    # Llenar datos
-    pdf.set_font('Arial', '', 8)
-    for idx, (_, row) in enumerate(df.iterrows(), start=1):
-        barrio_txt = str(row[col_map['BARRIO']])
-        
-        # Alerta visual: Si la visita es de apoyo (vino de otro técnico), se marca en ROJO
-        if pd.notna(row.get('ORIGEN_REAL')) and str(row.get('ORIGEN_REAL')) != tecnico:
-            barrio_txt = f"[APOYO] {barrio_txt}"
-            pdf.set_text_color(200, 0, 0) # Letra roja
-        else:
-            pdf.set_text_color(0, 0, 0) # Letra negra
-
-        # Helper para evitar nulos y truncar largos
-        def get_s(k):
-            c = col_map.get(k)
-            return str(row[c]) if c and c in df.columns and c != "NO TIENE" else ""
-
-        row_data = [
-            str(idx), 
-            get_s('CUENTA'), 
-            get_s('MEDIDOR')[:15], 
-            barrio_txt[:38], 
-            get_s('DIRECCION')[:60], 
-            get_s('CLIENTE')[:30]
-        ]
-        
-        # Escritura celda por celda manejando codificación latin-1 para FPDF
-        for val, w in zip(row_data, widths):
-            try: 
-                val_e = val.encode('latin-1', 'replace').decode('latin-1')
-            except: 
-                val_e = val
-            pdf.cell(w, 7, val_e, 1, 0, 'L')
-        pdf.ln()
-        
-    return pdf.output(dest='S').encode('latin-1')
+def guardar_operacion_en_disco():
+    """Punto de control de la operación si df_simulado cambió (distribución o traslado)."""
+    from instrumentacion import corrida
+    from punto_control import guardar_punto_control
+    df_estado = st.session_state['df_simulado']
+    if df_estado is None or df_estado is st.session_state.get('df_en_punto_control'):
+        return
+    laterales = st.session_state.get('columnas_laterales')
+    laterales_nuevas = laterales if laterales is not st.session_state.get('laterales_en_punto_control') else None
+    try:
+        sesion = {clave: st.session_state[clave] for clave in CLAVES_PUNTO_CONTROL}
+        sesion['limites_cupo'] = {t: int(c) for t, c in sesion['limites_cupo'].items()}
+        with corrida("PUNTO DE CONTROL"):
+            guardar_punto_control(df_estado, sesion, st.session_state['mapa_polizas_cargado'], laterales_nuevas)
+    except (OSError, TypeError, ValueError) as e:
+        st.toast(f"⚠️ No se pudo guardar el punto de control de la operación: {e}")
+        return
+    st.session_state['df_en_punto_control'] = df_estado
+    st.session_state['laterales_en_punto_control'] = laterales
+
+def indice_busqueda_operacion():
+    """
+    Índice del buscador al día con df_simulado: se arma una vez por operación y tras cada
+    traslado solo se actualizan técnico y origen de las visitas que cambiaron.
+    """
+    from indice_busqueda import IndiceBusqueda
+    df_estado = st.session_state['df_simulado']
+    if df_estado is None:
+        return None
+    indice = st.session_state.get('indice_busqueda')
+    if df_estado is st.session_state.get('df_en_indice'):
+        return indice
+    if indice is None or indice.actualizar(df_estado) is None:
+        indice = IndiceBusqueda(df_estado, st.session_state['col_map_final'])
+    st.session_state['indice_busqueda'] = indice
+    st.session_state['df_en_indice'] = df_estado
+    return indice
+
+def reanudar_operacion():
+    """Restaura en la sesión la operación de hoy guardada en disco."""
+    from instrumentacion import corrida
+    from punto_control import cargar_punto_control
+    with corrida("REANUDAR OPERACION"):
+        punto = cargar_punto_control()
+    for clave, valor in punto['sesion'].items():
+        st.session_state[clave] = valor
+    st.session_state['df_simulado'] = punto['df_estado']
+    st.session_state['columnas_laterales'] = punto['columnas_laterales']
+    st.session_state['mapa_polizas_cargado'] = punto['mapa_polizas']
+    st.session_state['df_en_punto_control'] = punto['df_estado']
+    st.session_state['laterales_en_punto_control'] = punto['columnas_laterales']
+    return punto['polizas_perdidas']
 
 # =======================================================================================
 # SECCIÓN 6: BARRA LATERAL, PERFILES Y ASISTENCIA
@@ -786,68 +492,101 @@ with st.sidebar:
 # SECCIÓN 7: INTERFAZ DEL TÉCNICO (DESCARGAS)
 # =======================================================================================
 
+@st.cache_data(show_spinner=False)
+def manifiesto_publicado(marca):
+    """Manifiesto de la publicación vigente; se relee solo cuando cambia su marca (mtime)."""
+    return leer_manifiesto()
+
+@st.cache_resource
+def secreto_enlaces():
+    """Clave con la que se firman los enlaces del servidor de descargas (una lectura por proceso)."""
+    return secreto_descargas()
+
+def boton_descarga_publicada(etiqueta, version, info_tecnico, nombre_archivo, nombre_descarga, mime, clave):
+    """
+    Botón de descarga diferida: los bytes se leen del disco solo al pulsarlo.
+    Con ITA_URL_DESCARGAS es un enlace firmado al servidor estático: el celular puede
+    reanudar una descarga cortada y no vuelve a bajar un archivo que ya tiene.
+    """
+    info_archivo = info_tecnico["archivos"].get(nombre_archivo)
+    if info_archivo is None:
+        return False
+    if URL_DESCARGAS:
+        enlace = url_descarga(URL_DESCARGAS, secreto_enlaces(), version, info_tecnico["carpeta"],
+                              nombre_archivo, nombre_descarga)
+        st.link_button(etiqueta, enlace, use_container_width=True)
+    else:
+        st.download_button(
+            etiqueta,
+            partial(leer_archivo_publicado, version, info_tecnico["carpeta"], nombre_archivo),
+            nombre_descarga, mime, key=clave, use_container_width=True
+        )
+    st.caption(f"{tamano_legible(info_archivo['bytes'])} · {info_archivo['modificado'][11:16]}")
+    return True
+
 if modo_acceso == "👷 TÉCNICO":
     st.markdown('<div class="tech-header">ZONA DE DESCARGAS</div>', unsafe_allow_html=True)
-    
-    tecnicos_list = []
-    if os.path.exists(CARPETA_PUBLICA):
-        tecnicos_list = sorted([d for d in os.listdir(CARPETA_PUBLICA) if os.path.isdir(os.path.join(CARPETA_PUBLICA, d))])
-    
+
+    # Una sola lectura de disco por recarga: el 'stat' del manifiesto (el JSON queda en caché)
+    manifiesto = manifiesto_publicado(marca_manifiesto())
+    tecnicos_list = sorted(manifiesto["tecnicos"]) if manifiesto else []
+
     if not tecnicos_list:
         col_c1, col_c2, col_c3 = st.columns([1, 2, 1])
         with col_c2:
             st.warning("⏳ La operación del día aún no ha sido liberada por el despacho.")
-            if st.button("🔄 Actualizar Vista", type="secondary"): 
+            if st.button("🔄 Actualizar Vista", type="secondary"):
                 st.rerun()
     else:
         col_espacio1, col_centro, col_espacio2 = st.columns([1, 2, 1])
-        with col_centro: 
+        with col_centro:
             seleccion = st.selectbox("👇 BUSCA TU NOMBRE EN LA LISTA:", ["-- Seleccionar --"] + tecnicos_list)
-        
+
         if seleccion != "-- Seleccionar --":
-            path_tec = os.path.join(CARPETA_PUBLICA, seleccion)
-            f_ruta = os.path.join(path_tec, "1_HOJA_DE_RUTA.pdf")
-            f_excel = os.path.join(path_tec, "2_TABLA_DIGITAL.xlsx")
-            f_leg = os.path.join(path_tec, "3_PAQUETE_LEGALIZACION.pdf")
-            
+            info_tecnico = manifiesto["tecnicos"][seleccion]
+            if es_diferida(manifiesto):
+                # Publicación diferida: sus archivos se arman la primera vez que entra (luego quedan en disco)
+                try:
+                    with st.spinner("⏳ Preparando tus archivos (solo la primera vez)..."):
+                        info_tecnico = artefactos_bajo_demanda(manifiesto["version"], info_tecnico["carpeta"])
+                except Exception as e:
+                    st.error(f"No se pudieron preparar tus archivos: {e}. Avisa al despacho.")
+                    st.stop()
+
             st.markdown(f"<h3 style='text-align:center; color:#0284C7; margin-top:20px;'>Hola, <span>{seleccion}</span></h3>", unsafe_allow_html=True)
             st.write("")
-            
+
             c_izq, c_cen, c_der = st.columns(3)
-            
+
             with c_izq:
                 st.markdown("""<div style='background:#1E293B; padding:15px; border-radius:10px; border-left:5px solid #38BDF8;'><h5 style='color:#38BDF8; margin:0;'>📄 1. Ruta PDF</h5></div>""", unsafe_allow_html=True)
                 st.write("")
-                if os.path.exists(f_ruta):
-                    with open(f_ruta, "rb") as f: 
-                        st.download_button("⬇️ DESCARGAR PDF", f, f"Ruta_{seleccion}.pdf", "application/pdf", key="d_ruta", use_container_width=True)
-                else: 
+                if not boton_descarga_publicada("⬇️ DESCARGAR PDF", manifiesto["version"], info_tecnico, ARCHIVO_HOJA_RUTA, f"Ruta_{seleccion}.pdf", "application/pdf", "d_ruta"):
                     st.error("No disponible")
-            
+
             with c_cen:
                 st.markdown("""<div style='background:#1E293B; padding:15px; border-radius:10px; border-left:5px solid #FBBF24;'><h5 style='color:#FBBF24; margin:0;'>📊 2. Tabla Excel</h5></div>""", unsafe_allow_html=True)
                 st.write("")
-                if os.path.exists(f_excel):
-                    with open(f_excel, "rb") as f: 
-                        st.download_button("⬇️ DESCARGAR EXCEL", f, f"Tabla_{seleccion}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="d_excel", use_container_width=True)
-                else: 
+                if not boton_descarga_publicada("⬇️ DESCARGAR EXCEL", manifiesto["version"], info_tecnico, ARCHIVO_TABLA_DIGITAL, f"Tabla_{seleccion}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "d_excel"):
                     st.info("No disponible")
-                
+
             with c_der:
                 st.markdown("""<div style='background:#1E293B; padding:15px; border-radius:10px; border-left:5px solid #34D399;'><h5 style='color:#34D399; margin:0;'>📂 3. Pólizas</h5></div>""", unsafe_allow_html=True)
                 st.write("")
-                if os.path.exists(f_leg):
-                    with open(f_leg, "rb") as f: 
-                        st.download_button("⬇️ DESCARGAR PÓLIZAS", f, f"Leg_{seleccion}.pdf", "application/pdf", key="d_leg", use_container_width=True)
-                else: 
+                if not boton_descarga_publicada("⬇️ DESCARGAR PÓLIZAS", manifiesto["version"], info_tecnico, ARCHIVO_PAQUETE, f"Leg_{seleccion}.pdf", "application/pdf", "d_leg"):
                     st.info("No tienes pólizas asignadas hoy.")
 
+            # Todo en un solo archivo (una sola descarga en datos móviles)
+            st.write("")
+            col_z1, col_z2, col_z3 = st.columns([1, 2, 1])
+            with col_z2:
+                boton_descarga_publicada("📦 DESCARGAR TODO (ZIP)", manifiesto["version"], info_tecnico, ARCHIVO_TODO_EN_UNO, f"Operacion_{seleccion}.zip", "application/zip", "d_todo")
+
 # =======================================================================================
 # SECCIÓN 8: VISTA DEL ADMINISTRADOR (DESPACHO Y LOGÍSTICA)
 # =======================================================================================
 
 elif modo_acceso == "⚙️ ADMINISTRADOR":
-    
     # LOGIN
     if not st.session_state.get('admin_logged_in', False):
         col_login_spacer1, col_login, col_login_spacer2 = st.columns([1, 1, 1])
@@ -865,6 +604,10 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
     
     # SISTEMA PRINCIPAL ADMINISTRADOR
     else:
+        import pandas as pd
+        from instrumentacion import corrida
+        from punto_control import leer_punto_control
+
         col_tit, col_logout = st.columns([4, 1])
         with col_tit: 
             st.markdown("## ⚙️ Centro de Comando Logístico v14.3")
@@ -872,18 +615,66 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
             if st.button("Cerrar Sesión Segura"):
                 st.session_state['admin_logged_in'] = False
                 st.rerun()
+
+        # REANUDAR: tras un reinicio del servidor o una sesión expirada, la operación de hoy sigue en disco
+        purgar_sesiones_antiguas()
+        if st.session_state['df_simulado'] is None:
+            punto_hoy = leer_punto_control()
+            if punto_hoy:
+                col_punto, col_reanudar = st.columns([3, 1])
+                with col_punto:
+                    st.info(
+                        f"💾 Hay una operación de hoy guardada a las {punto_hoy['guardado'][11:16]}: "
+                        f"{punto_hoy['visitas']} visitas, {punto_hoy['tecnicos']} técnicos y "
+                        f"{punto_hoy['en_bolsa']} en la Bolsa Pendiente."
+                    )
+                with col_reanudar:
+                    if st.button("♻️ REANUDAR OPERACIÓN DE HOY", type="primary", use_container_width=True):
+                        if reanudar_operacion():
+                            st.warning("⚠️ Las pólizas escaneadas ya no están en el almacén: vuelve a subir los PDF en la Pestaña 2.")
+                            time.sleep(1)
+                        st.rerun()
         
-        tab1, tab2, tab3, tab4 = st.tabs([
+        # BUSCADOR GLOBAL: ¿quién tiene la cuenta X? ¿quién está en la Calle 72?
+        indice_operacion = indice_busqueda_operacion()
+        if indice_operacion is not None:
+            texto_busqueda = st.text_input(
+                "🔎 Buscar en la operación de hoy",
+                placeholder="Cuenta, orden, dirección (ej: Calle 72), cliente o barrio",
+                key="busqueda_global"
+            )
+            if texto_busqueda.strip():
+                resultados_busqueda, total_busqueda = indice_operacion.buscar(texto_busqueda, st.session_state['mapa_polizas_cargado'])
+                if total_busqueda == 0:
+                    st.caption("Sin coincidencias en la operación de hoy.")
+                else:
+                    mostrados = f" (se muestran las primeras {len(resultados_busqueda)})" if total_busqueda > len(resultados_busqueda) else ""
+                    st.caption(f"{total_busqueda} visita(s) encontrada(s){mostrados}.")
+                    st.dataframe(
+                        resultados_busqueda.rename(columns={
+                            'CUENTA': 'Cuenta', 'ORDEN': 'Orden', 'DIRECCION': 'Dirección', 'BARRIO': 'Barrio', 'CLIENTE': 'Cliente',
+                            'TECNICO_FINAL': 'Técnico actual', 'ORIGEN_REAL': 'Origen', 'TECNICO_IDEAL': 'Zona de', 'POLIZA': 'Póliza'
+                        }),
+                        column_config={"Póliza": st.column_config.CheckboxColumn()},
+                        hide_index=True,
+                        use_container_width=True
+                    )
+
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "1. 🗃️ Base de Zonas", 
             "2. ⚖️ Carga de Ruta", 
             "3. 🛠️ Tablero de Operación", 
-            "4. 🌍 Generación y Entrega"
+            "4. 🌍 Generación y Entrega",
+            "5. 📈 Analítica Histórica"
         ])
         
         # -------------------------------------------------------------------------------
         # TAB 1: CARGA DE MAESTRO ZONIFICACIÓN
         # -------------------------------------------------------------------------------
         with tab1:
+            from motor_logistico import cargar_maestro_dinamico
+            from punto_control import descartar_punto_control
+
             st.markdown("### Acciones de Mantenimiento de Base")
             col_reset, col_explain = st.columns([1, 2])
             
@@ -894,10 +685,11 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                     st.session_state['df_simulado'] = None
                     st.session_state['col_map_final'] = None
                     st.session_state['mapa_polizas_cargado'] = {}
-                    st.session_state['zip_admin_ready'] = None
                     st.session_state['tecnicos_activos_manual'] = []
                     st.session_state['ultimo_archivo_procesado'] = None
                     st.session_state['limites_cupo'] = {}
+                    st.session_state['columnas_laterales'] = None
+                    descartar_punto_control()
                     st.success("✅ Sistema purgado y listo para un nuevo día.")
                     time.sleep(1)
                     st.rerun()
@@ -913,8 +705,12 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
             
             if f_maestro:
                 if st.session_state.get('ultimo_archivo_procesado') != f_maestro.name:
-                    with st.spinner("Leyendo estructura y mapeando zonas..."):
-                        nuevo_mapa, nuevos_telefonos = cargar_maestro_dinamico(f_maestro)
+                    with st.spinner("Leyendo estructura y mapeando zonas..."), corrida("CARGA MAESTRO"):
+                        try:
+                            nuevo_mapa, nuevos_telefonos = cargar_maestro_dinamico(f_maestro)
+                        except ValueError as e:
+                            st.error(str(e))
+                            nuevo_mapa, nuevos_telefonos = {}, {}
                         if nuevo_mapa:
                             st.session_state['mapa_actual'] = nuevo_mapa
                             st.session_state['mapa_telefonos'] = nuevos_telefonos
@@ -937,6 +733,17 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
         # TAB 2: PROCESAMIENTO DE ARCHIVOS DIARIOS
         # -------------------------------------------------------------------------------
         with tab2:
+            from escenarios_cupo import escenarios_ajuste, escenarios_uniformes
+            from miniaturas_polizas import ANCHO_MINIATURA, miniaturas_cuenta
+            from motor_logistico import (
+                PALABRAS_CLAVE_COLUMNAS,
+                claves_cuenta,
+                compactar_operacion,
+                ejecutar_distribucion,
+                escanear_al_almacen,
+                normalizar_numero,
+            )
+
             st.markdown("### Ingesta de Archivos Diarios")
             
             c_pdf, c_xls = st.columns(2)
@@ -945,19 +752,43 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 st.markdown("**Paso 1: Digitalización de Pólizas (PDF)**")
                 up_pdfs = st.file_uploader("Arrastra los archivos PDF del banco de pólizas", type="pdf", accept_multiple_files=True)
                 if up_pdfs and st.button("EJECUTAR ESCÁNER PDF"):
-                    with st.spinner("Analizando documentos, extrayendo cuentas y fragmentando páginas..."):
-                        diccionario_global_polizas = {}
-                        for pdf_obj in up_pdfs:
-                            resultado_parcial = procesar_pdf_polizas_avanzado(pdf_obj)
-                            diccionario_global_polizas.update(resultado_parcial)
-                        
-                        st.session_state['mapa_polizas_cargado'] = diccionario_global_polizas
+                    with st.spinner("Analizando documentos, extrayendo cuentas y fragmentando páginas..."), corrida("ESCANER PDF"):
+                        st.session_state['mapa_polizas_cargado'] = escanear_al_almacen(up_pdfs, almacen_compartido())
                         st.success(f"✅ Escaneo finalizado: {len(st.session_state['mapa_polizas_cargado'])} Pólizas procesadas desde {len(up_pdfs)} archivo(s).")
 
             with c_xls:
                 st.markdown("**Paso 2: Carga de Ruta Diaria (Excel)**")
-                up_xls = st.file_uploader("Arrastra el Excel exportado del sistema", type=["xlsx", "csv"])
+                up_xls = st.file_uploader("Arrastra el Excel exportado del sistema (uno o varios archivos)", type=["xlsx", "csv"], accept_multiple_files=True)
             
+            # Revisión puntual de la póliza de una cuenta (miniaturas bajo demanda, con caché)
+            if st.session_state['mapa_polizas_cargado']:
+                with st.expander("🔎 Revisar la póliza asignada a una cuenta"):
+                    polizas_cargadas = st.session_state['mapa_polizas_cargado']
+                    df_revision = st.session_state['df_simulado']
+                    col_busqueda, col_tecnico_rev = st.columns(2)
+                    cuenta_escrita = col_busqueda.text_input("Número de cuenta", key="cuenta_revision")
+                    cuenta_revision = normalizar_numero(cuenta_escrita)
+                    if df_revision is not None:
+                        cuentas_operacion = claves_cuenta(df_revision, st.session_state['col_map_final'])
+                    if df_revision is not None and not cuenta_revision:
+                        # Sin cuenta escrita: recorrer las cuentas del paquete de un técnico
+                        tecnico_rev = col_tecnico_rev.selectbox("Paquete del técnico", sorted(df_revision['TECNICO_FINAL'].unique()), key="tecnico_revision")
+                        cuentas_paquete = [c for c in cuentas_operacion[df_revision['TECNICO_FINAL'] == tecnico_rev] if c in polizas_cargadas]
+                        cuenta_revision = col_busqueda.selectbox(f"Cuentas con póliza ({len(cuentas_paquete)})", cuentas_paquete, key="cuenta_paquete_revision")
+
+                    if cuenta_revision:
+                        paginas_poliza = miniaturas_cuenta(polizas_cargadas, cuenta_revision)
+                        if not paginas_poliza:
+                            st.warning(f"La cuenta {cuenta_revision} no tiene póliza en el banco escaneado.")
+                        else:
+                            if df_revision is not None:
+                                asignada_a = df_revision.loc[cuentas_operacion == cuenta_revision, 'TECNICO_FINAL'].unique()
+                                if len(asignada_a):
+                                    st.caption(f"Cuenta {cuenta_revision} · paquete de: {', '.join(map(str, asignada_a))}")
+                            st.image([imagen for _, imagen in paginas_poliza],
+                                     caption=[f"Página {pagina + 1} del PDF escaneado" for pagina, _ in paginas_poliza],
+                                     width=ANCHO_MINIATURA)
+
             # Verificar técnicos activos desde el menú lateral
             if 'tecnicos_activos_manual' in st.session_state and st.session_state['tecnicos_activos_manual']:
                 tecnicos_hoy = st.session_state['tecnicos_activos_manual']
@@ -967,11 +798,23 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 tecnicos_hoy = []
 
             if up_xls and tecnicos_hoy:
-                # Leer ruta
-                if up_xls.name.endswith('.csv'): 
-                    df_ruta = pd.read_csv(up_xls, sep=None, engine='python', encoding='utf-8-sig')
-                else: 
-                    df_ruta = pd.read_excel(up_xls)
+                # Leer ruta (varios archivos se unen en una sola, sin pares cuenta/orden repetidos)
+                with st.spinner("Leyendo y uniendo los archivos de ruta..."):
+                    union_ruta = ruta_unificada(tuple(f.file_id for f in up_xls), up_xls)
+                df_ruta = union_ruta["ruta"]
+
+                if len(up_xls) > 1:
+                    st.success(f"✅ {len(up_xls)} archivos unidos: {len(df_ruta)} visitas únicas "
+                               f"({union_ruta['duplicadas']} fila(s) repetida(s) descartada(s)).")
+                for nombre_archivo, faltantes in union_ruta["columnas_faltantes"].items():
+                    st.warning(f"⚠️ '{nombre_archivo}' no trae las columnas: {', '.join(faltantes)}. Sus visitas quedan vacías en esos campos.")
+                df_conflictos = union_ruta["conflictos"]
+                if not df_conflictos.empty:
+                    st.warning(f"⚠️ {df_conflictos[['CUENTA', 'ORDEN']].drop_duplicates().shape[0]} par(es) cuenta/orden aparecen con datos distintos entre archivos. Se conserva la primera aparición.")
+                    with st.expander("Ver conflictos entre archivos"):
+                        st.dataframe(df_conflictos, hide_index=True, use_container_width=True)
+                        st.download_button("📥 Descargar conflictos (CSV)", df_conflictos.to_csv(index=False).encode('utf-8-sig'),
+                                           "CONFLICTOS_RUTA.csv", "text/csv")
                 
                 # Filtrar columnas
                 cols_limpias = []
@@ -984,9 +827,11 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 st.markdown("#### Configuración de Restricciones (Cupo Máximo)")
                 st.info("Ajusta la capacidad de cada operario. Todo lo que supere este número se enviará a la Bolsa Pendiente.")
                 
+                # Default 35, o los cupos del escenario elegido en el simulador
+                cupos_escenario = st.session_state.get('cupos_escenario', {})
                 df_cupos = pd.DataFrame({
                     "Técnico": tecnicos_hoy, 
-                    "Cupo": [35] * len(tecnicos_hoy) # Default 35
+                    "Cupo": [cupos_escenario.get(t, 35) for t in tecnicos_hoy]
                 })
                 
                 editor_cupos = st.data_editor(
@@ -1009,16 +854,16 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 
                 col_sel_1, col_sel_2, col_sel_3, col_sel_4 = st.columns(4)
                 
-                sel_barrio = col_sel_1.selectbox("Columna Barrio", cols_limpias, index=buscar_columna_inteligente(['BARRIO', 'ZONA', 'UNIDAD']))
-                sel_dir = col_sel_2.selectbox("Columna Dirección", cols_limpias, index=buscar_columna_inteligente(['DIR','DIRECCION', 'UBICACION']))
-                sel_cuenta = col_sel_3.selectbox("Columna Cuenta", cols_limpias, index=buscar_columna_inteligente(['CUENTA', 'CONTRATO', 'CODIGO']))
-                sel_orden = col_sel_4.selectbox("Columna Orden (Real)", cols_limpias, index=buscar_columna_inteligente(['ORDEN', 'PEDIDO', 'TICKET', 'SERVICIO']))
+                sel_barrio = col_sel_1.selectbox("Columna Barrio", cols_limpias, index=buscar_columna_inteligente(PALABRAS_CLAVE_COLUMNAS['BARRIO']))
+                sel_dir = col_sel_2.selectbox("Columna Dirección", cols_limpias, index=buscar_columna_inteligente(PALABRAS_CLAVE_COLUMNAS['DIRECCION']))
+                sel_cuenta = col_sel_3.selectbox("Columna Cuenta", cols_limpias, index=buscar_columna_inteligente(PALABRAS_CLAVE_COLUMNAS['CUENTA']))
+                sel_orden = col_sel_4.selectbox("Columna Orden (Real)", cols_limpias, index=buscar_columna_inteligente(PALABRAS_CLAVE_COLUMNAS['ORDEN']))
                 
                 st.markdown("#### Columnas Opcionales")
                 opciones_nulas = ["NO TIENE"] + cols_limpias
                 col_sel_5, col_sel_6 = st.columns(2)
-                sel_medidor = col_sel_5.selectbox("Columna Medidor", opciones_nulas, index=buscar_columna_inteligente(['MEDIDOR', 'APARATO', 'SERIAL'], True))
-                sel_cliente = col_sel_6.selectbox("Columna Cliente", opciones_nulas, index=buscar_columna_inteligente(['CLIENTE', 'NOMBRE', 'USUARIO'], True))
+                sel_medidor = col_sel_5.selectbox("Columna Medidor", opciones_nulas, index=buscar_columna_inteligente(PALABRAS_CLAVE_COLUMNAS['MEDIDOR'], True))
+                sel_cliente = col_sel_6.selectbox("Columna Cliente", opciones_nulas, index=buscar_columna_inteligente(PALABRAS_CLAVE_COLUMNAS['CLIENTE'], True))
                 
                 mapa_columnas = {
                     'BARRIO': sel_barrio, 
@@ -1029,57 +874,76 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                     'CLIENTE': sel_cliente if sel_cliente != "NO TIENE" else None
                 }
                 
+                # Simulador de cupos: muchos escenarios evaluados de una vez, sin correr la distribución
+                with st.expander("🧪 Simulador de cupos: ¿cuánto quedaría en la Bolsa Pendiente?"):
+                    simulador = simulador_cupos(tuple(f.file_id for f in up_xls), sel_barrio, st.session_state['mapa_actual'], df_ruta)
+                    tipo_escenarios = st.radio("Escenarios", ["Cupo igual para todos", "Ajustes sobre la tabla de cupos"],
+                                               horizontal=True, key="tipo_escenarios")
+                    if tipo_escenarios == "Cupo igual para todos":
+                        desde_cupo, hasta_cupo = st.slider("Rango de cupos", 1, 200, (20, 60), key="rango_escenarios")
+                        matriz_cupos = escenarios_uniformes(tecnicos_hoy, desde_cupo, hasta_cupo)
+                    else:
+                        ajuste_cupo = st.slider("Ajuste por técnico (±)", 1, 30, 5, key="ajuste_escenarios")
+                        matriz_cupos = escenarios_ajuste(diccionario_limites, (-ajuste_cupo, ajuste_cupo))
+                    tabla_escenarios = simulador.evaluar(matriz_cupos)
+
+                    st.caption(f"{len(tabla_escenarios)} escenarios · {tabla_escenarios['POR_AUSENCIA'].iloc[0]} visitas de técnicos "
+                               f"inactivos o barrios sin zona van a la bolsa en todos. Cupo libre ≥ En bolsa: el auto-balanceo "
+                               f"puede vaciarla.")
+                    st.dataframe(
+                        tabla_escenarios.rename(columns={
+                            "EN_BOLSA": "En bolsa", "POR_CUPO": "Por cupo", "POR_AUSENCIA": "Por ausencia",
+                            "SOBRECARGADOS": "Técnicos sobre el cupo", "BARRIOS_PARTIDOS": "Barrios partidos",
+                            "BARRIOS_A_BOLSA": "Barrios a la bolsa", "CUPO_LIBRE": "Cupo libre",
+                        }),
+                        use_container_width=True, height=300
+                    )
+
+                    escenario_elegido = st.selectbox("Detalle del escenario", tabla_escenarios.index, key="escenario_elegido")
+                    detalle_escenario = simulador.detalle(matriz_cupos.loc[escenario_elegido].to_dict())
+                    st.dataframe(
+                        detalle_escenario[detalle_escenario["A_BOLSA"] > 0].rename(columns={
+                            "TECNICO": "Técnico", "CARGA": "Carga asignada", "CUPO": "Cupo", "A_BOLSA": "A la bolsa",
+                            "BARRIOS_A_BOLSA": "Barrios a la bolsa", "BARRIO_PARTIDO": "Parte un barrio",
+                        }),
+                        hide_index=True, use_container_width=True
+                    )
+                    if st.button("✅ Usar estos cupos en la tabla", key="usar_escenario"):
+                        st.session_state['cupos_escenario'] = {t: max(1, int(c)) for t, c in matriz_cupos.loc[escenario_elegido].items()}
+                        st.rerun()
+
+                st.markdown("#### Orden de Visitas")
+                secuenciar_recorrido = st.toggle(
+                    "🧭 Ordenar el recorrido de cada técnico por dirección (Calle/Carrera)",
+                    value=False,
+                    help="Reduce los zig-zag en terreno. Las direcciones que no se puedan leer conservan el orden V74."
+                )
+
                 # BOTÓN DE EJECUCIÓN PRINCIPAL
                 if st.button("🚀 INICIAR ALGORITMO DE DISTRIBUCIÓN", type="primary"):
-                    if up_pdfs and not st.session_state['mapa_polizas_cargado']:
-                        diccionario_global_polizas = {}
-                        for pdf_obj in up_pdfs:
-                            resultado_parcial = procesar_pdf_polizas_avanzado(pdf_obj)
-                            diccionario_global_polizas.update(resultado_parcial)
-                        st.session_state['mapa_polizas_cargado'] = diccionario_global_polizas
-                    
-                    st.session_state['limites_cupo'] = diccionario_limites
-                    df_procesamiento = df_ruta.copy()
+                    with corrida("ALGORITMO DISTRIBUCION"):
+                        if up_pdfs and not st.session_state['mapa_polizas_cargado']:
+                            st.session_state['mapa_polizas_cargado'] = escanear_al_almacen(up_pdfs, almacen_compartido())
                     
-                    # 1. Asignación Primaria (El Deber Ser)
-                    df_procesamiento['TECNICO_IDEAL'] = df_procesamiento[sel_barrio].apply(lambda x: buscar_tecnico_exacto(x, st.session_state['mapa_actual']))
-                    df_procesamiento['TECNICO_FINAL'] = df_procesamiento['TECNICO_IDEAL']
-                    df_procesamiento['ORIGEN_REAL'] = None
-                    df_procesamiento['ORDEN_ORIGINAL'] = range(len(df_procesamiento))
+                        st.session_state['limites_cupo'] = diccionario_limites
                     
-                    # 2. Ordenamiento Geográfico (Respetando el motor V74 original)
-                    df_procesamiento = df_procesamiento.sort_values(by=[sel_barrio, 'ORDEN_ORIGINAL'])
+                        # 1. Asignación Primaria (El Deber Ser) + Ordenamiento Geográfico V74
+                        # 2. Aplicación de Reglas de Negocio (Ausencias y Sobrecarga / Cupos)
+                        # === REORGANIZACIÓN GLOBAL AUTOMÁTICA ===
+                        df_final_procesado = ejecutar_distribucion(df_ruta, mapa_columnas, st.session_state['mapa_actual'], tecnicos_hoy, diccionario_limites, secuenciar=secuenciar_recorrido)
 
-                    # 3. Aplicación de Reglas de Negocio (Ausencias)
-                    mascara_ausentes = ~df_procesamiento['TECNICO_FINAL'].isin(tecnicos_hoy)
-                    df_procesamiento.loc[mascara_ausentes, 'ORIGEN_REAL'] = "TÉCNICO INACTIVO/AUSENTE"
-                    df_procesamiento.loc[mascara_ausentes, 'TECNICO_FINAL'] = "⚠️ BOLSA PENDIENTE"
-                    
-                    # 4. Aplicación de Reglas de Negocio (Sobrecarga / Cupos)
-                    for tecnico_activo in tecnicos_hoy:
-                        capacidad_max = diccionario_limites.get(tecnico_activo, 35)
-                        indices_del_tecnico = df_procesamiento[df_procesamiento['TECNICO_FINAL'] == tecnico_activo].index
-                        
-                        if len(indices_del_tecnico) > capacidad_max:
-                            excedente_cantidad = len(indices_del_tecnico) - capacidad_max
-                            
-                            df_tec_temp = df_procesamiento.loc[indices_del_tecnico].copy()
-                            mapa_vol = df_tec_temp[sel_barrio].value_counts().to_dict()
-                            df_tec_temp['VOL_TEMP'] = df_tec_temp[sel_barrio].map(mapa_vol)
-                            indices_del_tecnico = df_tec_temp.sort_values(by=['VOL_TEMP', sel_barrio], ascending=[False, True]).index.tolist()
-
-                            indices_a_mover = indices_del_tecnico[-excedente_cantidad:]
-                            
-                            df_procesamiento.loc[indices_a_mover, 'ORIGEN_REAL'] = "EXCEDE CUPO MÁXIMO"
-                            df_procesamiento.loc[indices_a_mover, 'TECNICO_FINAL'] = "⚠️ BOLSA PENDIENTE"
-
-                    # === REORGANIZACIÓN GLOBAL AUTOMÁTICA ===
-                    df_final_procesado = reordenar_operacion_global(df_procesamiento, mapa_columnas)
+                        # Representación compacta para los traslados; las columnas no mapeadas quedan aparte
+                        df_final_procesado, columnas_laterales = compactar_operacion(
+                            df_final_procesado, mapa_columnas, st.session_state['mapa_actual'].values())
+                        st.session_state['columnas_laterales'] = columnas_laterales
 
                     # Guardar en memoria
                     st.session_state['df_simulado'] = df_final_procesado
                     st.session_state['col_map_final'] = mapa_columnas
-                    st.success("✅ Algoritmo completado respetando Orden V74. Dirígete a la Pestaña 3 para el Ajuste Logístico Manual.")
+                    if secuenciar_recorrido:
+                        st.success("✅ Algoritmo completado con recorrido por dirección para cada técnico. Dirígete a la Pestaña 3 para el Ajuste Logístico Manual.")
+                    else:
+                        st.success("✅ Algoritmo completado respetando Orden V74. Dirígete a la Pestaña 3 para el Ajuste Logístico Manual.")
 
             elif not tecnicos_hoy and st.session_state['mapa_actual']:
                 st.error("⚠️ La lista de técnicos activos está vacía. Verifica el panel lateral.")
@@ -1110,8 +974,16 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 
                 if not visitas_huerfanas.empty:
                     st.markdown("#### 🚨 Carga Pendiente en Despacho")
+
+                    st.markdown('<div class="btn-masivo-naranja">', unsafe_allow_html=True)
+                    if st.button(f"🤖 AUTO-BALANCEAR BOLSA ({len(visitas_huerfanas)} visitas) ENTRE TÉCNICOS CON CUPO", key="btn_auto_balanceo"):
+                        modal_auto_balanceo(dataframe_matriz, cuadrilla_presente, dicc_limites)
+                    st.markdown('</div>', unsafe_allow_html=True)
                     
-                    agrupacion_bolsas = visitas_huerfanas.groupby('TECNICO_IDEAL')
+                    agrupacion_bolsas = visitas_huerfanas.groupby('TECNICO_IDEAL', observed=True)
+                    # Conteo por barrio de todas las bolsas en una sola agrupación
+                    conteo_bolsas = visitas_huerfanas.groupby(['TECNICO_IDEAL', columna_barrio_nombre], observed=True).size().reset_index(name='TOTAL')
+                    barrios_por_bolsa = {d: g.reset_index(drop=True) for d, g in conteo_bolsas.groupby('TECNICO_IDEAL', observed=True)}
                     
                     for dueno_maestro, datos_bolsa_dueno in agrupacion_bolsas:
                         
@@ -1126,7 +998,7 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                                 modal_reasignar_bolsa(dueno_maestro, cuadrilla_presente, dataframe_matriz)
                             st.markdown('</div>', unsafe_allow_html=True)
                             
-                            resumen_agrupado = datos_bolsa_dueno.groupby([columna_barrio_nombre]).size().reset_index(name='TOTAL')
+                            resumen_agrupado = barrios_por_bolsa.get(dueno_maestro, conteo_bolsas.iloc[:0])
                             
                             # USANDO GAP=SMALL DE STREAMLIT PARA JUNTAR LAS COLUMNAS AÚN MÁS
                             columnas_grid_bolsa = st.columns(8, gap="small")
@@ -1150,12 +1022,16 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 # -------------------------------------------------------------------
                 st.markdown("#### 👷 Asignación Actual en Terreno")
                 
+                # Carga y barrios de toda la cuadrilla en una sola agrupación (no un filtro por técnico)
+                carga_por_tecnico = dataframe_matriz['TECNICO_FINAL'].value_counts()
+                conteo_barrios = dataframe_matriz.groupby(['TECNICO_FINAL', columna_barrio_nombre], observed=True).size().reset_index(name='CANTIDAD')
+                barrios_por_tecnico = {t: g.reset_index(drop=True) for t, g in conteo_barrios.groupby('TECNICO_FINAL', observed=True)}
+
                 grid_tecnicos = st.columns(3)
                 for index_tecnico, nombre_tecnico in enumerate(cuadrilla_presente):
                     with grid_tecnicos[index_tecnico % 3]:
                         
-                        data_tecnico = dataframe_matriz[dataframe_matriz['TECNICO_FINAL'] == nombre_tecnico]
-                        visitas_asignadas = len(data_tecnico)
+                        visitas_asignadas = int(carga_por_tecnico.get(nombre_tecnico, 0))
                         capacidad_tecnico = dicc_limites.get(nombre_tecnico, 35)
                         
                         if visitas_asignadas == 0:
@@ -1173,7 +1049,7 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                                     modal_masivo(nombre_tecnico, opciones_para_destino, dataframe_matriz)
                                 st.markdown('</div>', unsafe_allow_html=True)
                                 
-                                agrupacion_barrios_tecnico = data_tecnico.groupby([columna_barrio_nombre]).size().reset_index(name='CANTIDAD')
+                                agrupacion_barrios_tecnico = barrios_por_tecnico.get(nombre_tecnico, conteo_barrios.iloc[:0])
                                 
                                 # SE USAN 3 COLUMNAS INTERNAS CON GAP "SMALL" PARA EXPRIMIR CADA PÍXEL DE ESPACIO
                                 grid_barrios = st.columns(3, gap="small") 
@@ -1196,6 +1072,16 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
         # TAB 4: GENERACIÓN, REPORTES Y DESCARGAS GLOBALES
         # -------------------------------------------------------------------------------
         with tab4:
+            from exportacion_masiva import FORMATOS_CONSOLIDADO
+            from motor_logistico import (
+                CALIDAD_PAQUETE_MOVIL,
+                DPI_PAQUETE_MOVIL,
+                crear_libro_rutas,
+                perfil_paquete_movil,
+                tecnicos_con_carga,
+            )
+            from trabajos import trabajo_publicacion, trabajo_zip_maestro
+
             st.markdown("### 🌍 Consolidación y Exportación de Operación")
             if st.session_state['df_simulado'] is not None:
                 dataframe_final = st.session_state['df_simulado']
@@ -1207,169 +1093,209 @@ elif modo_acceso == "⚙️ ADMINISTRADOR":
                 else:
                     conf_columnas = st.session_state['col_map_final']
                     conf_polizas = st.session_state['mapa_polizas_cargado']
-                    lista_tecnicos_con_carga = [t for t in dataframe_final['TECNICO_FINAL'].unique() if "SIN_" not in t and "⚠️" not in t]
                     
                     columna_btn1, columna_btn2 = st.columns(2)
                     
+                    # Huella del estado de asignación: un trabajo con estado anterior queda reemplazado
+                    huella_estado = str(pd.util.hash_pandas_object(dataframe_final).sum())
+                    
                     # ---- BOTÓN 1: PUBLICAR EN LA WEB PARA LOS TÉCNICOS ----
                     with columna_btn1:
                         st.markdown("#### ☁️ Portal Web Movil")
                         st.info("Sube los archivos a la nube para que los técnicos puedan descargarlos desde su celular.")
+                        usar_perfil_movil = st.toggle(
+                            "📱 Paquete de pólizas liviano (perfil móvil)",
+                            value=False,
+                            help="Reduce y recomprime los escaneos del paquete para los datos móviles de los técnicos. "
+                                 "El ZIP de oficina conserva siempre la calidad original."
+                        )
+                        perfil_movil = None
+                        if usar_perfil_movil:
+                            col_dpi, col_calidad = st.columns(2)
+                            dpi_movil = col_dpi.number_input("Resolución (DPI)", min_value=72, max_value=300, value=DPI_PAQUETE_MOVIL, step=10)
+                            calidad_movil = col_calidad.slider("Calidad JPEG", min_value=30, max_value=95, value=CALIDAD_PAQUETE_MOVIL, step=5)
+                            perfil_movil = perfil_paquete_movil(dpi_movil, calidad_movil)
+                        publicacion_diferida = st.toggle(
+                            "⚡ Publicación instantánea (archivos bajo demanda)",
+                            value=False,
+                            help="Solo congela la asignación y la libera al momento. La ruta, la tabla y las pólizas "
+                                 "de cada técnico se arman la primera vez que entra a descargarlas."
+                        )
                         if st.button("📢 ENVIAR ARCHIVOS AL PORTAL", type="primary"):
-                            gestionar_sistema_archivos("limpiar")
-                            barra_progreso = st.progress(0)
-                            
-                            for iterador, nombre_operario in enumerate(lista_tecnicos_con_carga):
-                                # Copia limpia para este técnico
-                                dt_operario = dataframe_final[dataframe_final['TECNICO_FINAL'] == nombre_operario].copy()
-                                
-                                # Aplicamos orden V74 original en lugar de destructivo natural_sort_key
-                                if 'ORDEN_ORIGINAL' in dt_operario.columns:
-                                    dt_operario = dt_operario.sort_values(by=[conf_columnas['BARRIO'], 'ORDEN_ORIGINAL'])
-                                else:
-                                    dt_operario = dt_operario.sort_values(by=[conf_columnas['BARRIO']])
-                                
-                                carpeta_segura = str(nombre_operario).replace(" ","_")
-                                ruta_carpeta = os.path.join(CARPETA_PUBLICA, carpeta_segura)
-                                os.makedirs(ruta_carpeta, exist_ok=True)
-                                
-                                # ARTEFACTO 1: Hoja de Ruta PDF
-                                with open(os.path.join(ruta_carpeta, "1_HOJA_DE_RUTA.pdf"), "wb") as f_pdf_ruta:
-                                    f_pdf_ruta.write(crear_pdf_lista_final(dt_operario, nombre_operario, conf_columnas))
-                                
-                                # ARTEFACTO 2: Tabla Digital Excel
-                                df_5_columnas = preparar_tabla_digital_excel(dt_operario, conf_columnas)
-                                with pd.ExcelWriter(os.path.join(ruta_carpeta, "2_TABLA_DIGITAL.xlsx"), engine='xlsxwriter') as w_excel: 
-                                    df_5_columnas.to_excel(w_excel, index=False)
-                                
-                                # ARTEFACTO 3: Consolidado de Pólizas PDF
-                                if conf_polizas:
-                                    motor_fusion = fitz.open()
-                                    contador_polizas = 0
-                                    
-                                    for _, fila_dato in dt_operario.iterrows():
-                                        num_cuenta = normalizar_numero(str(fila_dato[conf_columnas['CUENTA']]))
-                                        if num_cuenta in conf_polizas:
-                                            with fitz.open(stream=conf_polizas[num_cuenta], filetype="pdf") as pdf_individual: 
-                                                motor_fusion.insert_pdf(pdf_individual)
-                                            contador_polizas += 1
-                                            
-                                    if contador_polizas > 0:
-                                        with open(os.path.join(ruta_carpeta, "3_PAQUETE_LEGALIZACION.pdf"), "wb") as f_pdf_pol: 
-                                            f_pdf_pol.write(motor_fusion.tobytes())
-                                    motor_fusion.close()
-                                
-                                barra_progreso.progress((iterador + 1) / len(lista_tecnicos_con_carga))
-                                
-                            st.success("✅ Operación completada. Los operarios ya pueden entrar a descargar.")
-                            st.balloons()
+                            # Corre en segundo plano: se arma en una versión nueva y se libera al terminar
+                            cola_trabajos().enviar("PUBLICACION", trabajo_publicacion, CARPETA_PUBLICA, dataframe_final.copy(),
+                                                   conf_columnas, conf_polizas, perfil_movil=perfil_movil,
+                                                   diferida=publicacion_diferida,
+                                                   huella=f"{huella_estado}:{perfil_movil}:{publicacion_diferida}")
+                        
+                        trabajo_pub = mostrar_trabajo("PUBLICACION")
+                        if trabajo_pub and trabajo_pub["estado"] == "COMPLETADO":
+                            resultado_pub = trabajo_pub['resultado']
+                            st.success(f"✅ Operación publicada (versión {resultado_pub['version']}). Los operarios ya pueden entrar a descargar.")
+                            if resultado_pub.get('diferida'):
+                                st.caption("⚡ Publicación instantánea: los archivos de cada técnico se arman cuando entra por primera vez.")
+                            if resultado_pub.get('bytes_paquetes'):
+                                perfil_pub = resultado_pub.get('perfil_movil')
+                                detalle_perfil = (f"perfil móvil {perfil_pub['dpi']} DPI, calidad {perfil_pub['calidad']}"
+                                                  if perfil_pub else "calidad original")
+                                st.caption(f"📄 Paquetes de pólizas publicados: {tamano_legible(resultado_pub['bytes_paquetes'])} "
+                                           f"en total ({detalle_perfil}).")
                     
                     # ---- BOTÓN 2: GENERAR ZIP Y REPORTE TXT PARA OFICINA ----
                     with columna_btn2:
                         st.markdown("#### 📦 Archivo Físico Despacho")
                         st.info("Genera el archivo ZIP con todas las rutas, excels y el **Reporte de Pólizas Faltantes**.")
                         
+                        formatos_consolidado = st.multiselect(
+                            "Formatos del Consolidado General:",
+                            options=list(FORMATOS_CONSOLIDADO.keys()),
+                            default=["XLSX"],
+                            help="CSV.GZ y PARQUET son más livianos y rápidos para las herramientas de análisis de la oficina."
+                        )
+                        incluir_libro = st.checkbox(
+                            "🖨️ Incluir Libro de Rutas (todas las hojas de ruta en un solo PDF)",
+                            value=True,
+                            help="Un PDF para imprimir de una vez: resumen de visitas y páginas, y un marcador por técnico."
+                        )
+                        
                         if st.button("DESCARGAR ZIP MAESTRO (CON REPORTE)"):
-                            buffer_zip = io.BytesIO()
-                            
-                            with zipfile.ZipFile(buffer_zip, "w") as archivo_z:
-                                
-                                # 1. CONSOLIDADO GENERAL INTACTO
-                                buffer_excel_maestro = io.BytesIO() 
-                                # Ocultamos el ORDEN_ORIGINAL del Excel final ya que es uso interno
-                                df_export_maestro = dataframe_final.drop(columns=['ORDEN_ORIGINAL']) if 'ORDEN_ORIGINAL' in dataframe_final.columns else dataframe_final
-                                with pd.ExcelWriter(buffer_excel_maestro, engine='xlsxwriter') as wr_maestro: 
-                                    df_export_maestro.to_excel(wr_maestro, index=False)
-                                archivo_z.writestr("00_CONSOLIDADO_GENERAL.xlsx", buffer_excel_maestro.getvalue())
-                                
-                                # ---------------------------------------------------------------------
-                                # 2. LÓGICA DE CRUCE DOCUMENTAL (EL REPORTE TXT SOLICITADO)
-                                # ---------------------------------------------------------------------
-                                string_reporte = f"REPORTE OFICIAL DE CRUCE DOCUMENTAL - PÓLIZAS FALTANTES\n"
-                                string_reporte += f"FECHA DE GENERACIÓN: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-                                string_reporte += "="*85 + "\n\n"
-                                
-                                if not conf_polizas:
-                                    string_reporte += "ALERTA DEL SISTEMA: No se ingresó ningún documento PDF con pólizas.\n"
-                                    string_reporte += "Asumiendo que toda la operación carece de soportes documentales.\n"
-                                else:
-                                    conjunto_cuentas_pdf = set(conf_polizas.keys())
-                                    df_analisis_cruce = dataframe_final.copy()
-                                    df_analisis_cruce['CUENTA_MATCH'] = df_analisis_cruce[conf_columnas['CUENTA']].astype(str).apply(normalizar_numero)
-                                    
-                                    df_sin_poliza = df_analisis_cruce[
-                                        ~df_analisis_cruce['CUENTA_MATCH'].isin(conjunto_cuentas_pdf) & 
-                                        (df_analisis_cruce['CUENTA_MATCH'] != '')
-                                    ]
-                                    
-                                    if df_sin_poliza.empty:
-                                        string_reporte += "ESTADO: EXCELENTE (0 FALTANTES)\n"
-                                        string_reporte += "Todas las visitas planificadas cuentan con su póliza respectiva en el sistema.\n"
-                                    else:
-                                        string_reporte += f"ESTADO: REQUIERE ATENCIÓN - Faltan {len(df_sin_poliza)} documentos físicos.\n\n"
-                                        string_reporte += "LISTADO DETALLADO POR OPERARIO Y ZONA:\n"
-                                        string_reporte += "-"*85 + "\n"
-                                        string_reporte += f"{'CUENTA'.ljust(15)} | {'TÉCNICO'.ljust(25)} | {'BARRIO'}\n"
-                                        string_reporte += "-"*85 + "\n"
-                                        
-                                        df_sin_poliza = df_sin_poliza.sort_values(by=['TECNICO_FINAL', conf_columnas['BARRIO']])
-                                        
-                                        for _, fila_cruce in df_sin_poliza.iterrows():
-                                            t_cuenta = str(fila_cruce['CUENTA_MATCH']).ljust(15)
-                                            t_tecnico = str(fila_cruce['TECNICO_FINAL'])[:23].ljust(25)
-                                            t_barrio = str(fila_cruce[conf_columnas['BARRIO']])[:40]
-                                            string_reporte += f"{t_cuenta} | {t_tecnico} | {t_barrio}\n"
-                                
-                                archivo_z.writestr("00_REPORTE_POLIZAS_FALTANTES.txt", string_reporte.encode('utf-8'))
-                                # ---------------------------------------------------------------------
-
-                                # 3. GENERAR CARPETAS INDIVIDUALES
-                                for tech_name in lista_tecnicos_con_carga:
-                                    folder_name = str(tech_name).replace(" ","_")
-                                    datos_tech = dataframe_final[dataframe_final['TECNICO_FINAL'] == tech_name].copy()
-                                    
-                                    # Aplicamos orden V74 original
-                                    if 'ORDEN_ORIGINAL' in datos_tech.columns:
-                                        datos_tech = datos_tech.sort_values(by=[conf_columnas['BARRIO'], 'ORDEN_ORIGINAL'])
-                                    else:
-                                        datos_tech = datos_tech.sort_values(by=[conf_columnas['BARRIO']])
-                                    
-                                    # Ruta PDF
-                                    archivo_z.writestr(f"{folder_name}/1_HOJA_DE_RUTA.pdf", crear_pdf_lista_final(datos_tech, tech_name, conf_columnas))
-                                    
-                                    # Tabla Digital 5 Columnas
-                                    buffer_tech_xls = io.BytesIO()
-                                    df_tech_5col = preparar_tabla_digital_excel(datos_tech, conf_columnas)
-                                    with pd.ExcelWriter(buffer_tech_xls, engine='xlsxwriter') as wr_tech: 
-                                        df_tech_5col.to_excel(wr_tech, index=False)
-                                    archivo_z.writestr(f"{folder_name}/2_TABLA_DIGITAL.xlsx", buffer_tech_xls.getvalue())
-                                    
-                                    # Pólizas
-                                    if conf_polizas:
-                                        motor_poliza = fitz.open()
-                                        num_inserts = 0
-                                        for _, r_data in datos_tech.iterrows():
-                                            cuenta_clean = normalizar_numero(str(r_data[conf_columnas['CUENTA']]))
-                                            if cuenta_clean in conf_polizas:
-                                                with fitz.open(stream=conf_polizas[cuenta_clean], filetype="pdf") as px: 
-                                                    motor_poliza.insert_pdf(px)
-                                                num_inserts += 1
-                                        if num_inserts > 0: 
-                                            archivo_z.writestr(f"{folder_name}/3_PAQUETE_LEGALIZACION.pdf", motor_poliza.tobytes())
-                                        motor_poliza.close()
-                                        
-                            st.session_state['zip_admin_ready'] = buffer_zip.getvalue()
-                            st.success("✅ Archivo ZIP Creado Exitosamente. Incluye Reporte de Faltantes.")
+                            cola_trabajos().enviar("ZIP_MAESTRO", trabajo_zip_maestro, dataframe_final.copy(), conf_columnas,
+                                                   conf_polizas, list(formatos_consolidado),
+                                                   columnas_laterales=st.session_state.get('columnas_laterales'),
+                                                   libro_rutas=incluir_libro,
+                                                   huella=f"{huella_estado}:{','.join(formatos_consolidado)}:{incluir_libro}")
                         
-                        # Botón persistente de descarga
-                        if st.session_state.get('zip_admin_ready'):
+                        # Botón persistente de descarga (también tras recargar la página)
+                        trabajo_zip = mostrar_trabajo("ZIP_MAESTRO")
+                        if trabajo_zip and trabajo_zip["estado"] == "COMPLETADO" and os.path.exists(trabajo_zip["resultado"]["archivo"]):
+                            for aviso in trabajo_zip["resultado"]["avisos"]:
+                                st.warning(f"⚠️ {aviso}")
+                            st.success("✅ Archivo ZIP Creado Exitosamente. Incluye Reporte de Faltantes.")
+                            if trabajo_zip["resultado"].get("bytes_paquetes"):
+                                st.caption(f"📄 Paquetes de pólizas a calidad original: "
+                                           f"{tamano_legible(trabajo_zip['resultado']['bytes_paquetes'])} en total.")
                             st.download_button(
                                 label="⬇️ DESCARGAR SISTEMA COMPLETO (ZIP)", 
-                                data=st.session_state['zip_admin_ready'], 
-                                file_name=f"Logistica_ITA_{datetime.now().strftime('%Y%m%d_%H%M')}.zip", 
+                                data=partial(leer_bytes, trabajo_zip["resultado"]["archivo"]), 
+                                file_name=f"Logistica_ITA_{trabajo_zip['actualizado'][:16].replace('-', '').replace('T', '_').replace(':', '')}.zip", 
                                 mime="application/zip", 
                                 use_container_width=True
                             )
 
+                        # Solo el libro de rutas: se arma al pulsar (una pasada, sin esperar el ZIP)
+                        if tecnicos_con_carga(dataframe_final):
+                            st.download_button(
+                                label="🖨️ DESCARGAR SOLO EL LIBRO DE RUTAS (PDF)",
+                                data=partial(crear_libro_rutas, dataframe_final, conf_columnas),
+                                file_name=f"Libro_Rutas_ITA_{datetime.now().strftime('%Y%m%d')}.pdf",
+                                mime="application/pdf",
+                                use_container_width=True
+                            )
+                        else:
+                            st.caption("🖨️ Libro de rutas: ningún técnico tiene visitas asignadas.")
+
             else: 
                 st.info("Para exportar, primero debes procesar la información en la Pestaña 2.")
+
+        # -------------------------------------------------------------------------------
+        # TAB 5: ANALÍTICA HISTÓRICA (SOLO ACUMULADOS DIARIOS)
+        # -------------------------------------------------------------------------------
+        with tab5:
+            st.markdown("### 📈 Analítica Histórica de la Operación")
+            st.caption("Cada día publicado en el portal o exportado en el ZIP maestro queda en el histórico. "
+                       "Las gráficas leen solo los acumulados diarios por técnico, barrio y motivo de traslado.")
+            marca_historial = historial_operaciones().marca()
+            dias_registrados = consultar_historial(marca_historial, "dias")
+
+            if dias_registrados.empty:
+                st.info("Aún no hay días registrados. Se agregan al publicar el portal o generar el ZIP maestro (Pestaña 4).")
+            else:
+                primer_dia = datetime.fromisoformat(dias_registrados['fecha'].iloc[0]).date()
+                ultimo_dia = datetime.fromisoformat(dias_registrados['fecha'].iloc[-1]).date()
+                rango_fechas = st.date_input(
+                    "Rango de fechas:",
+                    value=(max(primer_dia, ultimo_dia - timedelta(days=29)), ultimo_dia),
+                    min_value=primer_dia,
+                    max_value=ultimo_dia,
+                    key="rango_analitica"
+                )
+
+                if len(rango_fechas) != 2:
+                    st.caption("Selecciona también la fecha final del rango.")
+                else:
+                    desde, hasta = (f.isoformat() for f in rango_fechas)
+                    dias_rango = dias_registrados[dias_registrados['fecha'].between(desde, hasta)]
+                    total_visitas = int(dias_rango['visitas'].sum())
+
+                    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+                    kpi1.metric("Días Operados", len(dias_rango))
+                    kpi2.metric("Visitas", f"{total_visitas:,}")
+                    kpi3.metric("Absorbidas por Otro Técnico",
+                                f"{dias_rango['absorbidas'].sum() / total_visitas:.1%}" if total_visitas else "0%")
+                    kpi4.metric("Publicadas con Bolsa Pendiente", int(dias_rango['en_bolsa'].sum()))
+
+                    import plotly.express as px
+
+                    col_dias, col_motivos = st.columns(2)
+                    with col_dias:
+                        fig_dias = px.bar(
+                            dias_rango.melt(id_vars='fecha', value_vars=['propias', 'absorbidas', 'en_bolsa'],
+                                            var_name='Tipo', value_name='Visitas'),
+                            x='fecha', y='Visitas', color='Tipo', title="Visitas por día",
+                            labels={'fecha': 'Fecha'}
+                        )
+                        st.plotly_chart(fig_dias, use_container_width=True)
+                    with col_motivos:
+                        motivos = consultar_historial(marca_historial, "por_motivo", desde, hasta)
+                        fig_motivos = px.bar(motivos, x='fecha', y='visitas', color='motivo',
+                                             title="Visitas fuera de su técnico por motivo",
+                                             labels={'fecha': 'Fecha', 'visitas': 'Visitas', 'motivo': 'Motivo'})
+                        st.plotly_chart(fig_motivos, use_container_width=True)
+
+                    col_tecnicos, col_barrios = st.columns(2)
+                    with col_tecnicos:
+                        por_tecnico = consultar_historial(marca_historial, "por_tecnico", desde, hasta).head(25)
+                        fig_tecnicos = px.bar(
+                            por_tecnico.melt(id_vars='tecnico', value_vars=['absorbidas', 'cedidas'],
+                                             var_name='Movimiento', value_name='Visitas'),
+                            x='Visitas', y='tecnico', color='Movimiento', orientation='h', barmode='group',
+                            title="Técnicos que más absorben (y ceden) carga", labels={'tecnico': ''}
+                        )
+                        fig_tecnicos.update_yaxes(autorange="reversed")
+                        st.plotly_chart(fig_tecnicos, use_container_width=True)
+                    with col_barrios:
+                        por_barrio = consultar_historial(marca_historial, "por_barrio", desde, hasta)
+                        fig_barrios = px.bar(por_barrio, x='absorbidas', y='barrio', orientation='h',
+                                             hover_data=['visitas', 'dias'],
+                                             title="Barrios con más visitas trasladadas",
+                                             labels={'barrio': '', 'absorbidas': 'Visitas absorbidas'})
+                        fig_barrios.update_yaxes(autorange="reversed")
+                        st.plotly_chart(fig_barrios, use_container_width=True)
+
+        # Punto de control en disco (solo si hubo una distribución o un traslado en esta ejecución)
+        guardar_operacion_en_disco()
+
+        # -------------------------------------------------------------------------------
+        # PANEL DE DIAGNÓSTICO DE RENDIMIENTO (COLAPSABLE)
+        # -------------------------------------------------------------------------------
+        # Se pinta al final para que incluya las mediciones de la acción recién ejecutada.
+        st.divider()
+        with st.expander("🩺 Diagnóstico de Rendimiento (Tiempos y Memoria por Etapa)", expanded=False):
+            from instrumentacion import CARPETA_DIAGNOSTICOS, resumen_por_corrida
+
+            resumen_etapas = resumen_por_corrida()
+            if resumen_etapas:
+                st.caption("Tiempo real, filas/páginas procesadas y pico de memoria (RSS) de cada etapa, agrupado por acción. "
+                           "La etapa paquete_polizas de PUBLICACION PORTAL y de ZIP MAESTRO compara el perfil móvil con el original.")
+                st.dataframe(
+                    pd.DataFrame(resumen_etapas).rename(columns={
+                        'corrida': 'Acción', 'etapa': 'Etapa', 'ejecuciones': 'Llamadas',
+                        'segundos': 'Segundos', 'unidades': 'Filas/Páginas', 'pico_rss_mb': 'Pico RSS (MB)'
+                    }),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.caption("Aún no hay mediciones en este servidor. Ejecuta alguna acción de las pestañas 1 a 4.")
+            st.caption(f"Historial de tendencias: `{CARPETA_DIAGNOSTICOS}/metricas.jsonl` (días anteriores: `metricas-AAAA-MM-DD.jsonl`) | "
+                       f"Formato Prometheus: `{CARPETA_DIAGNOSTICOS}/metricas.<pid>.prom`")
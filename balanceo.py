@@ -0,0 +1,149 @@
+#########################################################################################
+#                                                                                       #
+#   AUTO-BALANCEO DE LA BOLSA PENDIENTE - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA          #
+#                                                                                       #
+#   Reparte la Bolsa Pendiente entre los técnicos activos con cupo libre, en una sola   #
+#   pasada voraz (sin un traslado manual por barrio):                                   #
+#   - Los barrios se asignan completos cuando algún técnico tiene cupo para todo el     #
+#     barrio; si nadie lo tiene, se parte en el orden V74 entre los mejores candidatos. #
+#   - Preferencia: técnico que ya trabaja el mismo barrio > dueño de la zona            #
+#     (TECNICO_IDEAL) > técnico con barrios más cercanos (centroides de dirección).     #
+#   - Resultado: una propuesta revisable; nada cambia hasta que se aplica.              #
+#                                                                                       #
+#########################################################################################
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import instrumentar
+from motor_logistico import (
+    BOLSA_PENDIENTE,
+    CUPO_POR_DEFECTO,
+    clave_barrio,
+    reordenar_operacion_global,
+)
+from secuenciacion import coordenadas_direcciones
+
+# Puntaje en "cuadras equivalentes": menor es mejor
+BONO_MISMO_BARRIO = 40
+BONO_DUENO_ZONA = 20
+# Distancia supuesta cuando no hay direcciones legibles para comparar barrios
+DISTANCIA_DESCONOCIDA = 30
+
+MOTIVO_MISMO_BARRIO = "Ya trabaja el barrio"
+MOTIVO_DUENO_ZONA = "Dueño de la zona"
+MOTIVO_VECINO = "Barrio vecino"
+MOTIVO_CUPO = "Cupo disponible"
+
+COLUMNAS_PROPUESTA = ["BARRIO", "TECNICO_IDEAL", "DESTINO", "VISITAS", "MOTIVO"]
+
+@instrumentar("auto_balanceo", unidades=lambda r, df, *a, **k: len(df))
+def proponer_balanceo(df_estado, col_map, tecnicos_activos, limites_cupo):
+    """
+    Propone cómo vaciar la Bolsa Pendiente sin pasar el cupo de nadie.
+    Retorna {"propuesta": DataFrame (COLUMNAS_PROPUESTA), "asignacion": Series índice -> destino,
+             "sin_cupo": visitas que no caben en ningún técnico}.
+    """
+    col_barrio = col_map['BARRIO']
+    col_direccion = col_map.get('DIRECCION')
+    en_bolsa = df_estado['TECNICO_FINAL'] == BOLSA_PENDIENTE
+    bolsa = df_estado[en_bolsa]
+    vacio = {"propuesta": pd.DataFrame(columns=COLUMNAS_PROPUESTA), "asignacion": pd.Series(dtype=object), "sin_cupo": len(bolsa)}
+
+    # Cupo libre de cada técnico activo
+    carga = df_estado['TECNICO_FINAL'].value_counts()
+    tecnicos = [t for t in tecnicos_activos if limites_cupo.get(t, CUPO_POR_DEFECTO) - carga.get(t, 0) > 0]
+    if bolsa.empty or not tecnicos:
+        return vacio
+    cupo = np.array([limites_cupo.get(t, CUPO_POR_DEFECTO) - carga.get(t, 0) for t in tecnicos])
+    posicion_tecnico = {t: i for i, t in enumerate(tecnicos)}
+
+    claves = clave_barrio(df_estado[col_barrio])
+    orden_v74 = 'ORDEN_ORIGINAL' if 'ORDEN_ORIGINAL' in bolsa.columns else col_barrio
+
+    # Bloques de la bolsa: (barrio, dueño de la zona), los más grandes primero
+    bolsa = bolsa.assign(_CLAVE=claves[en_bolsa]).sort_values(by=['_CLAVE', orden_v74])
+    bloques = bolsa.groupby(['_CLAVE', 'TECNICO_IDEAL'], sort=False, observed=True).indices
+    lista_bloques = sorted(bloques.items(), key=lambda par: -len(par[1]))
+    nombres_bloque = [clave for clave, _ in lista_bloques]
+
+    # Barrios que ya trabaja cada técnico activo (clave -> técnicos)
+    activos = df_estado['TECNICO_FINAL'].isin(tecnicos)
+    mismo_barrio = np.zeros((len(lista_bloques), len(tecnicos)), dtype=bool)
+    trabajados = pd.DataFrame({"CLAVE": claves[activos], "TECNICO": df_estado.loc[activos, 'TECNICO_FINAL']}).drop_duplicates()
+    fila_por_clave = {}
+    for b, (clave_b, _) in enumerate(nombres_bloque):
+        fila_por_clave.setdefault(clave_b, []).append(b)
+    for clave_t, tecnico in zip(trabajados['CLAVE'], trabajados['TECNICO']):
+        for b in fila_por_clave.get(clave_t, ()):
+            mismo_barrio[b, posicion_tecnico[tecnico]] = True
+
+    es_dueno = np.array([[dueno == t for t in tecnicos] for _, dueno in nombres_bloque], dtype=bool)
+
+    # Distancia (cuadras) de cada bloque al barrio más cercano de cada técnico (NaN: sin direcciones)
+    distancia = np.full((len(lista_bloques), len(tecnicos)), np.nan)
+    centro_bloque = np.full((len(lista_bloques), 2), np.nan)
+    if col_direccion:
+        xy = coordenadas_direcciones(df_estado[col_direccion])
+        centro_bloque = np.array([xy.loc[bolsa.index[posiciones]].mean().to_numpy() for _, posiciones in lista_bloques])
+        centros = xy[activos].groupby([df_estado.loc[activos, 'TECNICO_FINAL'], claves[activos]], observed=True).mean().dropna()
+        if len(centros):
+            d = (np.abs(centro_bloque[:, :1] - centros['X'].to_numpy()[None, :])
+                 + np.abs(centro_bloque[:, 1:] - centros['Y'].to_numpy()[None, :]))
+            por_tecnico = pd.DataFrame(d.T).groupby(centros.index.get_level_values(0).to_numpy()).min()
+            for tecnico, fila in por_tecnico.iterrows():
+                distancia[:, posicion_tecnico[tecnico]] = fila.to_numpy()
+
+    asignacion = {}
+    filas_propuesta = []
+    for b, ((clave_b, dueno), posiciones) in enumerate(lista_bloques):
+        indices = bolsa.index[posiciones]
+        puntaje = (np.nan_to_num(distancia[b], nan=DISTANCIA_DESCONOCIDA)
+                   - BONO_MISMO_BARRIO * mismo_barrio[b] - BONO_DUENO_ZONA * es_dueno[b])
+        barrio_txt = bolsa.loc[indices[0], col_barrio]
+        pendientes = len(indices)
+
+        # 1. Barrio completo al mejor técnico que tenga cupo para todo; 2. si nadie, se parte
+        while pendientes and cupo.sum() > 0:
+            caben = cupo >= pendientes
+            candidatos = np.where(caben if caben.any() else cupo > 0, puntaje, np.inf)
+            j = int(np.argmin(candidatos))
+            cantidad = min(pendientes, int(cupo[j]))
+            tramo = indices[len(indices) - pendientes:len(indices) - pendientes + cantidad]
+            tecnico = tecnicos[j]
+            asignacion.update(dict.fromkeys(tramo, tecnico))
+            cupo[j] -= cantidad
+            pendientes -= cantidad
+
+            if mismo_barrio[b, j]:
+                motivo = MOTIVO_MISMO_BARRIO
+            elif es_dueno[b, j]:
+                motivo = MOTIVO_DUENO_ZONA
+            elif not np.isnan(distancia[b, j]):
+                motivo = f"{MOTIVO_VECINO} ({distancia[b, j]:.0f} cuadras)"
+            else:
+                motivo = MOTIVO_CUPO
+            filas_propuesta.append({
+                "BARRIO": barrio_txt, "TECNICO_IDEAL": dueno, "DESTINO": tecnico, "VISITAS": cantidad,
+                "MOTIVO": motivo,
+            })
+
+            # El técnico ahora trabaja este barrio: los bloques del mismo barrio y los vecinos lo prefieren
+            mismo_barrio[fila_por_clave[clave_b], j] = True
+            cercania = np.abs(centro_bloque[:, 0] - centro_bloque[b, 0]) + np.abs(centro_bloque[:, 1] - centro_bloque[b, 1])
+            distancia[:, j] = np.fmin(distancia[:, j], cercania)
+
+    sin_cupo = len(bolsa) - len(asignacion)
+    return {
+        "propuesta": pd.DataFrame(filas_propuesta, columns=COLUMNAS_PROPUESTA),
+        "asignacion": pd.Series(asignacion, dtype=object),
+        "sin_cupo": sin_cupo,
+    }
+
+def aplicar_balanceo(df_estado, col_map, asignacion):
+    """Aplica la propuesta: las visitas salen de la bolsa guardando su dueño original (ORIGEN_REAL)."""
+    df_work = df_estado.copy()
+    indices = asignacion.index.intersection(df_work.index[df_work['TECNICO_FINAL'] == BOLSA_PENDIENTE])
+    df_work.loc[indices, 'ORIGEN_REAL'] = df_work.loc[indices, 'TECNICO_IDEAL']
+    df_work.loc[indices, 'TECNICO_FINAL'] = asignacion[indices]
+    return reordenar_operacion_global(df_work, col_map)
@@ -0,0 +1,69 @@
+"""
+MEDICIÓN DEL ARRANQUE EN FRÍO DEL PORTAL DE TÉCNICOS
+
+Lanza un proceso Python nuevo por cada repetición (arranque realmente en frío), ejecuta
+app.py con el perfil TÉCNICO mediante el AppTest de Streamlit y reporta:
+- Tiempo hasta el primer render completo del script (import + ejecución).
+- Qué librerías pesadas quedaron cargadas (fitz, fpdf, pandas, xlsxwriter).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_arranque --repeticiones 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (plotly no se lista: el propio AppTest de Streamlit lo importa)
+LIBRERIAS_PESADAS = ["fitz", "pymupdf", "fpdf", "pandas", "numpy", "xlsxwriter", "openpyxl"]
+
+# Código que corre dentro del proceso hijo
+_PROGRAMA_HIJO = r"""
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+listo_streamlit = time.perf_counter()
+at = AppTest.from_file({ruta_app!r}, default_timeout=120)
+at.run()
+fin = time.perf_counter()
+print(json.dumps({{
+    "import_streamlit_s": listo_streamlit - inicio,
+    "primer_render_s": fin - listo_streamlit,
+    "error": [str(e.value) for e in at.exception],
+    "librerias": [m for m in {librerias!r} if m in sys.modules],
+}}))
+"""
+
+
+def medir_una_vez():
+    programa = _PROGRAMA_HIJO.format(ruta_app=os.path.join(RAIZ, "app.py"), librerias=LIBRERIAS_PESADAS)
+    salida = subprocess.run([sys.executable, "-c", programa], cwd=RAIZ, capture_output=True, text=True, check=True)
+    ultima_linea = [l for l in salida.stdout.splitlines() if l.startswith("{")][-1]
+    return json.loads(ultima_linea)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo hasta el primer render del portal de técnicos.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    mediciones = [medir_una_vez() for _ in range(args.repeticiones)]
+    errores = [m["error"] for m in mediciones if m["error"]]
+    if errores:
+        print(f"El script falló: {errores[0]}")
+        return 1
+
+    renders = [m["primer_render_s"] for m in mediciones]
+    print(f"Primer render portal técnico: mediana {statistics.median(renders):.3f} s "
+          f"(mín {min(renders):.3f} s, máx {max(renders):.3f} s, n={len(renders)})")
+    print(f"Librerías pesadas cargadas: {', '.join(mediciones[-1]['librerias']) or 'ninguna'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
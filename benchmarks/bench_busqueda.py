@@ -0,0 +1,134 @@
+"""
+MEDICIÓN DEL BUSCADOR DE LA OPERACIÓN DEL DÍA
+
+Distribuye una ruta sintética grande (con ausencias y cupos), la compacta como df_simulado
+y mide:
+  1. Armado del índice (una vez por operación).
+  2. Búsquedas de cuenta, orden, dirección ("Calle 72"), cliente y prefijos de barrio.
+  3. Actualización tras vaciar la Bolsa con el balanceo automático (solo técnicos y origen).
+  4. Referencia: la misma búsqueda de texto recorriendo el DataFrame (str.contains).
+Verifica que el índice actualizado responda igual que uno armado de cero.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_busqueda
+    python -m benchmarks.bench_busqueda --filas 250000 --busquedas 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from balanceo import aplicar_balanceo, proponer_balanceo
+from benchmarks.datos_sinteticos import generar_maestro, generar_ruta
+from indice_busqueda import IndiceBusqueda
+from motor_logistico import cargar_maestro_dinamico, compactar_operacion, ejecutar_distribucion
+
+COL_MAP = {
+    'BARRIO': 'BARRIO',
+    'DIRECCION': 'DIRECCION',
+    'CUENTA': 'CUENTA',
+    'ORDEN': 'ORDEN',
+    'MEDIDOR': 'MEDIDOR',
+    'CLIENTE': 'CLIENTE',
+}
+
+# Meta del buscador: respuesta en menos de 10 ms
+META_MS_BUSQUEDA = 10.0
+
+
+def operacion_del_dia(barrios, tecnicos, filas):
+    """df_simulado tras la distribución, con el 10% de técnicos ausentes y cupos ajustados."""
+    df_maestro = generar_maestro(barrios, tecnicos)
+    with tempfile.TemporaryDirectory() as carpeta_tmp:
+        ruta_maestro = os.path.join(carpeta_tmp, "maestro.xlsx")
+        df_maestro.to_excel(ruta_maestro, index=False)
+        mapa_barrios, _ = cargar_maestro_dinamico(ruta_maestro)
+    todos = sorted(set(mapa_barrios.values()))
+    tecnicos_hoy = [t for i, t in enumerate(todos) if i % 10]
+    limites = {t: int(filas / len(tecnicos_hoy) * 1.05) for t in tecnicos_hoy}
+    df_final = ejecutar_distribucion(generar_ruta(df_maestro, filas), COL_MAP, mapa_barrios, tecnicos_hoy, limites)
+    return compactar_operacion(df_final, COL_MAP, todos)[0], tecnicos_hoy, limites
+
+
+def busquedas_tipo(df_estado, n, semilla=5):
+    """Mezcla de lo que pregunta un supervisor durante el día."""
+    rnd = random.Random(semilla)
+    muestra = df_estado.sample(n, replace=True, random_state=semilla)
+    consultas = []
+    for i, (_, fila) in enumerate(muestra.iterrows()):
+        tipo = i % 5
+        if tipo == 0:
+            consultas.append(str(fila['CUENTA']))
+        elif tipo == 1:
+            consultas.append(str(fila['ORDEN']))
+        elif tipo == 2:
+            via, numero = str(fila['DIRECCION']).split()[:2]
+            consultas.append(f"{rnd.choice(['Calle', 'CL', 'Carrera', 'KR'])} {numero}" if rnd.random() < 0.5 else f"{via} {numero}")
+        elif tipo == 3:
+            consultas.append(" ".join(str(fila['CLIENTE']).split()[:2]).lower())
+        else:
+            consultas.append(str(fila['BARRIO']).strip()[:7])
+    return consultas
+
+
+def cronometrar(funcion, argumentos):
+    tiempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def percentil(tiempos, p):
+    return sorted(tiempos)[min(len(tiempos) - 1, int(len(tiempos) * p))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Armado, búsquedas y actualización del índice del buscador.")
+    parser.add_argument("--barrios", type=int, default=300)
+    parser.add_argument("--tecnicos", type=int, default=60)
+    parser.add_argument("--filas", type=int, default=120000)
+    parser.add_argument("--busquedas", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    df_estado, tecnicos_hoy, limites = operacion_del_dia(args.barrios, args.tecnicos, args.filas)
+    consultas = busquedas_tipo(df_estado, args.busquedas)
+
+    inicio = time.perf_counter()
+    indice = IndiceBusqueda(df_estado, COL_MAP)
+    t_armado = time.perf_counter() - inicio
+    t_busquedas = cronometrar(indice.buscar, consultas)
+    sin_resultado = sum(indice.buscar(c)[1] == 0 for c in consultas)
+
+    propuesta = proponer_balanceo(df_estado, COL_MAP, tecnicos_hoy, limites)
+    df_balanceado = aplicar_balanceo(df_estado, COL_MAP, propuesta["asignacion"])
+    inicio = time.perf_counter()
+    cambiadas = indice.actualizar(df_balanceado)
+    t_actualizar = time.perf_counter() - inicio
+    de_cero = IndiceBusqueda(df_balanceado, COL_MAP)
+    for consulta in consultas[:200]:
+        assert indice.buscar(consulta, limite=None)[0].equals(de_cero.buscar(consulta, limite=None)[0]), consulta
+
+    texto = df_estado[COL_MAP['DIRECCION']].astype(str)
+    t_recorrido = cronometrar(lambda c: texto.str.contains(c, case=False, regex=False).sum(),
+                              [c for i, c in enumerate(consultas[:50]) if i % 5 == 2])
+
+    print(f"{len(df_estado):,} visitas · {len(indice._vocabulario):,} palabras indexadas")
+    print(f"Armado del índice: {t_armado:.2f} s")
+    print(f"Búsquedas ({len(consultas)}, {sin_resultado} sin resultado): mediana {statistics.median(t_busquedas) * 1000:.2f} ms, "
+          f"p99 {percentil(t_busquedas, 0.99) * 1000:.2f} ms, máximo {max(t_busquedas) * 1000:.2f} ms")
+    print(f"Actualización tras el balanceo ({cambiadas:,} visitas cambiaron): {t_actualizar * 1000:.0f} ms")
+    print(f"Referencia: buscar una dirección recorriendo el DataFrame: mediana {statistics.median(t_recorrido) * 1000:.1f} ms")
+    if percentil(t_busquedas, 0.99) * 1000 > META_MS_BUSQUEDA:
+        print(f"El p99 de las búsquedas supera la meta de {META_MS_BUSQUEDA:.0f} ms.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
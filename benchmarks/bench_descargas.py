@@ -0,0 +1,156 @@
+"""
+PRUEBA DE CARGA DEL SERVIDOR DE DESCARGAS ESTÁTICAS
+
+Publica un portal sintético, levanta servidor_descargas.py en local y simula la jornada
+de N técnicos en paralelo con un ancho de banda limitado por celular:
+  1. Bajan sus tres archivos; a una fracción se les corta el paquete de pólizas a mitad.
+  2. Más tarde vuelven a abrir el portal y piden los mismos archivos otra vez.
+
+Se compara el mismo servidor usado de dos maneras:
+  - completo:    sin reanudar ni revalidar (una descarga cortada empieza de cero y cada
+                 visita vuelve a bajar todo, como con una URL nueva en cada recarga).
+  - reanudable:  Range + If-Range tras el corte e If-None-Match (304) en la segunda visita.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_descargas
+    python -m benchmarks.bench_descargas --tecnicos 40 --concurrencia 40 --mb-paquete 3 --mbps 20 --cortes 0.3
+"""
+
+import argparse
+import http.client
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.datos_sinteticos import generar_portal_publico
+from portal_publico import ARCHIVO_HOJA_RUTA, ARCHIVO_PAQUETE, ARCHIVO_TABLA_DIGITAL, tamano_legible
+from servidor_descargas import iniciar_en_segundo_plano, secreto_descargas, url_descarga
+
+ARCHIVOS = (ARCHIVO_HOJA_RUTA, ARCHIVO_TABLA_DIGITAL, ARCHIVO_PAQUETE)
+TAMANO_LECTURA = 64 * 1024
+
+
+def pedir(puerto, ruta, cabeceras=None, corte=None, bytes_por_segundo=None):
+    """GET con lectura a ritmo de celular. Retorna (estado, bytes recibidos, segundos, etag)."""
+    inicio = time.perf_counter()
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+    try:
+        conexion.request("GET", ruta, headers=cabeceras or {})
+        respuesta = conexion.getresponse()
+        recibidos = 0
+        while True:
+            pedazo = respuesta.read(TAMANO_LECTURA)
+            if not pedazo:
+                break
+            recibidos += len(pedazo)
+            if bytes_por_segundo:
+                time.sleep(len(pedazo) / bytes_por_segundo)
+            if corte is not None and recibidos >= corte:
+                break  # señal perdida: se cierra la conexión a mitad de la descarga
+        return respuesta.status, recibidos, time.perf_counter() - inicio, respuesta.getheader("ETag")
+    finally:
+        conexion.close()
+
+
+def jornada_tecnico(modo, puerto, enlaces, tamanos, se_corta, bytes_por_segundo):
+    """Dos visitas al portal de un técnico. Retorna [(estado esperado?, bytes, segundos)] por petición."""
+    peticiones, etags = [], {}
+
+    def registrar(esperados, resultado):
+        estado, recibidos, segundos, etag = resultado
+        peticiones.append((estado in esperados, recibidos, segundos))
+        return recibidos, etag
+
+    # Primera visita: los tres archivos (el paquete puede cortarse a mitad)
+    for archivo in ARCHIVOS:
+        corte = tamanos[archivo] // 2 if (se_corta and archivo == ARCHIVO_PAQUETE) else None
+        recibidos, etags[archivo] = registrar((200,), pedir(puerto, enlaces[archivo], corte=corte,
+                                                             bytes_por_segundo=bytes_por_segundo))
+        if corte is None:
+            continue
+        if modo == "reanudable":
+            cabeceras = {"Range": f"bytes={recibidos}-", "If-Range": etags[archivo]}
+            registrar((206,), pedir(puerto, enlaces[archivo], cabeceras, bytes_por_segundo=bytes_por_segundo))
+        else:
+            registrar((200,), pedir(puerto, enlaces[archivo], bytes_por_segundo=bytes_por_segundo))
+
+    # Segunda visita: los mismos archivos (la publicación no cambió)
+    for archivo in ARCHIVOS:
+        if modo == "reanudable":
+            registrar((304,), pedir(puerto, enlaces[archivo], {"If-None-Match": etags[archivo]}))
+        else:
+            registrar((200,), pedir(puerto, enlaces[archivo], bytes_por_segundo=bytes_por_segundo))
+    return peticiones
+
+
+def medir_modo(modo, puerto, casos, concurrencia, bytes_por_segundo):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        jornadas = list(ejecutor.map(
+            lambda caso: jornada_tecnico(modo, puerto, *caso, bytes_por_segundo), casos))
+    segundos = time.perf_counter() - inicio
+    peticiones = [p for jornada in jornadas for p in jornada]
+    latencias = sorted(p[2] for p in peticiones)
+    return {
+        "segundos": segundos,
+        "peticiones": len(peticiones),
+        "errores": sum(not p[0] for p in peticiones),
+        "bytes": sum(p[1] for p in peticiones),
+        "p50": statistics.median(latencias),
+        "p95": latencias[int(0.95 * (len(latencias) - 1))],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Descargas completas vs. reanudables/revalidadas contra el servidor estático.")
+    parser.add_argument("--tecnicos", type=int, default=30)
+    parser.add_argument("--concurrencia", type=int, default=30, help="Técnicos descargando a la vez.")
+    parser.add_argument("--mb-paquete", type=float, default=3.0, help="Tamaño medio del paquete de pólizas.")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Ancho de banda por celular (0 = sin límite).")
+    parser.add_argument("--cortes", type=float, default=0.3, help="Fracción de técnicos a los que se les corta el paquete.")
+    args = parser.parse_args(argv)
+
+    carpeta = tempfile.mkdtemp(prefix="ita_descargas_")
+    manifiesto = generar_portal_publico(carpeta, args.tecnicos, bytes_paquete=int(args.mb_paquete * 1_000_000))
+    servidor = iniciar_en_segundo_plano(0, carpeta, host="127.0.0.1")
+    puerto = servidor.server_address[1]
+    secreto = secreto_descargas(carpeta)
+
+    rnd = random.Random(5)
+    casos = []
+    for entrada in manifiesto["tecnicos"].values():
+        enlaces = {a: url_descarga("", secreto, manifiesto["version"], entrada["carpeta"], a, a) for a in ARCHIVOS}
+        tamanos = {a: entrada["archivos"][a]["bytes"] for a in ARCHIVOS}
+        casos.append((enlaces, tamanos, rnd.random() < args.cortes))
+    utiles = sum(sum(tamanos.values()) for _, tamanos, _ in casos)
+    bytes_por_segundo = args.mbps * 125_000 if args.mbps else None
+
+    print(f"{args.tecnicos} técnicos ({args.concurrencia} a la vez), {tamano_legible(utiles)} publicados, "
+          f"{sum(c[2] for c in casos)} descargas cortadas, "
+          f"{f'{args.mbps:g} Mbps por celular' if args.mbps else 'sin límite de ancho de banda'}")
+    try:
+        resultados = {modo: medir_modo(modo, puerto, casos, args.concurrencia, bytes_por_segundo)
+                      for modo in ("completo", "reanudable")}
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    print(f"{'Modo':<12} {'Segundos':>9} {'Peticiones':>11} {'Errores':>8} {'Transferido':>12} "
+          f"{'p50 (s)':>8} {'p95 (s)':>8} {'Técnicos/s':>11}")
+    for modo, r in resultados.items():
+        print(f"{modo:<12} {r['segundos']:>9.2f} {r['peticiones']:>11} {r['errores']:>8} {tamano_legible(r['bytes']):>12} "
+              f"{r['p50']:>8.3f} {r['p95']:>8.3f} {args.tecnicos / r['segundos']:>11.2f}")
+
+    completo, reanudable = resultados["completo"], resultados["reanudable"]
+    print(f"Bytes transferidos: -{1 - reanudable['bytes'] / completo['bytes']:.0%} · "
+          f"tiempo total: {completo['segundos'] / reanudable['segundos']:.1f}x más rápido")
+    return 1 if completo["errores"] or reanudable["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
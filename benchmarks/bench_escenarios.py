@@ -0,0 +1,114 @@
+"""
+MEDICIÓN DEL SIMULADOR DE CUPOS (ESCENARIOS ¿QUÉ PASARÍA SI...?)
+
+Asigna una ruta sintética grande y compara, para muchos escenarios de cupo:
+  1. Preparación del simulador (volúmenes por técnico y barrio, una vez por ruta).
+  2. Barrido vectorizado: cupo uniforme en un rango y ajustes por técnico sobre unos
+     cupos base, todos evaluados de una vez.
+  3. Referencia: aplicar_reglas_cupo escenario por escenario, como al volver a pulsar
+     "INICIAR ALGORITMO DE DISTRIBUCIÓN" con otros cupos.
+Verifica en una muestra de escenarios aleatorios que bolsa, técnicos sobrecargados y
+barrios partidos coincidan exactamente con lo que producen las reglas de cupo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_escenarios
+    python -m benchmarks.bench_escenarios --filas 250000 --tecnicos 120 --verificar 40
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_maestro, generar_ruta
+from escenarios_cupo import SimuladorCupos, escenarios_ajuste, escenarios_uniformes
+from motor_logistico import MOTIVO_EXCEDE_CUPO, aplicar_reglas_cupo, asignar_tecnicos, cargar_maestro_dinamico
+
+# Meta del barrido: la tabla de escenarios debe sentirse instantánea en la Pestaña 2
+META_MS_BARRIDO = 200.0
+
+
+def ruta_asignada(barrios, tecnicos, filas):
+    df_maestro = generar_maestro(barrios, tecnicos)
+    with tempfile.TemporaryDirectory() as carpeta_tmp:
+        ruta_maestro = os.path.join(carpeta_tmp, "maestro.xlsx")
+        df_maestro.to_excel(ruta_maestro, index=False)
+        mapa_barrios, _ = cargar_maestro_dinamico(ruta_maestro)
+    df_ruta = generar_ruta(df_maestro, filas)
+    return df_ruta, asignar_tecnicos(df_ruta, 'BARRIO', mapa_barrios), mapa_barrios
+
+
+def resultado_reglas(df_asignado, tecnicos_hoy, limites):
+    """Lo mismo que mide el simulador, contado sobre la salida real de aplicar_reglas_cupo."""
+    df = aplicar_reglas_cupo(df_asignado.copy(), 'BARRIO', tecnicos_hoy, limites)
+    por_cupo = df['ORIGEN_REAL'] == MOTIVO_EXCEDE_CUPO
+    grupos = pd.DataFrame({"tecnico": df['TECNICO_IDEAL'], "barrio": df['BARRIO'], "movida": por_cupo})
+    grupos = grupos[grupos["tecnico"].isin(tecnicos_hoy)].groupby(["tecnico", "barrio"])["movida"].agg(["any", "all"])
+    return {
+        "EN_BOLSA": int(df['ORIGEN_REAL'].notna().sum()),
+        "POR_CUPO": int(por_cupo.sum()),
+        "SOBRECARGADOS": int(df.loc[por_cupo, 'TECNICO_IDEAL'].nunique()),
+        "BARRIOS_PARTIDOS": int((grupos["any"] & ~grupos["all"]).sum()),
+        "BARRIOS_A_BOLSA": int(grupos["any"].sum()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido vectorizado de escenarios de cupo vs. reglas de cupo una a una.")
+    parser.add_argument("--barrios", type=int, default=300)
+    parser.add_argument("--tecnicos", type=int, default=60)
+    parser.add_argument("--filas", type=int, default=120000)
+    parser.add_argument("--verificar", type=int, default=20, help="Escenarios aleatorios comparados con las reglas de cupo.")
+    args = parser.parse_args(argv)
+
+    df_ruta, df_asignado, mapa_barrios = ruta_asignada(args.barrios, args.tecnicos, args.filas)
+    todos = sorted(set(mapa_barrios.values()))
+    tecnicos_hoy = [t for i, t in enumerate(todos) if i % 10]
+    promedio = args.filas // len(tecnicos_hoy)
+
+    inicio = time.perf_counter()
+    simulador = SimuladorCupos.desde_ruta(df_ruta, 'BARRIO', mapa_barrios)
+    t_preparar = time.perf_counter() - inicio
+
+    # Barrido: cupo uniforme de la mitad al doble del promedio + ajustes de +/-5 y +/-20 por técnico
+    matriz = pd.concat([
+        escenarios_uniformes(tecnicos_hoy, promedio // 2, promedio * 2),
+        escenarios_ajuste(dict.fromkeys(tecnicos_hoy, promedio), (-20, -5, 5, 20)),
+    ])
+    inicio = time.perf_counter()
+    tabla = simulador.evaluar(matriz)
+    t_barrido = time.perf_counter() - inicio
+
+    # Verificación y referencia con escenarios aleatorios
+    rnd = np.random.default_rng(3)
+    muestra = matriz.iloc[rnd.choice(len(matriz), size=min(args.verificar, len(matriz)), replace=False)].copy()
+    muestra.iloc[:len(muestra) // 2] = rnd.integers(promedio // 3, promedio * 2, size=(len(muestra) // 2, len(tecnicos_hoy)))
+    evaluados = simulador.evaluar(muestra)
+    inicio = time.perf_counter()
+    for nombre, cupos in muestra.iterrows():
+        esperado = resultado_reglas(df_asignado, tecnicos_hoy, cupos.to_dict())
+        obtenido = evaluados.loc[nombre, list(esperado)].to_dict()
+        assert obtenido == esperado, (nombre, obtenido, esperado)
+    t_regla = (time.perf_counter() - inicio) / len(muestra)
+
+    print(f"{args.filas:,} visitas · {len(tecnicos_hoy)} técnicos activos · {len(simulador.tecnicos)} con carga")
+    print(f"Preparación del simulador: {t_preparar * 1000:.0f} ms")
+    print(f"Barrido de {len(matriz):,} escenarios: {t_barrido * 1000:.1f} ms "
+          f"({t_barrido / len(matriz) * 1e6:.1f} µs por escenario)")
+    print(f"Referencia: reglas de cupo por escenario: {t_regla * 1000:.0f} ms "
+          f"(~{t_regla * len(matriz):.0f} s para el mismo barrido)")
+    print(f"Verificados contra aplicar_reglas_cupo: {len(muestra)} escenarios, todos iguales")
+    mejor = tabla.sort_values(["EN_BOLSA", "BARRIOS_PARTIDOS"]).iloc[0]
+    print(f"Menor bolsa del barrido: {mejor.name} -> {mejor['EN_BOLSA']} visitas, {mejor['BARRIOS_PARTIDOS']} barrios partidos")
+    if t_barrido * 1000 > META_MS_BARRIDO:
+        print(f"El barrido supera la meta de {META_MS_BARRIDO:.0f} ms.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
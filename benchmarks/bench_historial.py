@@ -0,0 +1,148 @@
+"""
+MEDICIÓN DEL HISTÓRICO DE OPERACIONES Y DE LA PESTAÑA DE ANALÍTICA
+
+Registra N días sintéticos en un histórico temporal (distribución con ausencias y cupos,
+Bolsa vaciada con el balanceo automático) y mide:
+  1. Registro incremental de cada día (Parquet del día + acumulados en SQLite).
+  2. Consultas de la Pestaña 5 sobre todo el rango + construcción de las figuras de plotly
+     (lo que tarda la pestaña en pintarse sin caché).
+  3. Los mismos acumulados recalculados desde las visitas en Parquet de cada día, como
+     referencia de lo que costaría la pestaña sin ellos.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_historial
+    python -m benchmarks.bench_historial --dias 365 --filas 15000 --tecnicos 60
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import plotly.express as px
+
+from balanceo import aplicar_balanceo, proponer_balanceo
+from benchmarks.datos_sinteticos import generar_maestro, generar_ruta
+from historial import HistorialOperaciones, calcular_acumulados
+from motor_logistico import cargar_maestro_dinamico, compactar_operacion, ejecutar_distribucion
+
+COL_MAP = {
+    'BARRIO': 'BARRIO',
+    'DIRECCION': 'DIRECCION',
+    'CUENTA': 'CUENTA',
+    'ORDEN': 'ORDEN',
+    'MEDIDOR': 'MEDIDOR',
+    'CLIENTE': 'CLIENTE',
+}
+
+# Meta de la pestaña: meses de historia pintados en menos de un segundo
+META_SEGUNDOS_ANALITICA = 1.0
+
+
+def jornadas_tipo(n_jornadas, barrios, tecnicos, filas, carpeta_tmp):
+    """Días finalizados distintos (ausencias y rutas diferentes) que se repiten a lo largo del histórico."""
+    df_maestro = generar_maestro(barrios, tecnicos)
+    ruta_maestro = os.path.join(carpeta_tmp, "maestro.xlsx")
+    df_maestro.to_excel(ruta_maestro, index=False)
+    mapa_barrios, _ = cargar_maestro_dinamico(ruta_maestro)
+    todos = sorted(set(mapa_barrios.values()))
+
+    jornadas = []
+    for i in range(n_jornadas):
+        tecnicos_hoy = [t for j, t in enumerate(todos) if (j + i) % 10]  # ~10% ausente, distinto cada día
+        cupo = max(1, int(filas / len(tecnicos_hoy) * 1.05))
+        limites = {t: cupo for t in tecnicos_hoy}
+        df_ruta = generar_ruta(df_maestro, filas, semilla=100 + i)
+        df_final = ejecutar_distribucion(df_ruta, COL_MAP, mapa_barrios, tecnicos_hoy, limites)
+        propuesta = proponer_balanceo(df_final, COL_MAP, tecnicos_hoy, limites)
+        df_final = aplicar_balanceo(df_final, COL_MAP, propuesta["asignacion"])
+        jornadas.append(compactar_operacion(df_final, COL_MAP, todos)[0])
+    return jornadas
+
+
+def consultar_analitica(historial, desde, hasta):
+    """Las cuatro consultas de la Pestaña 5 sobre los acumulados."""
+    return (historial.dias(desde, hasta), historial.por_motivo(desde, hasta),
+            historial.por_tecnico(desde, hasta).head(25), historial.por_barrio(desde, hasta))
+
+
+def pintar_analitica(historial, desde, hasta):
+    """Consultas y figuras de la Pestaña 5 (sin la caché de Streamlit). Retorna los bytes de las figuras."""
+    dias, motivos, tecnicos, barrios = consultar_analitica(historial, desde, hasta)
+    figuras = [
+        px.bar(dias.melt(id_vars='fecha', value_vars=['propias', 'absorbidas', 'en_bolsa']),
+               x='fecha', y='value', color='variable'),
+        px.bar(motivos, x='fecha', y='visitas', color='motivo'),
+        px.bar(tecnicos.melt(id_vars='tecnico', value_vars=['absorbidas', 'cedidas']),
+               x='value', y='tecnico', color='variable', orientation='h', barmode='group'),
+        px.bar(barrios, x='absorbidas', y='barrio', orientation='h'),
+    ]
+    return sum(len(f.to_json()) for f in figuras)
+
+
+def acumulados_desde_parquet(historial):
+    """Lo mismo sin acumulados: releer las visitas de cada día y volver a agregarlas."""
+    for carpeta_dia in sorted(os.listdir(historial.carpeta_visitas)):
+        calcular_acumulados(pd.read_parquet(os.path.join(historial.carpeta_visitas, carpeta_dia, "operacion.parquet")))
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registro incremental y consultas del histórico de operaciones.")
+    parser.add_argument("--dias", type=int, default=180, help="Días a registrar en el histórico.")
+    parser.add_argument("--jornadas-tipo", type=int, default=7, help="Días distintos generados (se repiten).")
+    parser.add_argument("--barrios", type=int, default=300)
+    parser.add_argument("--tecnicos", type=int, default=40)
+    parser.add_argument("--filas", type=int, default=10000, help="Visitas por día.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta_tmp:
+        jornadas = jornadas_tipo(args.jornadas_tipo, args.barrios, args.tecnicos, args.filas, carpeta_tmp)
+        historial = HistorialOperaciones(os.path.join(carpeta_tmp, "historial"))
+        primer_dia = date.today() - timedelta(days=args.dias - 1)
+
+        registros = []
+        for i in range(args.dias):
+            inicio = time.perf_counter()
+            historial.registrar_dia(jornadas[i % len(jornadas)], COL_MAP, fecha=primer_dia + timedelta(days=i))
+            registros.append(time.perf_counter() - inicio)
+        # Volver a publicar el último día reemplaza sus acumulados (no los duplica)
+        historial.registrar_dia(jornadas[(args.dias - 1) % len(jornadas)], COL_MAP, fecha=primer_dia + timedelta(days=args.dias - 1))
+        total_visitas = int(historial.dias()['visitas'].sum())
+        assert total_visitas == sum(len(jornadas[i % len(jornadas)]) for i in range(args.dias))
+
+        tamano_base = os.path.getsize(os.path.join(historial.carpeta, "acumulados.sqlite"))
+        desde, hasta = primer_dia.isoformat(), date.today().isoformat()
+        tiempos_consultas = cronometrar(lambda: consultar_analitica(historial, desde, hasta), args.repeticiones)
+        tiempos_analitica = cronometrar(lambda: pintar_analitica(HistorialOperaciones(historial.carpeta), desde, hasta),
+                                        args.repeticiones)
+        tiempos_parquet = cronometrar(lambda: acumulados_desde_parquet(historial), 1)
+
+    print(f"{args.dias} días · {total_visitas:,} visitas · acumulados en SQLite: {tamano_base / 1e6:.1f} MB")
+    print(f"Registro de un día ({args.filas} visitas): mediana {statistics.median(registros) * 1000:.0f} ms, "
+          f"máximo {max(registros) * 1000:.0f} ms")
+    print(f"Consultas de la pestaña sobre los acumulados: mediana {statistics.median(tiempos_consultas):.3f} s")
+    print(f"Pestaña de analítica ({args.dias} días, consultas + 4 gráficas): mediana {statistics.median(tiempos_analitica):.3f} s, "
+          f"máximo {max(tiempos_analitica):.3f} s")
+    print(f"Sin acumulados (reagregar las visitas en Parquet de cada día): {tiempos_parquet[0]:.3f} s")
+    if max(tiempos_analitica) > META_SEGUNDOS_ANALITICA:
+        print(f"La analítica supera la meta de {META_SEGUNDOS_ANALITICA:.0f} s.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
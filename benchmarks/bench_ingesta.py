@@ -0,0 +1,110 @@
+"""
+MEDICIÓN DE LA INGESTA DE LA RUTA EN VARIOS ARCHIVOS
+
+Parte una ruta sintética en K archivos Excel que se solapan (las últimas filas de cada
+archivo se repiten al inicio del siguiente, como cuando el sistema exporta por tramos y
+alguien vuelve a exportar un tramo), con encabezados escritos distinto en cada archivo y
+algunos pares cuenta/orden en conflicto. Mide:
+  1. Lectura secuencial + concatenación (lo que haría la Pestaña 2 archivo por archivo).
+  2. unir_rutas con 1 proceso (alineación de columnas + deduplicación con índice hash).
+  3. unir_rutas con un proceso por archivo.
+y verifica que la ruta unida tenga exactamente las visitas únicas de la ruta original.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_ingesta
+    python -m benchmarks.bench_ingesta --archivos 8 --filas 40000 --procesos 4
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_maestro, generar_ruta
+from ingesta_rutas import unir_rutas
+from motor_logistico import leer_tabla
+
+# Encabezados con que distintas exportaciones nombran las mismas columnas
+VARIANTES_ENCABEZADOS = [
+    {},
+    {'BARRIO': 'Barrio ', 'CUENTA': 'NUMERO CUENTA'},
+    {'DIRECCION': 'DIRECCIÓN PREDIO', 'CLIENTE': 'NOMBRE CLIENTE'},
+]
+
+
+def partir_ruta(df_ruta, archivos, solape, conflictos):
+    """Bytes de K archivos .xlsx con la ruta repartida; cada uno repite las últimas 'solape' filas del anterior."""
+    tramo = -(-len(df_ruta) // archivos)
+    partes = []
+    for i in range(archivos):
+        inicio = max(0, i * tramo - (solape if i else 0))
+        parte = df_ruta.iloc[inicio:(i + 1) * tramo].copy()
+        if i and conflictos:
+            parte.iloc[:conflictos, parte.columns.get_loc('DIRECCION')] = "DIRECCION CORREGIDA"
+        if i % 2:
+            parte['CUENTA'] = parte['CUENTA'].astype(str).str.zfill(12)  # la misma cuenta con ceros a la izquierda
+        buffer = io.BytesIO()
+        parte.rename(columns=VARIANTES_ENCABEZADOS[i % len(VARIANTES_ENCABEZADOS)]).to_excel(buffer, index=False)
+        partes.append((f"ruta_{i + 1}.xlsx", buffer.getvalue()))
+    return partes
+
+
+def lectura_secuencial(partes):
+    """Referencia: leer cada archivo y concatenar, sin alinear ni deduplicar."""
+    tablas = []
+    for nombre, contenido in partes:
+        buffer = io.BytesIO(contenido)
+        buffer.name = nombre
+        tablas.append(leer_tabla(buffer))
+    return pd.concat(tablas, ignore_index=True)
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos, resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lectura, alineación y deduplicación de la ruta en varios archivos.")
+    parser.add_argument("--archivos", type=int, default=4)
+    parser.add_argument("--filas", type=int, default=20000, help="Visitas únicas de la ruta completa.")
+    parser.add_argument("--solape", type=int, default=500, help="Filas repetidas entre archivos consecutivos.")
+    parser.add_argument("--conflictos", type=int, default=20, help="Filas repetidas con otra dirección por archivo.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    df_ruta = generar_ruta(generar_maestro(300, 40), args.filas)
+    partes = partir_ruta(df_ruta, args.archivos, args.solape, args.conflictos)
+
+    t_secuencial, concatenada = cronometrar(lambda: lectura_secuencial(partes), args.repeticiones)
+    t_union, union = cronometrar(lambda: unir_rutas(partes), args.repeticiones)
+    t_paralela, union_paralela = cronometrar(lambda: unir_rutas(partes, procesos=args.procesos), args.repeticiones)
+
+    ruta = union["ruta"]
+    assert len(ruta) == args.filas, f"{len(ruta)} visitas unidas, se esperaban {args.filas}"
+    assert ruta.columns.tolist() == df_ruta.columns.tolist()
+    assert ruta['ORDEN'].astype(str).tolist() == df_ruta['ORDEN'].astype(str).tolist()
+    assert union_paralela["ruta"].equals(ruta)
+    repetidas = (args.archivos - 1) * args.solape
+
+    print(f"{args.archivos} archivos · {args.filas:,} visitas únicas · {repetidas:,} filas repetidas · "
+          f"{os.cpu_count()} CPU")
+    print(f"Lectura secuencial + concat (sin deduplicar, {len(concatenada):,} filas y "
+          f"{len(concatenada.columns)} columnas desalineadas): mediana {statistics.median(t_secuencial):.3f} s")
+    print(f"unir_rutas, 1 proceso: mediana {statistics.median(t_union):.3f} s")
+    print(f"unir_rutas, {args.procesos} proceso(s): mediana {statistics.median(t_paralela):.3f} s")
+    print(f"Repetidas descartadas: {union['duplicadas']:,} · filas en conflicto reportadas: {len(union['conflictos'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
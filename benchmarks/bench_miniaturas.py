@@ -0,0 +1,108 @@
+"""
+MEDICIÓN DE LAS MINIATURAS DE PÓLIZAS (REVISIÓN PUNTUAL EN LA PESTAÑA 2)
+
+Escanea un banco sintético con imagen de escaneo en cada hoja a un almacén temporal y
+recorre N cuentas como lo haría la oficina revisando paquetes:
+  1. Primera vista de cada cuenta (se dibuja desde el PDF fuente y se guarda en disco).
+  2. Segunda vista (caché en memoria del proceso).
+  3. Vista tras reiniciar el proceso (caché en disco, memoria vacía).
+  4. Referencia: abrir el paquete completo de un técnico y dibujar todas sus páginas, que
+     es lo que costaba revisar una sola cuenta antes.
+Verifica además que el escaneo no deja nada pre-dibujado y que la caché en disco respeta
+su límite de tamaño.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_miniaturas
+    python -m benchmarks.bench_miniaturas --paginas 2000 --cuentas 500 --limite-mb 2
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import fitz
+import pandas as pd
+
+import miniaturas_polizas
+from almacen_polizas import AlmacenPolizas
+from benchmarks.datos_sinteticos import generar_pdf_polizas
+from miniaturas_polizas import miniatura_pagina, miniaturas_cuenta, renderizar_pagina
+from motor_logistico import construir_paquete_legalizacion, escanear_al_almacen
+
+# Pólizas por paquete de técnico en la referencia (ruta típica de un día)
+POLIZAS_POR_PAQUETE = 35
+
+
+def recorrer(polizas, cuentas):
+    """Tiempo (s) de ver cada cuenta."""
+    tiempos = []
+    for cuenta in cuentas:
+        inicio = time.perf_counter()
+        miniaturas_cuenta(polizas, cuenta)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def paquete_completo(polizas, cuentas):
+    """Referencia: unir el paquete del técnico y dibujar todas sus páginas para encontrar una."""
+    inicio = time.perf_counter()
+    paquete = construir_paquete_legalizacion(pd.DataFrame({'CUENTA': cuentas}), {'CUENTA': 'CUENTA'}, polizas)
+    documento = fitz.open(stream=paquete, filetype="pdf")
+    for pagina in range(len(documento)):
+        renderizar_pagina(documento, pagina)
+    return time.perf_counter() - inicio
+
+
+def resumen(nombre, tiempos):
+    print(f"{nombre}: mediana {statistics.median(tiempos) * 1000:.1f} ms, máximo {max(tiempos) * 1000:.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vista previa de pólizas bajo demanda con caché en memoria y disco.")
+    parser.add_argument("--paginas", type=int, default=600, help="Páginas del banco de pólizas.")
+    parser.add_argument("--cuentas", type=int, default=200, help="Cuentas revisadas.")
+    parser.add_argument("--dpi-escaneo", type=int, default=150)
+    parser.add_argument("--limite-mb", type=float, default=1.0, help="Límite de la caché en disco para la prueba.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta_tmp:
+        cuentas_banco = [str(1000000 + i) for i in range(args.paginas)]
+        banco = generar_pdf_polizas(cuentas_banco, args.paginas, dpi_escaneo=args.dpi_escaneo)
+        almacen = AlmacenPolizas(os.path.join(carpeta_tmp, "almacen"))
+        polizas = escanear_al_almacen([io.BytesIO(banco)], almacen)
+        carpeta = miniaturas_polizas.carpeta_miniaturas(almacen.carpeta)
+        assert not os.listdir(carpeta), "el escaneo no debe pre-dibujar miniaturas"
+
+        cuentas = list(polizas)[:args.cuentas]
+        limite_original = miniaturas_polizas.LIMITE_MB_MINIATURAS
+        miniaturas_polizas.LIMITE_MB_MINIATURAS = args.limite_mb
+        try:
+            t_primera = recorrer(polizas, cuentas)
+            t_memoria = recorrer(polizas, cuentas)
+            en_disco = sum(e.stat().st_size for e in os.scandir(carpeta))
+            miniatura_pagina.cache_clear()
+            miniaturas_polizas._bytes_en_disco.clear()
+            visibles = cuentas[-max(1, len(cuentas) // 10):]   # las más recientes siguen en disco
+            t_disco = recorrer(polizas, visibles)
+        finally:
+            miniaturas_polizas.LIMITE_MB_MINIATURAS = limite_original
+        t_paquete = paquete_completo(polizas, cuentas[:POLIZAS_POR_PAQUETE])
+
+    print(f"Banco de {args.paginas} páginas · {len(cuentas)} cuentas revisadas · escaneo a {args.dpi_escaneo} DPI")
+    resumen("Primera vista (dibujo desde el PDF fuente)", t_primera)
+    resumen("Segunda vista (memoria)", t_memoria)
+    resumen("Tras reiniciar (disco)", t_disco)
+    print(f"Referencia: abrir y dibujar el paquete de {POLIZAS_POR_PAQUETE} pólizas de un técnico: {t_paquete:.3f} s")
+    print(f"Caché en disco: {en_disco / 1e6:.2f} MB (límite {args.limite_mb} MB)")
+    if en_disco > args.limite_mb * 1e6:
+        print("La caché en disco supera su límite.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
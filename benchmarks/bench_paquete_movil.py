@@ -0,0 +1,88 @@
+"""
+MEDICIÓN DEL PERFIL MÓVIL DEL PAQUETE DE PÓLIZAS
+
+Arma los paquetes de legalización de varios técnicos con pólizas escaneadas (imagen de
+página completa + capa de texto) y compara el perfil original (el del ZIP de oficina)
+con el perfil móvil (el del portal): tamaño por paquete, tiempo de armado y si el
+paquete liviano conserva las páginas y el texto de las cuentas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_paquete_movil
+    python -m benchmarks.bench_paquete_movil --tecnicos 4 --polizas 35 --dpi-escaneo 300 --dpi 110 --calidad 60
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+
+import fitz
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_pdf_polizas
+from motor_logistico import (
+    CALIDAD_PAQUETE_MOVIL,
+    DPI_PAQUETE_MOVIL,
+    construir_paquete_legalizacion,
+    escanear_lote_polizas,
+    perfil_paquete_movil,
+)
+from portal_publico import tamano_legible
+
+COL_MAP = {'CUENTA': 'CUENTA'}
+
+
+def medir_perfil(rutas, mapa_polizas, perfil):
+    """Arma el paquete de cada ruta con el perfil dado: retorna (tamaños, segundos, paquetes)."""
+    tamanos, segundos, paquetes = [], [], []
+    for dt in rutas:
+        inicio = time.perf_counter()
+        paquete = construir_paquete_legalizacion(dt, COL_MAP, mapa_polizas, perfil)
+        segundos.append(time.perf_counter() - inicio)
+        tamanos.append(len(paquete))
+        paquetes.append(paquete)
+    return tamanos, segundos, paquetes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tamaño y tiempo del paquete de pólizas: perfil original vs. móvil.")
+    parser.add_argument("--tecnicos", type=int, default=3)
+    parser.add_argument("--polizas", type=int, default=35, help="Pólizas por técnico.")
+    parser.add_argument("--dpi-escaneo", type=int, default=200, help="Resolución de los escaneos sintéticos.")
+    parser.add_argument("--dpi", type=int, default=DPI_PAQUETE_MOVIL, help="DPI del perfil móvil.")
+    parser.add_argument("--calidad", type=int, default=CALIDAD_PAQUETE_MOVIL, help="Calidad JPEG del perfil móvil.")
+    args = parser.parse_args(argv)
+
+    cuentas = [1000000 + i for i in range(args.tecnicos * args.polizas)]
+    print(f"Generando {len(cuentas)} pólizas escaneadas a {args.dpi_escaneo} DPI...")
+    banco = generar_pdf_polizas(cuentas, len(cuentas), proporcion_anexos=0, dpi_escaneo=args.dpi_escaneo)
+    mapa_polizas = escanear_lote_polizas([io.BytesIO(banco)])
+    rutas = [pd.DataFrame({"CUENTA": cuentas[i::args.tecnicos]}) for i in range(args.tecnicos)]
+
+    perfil = perfil_paquete_movil(args.dpi, args.calidad)
+    resultados = {
+        "original": medir_perfil(rutas, mapa_polizas, None),
+        f"móvil {args.dpi} DPI / calidad {args.calidad}": medir_perfil(rutas, mapa_polizas, perfil),
+    }
+
+    print(f"{'Perfil':<28} {'Promedio':>10} {'Máximo':>10} {'Total':>10} {'s/paquete':>10}")
+    for nombre, (tamanos, segundos, _) in resultados.items():
+        print(f"{nombre:<28} {tamano_legible(statistics.mean(tamanos)):>10} {tamano_legible(max(tamanos)):>10} "
+              f"{tamano_legible(sum(tamanos)):>10} {statistics.mean(segundos):>10.2f}")
+
+    (tam_orig, _, paquetes_orig), (tam_movil, _, paquetes_movil) = resultados.values()
+    print(f"Reducción: {1 - sum(tam_movil) / sum(tam_orig):.0%}")
+
+    # El paquete liviano debe conservar cada página y el número de cuenta legible (capa de texto)
+    for original, movil in zip(paquetes_orig, paquetes_movil):
+        with fitz.open(stream=original) as doc_o, fitz.open(stream=movil) as doc_m:
+            if doc_o.page_count != doc_m.page_count or doc_o[0].get_text() != doc_m[0].get_text():
+                print("ERROR: el perfil móvil alteró las páginas o el texto del paquete.")
+                return 1
+    print("Páginas y texto del perfil móvil: idénticos al original.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
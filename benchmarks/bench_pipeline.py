@@ -0,0 +1,237 @@
+"""
+SUITE DE MEDICIÓN DE RENDIMIENTO DEL PIPELINE DIARIO
+
+Mide cada etapa de la operación con datos sintéticos a varios tamaños:
+maestro -> asignación -> cupos -> escáner PDF -> hoja de ruta -> excel -> paquete -> ZIP.
+La etapa libro_rutas arma las mismas hojas de ruta en un solo PDF (comparable con hoja_ruta).
+Antes de medir verifica que la hoja de ruta sea byte a byte la que produce FPDF con cell()/ln():
+fila_tabla y el buffer por partes dependen de internos de pyfpdf (fpdf==1.7.2 en requirements.txt).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_pipeline                              # tamaños pequeno y mediano
+    python -m benchmarks.bench_pipeline --tamanos pequeno,mediano,grande --salida resultados.json
+    python -m benchmarks.bench_pipeline --guardar-baseline           # fija la línea base actual
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json --tolerancia 0.25
+
+Termina con código 1 si alguna etapa supera la línea base más la tolerancia.
+benchmarks/baseline.json trae la línea base de referencia (tamaños pequeno y mediano, mejor de
+3 repeticiones, un núcleo). Los tiempos dependen de la máquina: en otro servidor genérala allí
+con --guardar-baseline --repeticiones 3 antes de usar la compuerta.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.datos_sinteticos import generar_maestro, generar_ruta, generar_pdf_polizas
+from exportacion_masiva import escribir_tabla_digital
+from motor_logistico import (
+    cargar_maestro_dinamico,
+    asignar_tecnicos,
+    aplicar_reglas_cupo,
+    reordenar_operacion_global,
+    escanear_lote_polizas,
+    tecnicos_con_carga,
+    ruta_del_tecnico,
+    crear_pdf_lista_final,
+    crear_libro_rutas,
+    construir_paquete_legalizacion,
+    generar_zip_maestro,
+    _celdas_hoja_ruta,
+    _clase_pdf_listado,
+    _pintar_hoja_ruta,
+)
+
+# Tamaños predefinidos: (barrios, técnicos, filas de ruta, páginas de pólizas)
+TAMANOS = {
+    "pequeno": {"barrios": 60, "tecnicos": 10, "filas": 1000, "paginas": 200},
+    "mediano": {"barrios": 300, "tecnicos": 40, "filas": 10000, "paginas": 1000},
+    "grande": {"barrios": 1000, "tecnicos": 80, "filas": 100000, "paginas": 5000},
+}
+
+RUTA_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Diferencias absolutas menores a esto se consideran ruido y nunca cuentan como regresión
+MINIMO_SEGUNDOS_REGRESION = 0.05
+
+COL_MAP = {
+    'BARRIO': 'BARRIO',
+    'DIRECCION': 'DIRECCION',
+    'CUENTA': 'CUENTA',
+    'ORDEN': 'ORDEN',
+    'MEDIDOR': 'MEDIDOR',
+    'CLIENTE': 'CLIENTE',
+}
+
+
+def _cronometrar(funcion, repeticiones):
+    """Ejecuta la función varias veces y retorna (mejor_tiempo, resultado_de_la_ultima)."""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def verificar_hoja_ruta(dt_operario, tecnico):
+    """La hoja de ruta con fila_tabla debe ser idéntica a la escrita con la API pública de FPDF."""
+    PDFListado = _clase_pdf_listado()
+
+    class PDFReferencia(PDFListado):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.buffer = ""
+
+        def fila_tabla(self, valores, anchos, alto):
+            for valor, w in zip(valores, anchos):
+                self.cell(w, alto, valor, 1, 0, 'L')
+            self.ln()
+
+        def bytes_pdf(self):
+            return self.output(dest='S').encode('latin-1')
+
+    celdas = _celdas_hoja_ruta(dt_operario, COL_MAP, tecnico)
+    documentos = []
+    for clase in (PDFListado, PDFReferencia):
+        pdf = clase(orientation='L', unit='mm', format='A4')
+        _pintar_hoja_ruta(pdf, celdas, tecnico, "01/01/2026")
+        # La fecha de creación cambia con el reloj: no cuenta en la comparación
+        documentos.append(re.sub(rb"/CreationDate \(D:\d+\)", b"", pdf.bytes_pdf()))
+    assert documentos[0] == documentos[1], f"La hoja de ruta de {tecnico} no coincide con la de cell()/ln()"
+
+
+def medir_tamano(nombre, config, repeticiones, carpeta_tmp):
+    """Genera los datos sintéticos de un tamaño y cronometra cada etapa del pipeline."""
+    etapas = {}
+
+    def registrar(etapa, funcion, unidades):
+        segundos, resultado = _cronometrar(funcion, repeticiones)
+        etapas[etapa] = {"segundos": round(segundos, 4), "unidades": unidades}
+        print(f"  [{nombre}] {etapa:<12} {segundos:9.3f} s  ({unidades} unidades)")
+        return resultado
+
+    # Datos de entrada (no se cronometra su generación)
+    df_maestro = generar_maestro(config["barrios"], config["tecnicos"])
+    ruta_maestro = os.path.join(carpeta_tmp, f"maestro_{nombre}.xlsx")
+    df_maestro.to_excel(ruta_maestro, index=False)
+    df_ruta = generar_ruta(df_maestro, config["filas"])
+    pdf_polizas = generar_pdf_polizas(df_ruta["CUENTA"].tolist(), config["paginas"])
+
+    # 1. Maestro
+    mapa, _ = registrar("maestro", lambda: cargar_maestro_dinamico(ruta_maestro), len(df_maestro))
+
+    # 2. Asignación
+    df_asignado = registrar("asignacion", lambda: asignar_tecnicos(df_ruta, 'BARRIO', mapa), len(df_ruta))
+
+    # 3. Cupos (90% de la cuadrilla presente, cupo al 90% de la carga promedio)
+    todos = sorted(set(mapa.values()))
+    tecnicos_hoy = todos[:max(1, int(len(todos) * 0.9))]
+    cupo = max(1, int(len(df_ruta) / len(todos) * 0.9))
+    limites = {t: cupo for t in tecnicos_hoy}
+    df_final = registrar(
+        "cupos",
+        lambda: reordenar_operacion_global(aplicar_reglas_cupo(df_asignado.copy(), 'BARRIO', tecnicos_hoy, limites), COL_MAP),
+        len(df_asignado)
+    )
+
+    # 4. Escáner de pólizas
+    mapa_polizas = registrar("escaneo", lambda: escanear_lote_polizas([io.BytesIO(pdf_polizas)]), config["paginas"])
+
+    # 5-7. Artefactos por técnico
+    rutas = {t: ruta_del_tecnico(df_final, t, COL_MAP) for t in tecnicos_con_carga(df_final)}
+    mayor = max(rutas, key=lambda t: len(rutas[t]))
+    verificar_hoja_ruta(rutas[mayor], mayor)
+
+    registrar("hoja_ruta", lambda: [crear_pdf_lista_final(dt, t, COL_MAP) for t, dt in rutas.items()], len(rutas))
+    registrar("libro_rutas", lambda: crear_libro_rutas(df_final, COL_MAP), len(rutas))
+    registrar("excel", lambda: [escribir_tabla_digital(dt, COL_MAP, io.BytesIO()) for dt in rutas.values()], len(rutas))
+    registrar("paquete", lambda: [construir_paquete_legalizacion(dt, COL_MAP, mapa_polizas) for dt in rutas.values()], len(rutas))
+
+    # 8. ZIP maestro completo
+    registrar("zip", lambda: generar_zip_maestro(df_final, COL_MAP, mapa_polizas), len(df_final))
+
+    return {"config": config, "etapas": etapas}
+
+
+def comparar_con_baseline(resultados, baseline, tolerancia):
+    """Retorna la lista de regresiones (tamaño, etapa, base, actual) que superan la tolerancia."""
+    regresiones = []
+    for tamano, datos in resultados.items():
+        etapas_base = baseline.get("resultados", {}).get(tamano, {}).get("etapas", {})
+        for etapa, medicion in datos["etapas"].items():
+            if etapa not in etapas_base:
+                continue
+            base = etapas_base[etapa]["segundos"]
+            actual = medicion["segundos"]
+            if actual > base * (1 + tolerancia) and (actual - base) > MINIMO_SEGUNDOS_REGRESION:
+                regresiones.append((tamano, etapa, base, actual))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mediciones de rendimiento del pipeline logístico ITA.")
+    parser.add_argument("--tamanos", default="pequeno,mediano", help="Lista separada por comas: " + ",".join(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=1, help="Se reporta el mejor tiempo de N ejecuciones.")
+    parser.add_argument("--salida", default="bench_resultados.json", help="Archivo JSON de resultados.")
+    parser.add_argument("--baseline", default=RUTA_BASELINE, help="Línea base contra la que se compara.")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Regresión permitida (0.25 = 25%%).")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guarda estos resultados como nueva línea base.")
+    args = parser.parse_args(argv)
+
+    tamanos = [t.strip() for t in args.tamanos.split(",") if t.strip()]
+    desconocidos = [t for t in tamanos if t not in TAMANOS]
+    if desconocidos:
+        parser.error(f"Tamaños desconocidos: {', '.join(desconocidos)}")
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta_tmp:
+        for tamano in tamanos:
+            print(f"Midiendo tamaño '{tamano}' {TAMANOS[tamano]}")
+            resultados[tamano] = medir_tamano(tamano, TAMANOS[tamano], args.repeticiones, carpeta_tmp)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"Línea base actualizada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No hay línea base guardada; usa --guardar-baseline para crearla.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regresiones = comparar_con_baseline(resultados, baseline, args.tolerancia)
+    if regresiones:
+        print("REGRESIONES DETECTADAS:")
+        for tamano, etapa, base, actual in regresiones:
+            print(f"  [{tamano}] {etapa}: {base:.3f} s -> {actual:.3f} s ({(actual / base - 1) * 100:+.0f}%)")
+        return 1
+
+    print(f"Sin regresiones frente a la línea base (tolerancia {args.tolerancia:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+MEDICIÓN DE LA PUBLICACIÓN DIFERIDA DEL PORTAL
+
+Arma una operación sintética con pólizas en un almacén temporal y compara:
+  1. Publicación completa (todos los archivos de todos los técnicos antes de liberar).
+  2. Publicación diferida (solo congela la asignación y libera).
+  3. Primera entrada de una fracción de los técnicos (cada uno arma sus archivos) y
+     segunda entrada (ya están en disco).
+  4. Varias peticiones simultáneas del mismo técnico: debe armarse una sola vez.
+Verifica que cada técnico reciba los mismos archivos que con la publicación completa.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_publicacion_diferida
+    python -m benchmarks.bench_publicacion_diferida --filas 20000 --tecnicos 60 --descargan 0.5 --simultaneas 16
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import publicacion_diferida
+from almacen_polizas import AlmacenPolizas
+from benchmarks.datos_sinteticos import generar_maestro, generar_pdf_polizas, generar_ruta
+from motor_logistico import cargar_maestro_dinamico, ejecutar_distribucion, escanear_al_almacen, publicar_operacion
+from portal_publico import leer_manifiesto
+from publicacion_diferida import artefactos_bajo_demanda, publicar_diferida
+
+COL_MAP = {
+    'BARRIO': 'BARRIO',
+    'DIRECCION': 'DIRECCION',
+    'CUENTA': 'CUENTA',
+    'ORDEN': 'ORDEN',
+    'MEDIDOR': 'MEDIDOR',
+    'CLIENTE': 'CLIENTE',
+}
+
+
+def operacion(carpeta_tmp, barrios, tecnicos, filas, paginas):
+    """(df_final, pólizas del almacén) de un día sintético."""
+    df_maestro = generar_maestro(barrios, tecnicos)
+    ruta_maestro = os.path.join(carpeta_tmp, "maestro.xlsx")
+    df_maestro.to_excel(ruta_maestro, index=False)
+    mapa_barrios, _ = cargar_maestro_dinamico(ruta_maestro)
+    todos = sorted(set(mapa_barrios.values()))
+    df_ruta = generar_ruta(df_maestro, filas)
+    df_final = ejecutar_distribucion(df_ruta, COL_MAP, mapa_barrios, todos, {t: filas for t in todos})
+    banco = generar_pdf_polizas(df_ruta["CUENTA"].tolist(), paginas)
+    polizas = escanear_al_almacen([io.BytesIO(banco)], AlmacenPolizas(os.path.join(carpeta_tmp, "almacen")))
+    return df_final, polizas
+
+
+def cronometrar(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return time.perf_counter() - inicio, resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publicación completa vs. diferida (archivos bajo demanda).")
+    parser.add_argument("--barrios", type=int, default=120)
+    parser.add_argument("--tecnicos", type=int, default=30)
+    parser.add_argument("--filas", type=int, default=6000)
+    parser.add_argument("--paginas", type=int, default=600, help="Páginas del banco de pólizas.")
+    parser.add_argument("--descargan", type=float, default=0.6, help="Fracción de técnicos que entra a descargar.")
+    parser.add_argument("--simultaneas", type=int, default=8, help="Peticiones simultáneas del mismo técnico.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta_tmp:
+        df_final, polizas = operacion(carpeta_tmp, args.barrios, args.tecnicos, args.filas, args.paginas)
+        portal = os.path.join(carpeta_tmp, "portal")
+
+        t_completa, _ = cronometrar(publicar_operacion, portal, df_final, COL_MAP, polizas)
+        completa = leer_manifiesto(portal)
+        t_diferida, version = cronometrar(publicar_diferida, portal, df_final, COL_MAP, polizas)
+        carpetas = sorted(leer_manifiesto(portal)["tecnicos"])
+
+        # Entradas de los técnicos que sí descargan (el resto nunca cuesta nada)
+        entran = carpetas[:max(1, int(len(carpetas) * args.descargan))]
+        t_primera, t_segunda = [], []
+        for carpeta in entran:
+            segundos, entrada = cronometrar(artefactos_bajo_demanda, version, carpeta, portal)
+            t_primera.append(segundos)
+            assert set(entrada["archivos"]) == set(completa["tecnicos"][carpeta]["archivos"]), carpeta
+            t_segunda.append(cronometrar(artefactos_bajo_demanda, version, carpeta, portal)[0])
+
+        # Peticiones simultáneas de un técnico que aún no ha entrado
+        armados = []
+        armar_original = publicacion_diferida._armar
+
+        def armar_contado(*a, **k):
+            armados.append(threading.get_ident())
+            return armar_original(*a, **k)
+
+        carpeta_simultanea = carpetas[-1]
+        publicacion_diferida._armar = armar_contado
+        try:
+            with ThreadPoolExecutor(max_workers=args.simultaneas) as ejecutor:
+                entradas = list(ejecutor.map(lambda _: artefactos_bajo_demanda(version, carpeta_simultanea, portal),
+                                             range(args.simultaneas)))
+        finally:
+            publicacion_diferida._armar = armar_original
+
+    print(f"{len(df_final):,} visitas · {len(carpetas)} técnicos · {len(polizas):,} pólizas")
+    print(f"Publicación completa: {t_completa:.2f} s")
+    print(f"Publicación diferida: {t_diferida * 1000:.0f} ms ({t_completa / t_diferida:.0f}x más rápida en liberar)")
+    print(f"Primera entrada ({len(entran)} técnicos): mediana {statistics.median(t_primera) * 1000:.0f} ms, "
+          f"máximo {max(t_primera) * 1000:.0f} ms · total {sum(t_primera):.2f} s")
+    print(f"Segunda entrada: mediana {statistics.median(t_segunda) * 1e6:.0f} µs")
+    print(f"{args.simultaneas} peticiones simultáneas del mismo técnico: {len(armados)} armado(s)")
+    if len(armados) != 1 or any(e != entradas[0] for e in entradas):
+        print("Las peticiones simultáneas no compartieron un solo armado.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""
+PRUEBA DE CARGA DEL PORTAL DE TÉCNICOS (N TÉCNICOS A LA VEZ)
+
+Reproduce el pico real de la mañana (40-80 técnicos abriendo la ZONA DE DESCARGAS en
+pocos minutos) contra un proceso de Streamlit de verdad:
+  1. Publica un portal sintético (public_files) en una carpeta de trabajo temporal.
+  2. Levanta 'streamlit run app.py' en un puerto local (opcionalmente con el servidor
+     de descargas estáticas, ver servidor_descargas.py).
+  3. Cada técnico simulado habla el protocolo del navegador por el websocket: abre el
+     portal, busca su nombre en la lista y descarga sus tres archivos (ruta, tabla y
+     pólizas), tal como lo haría el celular.
+  4. Mide la latencia de cada paso (percentiles), el rendimiento (sesiones y bytes por
+     segundo), la tasa de errores y la memoria (RSS) del proceso del servidor.
+
+Cada corrida se guarda en benchmarks/resultados_carga/<fecha>_<modo>_<N>t.json para poder
+comparar cambios del portal o de la forma de servir archivos.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.carga_portal --tecnicos 40 --rampa 30
+    python -m benchmarks.carga_portal --tecnicos 80 --rampa 600 --mb-paquete 4
+    python -m benchmarks.carga_portal --tecnicos 80 --servidor-estatico
+    python -m benchmarks.carga_portal --comparar benchmarks/resultados_carga/A.json benchmarks/resultados_carga/B.json
+
+Requiere el cliente 'websockets' (ya viene con el servidor de Streamlit). La memoria se
+lee de /proc, así que el RSS solo se reporta en Linux.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from streamlit.proto.BackMsg_pb2 import BackendOperationRequest, BackMsg, DeferredFileRequestPayload
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState, WidgetStates
+from websockets.sync.client import connect
+
+from benchmarks.datos_sinteticos import generar_portal_publico
+from portal_publico import (
+    ARCHIVO_HOJA_RUTA,
+    ARCHIVO_PAQUETE,
+    ARCHIVO_TABLA_DIGITAL,
+    CARPETA_PUBLICA,
+    tamano_legible,
+)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados_carga")
+
+# Textos de la Zona de Descargas (app.py, SECCIÓN 7) que el técnico simulado busca en pantalla
+ETIQUETA_BUSCADOR = "BUSCA TU NOMBRE"
+
+# (paso medido, archivo publicado, etiqueta del botón)
+DESCARGAS = [
+    ("hoja_ruta", ARCHIVO_HOJA_RUTA, "DESCARGAR PDF"),
+    ("tabla_digital", ARCHIVO_TABLA_DIGITAL, "DESCARGAR EXCEL"),
+    ("paquete_polizas", ARCHIVO_PAQUETE, "DESCARGAR PÓLIZAS"),
+]
+PASOS = ["conexion", "portal", "seleccion", *(paso for paso, _, _ in DESCARGAS), "total"]
+
+SEGUNDOS_ESPERA = 120
+
+
+class ErrorPortal(Exception):
+    """El portal no respondió lo que haría con un celular (excepción, botón ausente, HTTP fallido)."""
+
+
+# =======================================================================================
+# SERVIDOR BAJO PRUEBA
+# =======================================================================================
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def lanzar_streamlit(carpeta_trabajo, puerto, puerto_estatico=None):
+    """Arranca 'streamlit run app.py' con la carpeta de trabajo como directorio actual."""
+    entorno = dict(os.environ)
+    if puerto_estatico:
+        entorno["ITA_PUERTO_DESCARGAS"] = str(puerto_estatico)
+        entorno["ITA_URL_DESCARGAS"] = f"http://127.0.0.1:{puerto_estatico}"
+    comando = [
+        sys.executable, "-m", "streamlit", "run", os.path.join(RAIZ, "app.py"),
+        "--server.port", str(puerto), "--server.address", "127.0.0.1", "--server.headless", "true",
+        "--server.enableXsrfProtection", "false", "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    registro = open(os.path.join(carpeta_trabajo, "streamlit.log"), "wb")
+    proceso = subprocess.Popen(comando, cwd=carpeta_trabajo, env=entorno, stdout=registro, stderr=subprocess.STDOUT)
+
+    limite = time.time() + SEGUNDOS_ESPERA
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"Streamlit terminó al arrancar (ver {registro.name}).")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=2) as r:
+                if r.status == 200:
+                    return proceso
+        except OSError:
+            time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError("Streamlit no respondió al chequeo de salud a tiempo.")
+
+
+def rss_proceso(pid):
+    """Memoria residente (bytes) de un proceso según /proc; None fuera de Linux."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class MuestreoMemoria(threading.Thread):
+    """Toma el RSS del servidor cada 'intervalo' segundos mientras dura la carga."""
+
+    def __init__(self, pid, intervalo=0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.intervalo = intervalo
+        self.muestras = []   # (segundos desde el inicio, bytes)
+        self._detener = threading.Event()
+        self._inicio = time.perf_counter()
+
+    def run(self):
+        while not self._detener.is_set():
+            rss = rss_proceso(self.pid)
+            if rss is not None:
+                self.muestras.append((round(time.perf_counter() - self._inicio, 2), rss))
+            self._detener.wait(self.intervalo)
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+# =======================================================================================
+# TÉCNICO SIMULADO (PROTOCOLO DEL NAVEGADOR)
+# =======================================================================================
+
+class NavegadorTecnico:
+    """Sesión de Streamlit por websocket, como la abre el celular de un técnico."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.id_sesion = None
+        self.widgets = {}
+
+    def _enviar(self, mensaje):
+        self.ws.send(mensaje.SerializeToString())
+
+    def _recibir(self):
+        return ForwardMsg.FromString(self.ws.recv(timeout=SEGUNDOS_ESPERA))
+
+    def ejecutar(self, disparador=None):
+        """Re-ejecuta el script con el estado de los widgets; retorna los elementos dibujados."""
+        estados = WidgetStates(widgets=[WidgetState(id=i, string_value=v) for i, v in self.widgets.items()])
+        if disparador is not None:
+            estados.widgets.append(WidgetState(id=disparador, trigger_value=True))
+        self._enviar(BackMsg(rerun_script=ClientState(widget_states=estados)))
+
+        elementos = []
+        while True:
+            mensaje = self._recibir()
+            tipo = mensaje.WhichOneof("type")
+            if tipo == "new_session":
+                self.id_sesion = mensaje.new_session.initialize.session_id
+            elif tipo == "delta" and mensaje.delta.WhichOneof("type") == "new_element":
+                elemento = mensaje.delta.new_element
+                clase = elemento.WhichOneof("type")
+                if clase == "exception":
+                    raise ErrorPortal(f"Excepción en el script: {elemento.exception.message}")
+                elementos.append((clase, getattr(elemento, clase)))
+            elif tipo == "script_finished":
+                if mensaje.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    elementos = []
+                    continue
+                if mensaje.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise ErrorPortal("El script no compila.")
+                return elementos
+
+    def url_diferida(self, id_archivo):
+        """Pide al servidor que ejecute la descarga diferida (el callable del botón) y retorna su URL."""
+        id_peticion = uuid.uuid4().hex
+        self._enviar(BackMsg(backend_operation_request=BackendOperationRequest(
+            request_id=id_peticion, session_id=self.id_sesion,
+            deferred_file=DeferredFileRequestPayload(file_id=id_archivo))))
+        while True:
+            mensaje = self._recibir()
+            if mensaje.WhichOneof("type") != "backend_operation_response":
+                continue
+            respuesta = mensaje.backend_operation_response
+            if respuesta.request_id != id_peticion:
+                continue
+            if respuesta.error_msg:
+                raise ErrorPortal(respuesta.error_msg)
+            return respuesta.deferred_file.url
+
+
+def descargar(url):
+    """GET completo. Retorna los bytes recibidos."""
+    try:
+        with urllib.request.urlopen(url, timeout=SEGUNDOS_ESPERA) as respuesta:
+            recibidos = 0
+            while pedazo := respuesta.read(256 * 1024):
+                recibidos += len(pedazo)
+            return recibidos
+    except urllib.error.HTTPError as e:
+        raise ErrorPortal(f"HTTP {e.code} en la descarga") from e
+
+
+def _buscar(elementos, clase, texto):
+    for clase_elemento, elemento in elementos:
+        if clase_elemento == clase and texto in elemento.label:
+            return elemento
+    return None
+
+
+def sesion_tecnico(puerto, indice, retraso, pausa, tamanos):
+    """
+    Jornada de un técnico: abrir portal, elegir su nombre, bajar sus tres archivos.
+    tamanos: {técnico: {archivo: bytes}} del manifiesto, para detectar descargas truncadas.
+    """
+    time.sleep(retraso)
+    registro = {"indice": indice, "tecnico": None, "ok": False, "error": None, "pasos": {}, "bytes": 0,
+                "inicio": time.time()}
+    inicio = time.perf_counter()
+
+    def medir(paso, funcion, *args):
+        t0 = time.perf_counter()
+        resultado = funcion(*args)
+        registro["pasos"][paso] = time.perf_counter() - t0
+        return resultado
+
+    try:
+        t0 = time.perf_counter()
+        with connect(f"ws://127.0.0.1:{puerto}/_stcore/stream", subprotocols=["streamlit"], max_size=None,
+                     open_timeout=SEGUNDOS_ESPERA) as ws:
+            registro["pasos"]["conexion"] = time.perf_counter() - t0
+            navegador = NavegadorTecnico(ws)
+            elementos = medir("portal", navegador.ejecutar)
+            buscador = _buscar(elementos, "selectbox", ETIQUETA_BUSCADOR)
+            if buscador is None or len(buscador.options) < 2:
+                raise ErrorPortal("El portal no muestra la lista de técnicos.")
+            registro["tecnico"] = nombre = buscador.options[1 + indice % (len(buscador.options) - 1)]
+
+            time.sleep(pausa)
+            navegador.widgets[buscador.id] = nombre
+            elementos = medir("seleccion", navegador.ejecutar)
+
+            for paso, archivo, etiqueta in DESCARGAS:
+                time.sleep(pausa)
+                t0 = time.perf_counter()
+                enlace = _buscar(elementos, "link_button", etiqueta)
+                if enlace is not None:
+                    # Servidor estático: el celular abre el enlace firmado, sin pasar por Streamlit
+                    recibidos = descargar(enlace.url)
+                else:
+                    boton = _buscar(elementos, "download_button", etiqueta)
+                    if boton is None:
+                        raise ErrorPortal(f"No aparece el botón '{etiqueta}'.")
+                    url = navegador.url_diferida(boton.deferred_file_id) if boton.deferred_file_id else boton.url
+                    recibidos = descargar(f"http://127.0.0.1:{puerto}{url}")
+                    # Al pulsar el botón el navegador también re-ejecuta el script
+                    elementos = navegador.ejecutar(disparador=boton.id)
+                registro["pasos"][paso] = time.perf_counter() - t0
+                registro["bytes"] += recibidos
+                if recibidos != tamanos[nombre][archivo]:
+                    raise ErrorPortal(f"Descarga incompleta de {archivo}.")
+
+        registro["ok"] = True
+    except Exception as e:
+        registro["error"] = f"{type(e).__name__}: {e}"
+    registro["pasos"]["total"] = time.perf_counter() - inicio
+    return registro
+
+
+# =======================================================================================
+# MÉTRICAS Y RESULTADOS
+# =======================================================================================
+
+def percentiles(valores):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    if len(valores) == 1:
+        return {"n": 1, "p50": valores[0], "p90": valores[0], "p95": valores[0], "p99": valores[0], "max": valores[0]}
+    cortes = statistics.quantiles(valores, n=100, method="inclusive")
+    return {"n": len(valores), "p50": cortes[49], "p90": cortes[89], "p95": cortes[94], "p99": cortes[98],
+            "max": valores[-1]}
+
+
+def resumir(sesiones, segundos, muestras_memoria, rss_reposo):
+    exitosas = [s for s in sesiones if s["ok"]]
+    total_bytes = sum(s["bytes"] for s in sesiones)
+    rss = [b for _, b in muestras_memoria]
+    errores = {}
+    for s in sesiones:
+        if s["error"]:
+            errores[s["error"]] = errores.get(s["error"], 0) + 1
+    return {
+        "sesiones": len(sesiones),
+        "exitosas": len(exitosas),
+        "tasa_error": 1 - len(exitosas) / len(sesiones) if sesiones else 0.0,
+        "errores": errores,
+        "segundos": segundos,
+        "sesiones_por_minuto": len(exitosas) / segundos * 60 if segundos else 0.0,
+        "bytes": total_bytes,
+        "bytes_por_segundo": total_bytes / segundos if segundos else 0.0,
+        "latencias": {p: percentiles([s["pasos"][p] for s in exitosas if p in s["pasos"]]) for p in PASOS},
+        "rss": {
+            "reposo": rss_reposo,
+            "pico": max(rss) if rss else None,
+            "final": rss[-1] if rss else None,
+        },
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir_resumen(metricas):
+    print(f"Sesiones: {metricas['exitosas']}/{metricas['sesiones']} "
+          f"(errores {metricas['tasa_error']:.1%}) en {metricas['segundos']:.1f} s · "
+          f"{metricas['sesiones_por_minuto']:.1f} técnicos/min · "
+          f"{tamano_legible(metricas['bytes'])} ({tamano_legible(metricas['bytes_por_segundo'])}/s)")
+    print(f"{'Paso':<18} {'n':>4} {'p50 (s)':>8} {'p90 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'máx (s)':>8}")
+    for paso, p in metricas["latencias"].items():
+        if p:
+            print(f"{paso:<18} {p['n']:>4} {p['p50']:>8.3f} {p['p90']:>8.3f} {p['p95']:>8.3f} "
+                  f"{p['p99']:>8.3f} {p['max']:>8.3f}")
+    rss = metricas["rss"]
+    if rss["pico"]:
+        print(f"RSS del servidor: reposo {tamano_legible(rss['reposo'] or 0)} · pico {tamano_legible(rss['pico'])} · "
+              f"final {tamano_legible(rss['final'])}")
+    for error, cantidad in metricas["errores"].items():
+        print(f"  {cantidad} x {error}")
+
+
+def comparar(rutas):
+    """Tabla con las métricas principales de varias corridas guardadas (la primera es la base)."""
+    corridas = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            corridas.append(json.load(f))
+
+    filas = [
+        ("técnicos", lambda m: m["sesiones"], "{:.0f}"),
+        ("tasa de error", lambda m: m["tasa_error"] * 100, "{:.1f} %"),
+        ("técnicos/min", lambda m: m["sesiones_por_minuto"], "{:.1f}"),
+        ("MB/s", lambda m: m["bytes_por_segundo"] / 1e6, "{:.2f}"),
+        ("portal p95 (s)", lambda m: (m["latencias"].get("portal") or {}).get("p95"), "{:.3f}"),
+        ("selección p95 (s)", lambda m: (m["latencias"].get("seleccion") or {}).get("p95"), "{:.3f}"),
+        ("pólizas p95 (s)", lambda m: (m["latencias"].get("paquete_polizas") or {}).get("p95"), "{:.3f}"),
+        ("total p50 (s)", lambda m: (m["latencias"].get("total") or {}).get("p50"), "{:.3f}"),
+        ("total p95 (s)", lambda m: (m["latencias"].get("total") or {}).get("p95"), "{:.3f}"),
+        ("RSS pico (MB)", lambda m: (m["rss"]["pico"] or 0) / 1e6, "{:.0f}"),
+    ]
+    nombres = [os.path.basename(r).removesuffix(".json") for r in rutas]
+    ancho = max(22, *(len(n) + 2 for n in nombres))
+    print(f"{'':<20}" + "".join(f"{n:>{ancho}}" for n in nombres))
+    for etiqueta, valor, formato in filas:
+        celdas = []
+        base = valor(corridas[0]["metricas"])
+        for corrida in corridas:
+            actual = valor(corrida["metricas"])
+            texto = formato.format(actual) if actual is not None else "-"
+            if corrida is not corridas[0] and actual is not None and base:
+                texto += f" ({(actual / base - 1) * 100:+.0f}%)"
+            celdas.append(f"{texto:>{ancho}}")
+        print(f"{etiqueta:<20}" + "".join(celdas))
+    return 0
+
+
+# =======================================================================================
+# PROGRAMA
+# =======================================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del portal de técnicos con N técnicos simultáneos.")
+    parser.add_argument("--tecnicos", type=int, default=40, help="Técnicos simulados que abren el portal.")
+    parser.add_argument("--rampa", type=float, default=30.0,
+                        help="Segundos en los que llegan todos los técnicos (pico real: 600).")
+    parser.add_argument("--pausa", type=float, default=0.5, help="Segundos que tarda el técnico entre un toque y otro.")
+    parser.add_argument("--mb-paquete", type=float, default=3.0, help="Tamaño medio del paquete de pólizas.")
+    parser.add_argument("--servidor-estatico", action="store_true",
+                        help="Descargas por servidor_descargas.py (enlaces firmados) en vez de st.download_button.")
+    parser.add_argument("--semilla", type=int, default=3)
+    parser.add_argument("--salida", default=None, help="Archivo JSON de la corrida (por defecto en resultados_carga/).")
+    parser.add_argument("--conservar", action="store_true", help="No borra la carpeta de trabajo (logs del servidor).")
+    parser.add_argument("--comparar", nargs="+", metavar="JSON", help="Compara corridas guardadas y termina.")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        return comparar(args.comparar)
+
+    carpeta_trabajo = tempfile.mkdtemp(prefix="ita_carga_")
+    print(f"Publicando portal sintético de {args.tecnicos} técnicos en {carpeta_trabajo}...")
+    manifiesto = generar_portal_publico(os.path.join(carpeta_trabajo, CARPETA_PUBLICA), args.tecnicos,
+                                        bytes_paquete=int(args.mb_paquete * 1_000_000))
+    tamanos = {carpeta: {archivo: info["bytes"] for archivo, info in entrada["archivos"].items()}
+               for carpeta, entrada in manifiesto["tecnicos"].items()}
+    publicados = sum(tamanos[t][archivo] for t in tamanos for _, archivo, _ in DESCARGAS)
+
+    puerto = puerto_libre()
+    puerto_estatico = puerto_libre() if args.servidor_estatico else None
+    modo = "estatico" if args.servidor_estatico else "streamlit"
+    proceso = lanzar_streamlit(carpeta_trabajo, puerto, puerto_estatico)
+    try:
+        rss_reposo = rss_proceso(proceso.pid)
+        memoria = MuestreoMemoria(proceso.pid)
+        memoria.start()
+
+        # Llegadas repartidas en la rampa con algo de azar (reproducible por semilla)
+        rnd = random.Random(args.semilla)
+        retrasos = sorted(rnd.uniform(0, args.rampa) for _ in range(args.tecnicos))
+        print(f"{args.tecnicos} técnicos en {args.rampa:g} s contra Streamlit ({modo}), "
+              f"{tamano_legible(publicados)} publicados...")
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.tecnicos) as ejecutor:
+            sesiones = list(ejecutor.map(lambda i: sesion_tecnico(puerto, i, retrasos[i], args.pausa, tamanos),
+                                         range(args.tecnicos)))
+        segundos = time.perf_counter() - inicio
+        memoria.detener()
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+    metricas = resumir(sesiones, segundos, memoria.muestras, rss_reposo)
+    imprimir_resumen(metricas)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "config": {**vars(args), "modo": modo, "bytes_publicados": publicados},
+        "metricas": metricas,
+        "memoria": memoria.muestras,
+        "sesiones": sesiones,
+    }
+    ruta_salida = args.salida
+    if ruta_salida is None:
+        os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+        ruta_salida = os.path.join(CARPETA_RESULTADOS,
+                                   f"{datetime.now():%Y%m%d-%H%M%S}_{modo}_{args.tecnicos}t.json")
+    with open(ruta_salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=1, ensure_ascii=False)
+    print(f"Resultados guardados en {ruta_salida}")
+
+    if args.conservar:
+        print(f"Carpeta de trabajo conservada: {carpeta_trabajo}")
+    else:
+        shutil.rmtree(carpeta_trabajo, ignore_errors=True)
+    return 1 if metricas["tasa_error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+GENERADORES DE DATOS SINTÉTICOS PARA MEDICIONES DE RENDIMIENTO
+
+Producen entradas realistas sin tocar información de clientes:
+- Maestro de zonas con N barrios repartidos entre T técnicos.
+- Ruta diaria de M visitas con barrios "sucios" (tildes, minúsculas, prefijos, espacios).
+- Banco de pólizas PDF de P páginas construido localmente con PyMuPDF (opcionalmente
+  con la imagen de escaneo de cada hoja, como los PDF del escáner con capa OCR).
+- Portal publicado (public_files) con T técnicos y artefactos del tamaño indicado, para
+  las pruebas de carga de descargas.
+"""
+
+import random
+
+import fitz
+import numpy as np
+import pandas as pd
+
+from portal_publico import (
+    ARCHIVO_HOJA_RUTA,
+    ARCHIVO_PAQUETE,
+    ARCHIVO_TABLA_DIGITAL,
+    activar_version,
+    escribir_artefactos,
+    escribir_manifiesto,
+    nueva_version,
+)
+
+NOMBRES = ["ANDRES", "CARLOS", "DIANA", "EDGAR", "FABIAN", "GLORIA", "HECTOR", "IVAN", "JULIO", "KAREN",
+           "LUIS", "MARTA", "NESTOR", "OSCAR", "PEDRO", "RAUL", "SANDRA", "TOMAS", "WILSON", "YEFREY"]
+APELLIDOS = ["GOMEZ", "PEREZ", "RODRIGUEZ", "MARTINEZ", "GARCIA", "LOPEZ", "HERRERA", "DIAZ", "MORALES", "CASTRO"]
+RAICES_BARRIO = ["SAN JOSÉ", "LAS FLORES", "EL PRADO", "LA CONCEPCIÓN", "VILLA CAROLINA", "LOS ALPES", "BOSTON",
+                 "EL CARMEN", "LA PAZ", "SANTA MÓNICA", "LAS NIEVES", "REBOLO", "SIMÓN BOLÍVAR", "CIUDAD JARDÍN"]
+PREFIJOS_SUCIOS = ["", "", "", "BARRIO ", "URB ", "Urbanizacion ", "SECTOR "]
+TIPOS_VIA = ["CL", "KR", "CALLE", "CARRERA", "DG", "TV"]
+
+
+def nombres_barrios(n_barrios):
+    """Barrios únicos combinando raíces conocidas con una etapa numerada."""
+    return [f"{RAICES_BARRIO[i % len(RAICES_BARRIO)]} {i // len(RAICES_BARRIO) + 1}" for i in range(n_barrios)]
+
+
+def nombres_tecnicos(n_tecnicos):
+    return [f"{NOMBRES[i % len(NOMBRES)]} {APELLIDOS[(i // len(NOMBRES)) % len(APELLIDOS)]} {i + 1}" for i in range(n_tecnicos)]
+
+
+def generar_maestro(n_barrios, n_tecnicos, semilla=7):
+    """DataFrame con el formato 'OPERARIOS REINSTALACION' (Nombre Unidad / Nombre funcionarios / Celular)."""
+    rnd = random.Random(semilla)
+    barrios = nombres_barrios(n_barrios)
+    tecnicos = nombres_tecnicos(n_tecnicos)
+    return pd.DataFrame({
+        "Nombre Unidad": barrios,
+        "Nombre funcionarios": [tecnicos[i % n_tecnicos] for i in range(n_barrios)],
+        "Celular": [f"3{rnd.randint(100000000, 999999999)}" for _ in range(n_barrios)],
+    })
+
+
+def ensuciar_barrio(barrio, rnd):
+    """Reproduce las variaciones de escritura que llegan en el Excel del sistema de operaciones."""
+    txt = rnd.choice(PREFIJOS_SUCIOS) + barrio
+    if rnd.random() < 0.3:
+        txt = txt.lower()
+    if rnd.random() < 0.3:
+        txt = txt.replace("Ó", "O").replace("É", "E").replace("ó", "o").replace("é", "e")
+    if rnd.random() < 0.2:
+        txt = f"  {txt}  "
+    return txt
+
+
+def generar_ruta(maestro, m_filas, semilla=11, proporcion_sin_zona=0.01):
+    """Ruta diaria de M visitas sobre los barrios del maestro (con un pequeño % de barrios desconocidos)."""
+    rnd = random.Random(semilla)
+    barrios = maestro["Nombre Unidad"].tolist()
+    # Volumen desigual por barrio, como en la operación real
+    pesos = [rnd.paretovariate(1.5) for _ in barrios]
+
+    filas_barrio = rnd.choices(barrios, weights=pesos, k=m_filas)
+    registros = []
+    for i, barrio in enumerate(filas_barrio):
+        if rnd.random() < proporcion_sin_zona:
+            barrio_txt = f"INVASION {rnd.randint(1, 50)}"
+        else:
+            barrio_txt = ensuciar_barrio(barrio, rnd)
+        registros.append({
+            "CUENTA": 1000000 + i,
+            "DIRECCION": f"{rnd.choice(TIPOS_VIA)} {rnd.randint(1, 120)} # {rnd.randint(1, 99)}-{rnd.randint(1, 99)}",
+            "BARRIO": barrio_txt,
+            "ORDEN": 50000000 + rnd.randint(0, 9999999),
+            "MEDIDOR": f"MD{rnd.randint(100000, 999999)}",
+            "CLIENTE": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}",
+        })
+    return pd.DataFrame(registros)
+
+
+def generar_pdf_polizas(cuentas, p_paginas, semilla=13, proporcion_anexos=0.15, dpi_escaneo=None):
+    """
+    Banco de pólizas de P páginas. Cada página principal lleva 'Póliza N° <cuenta>';
+    una fracción de ellas va seguida de un anexo sin número (continuación).
+    - dpi_escaneo: si se indica, cada hoja lleva debajo del texto una imagen JPEG de página
+      completa a esa resolución, con el grano del papel (tamaño real de un escaneo).
+    Retorna los bytes del PDF.
+    """
+    rnd = random.Random(semilla)
+    doc = fitz.open()
+    cuentas = list(cuentas)
+    pagina = 0
+    idx_cuenta = 0
+    while pagina < p_paginas and cuentas:
+        cuenta = cuentas[idx_cuenta % len(cuentas)]
+        idx_cuenta += 1
+        pag = doc.new_page(width=595, height=842)
+        pag.insert_text((72, 90), "UT ITA RADIAN - POLIZA DE REINSTALACION", fontsize=14)
+        pag.insert_text((72, 130), f"Póliza N° {cuenta}", fontsize=12)
+        pag.insert_text((72, 160), f"Cliente: {rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}", fontsize=11)
+        for renglon in range(20):
+            pag.insert_text((72, 200 + renglon * 18), "Condiciones generales del servicio " * 2, fontsize=9)
+        pagina += 1
+
+        if pagina < p_paginas and rnd.random() < proporcion_anexos:
+            anexo = doc.new_page(width=595, height=842)
+            anexo.insert_text((72, 90), "ANEXO - REGISTRO FOTOGRAFICO Y FIRMAS", fontsize=12)
+            pagina += 1
+
+    if dpi_escaneo:
+        _agregar_escaneos(doc, dpi_escaneo, semilla)
+
+    datos = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return datos
+
+
+def _agregar_escaneos(doc, dpi, semilla):
+    """Pone detrás de cada hoja su propia imagen rasterizada con ruido de papel (JPEG calidad 90)."""
+    grano = None
+    for pag in doc:
+        pix = pag.get_pixmap(dpi=dpi)
+        if grano is None or grano.size != len(pix.samples):
+            grano = np.random.default_rng(semilla).integers(-4, 4, len(pix.samples), dtype=np.int16)
+        muestras = np.clip(np.frombuffer(pix.samples, dtype=np.uint8) - 10 + grano, 0, 255).astype(np.uint8)
+        escaneo = fitz.Pixmap(pix.colorspace, pix.width, pix.height, muestras.tobytes(), pix.alpha)
+        pag.insert_image(pag.rect, stream=escaneo.tobytes("jpeg", jpg_quality=90), overlay=False)
+
+
+def generar_portal_publico(carpeta_base, n_tecnicos, bytes_paquete=3_000_000, bytes_hoja=80_000, bytes_tabla=40_000,
+                           semilla=17):
+    """
+    Publica (versión + manifiesto + puntero VIGENTE) un portal con los tres artefactos de
+    cada técnico. El contenido es binario aleatorio: se prueban bytes servidos, no PDF.
+    Retorna el manifiesto.
+    """
+    rnd = random.Random(semilla)
+    carpeta_version = nueva_version(carpeta_base)
+    entradas = []
+    for tecnico in nombres_tecnicos(n_tecnicos):
+        artefactos = {
+            ARCHIVO_HOJA_RUTA: rnd.randbytes(int(bytes_hoja * rnd.uniform(0.7, 1.3))),
+            ARCHIVO_TABLA_DIGITAL: rnd.randbytes(int(bytes_tabla * rnd.uniform(0.7, 1.3))),
+            ARCHIVO_PAQUETE: rnd.randbytes(int(bytes_paquete * rnd.uniform(0.7, 1.3))),
+        }
+        entradas.append(escribir_artefactos(carpeta_version, tecnico, artefactos))
+    manifiesto = escribir_manifiesto(carpeta_version, entradas)
+    activar_version(carpeta_version, carpeta_base)
+    return manifiesto
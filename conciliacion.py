@@ -0,0 +1,160 @@
+#########################################################################################
+#                                                                                       #
+#   CONCILIACIÓN DOCUMENTAL (RUTA <-> PÓLIZAS) - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA   #
+#                                                                                       #
+#   Cruce en ambos sentidos con operaciones de conjuntos vectorizadas (sin iterrows):   #
+#   - RUTA SIN PÓLIZA: visitas de hoy sin póliza escaneada.                             #
+#   - PÓLIZA SIN RUTA: pólizas escaneadas que no están en la ruta de hoy.               #
+#   - CUENTA DUPLICADA: la misma cuenta en varias filas de la ruta.                     #
+#   - PÓLIZA A OTRO TÉCNICO: la visita se reasignó fuera del dueño de la zona, así que  #
+#     el papel de la póliza debe cambiar de manos.                                      #
+#   Salidas: TXT (reporte oficial), CSV y XLSX (una fila por hallazgo).                 #
+#                                                                                       #
+#########################################################################################
+
+from datetime import datetime
+
+import pandas as pd
+
+from exportacion_masiva import agregar_xlsx_a_zip
+from instrumentacion import instrumentar
+from motor_logistico import BOLSA_PENDIENTE, claves_cuenta
+from portal_publico import ARCHIVO_REPORTE_FALTANTES
+
+ARCHIVO_CONCILIACION_CSV = "00_CONCILIACION.csv"
+ARCHIVO_CONCILIACION_XLSX = "00_CONCILIACION.xlsx"
+
+TIPO_RUTA_SIN_POLIZA = "RUTA SIN PÓLIZA"
+TIPO_POLIZA_SIN_RUTA = "PÓLIZA SIN RUTA"
+TIPO_CUENTA_DUPLICADA = "CUENTA DUPLICADA"
+TIPO_POLIZA_OTRO_TECNICO = "PÓLIZA A OTRO TÉCNICO"
+
+COLUMNAS_HALLAZGOS = ["TIPO", "CUENTA", "TECNICO_FINAL", "TECNICO_IDEAL", "BARRIO", "DETALLE"]
+
+# Técnico "ideal" que no corresponde a un dueño de zona real
+SIN_DUENO_ZONA = "SIN_ASIGNAR"
+
+@instrumentar("conciliacion", unidades=lambda r, df, *a, **k: len(df))
+def conciliar(dataframe_final, col_map, mapa_polizas):
+    """
+    Cruza la ruta del día con el banco de pólizas escaneadas.
+    Retorna {"hallazgos": DataFrame (COLUMNAS_HALLAZGOS), "resumen": {tipo: cantidad}, "hay_polizas": bool}.
+    """
+    base = pd.DataFrame({
+        "CUENTA": claves_cuenta(dataframe_final, col_map),
+        "TECNICO_FINAL": dataframe_final['TECNICO_FINAL'].astype(str),
+        "TECNICO_IDEAL": dataframe_final['TECNICO_IDEAL'].astype(str) if 'TECNICO_IDEAL' in dataframe_final.columns else "",
+        "BARRIO": dataframe_final[col_map['BARRIO']].astype(str),
+    })
+
+    hay_polizas = bool(mapa_polizas)
+    cuentas_pdf = pd.Index(list(mapa_polizas.keys()) if hay_polizas else [], dtype=object)
+    con_cuenta = base['CUENTA'].ne("")
+    en_pdf = base['CUENTA'].isin(cuentas_pdf)
+    partes = []
+
+    # 1. Ruta -> PDF (sin banco de pólizas no tiene sentido listar toda la ruta)
+    if hay_polizas:
+        partes.append(base[con_cuenta & ~en_pdf].assign(
+            TIPO=TIPO_RUTA_SIN_POLIZA, DETALLE="Visita en la ruta sin póliza escaneada"))
+
+    # 2. PDF -> Ruta
+    sobrantes = cuentas_pdf[~cuentas_pdf.isin(base['CUENTA'])]
+    if len(sobrantes):
+        partes.append(pd.DataFrame({
+            "CUENTA": sobrantes, "TECNICO_FINAL": "", "TECNICO_IDEAL": "", "BARRIO": "",
+            "TIPO": TIPO_POLIZA_SIN_RUTA, "DETALLE": "Póliza escaneada sin visita en la ruta de hoy",
+        }))
+
+    # 3. Cuentas duplicadas en la ruta
+    duplicadas = base[con_cuenta & base['CUENTA'].duplicated(keep=False)]
+    if not duplicadas.empty:
+        grupos = duplicadas.groupby('CUENTA')
+        veces = grupos['CUENTA'].transform('size').astype(str)
+        tecnicos = grupos['TECNICO_FINAL'].transform('nunique').astype(str)
+        partes.append(duplicadas.assign(
+            TIPO=TIPO_CUENTA_DUPLICADA,
+            DETALLE="Aparece " + veces + " veces en la ruta, repartida en " + tecnicos + " técnico(s)"))
+
+    # 4. Póliza que debe pasar del dueño de la zona al técnico que hará la visita
+    reasignada = (
+        con_cuenta & en_pdf
+        & base['TECNICO_IDEAL'].ne("") & base['TECNICO_IDEAL'].ne(SIN_DUENO_ZONA)
+        & base['TECNICO_FINAL'].ne(base['TECNICO_IDEAL']) & base['TECNICO_FINAL'].ne(BOLSA_PENDIENTE)
+    )
+    if reasignada.any():
+        otras = base[reasignada]
+        partes.append(otras.assign(
+            TIPO=TIPO_POLIZA_OTRO_TECNICO,
+            DETALLE="Zona de " + otras['TECNICO_IDEAL'] + ": entregar la póliza a " + otras['TECNICO_FINAL']))
+
+    if partes:
+        hallazgos = pd.concat(partes, ignore_index=True)[COLUMNAS_HALLAZGOS]
+    else:
+        hallazgos = pd.DataFrame(columns=COLUMNAS_HALLAZGOS)
+    resumen = hallazgos['TIPO'].value_counts().reindex(
+        [TIPO_RUTA_SIN_POLIZA, TIPO_POLIZA_SIN_RUTA, TIPO_CUENTA_DUPLICADA, TIPO_POLIZA_OTRO_TECNICO], fill_value=0)
+    return {"hallazgos": hallazgos, "resumen": {k: int(v) for k, v in resumen.items()}, "hay_polizas": hay_polizas}
+
+def _lineas_tabla(tabla, columna_final, ancho_final):
+    """Filas de texto de ancho fijo construidas por columna (sin concatenar fila por fila)."""
+    encabezado = f"{'CUENTA'.ljust(15)} | {'TÉCNICO'.ljust(25)} | {columna_final}"
+    filas = (
+        tabla['CUENTA'].str.ljust(15) + " | "
+        + tabla['TECNICO_FINAL'].str[:23].str.ljust(25) + " | "
+        + tabla[columna_final].str[:ancho_final]
+    )
+    return ["-"*85, encabezado, "-"*85] + filas.tolist()
+
+def reporte_txt(conciliacion, fecha_generacion=None):
+    """Reporte oficial de cruce documental en texto plano (va en el ZIP y junto al portal)."""
+    fecha_generacion = fecha_generacion or datetime.now()
+    hallazgos = conciliacion["hallazgos"]
+    resumen = conciliacion["resumen"]
+    lineas = [
+        "REPORTE OFICIAL DE CRUCE DOCUMENTAL - PÓLIZAS FALTANTES",
+        f"FECHA DE GENERACIÓN: {fecha_generacion.strftime('%Y-%m-%d %H:%M')}",
+        "="*85,
+        "",
+    ]
+
+    if not conciliacion["hay_polizas"]:
+        lineas += [
+            "ALERTA DEL SISTEMA: No se ingresó ningún documento PDF con pólizas.",
+            "Asumiendo que toda la operación carece de soportes documentales.",
+        ]
+    elif resumen[TIPO_RUTA_SIN_POLIZA] == 0:
+        lineas += [
+            "ESTADO: EXCELENTE (0 FALTANTES)",
+            "Todas las visitas planificadas cuentan con su póliza respectiva en el sistema.",
+        ]
+    else:
+        faltantes = hallazgos[hallazgos['TIPO'] == TIPO_RUTA_SIN_POLIZA].sort_values(by=['TECNICO_FINAL', 'BARRIO'], kind='stable')
+        lineas += [
+            f"ESTADO: REQUIERE ATENCIÓN - Faltan {len(faltantes)} documentos físicos.",
+            "",
+            "LISTADO DETALLADO POR OPERARIO Y ZONA:",
+        ]
+        lineas += _lineas_tabla(faltantes, 'BARRIO', 40)
+
+    # Secciones adicionales del cruce en sentido inverso y de consistencia
+    secciones = [
+        (TIPO_POLIZA_SIN_RUTA, "PÓLIZAS ESCANEADAS QUE NO ESTÁN EN LA RUTA DE HOY"),
+        (TIPO_CUENTA_DUPLICADA, "CUENTAS DUPLICADAS EN LA RUTA"),
+        (TIPO_POLIZA_OTRO_TECNICO, "PÓLIZAS QUE DEBEN CAMBIAR DE TÉCNICO (REASIGNACIONES)"),
+    ]
+    for tipo, titulo in secciones:
+        if resumen[tipo] == 0:
+            continue
+        tabla = hallazgos[hallazgos['TIPO'] == tipo].sort_values(by=['TECNICO_FINAL', 'CUENTA'], kind='stable')
+        lineas += ["", "", f"{titulo}: {resumen[tipo]}"]
+        lineas += _lineas_tabla(tabla, 'DETALLE', 80)
+
+    return "\n".join(lineas) + "\n"
+
+def agregar_conciliacion_a_zip(conciliacion, archivo_zip):
+    """Agrega al ZIP de oficina el reporte TXT y la tabla de hallazgos en CSV y XLSX."""
+    archivo_zip.writestr(ARCHIVO_REPORTE_FALTANTES, reporte_txt(conciliacion).encode('utf-8'))
+    hallazgos = conciliacion["hallazgos"]
+    archivo_zip.writestr(ARCHIVO_CONCILIACION_CSV, hallazgos.to_csv(index=False).encode('utf-8-sig'))
+    agregar_xlsx_a_zip(archivo_zip, ARCHIVO_CONCILIACION_XLSX, hallazgos)
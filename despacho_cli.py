@@ -0,0 +1,233 @@
+#########################################################################################
+#                                                                                       #
+#   DESPACHO POR LOTES (SIN INTERFAZ) - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA            #
+#                                                                                       #
+#   Ejecuta la operación completa del día desde la línea de comandos:                   #
+#   maestro -> ruta -> cupos -> escáner PDF -> artefactos -> portal + ZIP + reporte.    #
+#   Pensado para correr de noche usando todos los núcleos del servidor; la app de       #
+#   Streamlit queda solo para los ajustes manuales.                                     #
+#                                                                                       #
+#   Ejemplo:                                                                            #
+#     python despacho_cli.py --maestro maestro.xlsx --ruta ruta.xlsx \                  #
+#         --pdf polizas_1.pdf --pdf polizas_2.pdf --cupos cupos.csv \                   #
+#         --salida public_files --zip despacho.zip                                      #
+#                                                                                       #
+#########################################################################################
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import date
+
+from exportacion_masiva import FORMATOS_CONSOLIDADO
+from historial import CARPETA_HISTORIAL, HistorialOperaciones
+from ingesta_rutas import unir_rutas
+from instrumentacion import corrida
+from portal_publico import (
+    ARCHIVO_PAQUETE,
+    ARCHIVO_REPORTE_FALTANTES,
+    DIAS_RETENCION_PUBLICACIONES,
+    escribir_manifiesto,
+    nueva_version,
+    activar_version,
+    tamano_legible,
+)
+from motor_logistico import (
+    BOLSA_PENDIENTE,
+    CUPO_POR_DEFECTO,
+    DPI_PAQUETE_MOVIL,
+    CALIDAD_PAQUETE_MOVIL,
+    perfil_paquete_movil,
+    cargar_maestro_dinamico,
+    leer_cupos,
+    detectar_columnas_ruta,
+    ejecutar_distribucion,
+    compactar_operacion,
+    escanear_lote_polizas,
+    iterar_artefactos,
+    escribir_artefactos,
+    escribir_zip_maestro,
+    generar_reporte_faltantes,
+)
+
+
+def construir_parser():
+    parser = argparse.ArgumentParser(
+        description="Despacho diario ITA sin interfaz: genera el portal de técnicos y el ZIP de oficina."
+    )
+    parser.add_argument("--maestro", required=True, help="Maestro de zonas (Excel o CSV).")
+    parser.add_argument("--ruta", action="append", required=True,
+                        help="Ruta diaria exportada del sistema (Excel o CSV). Repetible: los archivos se unen en una sola ruta.")
+    parser.add_argument("--pdf", action="append", default=[], help="PDF del banco de pólizas (se puede repetir).")
+    parser.add_argument("--cupos", help="Cupos por técnico (CSV/XLSX 'Técnico,Cupo' o JSON). "
+                                        "Los técnicos del archivo son los habilitados hoy.")
+    parser.add_argument("--cupo-defecto", type=int, default=CUPO_POR_DEFECTO, help="Cupo para técnicos sin valor propio.")
+    parser.add_argument("--ausente", action="append", default=[], help="Técnico ausente hoy (se puede repetir).")
+    parser.add_argument("--salida", default="public_files", help="Carpeta del portal de técnicos.")
+    parser.add_argument("--retencion-dias", type=float, default=DIAS_RETENCION_PUBLICACIONES,
+                        help="Días que se conservan las publicaciones anteriores.")
+    parser.add_argument("--zip", help="Ruta del ZIP de oficina (opcional).")
+    parser.add_argument("--formato-consolidado", action="append", choices=list(FORMATOS_CONSOLIDADO),
+                        help="Formato(s) del consolidado general dentro del ZIP (por defecto XLSX).")
+    parser.add_argument("--libro-rutas", action="store_true",
+                        help="Agregar al ZIP el libro de rutas (todas las hojas de ruta en un PDF para imprimir).")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Núcleos a usar (por defecto todos).")
+    parser.add_argument("--secuenciar", action="store_true",
+                        help="Ordenar el recorrido de cada técnico por dirección (en vez del orden V74).")
+    parser.add_argument("--perfil-movil", action="store_true",
+                        help="Paquetes de pólizas livianos en el portal (el ZIP de oficina conserva la calidad original).")
+    parser.add_argument("--dpi-movil", type=int, default=DPI_PAQUETE_MOVIL, help="Resolución de los escaneos en el perfil móvil.")
+    parser.add_argument("--calidad-movil", type=int, default=CALIDAD_PAQUETE_MOVIL, help="Calidad JPEG (1-100) del perfil móvil.")
+    parser.add_argument("--permitir-bolsa", action="store_true",
+                        help="Publicar aunque quede carga en la Bolsa Pendiente (el día no se registra en el histórico). "
+                             "Por defecto no se publica, como en la Pestaña 4.")
+    parser.add_argument("--estricto", action="store_true", help=argparse.SUPPRESS)  # Ya es el comportamiento por defecto
+    parser.add_argument("--historial", default=CARPETA_HISTORIAL,
+                        help="Carpeta del histórico de operaciones ('' para no registrar el día).")
+    parser.add_argument("--fecha", type=date.fromisoformat, help="Fecha de la operación (AAAA-MM-DD, por defecto hoy).")
+    for clave in ("barrio", "direccion", "cuenta", "orden", "medidor", "cliente"):
+        parser.add_argument(f"--col-{clave}", help=f"Nombre exacto de la columna {clave.upper()} (si el auto-detector falla).")
+    return parser
+
+
+def main(argv=None):
+    args = construir_parser().parse_args(argv)
+    inicio = time.perf_counter()
+
+    with corrida("DESPACHO CLI"):
+        # 1. Maestro de zonas
+        try:
+            mapa_barrios, _ = cargar_maestro_dinamico(args.maestro)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        todos_tecnicos = sorted(set(mapa_barrios.values()))
+        print(f"Maestro: {len(mapa_barrios)} barrios, {len(todos_tecnicos)} técnicos.")
+
+        # 2. Cupos y asistencia
+        if args.cupos:
+            try:
+                limites = leer_cupos(args.cupos, tecnicos_validos=todos_tecnicos)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            tecnicos_hoy = sorted(limites)
+        else:
+            limites = {}
+            tecnicos_hoy = list(todos_tecnicos)
+        ausentes = {a.upper().strip() for a in args.ausente}
+        tecnicos_hoy = [t for t in tecnicos_hoy if t not in ausentes]
+        limites = {t: limites.get(t, args.cupo_defecto) for t in tecnicos_hoy}
+        print(f"Técnicos habilitados hoy: {len(tecnicos_hoy)}")
+
+        # 3. Ruta diaria y mapeo de columnas
+        union_ruta = unir_rutas(args.ruta, procesos=args.procesos)
+        df_ruta = union_ruta["ruta"]
+        if len(args.ruta) > 1:
+            print(f"Ruta unida desde {len(args.ruta)} archivos: {union_ruta['duplicadas']} fila(s) repetida(s) descartada(s), "
+                  f"{len(union_ruta['conflictos'])} fila(s) en conflicto.")
+            if not union_ruta["conflictos"].empty:
+                print(union_ruta["conflictos"].head(20).to_string(index=False), file=sys.stderr)
+        forzadas = {clave.upper(): getattr(args, f"col_{clave}") for clave in ("barrio", "direccion", "cuenta", "orden", "medidor", "cliente")}
+        col_map = detectar_columnas_ruta(df_ruta.columns, forzadas)
+        faltantes = [c for c in col_map.values() if c and c not in df_ruta.columns]
+        if faltantes:
+            print(f"Columnas inexistentes en la ruta: {', '.join(faltantes)}", file=sys.stderr)
+            return 1
+        print(f"Ruta: {len(df_ruta)} visitas. Columnas: {col_map}")
+
+        # 4. Escáner de pólizas (un PDF por núcleo)
+        mapa_polizas = escanear_lote_polizas(args.pdf, procesos=args.procesos) if args.pdf else {}
+        print(f"Pólizas escaneadas: {len(mapa_polizas)} desde {len(args.pdf)} archivo(s).")
+
+        # 5. Algoritmo de distribución
+        df_final = ejecutar_distribucion(df_ruta, col_map, mapa_barrios, tecnicos_hoy, limites, secuenciar=args.secuenciar)
+        df_final, columnas_laterales = compactar_operacion(df_final, col_map, mapa_barrios.values())
+        en_bolsa = int((df_final['TECNICO_FINAL'] == BOLSA_PENDIENTE).sum())
+        if en_bolsa:
+            print(f"ATENCIÓN: {en_bolsa} visitas quedaron en la Bolsa Pendiente (requieren ajuste manual).")
+            if not args.permitir_bolsa:
+                print("No se publica hasta vaciar la Bolsa Pendiente (ajusta cupos/ausencias o usa --permitir-bolsa).",
+                      file=sys.stderr)
+                return 2
+
+        # 6. Artefactos por técnico en paralelo: se escriben a una versión nueva del portal y al
+        #    ZIP a medida que salen (la publicación anterior sigue disponible mientras tanto)
+        perfil_movil = perfil_paquete_movil(args.dpi_movil, args.calidad_movil) if args.perfil_movil else None
+        carpeta_version = nueva_version(args.salida)
+        try:
+            entradas_manifiesto = []
+            paquetes = {}   # perfil -> (bytes de todos los paquetes, segundos de la pasada)
+
+            def publicar_al_vuelo(pares):
+                for tecnico, artefactos_tecnico in pares:
+                    entradas_manifiesto.append(escribir_artefactos(carpeta_version, tecnico, artefactos_tecnico))
+                    yield tecnico, artefactos_tecnico
+
+            def medir_paquetes(perfil, pares):
+                inicio_pasada = time.perf_counter()
+                total_bytes = 0
+                for tecnico, artefactos_tecnico in pares:
+                    total_bytes += len(artefactos_tecnico.get(ARCHIVO_PAQUETE, b""))
+                    yield tecnico, artefactos_tecnico
+                paquetes[perfil] = (total_bytes, time.perf_counter() - inicio_pasada)
+
+            # Sin perfil móvil basta una pasada (mismos artefactos para portal y ZIP); con perfil
+            # móvil el portal lleva sus propios paquetes y el ZIP los originales
+            if perfil_movil is None:
+                artefactos = publicar_al_vuelo(medir_paquetes("original", iterar_artefactos(
+                    df_final, col_map, mapa_polizas, procesos=args.procesos)))
+                portal = None
+            else:
+                portal = publicar_al_vuelo(medir_paquetes(
+                    f"móvil {perfil_movil['dpi']} DPI, calidad {perfil_movil['calidad']}",
+                    iterar_artefactos(df_final, col_map, mapa_polizas, procesos=args.procesos, perfil_movil=perfil_movil)))
+                artefactos = medir_paquetes("original", iterar_artefactos(
+                    df_final, col_map, mapa_polizas, procesos=args.procesos)) if args.zip else None
+
+            if args.zip:
+                avisos = escribir_zip_maestro(args.zip, df_final, col_map, mapa_polizas,
+                                              args.formato_consolidado or ["XLSX"], artefactos=artefactos,
+                                              columnas_laterales=columnas_laterales, libro_rutas=args.libro_rutas)
+                for aviso in avisos:
+                    print(f"Aviso: {aviso}", file=sys.stderr)
+                print(f"ZIP de oficina: {args.zip}")
+            elif portal is None:
+                portal = artefactos
+            if portal is not None:
+                for _ in portal:
+                    pass
+
+            for perfil, (total_bytes, segundos) in paquetes.items():
+                print(f"Paquetes de pólizas ({perfil}): {tamano_legible(total_bytes)} en total, pasada de {segundos:.1f} s.")
+
+            # 7. Reporte de pólizas faltantes junto al portal (también va dentro del ZIP)
+            with open(os.path.join(carpeta_version, ARCHIVO_REPORTE_FALTANTES), "w", encoding="utf-8") as f:
+                f.write(generar_reporte_faltantes(df_final, col_map, mapa_polizas))
+
+            # 8. Manifiesto: la versión queda completa
+            escribir_manifiesto(carpeta_version, entradas_manifiesto)
+        except BaseException:
+            # Una corrida fallida o interrumpida no deja versiones a medias en el portal
+            shutil.rmtree(carpeta_version, ignore_errors=True)
+            raise
+
+        # Cambio atómico del puntero: libera la operación (fuera del try: una falla al purgar
+        # versiones viejas ya con el puntero cambiado no debe borrar la versión recién liberada)
+        version = activar_version(carpeta_version, args.salida, args.retencion_dias)
+
+        # 9. Histórico: visitas del día y acumulados para la Analítica (solo días sin Bolsa Pendiente)
+        if en_bolsa and args.historial:
+            print("Histórico: el día no se registra porque quedó carga en la Bolsa Pendiente.")
+        elif args.historial:
+            resumen = HistorialOperaciones(args.historial).registrar_dia(df_final, col_map, fecha=args.fecha)
+            print(f"Histórico: día {resumen['fecha']} registrado ({resumen['absorbidas']} visitas absorbidas).")
+
+    print(f"Portal publicado en '{args.salida}' (versión {version}) en {time.perf_counter() - inicio:.1f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#########################################################################################
+#                                                                                       #
+#   SIMULADOR DE CUPOS (¿QUÉ PASARÍA SI...?) - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA     #
+#                                                                                       #
+#   Evalúa muchas configuraciones de cupo a la vez contra la ruta asignada, sin correr  #
+#   la distribución completa por cada intento:                                          #
+#   - Volumen por técnico y barrio calculado una vez, en el mismo orden en que las      #
+#     reglas de cupo sueltan carga (barrios de menor volumen primero), con sus sumas    #
+#     acumuladas: lo que queda con cada técnico es un prefijo de esa lista.             #
+#   - Cada escenario es una fila de una matriz escenarios x técnicos; bolsa, técnicos   #
+#     sobrecargados y barrios partidos salen de operaciones sobre toda la matriz y una  #
+#     sola búsqueda binaria (searchsorted) sobre las sumas de todos los técnicos.       #
+#   - Mismos resultados que aplicar_reglas_cupo (ver benchmarks/bench_escenarios.py).   #
+#                                                                                       #
+#########################################################################################
+
+import numpy as np
+import pandas as pd
+
+from motor_logistico import CUPO_POR_DEFECTO, buscar_tecnico_exacto
+
+# Columnas del resultado de evaluar (una fila por escenario)
+COLUMNAS_ESCENARIOS = ["EN_BOLSA", "POR_CUPO", "POR_AUSENCIA", "SOBRECARGADOS", "BARRIOS_PARTIDOS",
+                       "BARRIOS_A_BOLSA", "CUPO_LIBRE"]
+
+# Columnas del detalle de un escenario (una fila por técnico activo)
+COLUMNAS_DETALLE = ["TECNICO", "CARGA", "CUPO", "A_BOLSA", "BARRIOS_A_BOLSA", "BARRIO_PARTIDO"]
+
+def escenarios_uniformes(tecnicos, desde, hasta, paso=1):
+    """Matriz de cupos con el mismo cupo para todos: una fila por valor de desde..hasta."""
+    valores = list(range(int(desde), int(hasta) + 1, max(1, int(paso))))
+    return pd.DataFrame(np.repeat([valores], len(tecnicos), axis=0).T, index=[f"Cupo {v}" for v in valores],
+                        columns=list(tecnicos))
+
+def escenarios_ajuste(limites_base, ajustes):
+    """
+    Variaciones sobre los cupos actuales: el escenario base, todos +/- cada ajuste y cada
+    técnico por separado +/- cada ajuste (los cupos nunca bajan de 0).
+    """
+    tecnicos = list(limites_base)
+    base = np.array([limites_base[t] for t in tecnicos], dtype=np.int64)
+    filas, nombres = [base], ["Actual"]
+    for ajuste in ajustes:
+        filas.append(base + ajuste)
+        nombres.append(f"Todos {ajuste:+d}")
+    for i, tecnico in enumerate(tecnicos):
+        for ajuste in ajustes:
+            fila = base.copy()
+            fila[i] += ajuste
+            filas.append(fila)
+            nombres.append(f"{tecnico} {ajuste:+d}")
+    return pd.DataFrame(np.clip(np.array(filas), 0, None), index=nombres, columns=tecnicos)
+
+class SimuladorCupos:
+    """
+    Volúmenes de la ruta asignada listos para evaluar escenarios de cupo.
+    - tecnico_por_visita: técnico dueño de cada visita (TECNICO_IDEAL, antes de los cupos).
+    - barrio_por_visita: barrio de cada visita (la columna que usan las reglas de cupo).
+    """
+
+    def __init__(self, tecnico_por_visita, barrio_por_visita):
+        volumen = (pd.DataFrame({"TECNICO": np.asarray(tecnico_por_visita, dtype=object),
+                                 "BARRIO": np.asarray(barrio_por_visita, dtype=object)})
+                   .value_counts(dropna=False).rename("VOLUMEN").reset_index())
+        # Orden en que cada técnico conserva sus barrios (el final de la lista es lo que se suelta)
+        volumen = volumen.sort_values(["TECNICO", "VOLUMEN", "BARRIO"], ascending=[True, False, True], ignore_index=True)
+
+        codigos, self.tecnicos = pd.factorize(volumen["TECNICO"], sort=True)
+        volumenes = volumen["VOLUMEN"].to_numpy(dtype=np.int64)
+        self.total = int(volumenes.sum())
+        self._posicion = {t: i for i, t in enumerate(self.tecnicos)}
+
+        # Un técnico más, sin barrios, para los que no tienen carga en la ruta
+        n_tecnicos = len(self.tecnicos)
+        self._inicio = np.append(np.searchsorted(codigos, np.arange(n_tecnicos + 1)), len(codigos))
+        acumulado = np.concatenate([[0], np.cumsum(volumenes)])
+        self.carga = np.diff(acumulado[self._inicio])
+
+        # Sumas acumuladas de cada técnico desplazadas por técnico: una sola lista creciente
+        self._desplazamiento = np.arange(n_tecnicos + 1, dtype=np.int64) * (self.total + 1)
+        self._claves = self._desplazamiento[codigos] + acumulado[1:] - acumulado[self._inicio[codigos]]
+
+    @classmethod
+    def desde_ruta(cls, df_ruta, col_barrio, mapa_barrios):
+        """Simulador sobre la ruta sin distribuir: cada barrio distinto se asigna una sola vez."""
+        barrios = df_ruta[col_barrio]
+        unicos = barrios.drop_duplicates()
+        tecnicos = barrios.map(dict(zip(unicos, (buscar_tecnico_exacto(b, mapa_barrios) for b in unicos))))
+        return cls(tecnicos, barrios)
+
+    @classmethod
+    def desde_operacion(cls, df_estado, col_barrio):
+        """Simulador sobre una operación ya distribuida (reparte de nuevo desde TECNICO_IDEAL)."""
+        return cls(df_estado['TECNICO_IDEAL'], df_estado[col_barrio])
+
+    def _por_tecnico(self, matriz_cupos):
+        """Matrices escenarios x técnicos: (carga, cupo, a la bolsa, barrios a la bolsa, barrio partido)."""
+        cupos = matriz_cupos.fillna(CUPO_POR_DEFECTO).to_numpy(dtype=np.int64)
+        posiciones = np.array([self._posicion.get(t, len(self.tecnicos)) for t in matriz_cupos.columns], dtype=np.int64)
+        carga = self.carga[posiciones]
+
+        exceso = np.clip(carga - cupos, 0, None)
+        conserva = carga - exceso
+        # Barrios que el técnico conserva completos: sumas acumuladas <= lo que conserva
+        consulta = self._desplazamiento[posiciones] + conserva
+        hasta = np.searchsorted(self._claves, consulta, side="right")
+        en_limite = np.searchsorted(self._claves, consulta, side="left") < hasta
+        barrios_a_bolsa = self._inicio[posiciones + 1] - np.maximum(hasta, self._inicio[posiciones])
+        partido = (exceso > 0) & (conserva > 0) & ~en_limite
+        return carga, cupos, exceso, barrios_a_bolsa, partido
+
+    def evaluar(self, matriz_cupos):
+        """
+        Evalúa todos los escenarios de una vez. matriz_cupos: DataFrame escenarios x técnicos
+        activos (los técnicos con carga que no son columna quedan ausentes).
+        Retorna un DataFrame COLUMNAS_ESCENARIOS con el mismo índice.
+        """
+        carga, cupos, exceso, barrios_a_bolsa, partido = self._por_tecnico(matriz_cupos)
+        por_ausencia = self.total - int(carga.sum())
+        por_cupo = exceso.sum(axis=1)
+        return pd.DataFrame({
+            "EN_BOLSA": por_ausencia + por_cupo,
+            "POR_CUPO": por_cupo,
+            "POR_AUSENCIA": por_ausencia,
+            "SOBRECARGADOS": (exceso > 0).sum(axis=1),
+            "BARRIOS_PARTIDOS": partido.sum(axis=1),
+            "BARRIOS_A_BOLSA": barrios_a_bolsa.sum(axis=1),
+            "CUPO_LIBRE": np.clip(cupos - carga, 0, None).sum(axis=1),
+        }, index=matriz_cupos.index, columns=COLUMNAS_ESCENARIOS)
+
+    def detalle(self, limites_cupo):
+        """Técnico por técnico de un escenario { técnico: cupo }: carga, lo que va a la bolsa y si parte un barrio."""
+        matriz = pd.DataFrame([limites_cupo])
+        carga, cupos, exceso, barrios_a_bolsa, partido = self._por_tecnico(matriz)
+        return pd.DataFrame({
+            "TECNICO": matriz.columns,
+            "CARGA": carga,
+            "CUPO": cupos[0],
+            "A_BOLSA": exceso[0],
+            "BARRIOS_A_BOLSA": barrios_a_bolsa[0],
+            "BARRIO_PARTIDO": partido[0],
+        }, columns=COLUMNAS_DETALLE)
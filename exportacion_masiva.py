@@ -0,0 +1,199 @@
+#########################################################################################
+#                                                                                       #
+#   MÓDULO DE EXPORTACIÓN MASIVA - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA                 #
+#                                                                                       #
+#   - Escritura XLSX fila a fila con xlsxwriter en modo "constant_memory".              #
+#   - Formatos de columna precalculados una sola vez (no celda por celda).              #
+#   - Consolidado general también disponible en CSV comprimido (.csv.gz) y Parquet.     #
+#                                                                                       #
+#########################################################################################
+
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import instrumentar
+
+# Encabezados estéticos de la "Tabla Digital" (5 columnas exactas, en este orden)
+ENCABEZADOS_TABLA_DIGITAL = ['Cuenta', 'Dirección', 'Barrio', 'Orden', 'TECNICOS']
+
+# Formatos disponibles para el consolidado general
+FORMATOS_CONSOLIDADO = {
+    "XLSX": "00_CONSOLIDADO_GENERAL.xlsx",
+    "CSV.GZ": "00_CONSOLIDADO_GENERAL.csv.gz",
+    "PARQUET": "00_CONSOLIDADO_GENERAL.parquet",
+}
+
+# Tamaño del bloque de filas que se convierte a objetos Python en cada pasada
+FILAS_POR_BLOQUE = 5000
+
+# Filas que se revisan para estimar el ancho de cada columna
+FILAS_MUESTRA_ANCHO = 200
+
+
+def mapeo_tabla_digital(col_map, columnas_disponibles):
+    """
+    Devuelve la lista ordenada de pares (columna_real, encabezado_estetico) de la Tabla Digital,
+    omitiendo las columnas de la ruta que no existan en el DataFrame.
+    """
+    mapping = {
+        col_map['CUENTA']: 'Cuenta',
+        col_map['DIRECCION']: 'Dirección',
+        col_map['BARRIO']: 'Barrio',
+        col_map['ORDEN']: 'Orden',
+        'TECNICO_FINAL': 'TECNICOS'
+    }
+    pares = [(k, v) for k, v in mapping.items() if k in columnas_disponibles]
+    return sorted(pares, key=lambda par: ENCABEZADOS_TABLA_DIGITAL.index(par[1]))
+
+
+def _tipo_columna(serie):
+    """Clasifica la columna una sola vez para escoger el método de escritura de xlsxwriter."""
+    if pd.api.types.is_bool_dtype(serie):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(serie):
+        return "numero"
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "fecha"
+    return "texto"
+
+
+def _ancho_estimado(serie, encabezado):
+    """Estima el ancho de la columna con una muestra pequeña (no recorre todo el archivo)."""
+    largo_max = max((len(str(v)) for v in serie.head(FILAS_MUESTRA_ANCHO).tolist() if not pd.isna(v)), default=0)
+    return min(max(largo_max, len(str(encabezado))) + 2, 60)
+
+
+def escribir_xlsx_memoria_constante(df, destino, columnas=None, nombre_hoja="Sheet1"):
+    """
+    Escribe el DataFrame directamente con xlsxwriter en modo de memoria constante.
+
+    - destino: ruta de archivo o buffer binario (io.BytesIO).
+    - columnas: lista opcional de pares (columna_real, encabezado). Si no se indica,
+      se exportan todas las columnas con su nombre original.
+
+    Cada fila se vuelca al disco apenas se escribe, por lo que el consumo de memoria
+    no crece con el número de registros.
+    """
+    import xlsxwriter  # Motor Excel: se carga en el primer uso
+
+    if columnas is None:
+        columnas = [(c, c) for c in df.columns]
+
+    libro = xlsxwriter.Workbook(destino, {'constant_memory': True})
+    hoja = libro.add_worksheet(nombre_hoja)
+
+    fmt_encabezado = libro.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    fmt_fecha = libro.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+
+    # 1. Precalcular tipo, formato y ancho de cada columna (una sola vez)
+    tipos = []
+    for col_idx, (col_real, encabezado) in enumerate(columnas):
+        serie = df[col_real]
+        tipo = _tipo_columna(serie)
+        tipos.append(tipo)
+        hoja.set_column(col_idx, col_idx, _ancho_estimado(serie, encabezado), fmt_fecha if tipo == "fecha" else None)
+
+    # 2. Encabezados
+    for col_idx, (_, encabezado) in enumerate(columnas):
+        hoja.write_string(0, col_idx, str(encabezado), fmt_encabezado)
+
+    # 3. Volcado fila a fila por bloques (las filas deben escribirse en orden en este modo)
+    total_filas = len(df)
+    fila_excel = 1
+    for inicio in range(0, total_filas, FILAS_POR_BLOQUE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        valores_columnas = [bloque[col_real].tolist() for col_real, _ in columnas]
+
+        for fila in zip(*valores_columnas):
+            for col_idx, valor in enumerate(fila):
+                _escribir_celda(hoja, fila_excel, col_idx, valor, tipos[col_idx], fmt_fecha)
+            fila_excel += 1
+
+    libro.close()
+
+
+def _escribir_celda(hoja, fila, col, valor, tipo, fmt_fecha):
+    """Escribe una celda con el método directo de su tipo, dejando en blanco los nulos."""
+    if valor is None or valor is pd.NaT or valor is pd.NA:
+        return
+    if tipo == "numero":
+        if isinstance(valor, float) and np.isnan(valor):
+            return
+        hoja.write_number(fila, col, valor)
+    elif tipo == "bool":
+        hoja.write_boolean(fila, col, bool(valor))
+    elif tipo == "fecha":
+        hoja.write_datetime(fila, col, valor.to_pydatetime() if hasattr(valor, 'to_pydatetime') else valor, fmt_fecha)
+    elif isinstance(valor, str):
+        hoja.write_string(fila, col, valor)
+    elif isinstance(valor, (bool, np.bool_)):
+        hoja.write_boolean(fila, col, bool(valor))
+    elif isinstance(valor, (int, float, np.integer, np.floating)):
+        if pd.isna(valor):
+            return
+        hoja.write_number(fila, col, valor)
+    elif isinstance(valor, (datetime, date)):
+        hoja.write_datetime(fila, col, valor, fmt_fecha)
+    else:
+        hoja.write_string(fila, col, str(valor))
+
+
+@instrumentar("tabla_digital", unidades=lambda r, df, *a, **k: len(df))
+def escribir_tabla_digital(df_tec, col_map, destino):
+    """
+    Escribe la Tabla Digital (5 columnas) de un técnico sin copiar ni renombrar el DataFrame:
+    las columnas reales se leen directamente y solo se cambia el encabezado al escribir.
+    """
+    columnas = mapeo_tabla_digital(col_map, df_tec.columns)
+    escribir_xlsx_memoria_constante(df_tec, destino, columnas=columnas)
+
+
+def agregar_xlsx_a_zip(archivo_zip, nombre_en_zip, df, columnas=None):
+    """
+    Genera el XLSX en un archivo temporal y lo agrega al ZIP desde disco,
+    evitando mantener el libro completo en un buffer de memoria.
+    """
+    fd, ruta_tmp = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        escribir_xlsx_memoria_constante(df, ruta_tmp, columnas=columnas)
+        archivo_zip.write(ruta_tmp, nombre_en_zip)
+    finally:
+        os.unlink(ruta_tmp)
+
+
+def exportar_consolidado(df, formato, archivo_zip):
+    """
+    Agrega el consolidado general al ZIP en el formato indicado ("XLSX", "CSV.GZ" o "PARQUET").
+    Los formatos CSV.GZ y PARQUET están pensados para las herramientas de análisis de la oficina.
+    """
+    nombre = FORMATOS_CONSOLIDADO[formato]
+
+    if formato == "XLSX":
+        agregar_xlsx_a_zip(archivo_zip, nombre, df)
+        return nombre
+
+    fd, ruta_tmp = tempfile.mkstemp(suffix=os.path.splitext(nombre)[1])
+    os.close(fd)
+    try:
+        if formato == "CSV.GZ":
+            df.to_csv(ruta_tmp, index=False, encoding='utf-8-sig', compression='gzip', chunksize=FILAS_POR_BLOQUE)
+        else:
+            try:
+                import pyarrow  # noqa: F401  (dependencia opcional solo para Parquet)
+            except ImportError:
+                raise RuntimeError("La exportación Parquet requiere la librería 'pyarrow' instalada en el servidor.")
+            # Las columnas de texto mixto (números y letras) se unifican como texto para Parquet
+            columnas_texto = {c: 'string' for c in df.columns if df[c].dtype == object}
+            df.astype(columnas_texto).to_parquet(ruta_tmp, index=False, compression='zstd')
+        # Ya viene comprimido: se guarda sin recomprimir dentro del ZIP
+        archivo_zip.write(ruta_tmp, nombre, compress_type=zipfile.ZIP_STORED)
+    finally:
+        os.unlink(ruta_tmp)
+
+    return nombre
@@ -0,0 +1,250 @@
+#########################################################################################
+#                                                                                       #
+#   HISTÓRICO DE OPERACIONES - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA                     #
+#                                                                                       #
+#   - Cada día finalizado (publicación del portal o ZIP maestro, ambos con la Bolsa     #
+#     vacía) se agrega al histórico local: las visitas en Parquet particionado por día  #
+#     y los acumulados diarios en SQLite con índices.                                   #
+#   - Los acumulados se mantienen de forma incremental: registrar un día solo reemplaza #
+#     las filas de ese día (volver a publicar la misma jornada no duplica nada).        #
+#   - La pestaña de Analítica consulta solo los acumulados: meses de historia en pocas  #
+#     filas, sin volver a abrir los consolidados de Excel.                              #
+#                                                                                       #
+#   Estructura en disco:                                                                #
+#     historial/acumulados.sqlite                      dias + rollup_* (por fecha)      #
+#     historial/visitas/fecha=<AAAA-MM-DD>/operacion.parquet   visitas del día          #
+#                                                                                       #
+#########################################################################################
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pandas as pd
+
+from instrumentacion import instrumentar
+from motor_logistico import BOLSA_PENDIENTE, MOTIVO_AUSENTE, MOTIVO_EXCEDE_CUPO, clave_barrio
+
+CARPETA_HISTORIAL = os.environ.get("ITA_HISTORIAL", "historial")
+ARCHIVO_BASE = "acumulados.sqlite"
+CARPETA_VISITAS = "visitas"
+
+# Clasificación del ORIGEN_REAL de cada visita al cierre del día
+ORIGEN_PROPIA = "PROPIA"          # nunca salió de su técnico ideal
+MOTIVO_TRASLADO = "TRASLADO"      # pasó a un compañero estando su técnico ideal en servicio
+MOTIVOS_BOLSA = (MOTIVO_AUSENTE, MOTIVO_EXCEDE_CUPO)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS dias (
+    fecha       TEXT PRIMARY KEY,
+    registrado  TEXT NOT NULL,
+    visitas     INTEGER NOT NULL,
+    tecnicos    INTEGER NOT NULL,
+    propias     INTEGER NOT NULL,
+    absorbidas  INTEGER NOT NULL,
+    en_bolsa    INTEGER NOT NULL,
+    sin_asignar INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_tecnico (
+    fecha       TEXT NOT NULL,
+    tecnico     TEXT NOT NULL,
+    visitas     INTEGER NOT NULL,
+    propias     INTEGER NOT NULL,
+    absorbidas  INTEGER NOT NULL,
+    cedidas     INTEGER NOT NULL,
+    barrios     INTEGER NOT NULL,
+    PRIMARY KEY (fecha, tecnico)
+);
+CREATE INDEX IF NOT EXISTS rollup_tecnico_tecnico ON rollup_tecnico (tecnico, fecha);
+CREATE TABLE IF NOT EXISTS rollup_barrio (
+    fecha       TEXT NOT NULL,
+    barrio      TEXT NOT NULL,
+    visitas     INTEGER NOT NULL,
+    absorbidas  INTEGER NOT NULL,
+    en_bolsa    INTEGER NOT NULL,
+    tecnicos    INTEGER NOT NULL,
+    PRIMARY KEY (fecha, barrio)
+);
+CREATE INDEX IF NOT EXISTS rollup_barrio_barrio ON rollup_barrio (barrio, fecha);
+CREATE TABLE IF NOT EXISTS rollup_origen (
+    fecha       TEXT NOT NULL,
+    tecnico     TEXT NOT NULL,
+    motivo      TEXT NOT NULL,
+    origen      TEXT NOT NULL,
+    visitas     INTEGER NOT NULL,
+    PRIMARY KEY (fecha, tecnico, motivo, origen)
+);
+CREATE INDEX IF NOT EXISTS rollup_origen_motivo ON rollup_origen (motivo, fecha);
+"""
+
+def clasificar_motivo(origen_real, tecnico_ideal, tecnicos_activos):
+    """
+    Motivo por el que la visita no quedó con su técnico ideal:
+    - PROPIA: nunca se movió (ORIGEN_REAL vacío).
+    - Motivo de la Bolsa (ausente / excede cupo): sigue en la Bolsa con ese motivo.
+    - Al salir de la Bolsa ORIGEN_REAL pasa a ser un nombre: si el técnico ideal no trabajó
+      ese día se cuenta como ausencia; si trabajó, como TRASLADO (cupo o ajuste manual).
+    """
+    origen = origen_real.astype("string")
+    motivo = pd.Series(MOTIVO_TRASLADO, index=origen.index, dtype="string")
+    motivo[origen.isna()] = ORIGEN_PROPIA
+    en_bolsa = origen.isin(MOTIVOS_BOLSA)
+    motivo[en_bolsa] = origen[en_bolsa]
+    motivo[(motivo == MOTIVO_TRASLADO) & ~tecnico_ideal.isin(tecnicos_activos)] = MOTIVO_AUSENTE
+    return motivo
+
+def visitas_del_dia(df_estado, col_map):
+    """Columnas mapeadas (con su nombre canónico: BARRIO, CUENTA...) y las de asignación, como texto."""
+    visitas = pd.DataFrame({clave: df_estado[col] for clave, col in col_map.items() if col and col in df_estado.columns})
+    for columna in ('TECNICO_IDEAL', 'TECNICO_FINAL', 'ORIGEN_REAL'):
+        visitas[columna] = df_estado[columna]
+    visitas = visitas.astype("string")
+    if 'ORDEN_ORIGINAL' in df_estado.columns:
+        visitas['ORDEN_ORIGINAL'] = df_estado['ORDEN_ORIGINAL'].astype('int32')
+    return visitas.reset_index(drop=True)
+
+def _es_tecnico(serie):
+    return ~serie.str.contains("SIN_", regex=False).fillna(True) & (serie != BOLSA_PENDIENTE)
+
+def calcular_acumulados(visitas):
+    """Acumulados de un día: (resumen del día, por técnico, por barrio, por origen)."""
+    final, ideal = visitas['TECNICO_FINAL'], visitas['TECNICO_IDEAL']
+    real = _es_tecnico(final)
+    absorbida = real & (final != ideal).fillna(True)
+    en_bolsa = final == BOLSA_PENDIENTE
+    marcas = pd.DataFrame({
+        'tecnico': final, 'ideal': ideal, 'barrio': clave_barrio(visitas['BARRIO'].fillna("")),
+        'absorbida': absorbida.astype(int), 'en_bolsa': en_bolsa.astype(int),
+        'motivo': clasificar_motivo(visitas['ORIGEN_REAL'], ideal, final[real].unique()),
+        'origen': visitas['ORIGEN_REAL'].fillna(ORIGEN_PROPIA),
+    })
+    de_tecnicos = marcas[real]
+
+    por_tecnico = de_tecnicos.groupby('tecnico').agg(
+        visitas=('absorbida', 'size'), absorbidas=('absorbida', 'sum'), barrios=('barrio', 'nunique'))
+    por_tecnico['propias'] = por_tecnico['visitas'] - por_tecnico['absorbidas']
+    # Cedidas: visitas de su zona que terminaron en otro técnico (incluye a los ausentes)
+    cedidas = marcas[_es_tecnico(marcas['ideal']) & (marcas['ideal'] != marcas['tecnico'])].groupby('ideal').size()
+    por_tecnico = por_tecnico.join(cedidas.rename('cedidas'), how='outer').fillna(0).astype(int)
+    por_tecnico = por_tecnico.rename_axis('tecnico').reset_index()[
+        ['tecnico', 'visitas', 'propias', 'absorbidas', 'cedidas', 'barrios']]
+
+    por_barrio = marcas.groupby('barrio').agg(
+        visitas=('absorbida', 'size'), absorbidas=('absorbida', 'sum'), en_bolsa=('en_bolsa', 'sum'))
+    por_barrio['tecnicos'] = de_tecnicos.groupby('barrio')['tecnico'].nunique()
+    por_barrio = por_barrio.fillna(0).astype(int).reset_index()
+
+    por_origen = marcas.groupby(['tecnico', 'motivo', 'origen']).size().rename('visitas').reset_index()
+
+    resumen = {
+        'visitas': len(visitas),
+        'tecnicos': int(de_tecnicos['tecnico'].nunique()),
+        'propias': int(len(de_tecnicos) - de_tecnicos['absorbida'].sum()),
+        'absorbidas': int(de_tecnicos['absorbida'].sum()),
+        'en_bolsa': int(en_bolsa.sum()),
+        'sin_asignar': int((~real & ~en_bolsa).sum()),
+    }
+    return resumen, por_tecnico, por_barrio, por_origen
+
+def _filas(df):
+    """Filas como tuplas de tipos nativos (sqlite3 no acepta los enteros de numpy)."""
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+class HistorialOperaciones:
+    """Histórico local de la operación: Parquet por día + acumulados diarios en SQLite."""
+
+    def __init__(self, carpeta=CARPETA_HISTORIAL):
+        self.carpeta = os.path.abspath(carpeta)
+        self.carpeta_visitas = os.path.join(self.carpeta, CARPETA_VISITAS)
+        os.makedirs(self.carpeta_visitas, exist_ok=True)
+        self._ruta_base = os.path.join(self.carpeta, ARCHIVO_BASE)
+        with self._conexion() as con:
+            con.executescript(_ESQUEMA)
+
+    @contextmanager
+    def _conexion(self):
+        """Conexión corta por operación; confirma al salir."""
+        con = sqlite3.connect(self._ruta_base, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def marca(self):
+        """mtime (ns) de la base: cambia con cada día registrado (sirve de clave de caché)."""
+        try:
+            return os.stat(self._ruta_base).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    # --- Registro -----------------------------------------------------------------------
+
+    @instrumentar("historial", unidades=lambda r, self, df, *a, **k: len(df))
+    def registrar_dia(self, df_estado, col_map, fecha=None):
+        """
+        Guarda las visitas del día y reemplaza sus acumulados (una sola transacción).
+        Retorna el resumen del día.
+        """
+        fecha = (fecha or date.today()).isoformat()
+        visitas = visitas_del_dia(df_estado, col_map)
+
+        carpeta_dia = os.path.join(self.carpeta_visitas, f"fecha={fecha}")
+        os.makedirs(carpeta_dia, exist_ok=True)
+        ruta = os.path.join(carpeta_dia, "operacion.parquet")
+        ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        visitas.to_parquet(ruta_tmp, index=False)
+        os.replace(ruta_tmp, ruta)
+
+        resumen, por_tecnico, por_barrio, por_origen = calcular_acumulados(visitas)
+        with self._conexion() as con:
+            for tabla in ("rollup_tecnico", "rollup_barrio", "rollup_origen"):
+                con.execute(f"DELETE FROM {tabla} WHERE fecha = ?", (fecha,))
+            con.executemany("INSERT INTO rollup_tecnico VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [(fecha, *f) for f in _filas(por_tecnico)])
+            con.executemany("INSERT INTO rollup_barrio VALUES (?, ?, ?, ?, ?, ?)",
+                            [(fecha, *f) for f in _filas(por_barrio)])
+            con.executemany("INSERT INTO rollup_origen VALUES (?, ?, ?, ?, ?)",
+                            [(fecha, *f) for f in _filas(por_origen)])
+            con.execute("INSERT OR REPLACE INTO dias VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+                fecha, datetime.now().isoformat(timespec="seconds"), resumen['visitas'], resumen['tecnicos'],
+                resumen['propias'], resumen['absorbidas'], resumen['en_bolsa'], resumen['sin_asignar']))
+        return {"fecha": fecha, **resumen}
+
+    # --- Consultas (solo acumulados) -----------------------------------------------------
+
+    def _consultar(self, sql, parametros=()):
+        with self._conexion() as con:
+            return pd.read_sql_query(sql, con, params=parametros)
+
+    def dias(self, desde=None, hasta=None):
+        """Resumen de cada día registrado en el rango (fechas ISO o date)."""
+        return self._consultar(
+            "SELECT * FROM dias WHERE fecha BETWEEN ? AND ? ORDER BY fecha", _rango(desde, hasta))
+
+    def por_tecnico(self, desde=None, hasta=None):
+        """Totales por técnico en el rango (días trabajados, visitas, absorbidas, cedidas)."""
+        return self._consultar("""
+            SELECT tecnico, COUNT(*) AS dias, SUM(visitas) AS visitas, SUM(propias) AS propias,
+                   SUM(absorbidas) AS absorbidas, SUM(cedidas) AS cedidas
+            FROM rollup_tecnico WHERE fecha BETWEEN ? AND ?
+            GROUP BY tecnico ORDER BY absorbidas DESC, tecnico""", _rango(desde, hasta))
+
+    def por_barrio(self, desde=None, hasta=None, limite=20):
+        """Barrios con más visitas trasladadas en el rango."""
+        return self._consultar("""
+            SELECT barrio, COUNT(*) AS dias, SUM(visitas) AS visitas, SUM(absorbidas) AS absorbidas
+            FROM rollup_barrio WHERE fecha BETWEEN ? AND ?
+            GROUP BY barrio ORDER BY absorbidas DESC, visitas DESC LIMIT ?""", (*_rango(desde, hasta), limite))
+
+    def por_motivo(self, desde=None, hasta=None):
+        """Visitas fuera de su técnico ideal por día y motivo (traslado, ausencia o exceso de cupo)."""
+        return self._consultar("""
+            SELECT fecha, motivo, SUM(visitas) AS visitas
+            FROM rollup_origen WHERE fecha BETWEEN ? AND ? AND motivo != ?
+            GROUP BY fecha, motivo ORDER BY fecha""", (*_rango(desde, hasta), ORIGEN_PROPIA))
+
+def _rango(desde, hasta):
+    return (str(desde or "0000-01-01"), str(hasta or "9999-12-31"))
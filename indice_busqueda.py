@@ -0,0 +1,202 @@
+#########################################################################################
+#                                                                                       #
+#   BUSCADOR DE LA OPERACIÓN DEL DÍA - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA             #
+#                                                                                       #
+#   Responde "¿quién tiene la cuenta X?" o "¿quién está en la Calle 72?" sin recorrer   #
+#   el tablero ni abrir Excel. Índice en memoria armado una vez por operación:          #
+#   - Mapa hash exacto de cuentas y órdenes normalizadas.                               #
+#   - Índice de palabras de dirección, cliente y barrio (sin tildes, vías unificadas:   #
+#     CALLE/CLL/CL son la misma palabra) con búsqueda por prefijo: el vocabulario va    #
+#     ordenado y las filas de cada palabra contiguas, así un prefijo es un solo tramo.  #
+#   - Cada visita se identifica por ORDEN_ORIGINAL (los traslados renumeran el índice   #
+#     del DataFrame). Tras un traslado solo se comparan y actualizan técnico, dueño     #
+#     ideal y origen; las palabras no se vuelven a indexar.                             #
+#                                                                                       #
+#########################################################################################
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from motor_logistico import claves_cuenta, normalizar_numero, normalizar_numero_vectorizado
+
+# Tipos de vía escritos de distintas formas en el sistema -> una sola palabra en el índice
+SINONIMOS_VIA = {
+    **dict.fromkeys(["CALLE", "CLLE", "CLL", "CL"], "CL"),
+    **dict.fromkeys(["CARRERA", "CARR", "KRA", "KR", "CRA", "CR"], "KR"),
+    **dict.fromkeys(["DIAGONAL", "DG"], "DG"),
+    **dict.fromkeys(["TRANSVERSAL", "TRANSV", "TV", "TR"], "TV"),
+    **dict.fromkeys(["AVENIDA", "AV"], "AV"),
+}
+
+# Columnas del mapeo que se indexan por palabras
+CAMPOS_TEXTO = ('DIRECCION', 'CLIENTE', 'BARRIO')
+
+# Columnas que cambian con los traslados (se comparan en cada actualización)
+COLUMNAS_TRASLADO = ('TECNICO_FINAL', 'ORIGEN_REAL', 'TECNICO_IDEAL')
+
+# Columnas del resultado de una búsqueda
+COLUMNAS_RESULTADO = ["CUENTA", "ORDEN", "DIRECCION", "BARRIO", "CLIENTE", *COLUMNAS_TRASLADO, "POLIZA"]
+
+def _sin_tildes(serie):
+    return serie.astype("string").str.upper().str.normalize("NFD").str.replace("[\u0300-\u036f]", "", regex=True)
+
+def tokenizar(texto):
+    """Palabras de búsqueda de un texto suelto (misma normalización que el índice)."""
+    texto = unicodedata.normalize("NFD", str(texto).upper())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [SINONIMOS_VIA.get(p, p) for p in re.findall(r"[A-Z0-9]+", texto)]
+
+def _agrupar(codigos, filas, n_claves):
+    """
+    Filas ordenadas por clave (y por fila) + inicio del tramo de cada clave (formato CSR).
+    Un par clave/fila repetido queda una vez (ej: la misma palabra en la dirección y el barrio).
+    """
+    orden = np.lexsort((filas, codigos))
+    codigos, filas = codigos[orden], filas[orden]
+    distintos = np.ones(len(codigos), dtype=bool)
+    distintos[1:] = (codigos[1:] != codigos[:-1]) | (filas[1:] != filas[:-1])
+    codigos, filas = codigos[distintos], filas[distintos]
+    return filas, np.searchsorted(codigos, np.arange(n_claves + 1))
+
+class _MapaExacto:
+    """Mapa hash clave -> posiciones, con las posiciones de todas las claves en un solo arreglo."""
+
+    def __init__(self, claves):
+        codigos, unicas = pd.factorize(pd.Series(claves, dtype=object))
+        self._codigo = dict(zip(unicas, range(len(unicas))))
+        self._codigo.pop("", None)
+        self._filas, self._inicio = _agrupar(codigos, np.arange(len(codigos)), len(unicas))
+
+    def get(self, clave):
+        codigo = self._codigo.get(clave)
+        return None if codigo is None else self._filas[self._inicio[codigo]:self._inicio[codigo + 1]]
+
+class IndiceBusqueda:
+    """Índice de búsqueda sobre df_simulado. Las posiciones internas siguen el ORDEN_ORIGINAL."""
+
+    def __init__(self, df_estado, col_map):
+        self.col_map = dict(col_map)
+        ids = self._ids_de(df_estado)
+        orden = np.argsort(ids, kind="stable")
+        self._ids = ids[orden]
+        df = df_estado.iloc[orden].reset_index(drop=True)
+
+        # Datos fijos de cada visita (para mostrar en el resultado)
+        self._cuentas = np.array(claves_cuenta(df, col_map), dtype=object)
+        self._visitas = {"CUENTA": self._cuentas}
+        for clave in ("ORDEN", *CAMPOS_TEXTO):
+            columna = col_map.get(clave)
+            self._visitas[clave] = np.array(df[columna].astype(str), dtype=object) if columna else np.full(len(df), "", dtype=object)
+        self._traslado = {c: np.array(df[c], dtype=object) for c in COLUMNAS_TRASLADO if c in df.columns}
+
+        # Mapas hash exactos
+        self._por_cuenta = _MapaExacto(self._cuentas)
+        self._por_orden = _MapaExacto(normalizar_numero_vectorizado(df[col_map['ORDEN']]) if col_map.get('ORDEN') else [])
+
+        # Índice de palabras: vocabulario ordenado + filas de cada palabra en un tramo contiguo
+        partes = []
+        for clave in CAMPOS_TEXTO:
+            if col_map.get(clave):
+                # Cada texto distinto se normaliza una vez (barrios y clientes se repiten mucho)
+                codigos_texto, textos = pd.factorize(df[col_map[clave]])
+                palabras_texto = _sin_tildes(pd.Series(textos)).str.findall(r"[A-Z0-9]+").explode().dropna()
+                filas_texto = pd.DataFrame({"texto": codigos_texto, "fila": np.arange(len(df))})
+                partes.append(filas_texto.merge(pd.DataFrame({"texto": palabras_texto.index, "palabra": palabras_texto.to_numpy(dtype=object)}), on="texto"))
+        palabras = pd.concat(partes) if partes else pd.DataFrame({"fila": [], "palabra": []})
+        categorias = pd.Categorical(palabras["palabra"].to_numpy(dtype=object))
+        # Sinónimos de vía aplicados al vocabulario, no a cada palabra
+        codigo_canonico, vocabulario = pd.factorize(categorias.categories.map(lambda p: SINONIMOS_VIA.get(p, p)), sort=True)
+        codigos = codigo_canonico[categorias.codes]
+        filas = palabras["fila"].to_numpy(dtype=np.int64)
+        self._vocabulario = np.asarray(vocabulario, dtype=str)
+        self._filas_palabra, self._inicio_palabra = _agrupar(codigos, filas, len(self._vocabulario))
+
+    @staticmethod
+    def _ids_de(df_estado):
+        if 'ORDEN_ORIGINAL' in df_estado.columns:
+            return df_estado['ORDEN_ORIGINAL'].to_numpy(dtype=np.int64)
+        return np.arange(len(df_estado), dtype=np.int64)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def actualizar(self, df_estado):
+        """
+        Trae al índice los traslados hechos desde la última actualización.
+        Retorna cuántas visitas cambiaron, o None si df_estado es otra operación (hay que
+        volver a armar el índice).
+        """
+        ids = self._ids_de(df_estado)
+        if len(ids) != len(self._ids) or not len(ids) or set(self._traslado) - set(df_estado.columns):
+            return None
+        posiciones = np.searchsorted(self._ids, ids).clip(0, len(self._ids) - 1)
+        if not np.array_equal(self._ids[posiciones], ids):
+            return None
+        # Misma numeración pero otra ruta (ej: se subió otro archivo del mismo tamaño)
+        if not np.array_equal(self._cuentas[posiciones], np.array(claves_cuenta(df_estado, self.col_map), dtype=object)):
+            return None
+
+        cambiadas = np.zeros(len(ids), dtype=bool)
+        nuevos = {}
+        for columna, actual in self._traslado.items():
+            nuevo = np.empty(len(ids), dtype=object)
+            nuevo[posiciones] = np.array(df_estado[columna], dtype=object)
+            cambiadas |= (nuevo != actual) & ~(pd.isna(nuevo) & pd.isna(actual))
+            nuevos[columna] = nuevo
+        filas = np.flatnonzero(cambiadas)
+        for columna, nuevo in nuevos.items():
+            self._traslado[columna][filas] = nuevo[filas]
+        return len(filas)
+
+    def _tramo_prefijo(self, prefijo):
+        """
+        Filas (con repetidas, sin ordenar) de las palabras que empiezan por 'prefijo'. Los
+        números y las letras sueltas van exactos: 'Calle 7' no debe traer la 70 ni la 7A.
+        """
+        desde = np.searchsorted(self._vocabulario, prefijo, side="left")
+        if prefijo.isdigit() or len(prefijo) == 1:
+            hasta = desde + int(desde < len(self._vocabulario) and self._vocabulario[desde] == prefijo)
+        else:
+            hasta = np.searchsorted(self._vocabulario, prefijo + "\uffff", side="left")
+        return self._filas_palabra[self._inicio_palabra[desde]:self._inicio_palabra[hasta]]
+
+    def buscar_filas(self, texto):
+        """Posiciones internas (ordenadas) que responden a la búsqueda: cuenta/orden exacta o palabras."""
+        numero = normalizar_numero(texto) if str(texto).strip().isdigit() else ""
+        if numero:
+            exactas = [g for g in (self._por_cuenta.get(numero), self._por_orden.get(numero)) if g is not None]
+            if exactas:
+                return np.unique(np.concatenate(exactas))
+
+        # Todas las palabras deben aparecer: se parte del tramo más corto y se filtra con
+        # marcas por fila (sin ordenar ni deduplicar tramos de miles de filas)
+        tramos = sorted((self._tramo_prefijo(p) for p in set(tokenizar(texto))), key=len)
+        if not tramos:
+            return np.array([], dtype=np.int64)
+        marcas = np.zeros(len(self._ids), dtype=bool)
+        marcas[tramos[0]] = True
+        resultado = np.flatnonzero(marcas)
+        for tramo in tramos[1:]:
+            if not len(resultado):
+                break
+            marcas[:] = False
+            marcas[tramo] = True
+            resultado = resultado[marcas[resultado]]
+        return resultado
+
+    def buscar(self, texto, mapa_polizas=None, limite=50):
+        """
+        Visitas que responden a la búsqueda con su técnico actual, origen y si tienen póliza.
+        Retorna (DataFrame COLUMNAS_RESULTADO con hasta 'limite' filas, total encontrado).
+        """
+        filas = self.buscar_filas(texto)
+        total = len(filas)
+        filas = filas[:limite]
+        columnas = {c: valores[filas] for c, valores in self._visitas.items()}
+        for columna in COLUMNAS_TRASLADO:
+            columnas[columna] = self._traslado[columna][filas] if columna in self._traslado else np.full(len(filas), None)
+        columnas["POLIZA"] = np.array([c in mapa_polizas for c in columnas["CUENTA"]] if mapa_polizas else np.zeros(len(filas)), dtype=bool)
+        return pd.DataFrame(columnas, columns=COLUMNAS_RESULTADO), total
@@ -0,0 +1,147 @@
+#########################################################################################
+#                                                                                       #
+#   INGESTA DE LA RUTA EN VARIOS ARCHIVOS - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA        #
+#                                                                                       #
+#   Los días pesados el sistema de operaciones exporta la ruta partida en varios Excel  #
+#   o CSV. Aquí se unen como si hubiera llegado un solo archivo:                        #
+#   - Lectura en paralelo (un archivo por proceso; a cada proceso viajan sus bytes).    #
+#   - Columnas alineadas con el auto-detector de la Pestaña 2: 'Barrio ', 'ZONA' y      #
+#     'BARRIO' de archivos distintos terminan en la misma columna.                      #
+#   - Pares cuenta/orden repetidos descartados con un índice hash (se conserva la       #
+#     primera aparición); si las copias no coinciden en barrio, dirección, medidor o    #
+#     cliente, se reportan como conflicto.                                              #
+#                                                                                       #
+#########################################################################################
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from instrumentacion import instrumentar
+from motor_logistico import PALABRAS_CLAVE_COLUMNAS, buscar_columna, leer_tabla, normalizar_numero_vectorizado
+
+# Par que identifica una visita; lo demás del mapeo se compara para detectar conflictos
+CLAVES_VISITA = ('CUENTA', 'ORDEN')
+CAMPOS_COMPARADOS = ('BARRIO', 'DIRECCION', 'MEDIDOR', 'CLIENTE')
+
+# Procesos para leer los archivos en la Pestaña 2 (uno por archivo, hasta este tope)
+PROCESOS_INGESTA = int(os.environ.get("ITA_PROCESOS_INGESTA", os.cpu_count() or 1))
+
+COLUMNAS_CONFLICTOS = ["CUENTA", "ORDEN", "ARCHIVO", "FILA", "CONSERVADA", *CAMPOS_COMPARADOS]
+
+def _leer_archivo(tarea):
+    """Trabajo de un proceso: (nombre, bytes) -> DataFrame con los nombres de columna limpios."""
+    nombre, contenido = tarea
+    buffer = io.BytesIO(contenido)
+    buffer.name = nombre
+    df = leer_tabla(buffer)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+def leer_archivos_ruta(archivos, procesos=1):
+    """
+    Lee varios archivos de ruta (UploadedFile, rutas en disco o pares (nombre, bytes)).
+    Con procesos > 1 cada archivo se lee en su propio proceso. Retorna [(nombre, DataFrame)].
+    """
+    tareas = []
+    for archivo in archivos:
+        if isinstance(archivo, tuple):
+            tareas.append(archivo)
+        elif hasattr(archivo, 'read'):
+            archivo.seek(0)
+            tareas.append((archivo.name, archivo.read()))
+        else:
+            with open(archivo, "rb") as f:
+                tareas.append((str(archivo), f.read()))
+
+    nombres = [nombre for nombre, _ in tareas]
+    if procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as ejecutor:
+            return list(zip(nombres, ejecutor.map(_leer_archivo, tareas)))
+    return list(zip(nombres, map(_leer_archivo, tareas)))
+
+def alinear_columnas(tablas):
+    """
+    Renombra las columnas reconocidas por el auto-detector al nombre que tienen en el primer
+    archivo que las trae. Las demás columnas se unen por nombre.
+    Retorna (tablas alineadas, {archivo: [claves del mapeo que no trae]}).
+    """
+    detectadas = [{clave: buscar_columna(df.columns, palabras) for clave, palabras in PALABRAS_CLAVE_COLUMNAS.items()}
+                  for _, df in tablas]
+    referencia = {}
+    for mapa in detectadas:
+        for clave, columna in mapa.items():
+            if columna is not None:
+                referencia.setdefault(clave, columna)
+
+    alineadas, faltantes = [], {}
+    for (nombre, df), mapa in zip(tablas, detectadas):
+        renombres = {col: referencia[clave] for clave, col in mapa.items() if col is not None and col != referencia[clave]}
+        alineadas.append((nombre, df.rename(columns=renombres)))
+        sin_columna = [clave for clave in referencia if mapa[clave] is None]
+        if sin_columna:
+            faltantes[nombre] = sin_columna
+    return alineadas, faltantes
+
+def _texto_comparable(serie):
+    return serie.astype("string").str.strip().str.upper().fillna("")
+
+@instrumentar("ingesta_rutas", unidades=lambda r, *a, **k: len(r["ruta"]))
+def unir_rutas(archivos, procesos=1):
+    """
+    Une la ruta del día partida en varios archivos en un solo DataFrame (en el orden de los
+    archivos, con un índice nuevo) listo para la Pestaña 2 / ejecutar_distribucion.
+    Retorna {"ruta", "archivos": [{archivo, filas}], "columnas_faltantes", "duplicadas",
+             "conflictos": DataFrame (COLUMNAS_CONFLICTOS)}.
+    """
+    tablas, faltantes = alinear_columnas(leer_archivos_ruta(archivos, procesos))
+    resumen_archivos = [{"archivo": nombre, "filas": len(df)} for nombre, df in tablas]
+    ruta = pd.concat([df for _, df in tablas], ignore_index=True, sort=False)
+    origen = pd.DataFrame({
+        "ARCHIVO": [nombre for nombre, df in tablas for _ in range(len(df))],
+        "FILA": [fila for _, df in tablas for fila in range(2, len(df) + 2)],   # fila como se ve en Excel
+    })
+
+    columnas = {clave: buscar_columna(ruta.columns, PALABRAS_CLAVE_COLUMNAS[clave])
+                for clave in (*CLAVES_VISITA, *CAMPOS_COMPARADOS)}
+    claves = [columnas[c] for c in CLAVES_VISITA if columnas[c] is not None]
+    sin_conflictos = pd.DataFrame(columns=COLUMNAS_CONFLICTOS)
+    if not claves or ruta.empty:
+        return {"ruta": ruta, "archivos": resumen_archivos, "columnas_faltantes": faltantes,
+                "duplicadas": 0, "conflictos": sin_conflictos}
+
+    # Índice hash del par cuenta/orden normalizado ('00123', 123 y '123.0' son la misma cuenta)
+    claves_norm = pd.DataFrame({c: normalizar_numero_vectorizado(ruta[c]) for c in claves})
+    huella = pd.util.hash_pandas_object(claves_norm, index=False)
+    # Filas sin cuenta ni orden no se pueden identificar: nunca cuentan como repetidas
+    sin_clave = (claves_norm == "").all(axis=1)
+    repetida = huella.duplicated(keep='first') & ~sin_clave
+
+    conflictos = sin_conflictos
+    if repetida.any():
+        en_grupo = huella.isin(huella[repetida])
+        comparados = [columnas[c] for c in CAMPOS_COMPARADOS if columnas[c] is not None]
+        contenido = pd.util.hash_pandas_object(
+            pd.DataFrame({c: _texto_comparable(ruta.loc[en_grupo, c]) for c in comparados}), index=False)
+        distintos = contenido.groupby(huella[en_grupo].to_numpy()).nunique()
+        huellas_conflicto = distintos.index[distintos > 1]
+        filas = huella.isin(huellas_conflicto).to_numpy()
+        if filas.any():
+            conflictos = pd.DataFrame({
+                "CUENTA": claves_norm[columnas['CUENTA']][filas] if columnas['CUENTA'] else "",
+                "ORDEN": claves_norm[columnas['ORDEN']][filas] if columnas['ORDEN'] else "",
+                "ARCHIVO": origen["ARCHIVO"][filas],
+                "FILA": origen["FILA"][filas],
+                "CONSERVADA": ~repetida[filas],
+                **{c: ruta.loc[filas, columnas[c]] if columnas[c] else "" for c in CAMPOS_COMPARADOS},
+            }).sort_values(["CUENTA", "ORDEN"], kind="stable").reset_index(drop=True)
+
+    return {
+        "ruta": ruta[~repetida.to_numpy()].reset_index(drop=True),
+        "archivos": resumen_archivos,
+        "columnas_faltantes": faltantes,
+        "duplicadas": int(repetida.sum()),
+        "conflictos": conflictos,
+    }
@@ -0,0 +1,348 @@
+#########################################################################################
+#                                                                                       #
+#   INSTRUMENTACIÓN DE RENDIMIENTO - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA               #
+#                                                                                       #
+#   - Mide tiempo real, unidades procesadas (filas/páginas) y pico de memoria por etapa.#
+#   - Memoria por muestreo de RSS en un hilo liviano (tracemalloc opcional).            #
+#   - Registro en memoria para el panel de diagnóstico del administrador.              #
+#   - Historial en JSONL (tendencias) rotado por día y archivo de texto Prometheus      #
+#     (último valor) por proceso principal: los procesos del pool no lo escriben.       #
+#   - Las mediciones se acumulan en memoria y van a disco al terminar cada corrida y    #
+#     cada INTERVALO_VOLCADO segundos, fuera del candado de las mediciones.             #
+#                                                                                       #
+#########################################################################################
+
+import atexit
+import contextvars
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+CARPETA_DIAGNOSTICOS = os.environ.get("ITA_DIAGNOSTICOS", "diagnosticos")
+ARCHIVO_JSONL = "metricas.jsonl"          # Día en curso; los anteriores quedan como metricas-AAAA-MM-DD.jsonl
+ARCHIVO_PROMETHEUS = "metricas.{pid}.prom"  # Uno por proceso: cada uno reescribe solo sus propios contadores
+
+# Días de historial JSONL que se conservan
+DIAS_HISTORIAL = int(os.environ.get("ITA_DIAS_DIAGNOSTICO", "30"))
+
+# ITA_TRACEMALLOC=1 agrega el pico de memoria Python (más preciso, pero más lento)
+USAR_TRACEMALLOC = os.environ.get("ITA_TRACEMALLOC", "0") == "1"
+
+# Intervalo del muestreador de RSS (segundos)
+INTERVALO_MUESTREO = 0.02
+
+# Cada cuánto se escriben a disco las mediciones pendientes fuera de una corrida (segundos)
+INTERVALO_VOLCADO = 2.0
+
+# Últimas mediciones del proceso (compartidas por todas las sesiones)
+REGISTRO = deque(maxlen=1000)
+
+_candado = threading.Lock()
+_candado_disco = threading.Lock()  # Un solo volcado a la vez (en orden); nunca se toma dentro de _candado
+_pendientes = []                   # Mediciones aún no escritas en el JSONL
+_ultimo_volcado = time.monotonic()
+_activos = {}                      # id(registro) -> registro en curso que el muestreador debe actualizar
+_ultimo_por_etapa = {}             # Para el archivo Prometheus (gauge)
+_totales_por_etapa = {}            # Para el archivo Prometheus (counter)
+_muestreador = None
+_dia_jsonl = None                  # Último día en que se revisó la rotación del JSONL
+_prometheus_limpio = False         # Archivos .prom de procesos terminados ya borrados
+
+_registro_actual = contextvars.ContextVar("registro_actual", default=None)
+_corrida_actual = contextvars.ContextVar("corrida_actual", default=None)
+
+# =======================================================================================
+# LECTURA DE MEMORIA DEL PROCESO
+# =======================================================================================
+
+try:
+    _TAM_PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _TAM_PAGINA = 4096
+
+def rss_actual():
+    """Memoria residente (bytes) del proceso, o None si el sistema no permite leerla."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _TAM_PAGINA
+    except OSError:
+        pass
+    try:
+        import psutil  # Opcional: solo si el servidor no es Linux
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+def _ciclo_muestreo():
+    while True:
+        time.sleep(INTERVALO_MUESTREO)
+        if _pendientes and time.monotonic() - _ultimo_volcado >= INTERVALO_VOLCADO:
+            volcar()
+        with _candado:
+            if not _activos:
+                continue
+            rss = rss_actual()
+            if rss is None:
+                continue
+            for registro in _activos.values():
+                if rss > registro["_pico_rss"]:
+                    registro["_pico_rss"] = rss
+
+def _asegurar_muestreador():
+    global _muestreador
+    if _muestreador is None:
+        _muestreador = threading.Thread(target=_ciclo_muestreo, name="ita-muestreo-rss", daemon=True)
+        _muestreador.start()
+
+# =======================================================================================
+# API DE MEDICIÓN
+# =======================================================================================
+
+@contextmanager
+def corrida(nombre):
+    """Agrupa las etapas de una misma acción del usuario (ej: 'PUBLICACION PORTAL')."""
+    token = _corrida_actual.set(f"{datetime.now().strftime('%H:%M:%S')} {nombre}")
+    try:
+        yield
+    finally:
+        _corrida_actual.reset(token)
+        volcar()
+
+def anotar_unidades(cantidad):
+    """Permite que la función medida informe cuántas filas/páginas procesó realmente."""
+    registro = _registro_actual.get()
+    if registro is not None:
+        registro["unidades"] = int(cantidad)
+
+@contextmanager
+def medir_etapa(etapa, unidades=None):
+    """
+    Mide una etapa del pipeline. Uso:
+        with medir_etapa("escaneo") as reg:
+            ...
+            reg["unidades"] = total_paginas
+    """
+    _asegurar_muestreador()
+    rss_inicio = rss_actual() or 0
+    registro = {
+        "etapa": etapa,
+        "corrida": _corrida_actual.get() or "-",
+        "unidades": unidades,
+        "_pico_rss": rss_inicio,
+    }
+
+    padre = _registro_actual.get()
+    token = _registro_actual.set(registro)
+    with _candado:
+        _activos[id(registro)] = registro
+
+    traza_propia = USAR_TRACEMALLOC and not tracemalloc.is_tracing()
+    if traza_propia:
+        tracemalloc.start()
+    elif USAR_TRACEMALLOC:
+        tracemalloc.reset_peak()
+
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        duracion = time.perf_counter() - inicio
+        _registro_actual.reset(token)
+        rss_fin = rss_actual() or 0
+        # Por identidad: dos llamadas a la misma etapa pueden tener registros iguales
+        with _candado:
+            del _activos[id(registro)]
+            pico = max(registro.pop("_pico_rss"), rss_fin)
+
+        registro.update({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "segundos": round(duracion, 4),
+            "pico_rss_mb": round(pico / 1e6, 1) if pico else None,
+            "delta_rss_mb": round((pico - rss_inicio) / 1e6, 1) if pico else None,
+            "pid": os.getpid(),
+        })
+        if USAR_TRACEMALLOC:
+            registro["pico_python_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+            if traza_propia:
+                tracemalloc.stop()
+
+        # El pico de la etapa hija también es pico de la etapa padre
+        if padre is not None:
+            with _candado:
+                if pico > padre.get("_pico_rss", pico):
+                    padre["_pico_rss"] = pico
+
+        _guardar(registro)
+
+def instrumentar(etapa, unidades=None):
+    """
+    Decorador para las funciones del núcleo.
+    - unidades: función opcional (resultado, *args, **kwargs) -> int para calcular filas/páginas.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir_etapa(etapa) as registro:
+                resultado = funcion(*args, **kwargs)
+                if unidades is not None and registro["unidades"] is None:
+                    try:
+                        registro["unidades"] = int(unidades(resultado, *args, **kwargs))
+                    except Exception:
+                        pass
+                return resultado
+        return envoltura
+    return decorador
+
+# =======================================================================================
+# PERSISTENCIA (JSONL + PROMETHEUS)
+# =======================================================================================
+
+def _rotar_jsonl(ruta):
+    """Archiva el JSONL de un día anterior como metricas-AAAA-MM-DD.jsonl y borra los más viejos que DIAS_HISTORIAL."""
+    global _dia_jsonl
+    hoy = date.today()
+    if _dia_jsonl == hoy:
+        return
+    try:
+        dia = date.fromtimestamp(os.path.getmtime(ruta))
+    except FileNotFoundError:
+        dia = hoy
+    if dia < hoy:
+        base, extension = os.path.splitext(ruta)
+        archivo = f"{base}-{dia.isoformat()}{extension}"
+        try:
+            # link + unlink: si otro proceso ya rotó, el enlace falla y no se pisa su archivo
+            os.link(ruta, archivo)
+            os.unlink(ruta)
+        except (FileExistsError, FileNotFoundError):
+            pass
+        limite = f"{os.path.basename(base)}-{(hoy - timedelta(days=DIAS_HISTORIAL)).isoformat()}{extension}"
+        for viejo in glob.glob(f"{base}-????-??-??{extension}"):
+            if os.path.basename(viejo) < limite:
+                os.remove(viejo)
+    _dia_jsonl = hoy
+
+def _guardar(registro):
+    with _candado:
+        REGISTRO.append(registro)
+        _ultimo_por_etapa[registro["etapa"]] = registro
+        total = _totales_por_etapa.setdefault(registro["etapa"], {"ejecuciones": 0, "segundos": 0.0})
+        total["ejecuciones"] += 1
+        total["segundos"] += registro["segundos"]
+        _pendientes.append(registro)
+    # Los procesos del pool terminan sin atexit: escriben lo suyo al momento
+    if multiprocessing.current_process().name != "MainProcess":
+        volcar()
+
+def volcar():
+    """Escribe a disco las mediciones pendientes (JSONL) y el archivo Prometheus del proceso."""
+    global _ultimo_volcado
+    principal = multiprocessing.current_process().name == "MainProcess"
+    with _candado_disco:
+        with _candado:
+            registros = _pendientes[:]
+            del _pendientes[:]
+            texto_prometheus = _texto_prometheus() if principal and registros else None
+            _ultimo_volcado = time.monotonic()
+        if not registros:
+            return
+        try:
+            os.makedirs(CARPETA_DIAGNOSTICOS, exist_ok=True)
+            ruta_jsonl = os.path.join(CARPETA_DIAGNOSTICOS, ARCHIVO_JSONL)
+            _rotar_jsonl(ruta_jsonl)
+            with open(ruta_jsonl, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in registros)
+            # Los procesos del pool solo ven sus propias etapas: su archivo contaría hacia atrás
+            if texto_prometheus is not None:
+                _escribir_prometheus(texto_prometheus)
+        except OSError:
+            # El diagnóstico nunca debe tumbar la operación del día
+            pass
+
+def _al_bifurcar():
+    # Un proceso hijo (fork) no vuelve a escribir lo pendiente del padre ni hereda sus candados tomados
+    global _candado, _candado_disco, _muestreador
+    _candado, _candado_disco, _muestreador = threading.Lock(), threading.Lock(), None
+    _activos.clear()
+    del _pendientes[:]
+
+atexit.register(volcar)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_al_bifurcar)
+
+def _limpiar_prometheus():
+    """Borra los archivos .prom de procesos que ya terminaron (una vez por proceso)."""
+    global _prometheus_limpio
+    _prometheus_limpio = True
+    if os.name != "posix":
+        return
+    for ruta in glob.glob(os.path.join(CARPETA_DIAGNOSTICOS, ARCHIVO_PROMETHEUS.format(pid="*"))):
+        pid = os.path.basename(ruta).split(".")[1]
+        if not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+def _texto_prometheus():
+    """Archivo de texto del proceso para el 'textfile collector' de Prometheus (se arma bajo _candado)."""
+    pid = os.getpid()
+    lineas = [
+        "# HELP ita_etapa_segundos Duración de la última ejecución de la etapa.",
+        "# TYPE ita_etapa_segundos gauge",
+    ]
+    lineas += [f'ita_etapa_segundos{{etapa="{e}",pid="{pid}"}} {r["segundos"]}' for e, r in _ultimo_por_etapa.items()]
+    lineas += ["# HELP ita_etapa_unidades Filas/páginas procesadas en la última ejecución.", "# TYPE ita_etapa_unidades gauge"]
+    lineas += [f'ita_etapa_unidades{{etapa="{e}",pid="{pid}"}} {r["unidades"]}' for e, r in _ultimo_por_etapa.items() if r["unidades"] is not None]
+    lineas += ["# HELP ita_etapa_pico_rss_bytes Pico de memoria residente durante la última ejecución.", "# TYPE ita_etapa_pico_rss_bytes gauge"]
+    lineas += [f'ita_etapa_pico_rss_bytes{{etapa="{e}",pid="{pid}"}} {int(r["pico_rss_mb"] * 1e6)}' for e, r in _ultimo_por_etapa.items() if r["pico_rss_mb"]]
+    lineas += ["# HELP ita_etapa_ejecuciones_total Ejecuciones de la etapa desde el arranque.", "# TYPE ita_etapa_ejecuciones_total counter"]
+    lineas += [f'ita_etapa_ejecuciones_total{{etapa="{e}",pid="{pid}"}} {t["ejecuciones"]}' for e, t in _totales_por_etapa.items()]
+    lineas += ["# HELP ita_etapa_segundos_total Tiempo acumulado de la etapa desde el arranque.", "# TYPE ita_etapa_segundos_total counter"]
+    lineas += [f'ita_etapa_segundos_total{{etapa="{e}",pid="{pid}"}} {round(t["segundos"], 4)}' for e, t in _totales_por_etapa.items()]
+    return "\n".join(lineas) + "\n"
+
+def _escribir_prometheus(texto):
+    """
+    Reescribe de forma atómica el archivo de este proceso (etiqueta pid: las series de la app
+    y de despacho_cli no se pisan).
+    """
+    if not _prometheus_limpio:
+        _limpiar_prometheus()
+    ruta = os.path.join(CARPETA_DIAGNOSTICOS, ARCHIVO_PROMETHEUS.format(pid=os.getpid()))
+    ruta_tmp = f"{ruta}.tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(ruta_tmp, ruta)
+
+def resumen_por_corrida(registros=None):
+    """
+    Agrupa las mediciones por corrida y etapa: ejecuciones, tiempo total, unidades y pico.
+    Retorna una lista de diccionarios (de la corrida más reciente a la más antigua).
+    """
+    registros = list(REGISTRO) if registros is None else registros
+    grupos = {}
+    for posicion, r in enumerate(registros):
+        clave = (r["corrida"], r["etapa"])
+        g = grupos.setdefault(clave, {"corrida": r["corrida"], "etapa": r["etapa"], "ejecuciones": 0,
+                                      "segundos": 0.0, "unidades": 0, "pico_rss_mb": 0.0, "_orden": 0})
+        g["ejecuciones"] += 1
+        g["segundos"] = round(g["segundos"] + r["segundos"], 4)
+        g["unidades"] += r["unidades"] or 0
+        g["pico_rss_mb"] = max(g["pico_rss_mb"], r["pico_rss_mb"] or 0)
+        g["_orden"] = posicion
+    filas = sorted(grupos.values(), key=lambda g: g["_orden"], reverse=True)
+    for g in filas:
+        g.pop("_orden")
+    return filas
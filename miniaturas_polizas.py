@@ -0,0 +1,124 @@
+#########################################################################################
+#                                                                                       #
+#   MINIATURAS DE PÓLIZAS - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA                        #
+#                                                                                       #
+#   Vista previa de las páginas de póliza asignadas a una cuenta, para revisar un       #
+#   paquete sin descargar ni abrir el PDF completo del técnico.                         #
+#   - Se dibujan bajo demanda desde el PDF fuente del almacén (pixmap de PyMuPDF): el   #
+#     banco de pólizas nunca se pre-renderiza.                                          #
+#   - Caché LRU en dos niveles: memoria del proceso (cantidad acotada) y disco en       #
+#     almacen_polizas/miniaturas/ (tamaño acotado; se borran las menos usadas).         #
+#   - Las miniaturas de una fuente se borran junto con ella en la purga del almacén.    #
+#                                                                                       #
+#########################################################################################
+
+import functools
+import os
+import threading
+
+from almacen_polizas import CANDADO_PDF, CARPETA_ALMACEN, con_candado_pdf
+
+# Ancho (px) de la vista previa y calidad JPEG de la imagen guardada
+ANCHO_MINIATURA = 360
+CALIDAD_MINIATURA = 70
+
+# Cotas de la caché: miniaturas en memoria por proceso y megas en disco
+MINIATURAS_EN_MEMORIA = int(os.environ.get("ITA_MINIATURAS_MEMORIA", "256"))
+LIMITE_MB_MINIATURAS = float(os.environ.get("ITA_MINIATURAS_MB", "200"))
+
+# Al pasar el límite se borran las menos usadas hasta quedar en esta fracción
+FRACCION_TRAS_RECORTE = 0.8
+
+_candado_disco = threading.Lock()
+_bytes_en_disco = {}                 # carpeta -> total estimado (se calcula la primera vez)
+
+def carpeta_miniaturas(carpeta_almacen=CARPETA_ALMACEN):
+    return os.path.join(os.path.abspath(carpeta_almacen), "miniaturas")
+
+def _nombre_miniatura(h, pagina, ancho):
+    # Empieza por la huella: la purga del almacén la encuentra con el mismo prefijo
+    return f"{h}.{pagina}.{ancho}.jpg"
+
+@functools.lru_cache(maxsize=4)
+@con_candado_pdf
+def _documento_fuente(ruta_fuente):
+    """PDF fuente abierto una vez (los escaneos del día se consultan página por página)."""
+    import fitz
+    return fitz.open(ruta_fuente)
+
+def renderizar_pagina(documento, pagina, ancho=ANCHO_MINIATURA):
+    """JPEG de una página escalada al ancho pedido."""
+    import fitz
+    with CANDADO_PDF:
+        hoja = documento[pagina]
+        zoom = ancho / hoja.rect.width
+        pixmap = hoja.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return pixmap.tobytes("jpg", jpg_quality=CALIDAD_MINIATURA)
+
+def _recortar_disco(carpeta, limite_bytes):
+    """Borra las miniaturas usadas hace más tiempo hasta bajar de la fracción del límite."""
+    entradas = sorted((e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in os.scandir(carpeta) if e.name.endswith(".jpg"))
+    total = sum(tamano for _, tamano, _ in entradas)
+    for _, tamano, ruta in entradas:
+        if total <= limite_bytes * FRACCION_TRAS_RECORTE:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+    return total
+
+def _guardar_en_disco(carpeta, nombre, imagen, limite_bytes):
+    with _candado_disco:
+        if carpeta not in _bytes_en_disco:
+            os.makedirs(carpeta, exist_ok=True)
+            _bytes_en_disco[carpeta] = sum(e.stat().st_size for e in os.scandir(carpeta) if e.name.endswith(".jpg"))
+        ruta = os.path.join(carpeta, nombre)
+        ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(ruta_tmp, "wb") as f:
+            f.write(imagen)
+        os.replace(ruta_tmp, ruta)
+        _bytes_en_disco[carpeta] += len(imagen)
+        if _bytes_en_disco[carpeta] > limite_bytes:
+            _bytes_en_disco[carpeta] = _recortar_disco(carpeta, limite_bytes)
+
+@functools.lru_cache(maxsize=MINIATURAS_EN_MEMORIA)
+def miniatura_pagina(carpeta_almacen, h, pagina, ancho=ANCHO_MINIATURA):
+    """
+    Miniatura de una página de un PDF fuente del almacén.
+    Memoria -> disco (se marca como usada) -> se dibuja y se guarda en disco.
+    """
+    carpeta = carpeta_miniaturas(carpeta_almacen)
+    nombre = _nombre_miniatura(h, pagina, ancho)
+    ruta = os.path.join(carpeta, nombre)
+    try:
+        with open(ruta, "rb") as f:
+            imagen = f.read()
+        os.utime(ruta)
+        return imagen
+    except FileNotFoundError:
+        pass
+
+    documento = _documento_fuente(os.path.join(carpeta_almacen, "fuentes", f"{h}.pdf"))
+    imagen = renderizar_pagina(documento, pagina, ancho)
+    _guardar_en_disco(carpeta, nombre, imagen, LIMITE_MB_MINIATURAS * 1e6)
+    return imagen
+
+def miniaturas_cuenta(polizas, cuenta, ancho=ANCHO_MINIATURA):
+    """
+    [(página del PDF fuente, bytes JPEG)] de la póliza asignada a una cuenta; [] si no tiene.
+    - polizas: PolizasAlmacenadas (caché en memoria y disco) o el dict {cuenta: bytes_pdf}
+      del escáner en memoria (se dibuja cada vez, sin caché).
+    """
+    if cuenta not in polizas:
+        return []
+    if not hasattr(polizas, "ubicacion"):
+        import fitz
+        with CANDADO_PDF:
+            documento = fitz.open(stream=bytes(polizas[cuenta]), filetype="pdf")
+            return [(i, renderizar_pagina(documento, i, ancho)) for i in range(len(documento))]
+
+    ruta_fuente, pagina_inicio, pagina_fin = polizas.ubicacion(cuenta)
+    h = os.path.basename(ruta_fuente)[:-len(".pdf")]
+    return [(pagina, miniatura_pagina(polizas.carpeta, h, pagina, ancho)) for pagina in range(pagina_inicio, pagina_fin + 1)]
@@ -0,0 +1,1004 @@
+#########################################################################################
+#                                                                                       #
+#   MOTOR LOGÍSTICO - NÚCLEO IMPORTABLE DE LA PLATAFORMA ITA                            #
+#                                                                                       #
+#   - Lógica de negocio pura (sin Streamlit): normalización, asignación, cupos,         #
+#     escáner de pólizas, hojas de ruta PDF, paquetes de legalización y ZIP maestro.    #
+#   - La interfaz (app.py) y las herramientas de medición importan desde aquí.          #
+#                                                                                       #
+#########################################################################################
+
+import io
+import json
+import os
+import re
+import shutil
+import unicodedata
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import functools
+
+import pandas as pd
+
+from exportacion_masiva import (
+    mapeo_tabla_digital,
+    escribir_tabla_digital,
+    exportar_consolidado,
+)
+from almacen_polizas import CANDADO_PDF, AlmacenPolizas, con_candado_pdf
+from instrumentacion import instrumentar, anotar_unidades
+from portal_publico import (
+    ARCHIVO_HOJA_RUTA,
+    ARCHIVO_TABLA_DIGITAL,
+    ARCHIVO_PAQUETE,
+    ARCHIVO_LIBRO_RUTAS,
+    carpeta_segura,
+    escribir_artefactos,
+    escribir_manifiesto,
+    nueva_version,
+    activar_version,
+)
+
+# Los motores PDF (PyMuPDF y FPDF) se importan en el primer uso dentro de cada función:
+# cargar la interfaz o el tablero no debe pagar su tiempo de arranque.
+
+# Destino especial para las visitas sin operario asignado
+BOLSA_PENDIENTE = "⚠️ BOLSA PENDIENTE"
+
+# Motivos con los que una visita entra a la Bolsa Pendiente (quedan en ORIGEN_REAL)
+MOTIVO_AUSENTE = "TÉCNICO INACTIVO/AUSENTE"
+MOTIVO_EXCEDE_CUPO = "EXCEDE CUPO MÁXIMO"
+
+# Cupo por defecto de cada operario
+CUPO_POR_DEFECTO = 35
+
+# Palabras clave del auto-detector de columnas de la ruta diaria
+PALABRAS_CLAVE_COLUMNAS = {
+    'BARRIO': ['BARRIO', 'ZONA', 'UNIDAD'],
+    'DIRECCION': ['DIR', 'DIRECCION', 'UBICACION'],
+    'CUENTA': ['CUENTA', 'CONTRATO', 'CODIGO'],
+    'ORDEN': ['ORDEN', 'PEDIDO', 'TICKET', 'SERVICIO'],
+    'MEDIDOR': ['MEDIDOR', 'APARATO', 'SERIAL'],
+    'CLIENTE': ['CLIENTE', 'NOMBRE', 'USUARIO'],
+}
+COLUMNAS_OPCIONALES = ('MEDIDOR', 'CLIENTE')
+
+# Columnas internas que agrega la ingesta (no salen en el consolidado de oficina)
+COLUMNA_CUENTA_NORM = 'CUENTA_NORM'
+COLUMNA_SECUENCIA = 'SECUENCIA'
+COLUMNAS_INTERNAS = ('ORDEN_ORIGINAL', COLUMNA_CUENTA_NORM, COLUMNA_SECUENCIA)
+
+# Palabras genéricas que estorban al comparar nombres de barrio
+PATRON_PALABRAS_GENERICAS = r'\b(BARRIO|URB|URBANIZACION|SECTOR|ETAPA|VILLA|CIUDADELA|RESIDENCIAL|CONJUNTO|ZONA|UNIDAD)\b'
+
+# =======================================================================================
+# SECCIÓN 1: FUNCIONES DE NORMALIZACIÓN DE DATOS
+# =======================================================================================
+
+def limpiar_estricto(txt):
+    """Limpia tildes, espacios extra y convierte a mayúsculas para un match perfecto."""
+    if pd.isna(txt) or not txt:
+        return ""
+    txt = str(txt).upper().strip()
+    # Normalización para eliminar acentos diacríticos
+    txt = "".join(c for c in unicodedata.normalize('NFD', txt) if unicodedata.category(c) != 'Mn')
+    return txt
+
+def clave_barrio(serie):
+    """Nombre de barrio comparable ('urb las nieves 6' == 'LAS NIEVES 6'); se limpia cada valor único una vez."""
+    unicos = pd.Series(serie.unique())
+    limpios = unicos.map(lambda b: re.sub(r"\s+", " ", re.sub(PATRON_PALABRAS_GENERICAS, "", limpiar_estricto(b))).strip())
+    return serie.map(dict(zip(unicos, limpios)))
+
+def normalizar_numero(txt):
+    """Extrae únicamente los caracteres numéricos de una cadena, ideal para cuentas y celulares."""
+    if pd.isna(txt) or not txt:
+        return ""
+    txt_str = str(txt)
+    if txt_str.endswith('.0'):
+        txt_str = txt_str[:-2]
+    nums = re.sub(r'\D', '', txt_str)
+    return str(int(nums)) if nums else ""
+
+def normalizar_numero_vectorizado(serie):
+    """
+    Versión vectorizada de normalizar_numero para una columna completa (mismo resultado,
+    sin recorrer fila por fila): '00123' -> '123', '123.0' -> '123', vacío/NaN/0 -> ''.
+    """
+    if pd.api.types.is_integer_dtype(serie):
+        # Columna ya numérica (lo usual al leer Excel): basta con pasarla a texto
+        return serie.abs().astype(str).mask(serie.eq(0), "").astype(object)
+
+    texto = serie.astype("string").str.replace(r"\.0$", "", regex=True)
+    digitos = texto.str.replace(r"\D", "", regex=True).fillna("")
+    sin_ceros = digitos.str.lstrip("0")
+    resultado = sin_ceros.mask(digitos.ne("") & sin_ceros.eq(""), "0")
+    # Igual que normalizar_numero: los valores vacíos o el cero numérico no son cuenta
+    return resultado.mask(serie.isna() | serie.eq(0), "").astype(object)
+
+def claves_cuenta(df, col_map):
+    """Cuentas normalizadas de un DataFrame: la columna de la ingesta si existe, o se calcula."""
+    if COLUMNA_CUENTA_NORM in df.columns:
+        return df[COLUMNA_CUENTA_NORM]
+    return normalizar_numero_vectorizado(df[col_map['CUENTA']])
+
+def natural_sort_key(txt):
+    """Permite ordenar direcciones alfanuméricas de forma lógica humana (ej: Calle 2 antes que Calle 10)."""
+    if pd.isna(txt) or not txt:
+        return tuple()
+    txt = str(txt).upper()
+    return tuple(int(s) if s.isdigit() else s for s in re.split(r'(\d+)', txt))
+
+# =======================================================================================
+# SECCIÓN 2: MAESTRO DE ZONAS Y ASIGNACIÓN
+# =======================================================================================
+
+def buscar_tecnico_exacto(barrio_input, mapa_barrios):
+    """
+    Motor de asignación de barrios.
+    Intenta coincidencia exacta, si falla, usa eliminación de prefijos.
+    """
+    if pd.isna(barrio_input) or not barrio_input:
+        return "SIN_ASIGNAR"
+
+    b_raw = limpiar_estricto(str(barrio_input))
+    if not b_raw:
+        return "SIN_ASIGNAR"
+
+    # 1. Intento de coincidencia exacta
+    if b_raw in mapa_barrios:
+        return mapa_barrios[b_raw]
+
+    # 2. Intento eliminando palabras genéricas que suelen estorbar
+    b_flex = re.sub(PATRON_PALABRAS_GENERICAS, '', b_raw).strip()
+    if b_flex in mapa_barrios:
+        return mapa_barrios[b_flex]
+
+    # 3. Búsqueda por subcadena (fallback)
+    for k, v in mapa_barrios.items():
+        if len(k) > 4 and k in b_raw:
+            return v
+
+    return "SIN_ASIGNAR"
+
+def leer_tabla(file):
+    """Lee un Excel o CSV desde un archivo subido (UploadedFile) o una ruta en disco."""
+    nombre = getattr(file, 'name', str(file))
+    if nombre.endswith('.csv'):
+        return pd.read_csv(file, sep=None, engine='python', encoding='utf-8-sig')
+    return pd.read_excel(file)
+
+def buscar_columna(columnas, palabras_clave):
+    """Primera columna cuyo nombre contenga alguna de las palabras clave (o None)."""
+    for nombre_col in columnas:
+        for palabra in palabras_clave:
+            if palabra in str(nombre_col).upper():
+                return nombre_col
+    return None
+
+def detectar_columnas_ruta(columnas, forzadas=None):
+    """
+    Construye el mapa de columnas de la ruta con el auto-detector (igual que la Pestaña 2).
+    - forzadas: dict opcional {'BARRIO': 'Mi Columna', ...} que tiene prioridad.
+    Las obligatorias sin coincidencia toman la primera columna; las opcionales quedan en None.
+    """
+    forzadas = forzadas or {}
+    columnas = [str(c).strip() for c in columnas]
+    mapa_columnas = {}
+    for clave, palabras in PALABRAS_CLAVE_COLUMNAS.items():
+        if forzadas.get(clave):
+            mapa_columnas[clave] = forzadas[clave]
+        elif clave in COLUMNAS_OPCIONALES:
+            mapa_columnas[clave] = buscar_columna(columnas, palabras)
+        else:
+            mapa_columnas[clave] = buscar_columna(columnas, palabras) or columnas[0]
+    return mapa_columnas
+
+def leer_cupos(file, tecnicos_validos=None):
+    """
+    Lee el archivo de cupos (CSV/XLSX con columnas tipo 'Técnico' y 'Cupo', o JSON {técnico: cupo}).
+    Retorna {TECNICO: cupo}; los nombres se llevan a mayúsculas como en el maestro.
+    """
+    nombre = getattr(file, 'name', str(file))
+    if nombre.endswith('.json'):
+        with open(file, encoding='utf-8') as f:
+            crudo = json.load(f)
+        cupos = {str(k).upper().strip(): int(v) for k, v in crudo.items()}
+    else:
+        df = leer_tabla(file)
+        columnas = [limpiar_estricto(c) for c in df.columns]
+        df.columns = columnas
+        col_tecnico = buscar_columna(columnas, ['TECNICO', 'OPERARIO', 'FUNCIONARIO'])
+        col_cupo = buscar_columna(columnas, ['CUPO', 'CAPACIDAD', 'LIMITE'])
+        if not col_tecnico or not col_cupo:
+            raise ValueError("El archivo de cupos debe tener columnas 'Técnico' y 'Cupo'.")
+        cupos = {
+            str(t).upper().strip(): int(c)
+            for t, c in zip(df[col_tecnico], df[col_cupo])
+            if pd.notna(t) and pd.notna(c)
+        }
+    if tecnicos_validos is not None:
+        desconocidos = sorted(set(cupos) - set(tecnicos_validos))
+        if desconocidos:
+            raise ValueError(f"Técnicos del archivo de cupos que no existen en el maestro: {', '.join(desconocidos)}")
+    return cupos
+
+@instrumentar("maestro")
+def cargar_maestro_dinamico(file):
+    """
+    Lee el archivo maestro.
+    Reconoce el archivo 'OPERARIOS REINSTALACION' buscando columnas
+    como 'Nombre Unidad' (como Barrio) y 'Nombre funcionarios' (como Técnico).
+    Lanza ValueError con un mensaje listo para mostrar si el archivo no es válido.
+    """
+    mapa = {}
+    telefonos = {}
+    try:
+        df = leer_tabla(file)
+    except Exception as e:
+        raise ValueError(f"Error crítico leyendo el archivo maestro: {str(e)}")
+    anotar_unidades(len(df))
+
+    # Limpiar nombres de columnas
+    df.columns = [str(c).upper().strip() for c in df.columns]
+
+    # Diccionario ampliado de sinónimos para detectar las columnas correctas
+    col_barrio = next((c for c in df.columns if 'BARRIO' in c or 'ZONA' in c or 'UNIDAD' in c), None)
+    col_tecnico = next((c for c in df.columns if 'TECNICO' in c or 'OPERARIO' in c or 'NOMBRE FUNCIONARIO' in c or 'FUNCIONARIO' in c), None)
+    col_celular = next((c for c in df.columns if 'CEL' in c or 'TEL' in c or 'MOVIL' in c), None)
+
+    if not col_barrio or not col_tecnico:
+        raise ValueError("❌ Error: No se encontraron las columnas clave. El maestro debe tener algo parecido a 'Barrio/Unidad' y 'Técnico/Funcionario'.")
+
+    # Llenar el diccionario de cruce
+    for _, row in df.iterrows():
+        b = limpiar_estricto(str(row[col_barrio]))
+        t = str(row[col_tecnico]).upper().strip()
+
+        if t and t != "NAN" and b:
+            mapa[b] = t
+            if col_celular and pd.notna(row[col_celular]):
+                tel = normalizar_numero(row[col_celular])
+                if tel:
+                    telefonos[t] = tel
+
+    return mapa, telefonos
+
+@instrumentar("asignacion", unidades=lambda r, *a, **k: len(r))
+def asignar_tecnicos(df_ruta, col_barrio, mapa_barrios, col_cuenta=None):
+    """
+    Asignación Primaria (El Deber Ser): agrega TECNICO_IDEAL, TECNICO_FINAL, ORIGEN_REAL y
+    ORDEN_ORIGINAL, y ordena por barrio respetando el orden nativo del archivo (Motor V74).
+    Con col_cuenta también agrega CUENTA_NORM (la cuenta normalizada una sola vez, para el
+    cruce con las pólizas, los paquetes y la búsqueda).
+    """
+    df_procesamiento = df_ruta.copy()
+
+    df_procesamiento['TECNICO_IDEAL'] = df_procesamiento[col_barrio].apply(lambda x: buscar_tecnico_exacto(x, mapa_barrios))
+    df_procesamiento['TECNICO_FINAL'] = df_procesamiento['TECNICO_IDEAL']
+    df_procesamiento['ORIGEN_REAL'] = None
+    df_procesamiento['ORDEN_ORIGINAL'] = range(len(df_procesamiento))
+    if col_cuenta is not None:
+        df_procesamiento[COLUMNA_CUENTA_NORM] = normalizar_numero_vectorizado(df_procesamiento[col_cuenta])
+
+    # Ordenamiento Geográfico (Respetando el motor V74 original)
+    return df_procesamiento.sort_values(by=[col_barrio, 'ORDEN_ORIGINAL'])
+
+@instrumentar("cupos", unidades=lambda r, *a, **k: len(r))
+def aplicar_reglas_cupo(df_procesamiento, col_barrio, tecnicos_hoy, limites_cupo):
+    """
+    Aplica las reglas de negocio sobre el DataFrame asignado (modifica y retorna el mismo objeto):
+    1. Ausencias: la carga de técnicos no habilitados pasa a la Bolsa Pendiente.
+    2. Sobrecarga: lo que supere el cupo de cada técnico pasa a la Bolsa, empezando por sus barrios
+       de menor volumen para no partir los barrios grandes.
+    """
+    mascara_ausentes = ~df_procesamiento['TECNICO_FINAL'].isin(tecnicos_hoy)
+    df_procesamiento.loc[mascara_ausentes, 'ORIGEN_REAL'] = MOTIVO_AUSENTE
+    df_procesamiento.loc[mascara_ausentes, 'TECNICO_FINAL'] = BOLSA_PENDIENTE
+
+    for tecnico_activo in tecnicos_hoy:
+        capacidad_max = limites_cupo.get(tecnico_activo, CUPO_POR_DEFECTO)
+        indices_del_tecnico = df_procesamiento[df_procesamiento['TECNICO_FINAL'] == tecnico_activo].index
+
+        if len(indices_del_tecnico) > capacidad_max:
+            excedente_cantidad = len(indices_del_tecnico) - capacidad_max
+
+            df_tec_temp = df_procesamiento.loc[indices_del_tecnico].copy()
+            mapa_vol = df_tec_temp[col_barrio].value_counts().to_dict()
+            df_tec_temp['VOL_TEMP'] = df_tec_temp[col_barrio].map(mapa_vol)
+            indices_del_tecnico = df_tec_temp.sort_values(by=['VOL_TEMP', col_barrio], ascending=[False, True]).index.tolist()
+
+            indices_a_mover = indices_del_tecnico[-excedente_cantidad:]
+
+            df_procesamiento.loc[indices_a_mover, 'ORIGEN_REAL'] = MOTIVO_EXCEDE_CUPO
+            df_procesamiento.loc[indices_a_mover, 'TECNICO_FINAL'] = BOLSA_PENDIENTE
+
+    return df_procesamiento
+
+@instrumentar("reordenamiento", unidades=lambda r, *a, **k: len(r))
+def reordenar_operacion_global(df_estado, col_map, secuenciar=None):
+    """
+    Organiza automáticamente los registros conservando el orden original del Motor V74
+    (que venía en la planilla de Excel), agrupando primero por Técnico y luego por Barrio.
+    Garantiza que no se desorganice ninguna ruta al mover barrios de la bolsa.
+    - secuenciar: ordena cada técnico por recorrido de direcciones (ver secuenciacion.py).
+      Por defecto se mantiene el modo con el que se armó la operación (si ya trae SECUENCIA).
+    """
+    df_w = df_estado.copy()
+    if secuenciar is None:
+        secuenciar = COLUMNA_SECUENCIA in df_w.columns
+    if col_map and 'BARRIO' in col_map:
+        col_barrio = col_map['BARRIO']
+
+        if secuenciar and col_map.get('DIRECCION') and 'ORDEN_ORIGINAL' in df_w.columns:
+            from secuenciacion import secuenciar_visitas
+            df_w = secuenciar_visitas(df_w, col_map)
+        elif 'ORDEN_ORIGINAL' in df_w.columns:
+            # Garantizar que se respete el orden nativo con el que subieron el archivo
+            df_w = df_w.drop(columns=[COLUMNA_SECUENCIA], errors='ignore')
+            df_w = df_w.sort_values(by=['TECNICO_FINAL', col_barrio, 'ORDEN_ORIGINAL'])
+        else:
+            df_w = df_w.sort_values(by=['TECNICO_FINAL', col_barrio])
+
+        df_w = df_w.reset_index(drop=True)
+    return df_w
+
+def ejecutar_distribucion(df_ruta, col_map, mapa_barrios, tecnicos_hoy, limites_cupo, secuenciar=False):
+    """
+    Algoritmo completo de la Pestaña 2: asignación, reglas de cupo y reorganización V74
+    (o recorrido por dirección de cada técnico si secuenciar=True).
+    """
+    df_procesamiento = asignar_tecnicos(df_ruta, col_map['BARRIO'], mapa_barrios, col_map.get('CUENTA'))
+    df_procesamiento = aplicar_reglas_cupo(df_procesamiento, col_map['BARRIO'], tecnicos_hoy, limites_cupo)
+    return reordenar_operacion_global(df_procesamiento, col_map, secuenciar=secuenciar)
+
+def compactar_operacion(df_estado, col_map, tecnicos=()):
+    """
+    Representación de trabajo compacta para df_simulado (la que copian y filtran las Pestañas 3 y 4):
+    - Técnicos, ORIGEN_REAL y barrio como categorías (pocos valores distintos, ordenadas
+      alfabéticamente para que los ordenamientos V74 no cambien) y ORDEN_ORIGINAL como int32.
+    - Las columnas de la ruta que no están mapeadas salen a una tabla lateral (índice
+      ORDEN_ORIGINAL) que solo se vuelve a unir para el consolidado (restaurar_columnas).
+    - tecnicos: todos los destinos posibles de un traslado (ej: técnicos del maestro).
+    Retorna (df_compacto, columnas_laterales).
+    """
+    mapeadas = {c for c in col_map.values() if c}
+    propias = {'TECNICO_IDEAL', 'TECNICO_FINAL', 'ORIGEN_REAL', *COLUMNAS_INTERNAS}
+    conservar = [c for c in df_estado.columns if c in mapeadas or c in propias]
+    laterales = [c for c in df_estado.columns if c not in conservar]
+
+    df_compacto = df_estado[conservar].copy()
+    df_compacto['ORDEN_ORIGINAL'] = df_compacto['ORDEN_ORIGINAL'].astype('int32')
+
+    # Una sola categoría compartida: un traslado copia valores entre estas tres columnas
+    columnas_tecnico = ['TECNICO_IDEAL', 'TECNICO_FINAL', 'ORIGEN_REAL']
+    nombres = set(tecnicos) | {BOLSA_PENDIENTE}
+    for columna in columnas_tecnico:
+        nombres.update(df_compacto[columna].dropna().astype(str).unique())
+    tipo_tecnico = pd.CategoricalDtype(sorted(nombres))
+    for columna in columnas_tecnico:
+        df_compacto[columna] = df_compacto[columna].astype(tipo_tecnico)
+
+    col_barrio = col_map['BARRIO']
+    if not pd.api.types.is_numeric_dtype(df_compacto[col_barrio]):
+        df_compacto[col_barrio] = df_compacto[col_barrio].astype(
+            pd.CategoricalDtype(sorted(df_compacto[col_barrio].dropna().astype(str).unique())))
+
+    columnas_laterales = df_estado[laterales].set_axis(df_compacto['ORDEN_ORIGINAL'].to_numpy(), axis=0).sort_index()
+    columnas_laterales.attrs['orden_columnas'] = list(df_estado.columns)
+    return df_compacto, columnas_laterales
+
+def restaurar_columnas(df_compacto, columnas_laterales):
+    """Une de nuevo las columnas no mapeadas (por ORDEN_ORIGINAL) en el orden del archivo original."""
+    if columnas_laterales is None or columnas_laterales.columns.empty or 'ORDEN_ORIGINAL' not in df_compacto.columns:
+        return df_compacto
+    df_completo = df_compacto.join(columnas_laterales, on='ORDEN_ORIGINAL')
+    orden = [c for c in columnas_laterales.attrs.get('orden_columnas', []) if c in df_completo.columns]
+    return df_completo[orden + [c for c in df_completo.columns if c not in orden]]
+
+def tecnicos_con_carga(df_estado):
+    """Lista de operarios reales con visitas (excluye la Bolsa y los barrios sin asignar)."""
+    return [t for t in df_estado['TECNICO_FINAL'].unique() if "SIN_" not in t and "⚠️" not in t]
+
+def ruta_del_tecnico(df_estado, tecnico, col_map):
+    """
+    Copia de las visitas de un técnico en el orden V74 original (barrio + orden nativo),
+    o en el de su recorrido por dirección si la operación se secuenció.
+    """
+    dt_operario = df_estado[df_estado['TECNICO_FINAL'] == tecnico].copy()
+
+    if COLUMNA_SECUENCIA in dt_operario.columns:
+        return dt_operario.sort_values(by=[COLUMNA_SECUENCIA, col_map['BARRIO'], 'ORDEN_ORIGINAL'])
+    # Aplicamos orden V74 original en lugar de destructivo natural_sort_key
+    if 'ORDEN_ORIGINAL' in dt_operario.columns:
+        return dt_operario.sort_values(by=[col_map['BARRIO'], 'ORDEN_ORIGINAL'])
+    return dt_operario.sort_values(by=[col_map['BARRIO']])
+
+# =======================================================================================
+# SECCIÓN 3: ESCÁNER DE PÓLIZAS Y PAQUETES DE LEGALIZACIÓN
+# =======================================================================================
+
+# Perfil móvil del paquete de pólizas (lo que se publica en el portal): las imágenes
+# escaneadas se bajan a este DPI y se recomprimen en JPEG. El ZIP de oficina conserva
+# siempre los escaneos originales.
+DPI_PAQUETE_MOVIL = int(os.environ.get("ITA_DPI_MOVIL", "110"))
+CALIDAD_PAQUETE_MOVIL = int(os.environ.get("ITA_CALIDAD_MOVIL", "60"))
+
+def perfil_paquete_movil(dpi=DPI_PAQUETE_MOVIL, calidad=CALIDAD_PAQUETE_MOVIL):
+    """Parámetros del perfil móvil (diccionario simple: viaja a los procesos y a la cola de trabajos)."""
+    return {"dpi": int(dpi), "calidad": int(calidad)}
+
+def _fragmentos_polizas(doc):
+    """
+    Recorre el PDF abierto hoja por hoja buscando números de cuenta o póliza.
+    Produce (pagina_inicio, pagina_fin, cuentas, bytes_pdf) por cada póliza encontrada.
+    """
+    import fitz  # PyMuPDF: Motor avanzado de procesamiento de PDFs
+
+    total_paginas = len(doc)
+
+    for i in range(total_paginas):
+        texto_pagina = doc[i].get_text()
+
+        # Regex tolerante para encontrar la cuenta
+        matches = re.findall(r'(?:Póliza|Poliza|Cuenta)\D{0,20}(\d{4,15})', texto_pagina, re.IGNORECASE)
+
+        if matches:
+            # Crear un nuevo documento PDF en memoria solo con esta página
+            sub_doc = fitz.open()
+            sub_doc.insert_pdf(doc, from_page=i, to_page=i)
+            pagina_fin = i
+
+            # Revisar si la siguiente página también pertenece a esta póliza (Ej: anexos o revesos)
+            if i + 1 < total_paginas:
+                texto_siguiente = doc[i+1].get_text()
+                # Si la página siguiente NO tiene la palabra "Cuenta", asumimos que es continuación
+                if not re.search(r'(?:Póliza|Poliza|Cuenta)', texto_siguiente, re.IGNORECASE):
+                    sub_doc.insert_pdf(doc, from_page=i+1, to_page=i+1)
+                    pagina_fin = i + 1
+
+            pdf_bytes = sub_doc.tobytes()
+            sub_doc.close()
+
+            yield i, pagina_fin, [normalizar_numero(m) for m in matches], pdf_bytes
+
+@con_candado_pdf
+@instrumentar("escaneo_pdf")
+def procesar_pdf_polizas_avanzado(file_obj):
+    """
+    Usa PyMuPDF (fitz) para escanear el PDF hoja por hoja buscando números de cuenta o póliza.
+    Retorna un diccionario: { "Cuenta123": <Bytes_Del_PDF_Separado>, ... }
+    """
+    import fitz
+
+    file_obj.seek(0)
+    doc = fitz.open(stream=file_obj.read(), filetype="pdf")
+    diccionario_extraido = {}
+    anotar_unidades(len(doc))
+
+    for _, _, cuentas, pdf_bytes in _fragmentos_polizas(doc):
+        # Guardar en el diccionario asociándolo a la cuenta encontrada
+        for cuenta_limpia in cuentas:
+            diccionario_extraido[cuenta_limpia] = pdf_bytes
+
+    return diccionario_extraido
+
+def _escanear_ruta_pdf(ruta_pdf):
+    """Trabajo de un proceso del escáner paralelo: abre el PDF desde disco y lo escanea."""
+    with open(ruta_pdf, "rb") as f:
+        return procesar_pdf_polizas_avanzado(io.BytesIO(f.read()))
+
+def escanear_lote_polizas(archivos_pdf, procesos=1):
+    """
+    Escanea varios PDFs del banco de pólizas y unifica el resultado en un solo diccionario.
+    Con procesos > 1 los archivos (rutas en disco) se reparten entre varios núcleos.
+    """
+    diccionario_global_polizas = {}
+    if procesos > 1 and len(archivos_pdf) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            for resultado_parcial in ejecutor.map(_escanear_ruta_pdf, archivos_pdf):
+                diccionario_global_polizas.update(resultado_parcial)
+        return diccionario_global_polizas
+
+    for pdf_obj in archivos_pdf:
+        if isinstance(pdf_obj, (str, os.PathLike)):
+            resultado_parcial = _escanear_ruta_pdf(pdf_obj)
+        else:
+            resultado_parcial = procesar_pdf_polizas_avanzado(pdf_obj)
+        diccionario_global_polizas.update(resultado_parcial)
+    return diccionario_global_polizas
+
+@instrumentar("escaneo_pdf")
+def indexar_fuente(almacen, h):
+    """
+    Escanea un PDF ya guardado en el almacén compartido y escribe su índice.
+    Si otro proceso/sesión lo indexó mientras se esperaba el bloqueo, no repite el trabajo.
+    """
+    import fitz
+
+    with almacen.bloqueo(h):
+        if almacen.tiene_indice(h):
+            return 0
+        # El candado de PyMuPDF se toma dentro del bloqueo de archivo (nunca al revés)
+        with CANDADO_PDF, fitz.open(almacen.ruta_fuente(h)) as doc:
+            anotar_unidades(len(doc))
+            return almacen.guardar_indice(h, _fragmentos_polizas(doc), len(doc))
+
+def _indexar_fuente_trabajo(tarea):
+    return indexar_fuente(*tarea)
+
+def escanear_al_almacen(archivos_pdf, almacen=None, procesos=1):
+    """
+    Versión compartida de escanear_lote_polizas: guarda cada PDF en el almacén direccionado
+    por contenido, escanea solo las fuentes que nadie ha indexado antes y retorna un
+    manejador liviano (PolizasAlmacenadas) con la misma interfaz del diccionario de pólizas.
+    """
+    almacen = almacen or AlmacenPolizas()
+    huellas = []
+    for pdf_obj in archivos_pdf:
+        if isinstance(pdf_obj, (str, os.PathLike)):
+            with open(pdf_obj, "rb") as f:
+                contenido = f.read()
+        else:
+            pdf_obj.seek(0)
+            contenido = pdf_obj.read()
+        huellas.append(almacen.guardar_fuente(contenido))
+        del contenido
+
+    pendientes = [h for h in dict.fromkeys(huellas) if not almacen.tiene_indice(h)]
+    if procesos > 1 and len(pendientes) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            list(ejecutor.map(_indexar_fuente_trabajo, [(almacen, h) for h in pendientes]))
+    else:
+        for h in pendientes:
+            indexar_fuente(almacen, h)
+
+    return almacen.polizas(huellas)
+
+def polizas_de_ruta(dt_operario, col_map, mapa_polizas):
+    """Subconjunto del banco de pólizas que corresponde a las cuentas de una ruta."""
+    if not mapa_polizas:
+        return {}
+    return {c: mapa_polizas[c] for c in claves_cuenta(dt_operario, col_map) if c in mapa_polizas}
+
+def _opciones_perfil_movil(dpi, calidad):
+    """
+    Opciones de MuPDF para reescribir las imágenes a color y en grises:
+    - Remuestreo bicúbico (el promedio de rewrite_images solo reduce por factores enteros:
+      un escaneo de 200 DPI no bajaría a 110).
+    - Margen del 20%: una imagen apenas por encima del objetivo no vale la pena tocarla.
+    - Solo se reemplaza la imagen si el resultado es más pequeño.
+    Las de 1 bit (fax) quedan igual: ya son livianas y al reducirlas se vuelven ilegibles.
+    """
+    import fitz
+
+    opciones = fitz.mupdf.PdfImageRewriterOptions()
+    for tipo in ("color_lossy", "color_lossless", "gray_lossy", "gray_lossless"):
+        setattr(opciones, f"{tipo}_image_subsample_method", fitz.mupdf.FZ_SUBSAMPLE_BICUBIC)
+        setattr(opciones, f"{tipo}_image_subsample_threshold", int(dpi * 1.2))
+        setattr(opciones, f"{tipo}_image_subsample_to", dpi)
+        setattr(opciones, f"{tipo}_image_recompress_method", fitz.mupdf.FZ_RECOMPRESS_JPEG)
+        setattr(opciones, f"{tipo}_image_recompress_quality", str(calidad))
+    opciones.recompress_when = fitz.mupdf.FZ_RECOMPRESS_WHEN_SMALLER
+    return opciones
+
+def _bytes_paquete(documento, perfil_movil=None):
+    """
+    Bytes del paquete fusionado. Con perfil móvil: imágenes por encima del DPI objetivo
+    reducidas y recomprimidas, fuentes recortadas a los caracteres usados, objetos
+    repetidos (fuentes de cada póliza) unificados y todos los flujos comprimidos.
+    """
+    if not perfil_movil:
+        return documento.tobytes()
+    documento.rewrite_images(options=_opciones_perfil_movil(perfil_movil["dpi"], perfil_movil["calidad"]))
+    documento.subset_fonts()
+    return documento.tobytes(garbage=3, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+
+@con_candado_pdf
+@instrumentar("paquete_polizas")
+def construir_paquete_legalizacion(dt_operario, col_map, mapa_polizas, perfil_movil=None):
+    """
+    Fusiona en un solo PDF las pólizas de las visitas del técnico, en el orden de su ruta.
+    - perfil_movil: ver perfil_paquete_movil (None = escaneos originales, para la oficina).
+    Retorna los bytes del paquete o None si ninguna cuenta tiene póliza escaneada.
+    """
+    if not mapa_polizas:
+        return None
+
+    import fitz
+
+    motor_fusion = fitz.open()
+    contador_polizas = 0
+
+    for num_cuenta in claves_cuenta(dt_operario, col_map):
+        if num_cuenta in mapa_polizas:
+            with fitz.open(stream=mapa_polizas[num_cuenta], filetype="pdf") as pdf_individual:
+                motor_fusion.insert_pdf(pdf_individual)
+            contador_polizas += 1
+
+    anotar_unidades(contador_polizas)
+    paquete = _bytes_paquete(motor_fusion, perfil_movil) if contador_polizas > 0 else None
+    motor_fusion.close()
+    return paquete
+
+# =======================================================================================
+# SECCIÓN 4: GENERACIÓN DE HOJA DE RUTA FÍSICA (PDF)
+# =======================================================================================
+
+def preparar_tabla_digital_excel(df_tec, col_map):
+    """
+    FUNCIÓN ESTRICTA DE 5 COLUMNAS CON ORDEN REAL:
+    Garantiza que el Excel que recibe el operario SOLO tenga las columnas solicitadas en la imagen,
+    pero esta vez extrae el número de Orden real seleccionado por el usuario en lugar de inventar uno.
+    [Cuenta, Dirección, Barrio, Orden, TECNICOS]
+    """
+    # Solo se toman las columnas necesarias (sin copiar la ruta completa del técnico)
+    pares = mapeo_tabla_digital(col_map, df_tec.columns)
+    df_resultado = df_tec[[k for k, _ in pares]].set_axis([v for _, v in pares], axis=1).reset_index(drop=True)
+
+    return df_resultado
+
+class _BufferPDF:
+    """
+    Buffer de salida de FPDF por partes. pyfpdf acumula el documento con self.buffer += línea,
+    que copia todo lo escrito en cada línea (costo cuadrático en documentos de cientos de páginas).
+    Este buffer y PDFListado.fila_tabla usan internos de pyfpdf 1.7.2 (fijado en requirements.txt);
+    benchmarks/bench_pipeline.py verifica que el PDF sea idéntico al de cell()/ln().
+    """
+    def __init__(self):
+        self.partes = []
+        self.largo = 0
+
+    def __iadd__(self, texto):
+        self.partes.append(texto)
+        self.largo += len(texto)
+        return self
+
+    def __len__(self):
+        return self.largo
+
+    def __str__(self):
+        return "".join(self.partes)
+
+@functools.lru_cache(maxsize=None)
+def _clase_pdf_listado():
+    """Define (una sola vez, al primer uso) la plantilla FPDF de la hoja de ruta."""
+    from fpdf import FPDF
+
+    class PDFListado(FPDF):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.buffer = _BufferPDF()
+            self._plantillas_fila = {}
+
+        def bytes_pdf(self):
+            """Cierra el documento y retorna sus bytes (equivale a output(dest='S').encode('latin-1'))."""
+            if self.state < 3:
+                self.close()
+            return str(self.buffer).encode('latin-1')
+
+        def header(self):
+            # Fondo del encabezado azul oscuro institucional
+            self.set_fill_color(0, 51, 102)
+            self.rect(0, 0, 297, 20, 'F')
+            self.set_font('Arial', 'B', 16)
+            self.set_text_color(255, 255, 255)
+            self.set_xy(10, 5)
+            self.cell(0, 10, 'UT ITA RADIAN - HOJA DE RUTA DE OPERACIONES', 0, 1, 'C')
+            self.ln(10)
+
+        def fila_tabla(self, valores, anchos, alto):
+            """
+            Fila de celdas con borde y texto a la izquierda: lo mismo que cell(w, alto, v, 1, 0, 'L')
+            por celda + ln(), pero escrito al contenido de la página en una sola llamada y con las
+            coordenadas horizontales ya formateadas (solo cambian la altura y los textos).
+            """
+            if self.y + alto > self.page_break_trigger and self.accept_page_break():
+                self.add_page(self.cur_orientation)
+            k = self.k
+            con_texto = tuple(valor != '' for valor in valores)
+            clave = (tuple(anchos), alto, self.x, self.color_flag, self.text_color, con_texto)
+            plantilla = self._plantillas_fila.get(clave)
+            if plantilla is None:
+                color, fin = (f"q {self.text_color} ", " Q") if self.color_flag else ("", "")
+                partes, x = [], self.x
+                for w, hay_texto in zip(anchos, con_texto):
+                    parte = '%.2f %%s %.2f %.2f re S ' % (x * k, w * k, -alto * k)
+                    if hay_texto:
+                        parte += '%sBT %.2f %%s Td (%%s) Tj ET%s' % (color, (x + self.c_margin) * k, fin)
+                    partes.append(parte)
+                    x += w
+                plantilla = self._plantillas_fila[clave] = "\n".join(partes)
+
+            y_borde = '%.2f' % ((self.h - self.y) * k)
+            y_texto = '%.2f' % ((self.h - (self.y + .5 * alto + .3 * self.font_size)) * k)
+            argumentos = []
+            for valor, hay_texto in zip(valores, con_texto):
+                argumentos.append(y_borde)
+                if hay_texto:
+                    argumentos += (y_texto, self._escape(valor))
+            self._out(plantilla % tuple(argumentos))
+            self.lasth = alto
+            self.x = self.l_margin
+            self.y += alto
+
+    return PDFListado
+
+# Tabla de la hoja de ruta
+ENCABEZADOS_HOJA_RUTA = ['#', 'CUENTA', 'MEDIDOR', 'BARRIO', 'DIRECCION', 'CLIENTE']
+ANCHOS_HOJA_RUTA = [10, 25, 25, 65, 85, 60]
+
+def _nueva_hoja_pdf():
+    return _clase_pdf_listado()(orientation='L', unit='mm', format='A4')
+
+def _celdas_latin1(serie, largo=None):
+    """Columna como texto para FPDF: truncada y con lo que no cabe en latin-1 reemplazado por '?'."""
+    texto = serie.astype(str)
+    limpios = {v: v[:largo].encode('latin-1', 'replace').decode('latin-1') for v in texto.unique()}
+    return texto.map(limpios)
+
+def _celdas_hoja_ruta(df, col_map, tecnico):
+    """
+    Celdas de la hoja de ruta ya convertidas a texto (cada valor distinto se convierte una vez)
+    y la marca de APOYO de cada visita. 'tecnico' puede ser un nombre o una Serie alineada con
+    df (el TECNICO_FINAL de cada fila, para preparar toda la operación de una vez).
+    """
+    celdas = pd.DataFrame(index=df.index)
+
+    # Alerta visual: Si la visita es de apoyo (vino de otro técnico), se marca en ROJO
+    if 'ORIGEN_REAL' in df.columns:
+        celdas['APOYO'] = df['ORIGEN_REAL'].notna() & (df['ORIGEN_REAL'].astype(str) != tecnico)
+    else:
+        celdas['APOYO'] = False
+    barrios = df[col_map['BARRIO']].astype(str)
+    celdas['BARRIO'] = _celdas_latin1(barrios.where(~celdas['APOYO'], "[APOYO] " + barrios), 38)
+
+    # Demás columnas (vacías si no se mapearon), truncadas como en la hoja original
+    for clave, largo in (('CUENTA', None), ('MEDIDOR', 15), ('DIRECCION', 60), ('CLIENTE', 30)):
+        c = col_map.get(clave)
+        celdas[clave] = _celdas_latin1(df[c], largo) if c and c in df.columns and c != "NO TIENE" else ""
+    return celdas
+
+def _pintar_hoja_ruta(pdf, celdas, tecnico, fecha):
+    """Agrega al PDF las páginas de la hoja de ruta de un técnico (celdas de _celdas_hoja_ruta, en orden)."""
+    pdf.add_page()
+
+    # Metadatos del Gestor
+    pdf.set_font('Arial', 'B', 12)
+    pdf.set_text_color(0, 0, 0)
+    pdf.cell(0, 10, f"GESTOR: {tecnico} | FECHA: {fecha} | TOTAL VISITAS ASIGNADAS: {len(celdas)}", 0, 1)
+
+    # Pintar Cabeceras
+    pdf.set_fill_color(220, 220, 220)
+    pdf.set_font('Arial', 'B', 9)
+    for h, w in zip(ENCABEZADOS_HOJA_RUTA, ANCHOS_HOJA_RUTA):
+        pdf.cell(w, 8, h, 1, 0, 'C', 1)
+    pdf.ln()
+
+    # Llenar datos
+    pdf.set_font('Arial', '', 8)
+    filas = celdas[ENCABEZADOS_HOJA_RUTA[1:]].itertuples(index=False, name=None)
+    for idx, (es_apoyo, fila) in enumerate(zip(celdas['APOYO'].tolist(), filas), start=1):
+        if es_apoyo:
+            pdf.set_text_color(200, 0, 0) # Letra roja
+        else:
+            pdf.set_text_color(0, 0, 0) # Letra negra
+        pdf.fila_tabla((str(idx), *fila), ANCHOS_HOJA_RUTA, 7)
+
+@instrumentar("hoja_ruta", unidades=lambda r, df, *a, **k: len(df))
+def crear_pdf_lista_final(df, tecnico, col_map):
+    pdf = _nueva_hoja_pdf()
+    _pintar_hoja_ruta(pdf, _celdas_hoja_ruta(df, col_map, tecnico), tecnico, datetime.now().strftime('%d/%m/%Y'))
+    return pdf.bytes_pdf()
+
+def _pintar_resumen_libro(pdf, secciones, fecha):
+    """Página(s) de resumen del libro de rutas: visitas, página inicial y páginas por técnico."""
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 12)
+    pdf.set_text_color(0, 0, 0)
+    total_visitas = sum(s[1] for s in secciones)
+    total_paginas = sum(s[3] for s in secciones)
+    pdf.cell(0, 10, f"LIBRO DE RUTAS | FECHA: {fecha} | TÉCNICOS: {len(secciones)} | "
+                    f"VISITAS: {total_visitas} | PÁGINAS DE RUTA: {total_paginas}", 0, 1)
+
+    anchos = [10, 150, 35, 35, 35]
+    pdf.set_fill_color(220, 220, 220)
+    pdf.set_font('Arial', 'B', 9)
+    for h, w in zip(['#', 'TÉCNICO', 'VISITAS', 'PÁGINA', 'PÁGINAS'], anchos):
+        pdf.cell(w, 8, h, 1, 0, 'C', 1)
+    pdf.ln()
+    pdf.set_font('Arial', '', 9)
+    for i, (tecnico, visitas, pagina, paginas) in enumerate(secciones, start=1):
+        fila = [str(i), tecnico.encode('latin-1', 'replace').decode('latin-1'), str(visitas), str(pagina), str(paginas)]
+        for val, w in zip(fila, anchos):
+            pdf.cell(w, 7, val, 1, 0, 'L')
+        pdf.ln()
+
+@instrumentar("libro_rutas", unidades=lambda r, df, *a, **k: len(df))
+def crear_libro_rutas(dataframe_final, col_map):
+    """
+    Libro de rutas para imprimir en la oficina: las hojas de ruta de todos los técnicos en un
+    solo PDF armado en una pasada (una sola plantilla y un solo juego de fuentes), con un
+    resumen al inicio (visitas y páginas por técnico) y un marcador por técnico.
+    Retorna los bytes del PDF, o None si no hay técnicos con carga.
+    """
+    import fitz
+
+    tecnicos = sorted(tecnicos_con_carga(dataframe_final))
+    if not tecnicos:
+        return None
+
+    # Celdas de toda la operación en una sola conversión; cada técnico toma sus filas en el orden de su ruta
+    celdas = _celdas_hoja_ruta(dataframe_final, col_map, dataframe_final['TECNICO_FINAL'].astype(str))
+    pdf = _nueva_hoja_pdf()
+    fecha = datetime.now().strftime('%d/%m/%Y')
+    secciones = []   # (técnico, visitas, primera página sin contar el resumen, páginas)
+    for tecnico in tecnicos:
+        celdas_tecnico = celdas.loc[ruta_del_tecnico(dataframe_final, tecnico, col_map).index]
+        primera = pdf.page_no() + 1
+        _pintar_hoja_ruta(pdf, celdas_tecnico, tecnico, fecha)
+        secciones.append((tecnico, len(celdas_tecnico), primera, pdf.page_no() - primera + 1))
+
+    # Resumen al inicio: se pinta una vez para saber cuántas páginas ocupa y otra con las
+    # páginas de cada técnico corridas en esa cantidad (es una tabla corta)
+    paginas_resumen = 0
+    while True:
+        resumen = [(t, v, p + paginas_resumen, n) for t, v, p, n in secciones]
+        pdf_resumen = _nueva_hoja_pdf()
+        _pintar_resumen_libro(pdf_resumen, resumen, fecha)
+        if pdf_resumen.page_no() == paginas_resumen:
+            break
+        paginas_resumen = pdf_resumen.page_no()
+
+    with CANDADO_PDF, fitz.open(stream=pdf_resumen.bytes_pdf(), filetype="pdf") as libro, \
+         fitz.open(stream=pdf.bytes_pdf(), filetype="pdf") as rutas:
+        libro.insert_pdf(rutas)
+        libro.set_toc(
+            [[1, f"RESUMEN ({len(secciones)} técnicos, {sum(s[1] for s in secciones)} visitas, "
+                 f"{rutas.page_count} págs.)", 1]] +
+            [[1, f"{tecnico} ({visitas} visitas, {paginas} págs.)", pagina] for tecnico, visitas, pagina, paginas in resumen]
+        )
+        return libro.tobytes(garbage=1, deflate=True)
+
+# =======================================================================================
+# SECCIÓN 5: REPORTES Y ARCHIVO FÍSICO DE DESPACHO (ZIP)
+# =======================================================================================
+
+def generar_reporte_faltantes(dataframe_final, col_map, mapa_polizas):
+    """Reporte TXT de cruce documental (ruta <-> pólizas). Ver conciliacion.py."""
+    from conciliacion import conciliar, reporte_txt
+
+    return reporte_txt(conciliar(dataframe_final, col_map, mapa_polizas))
+
+def generar_artefactos_tecnico(dt_operario, tecnico, col_map, mapa_polizas, perfil_movil=None):
+    """
+    Genera en memoria los artefactos de un técnico: { nombre_archivo: bytes }.
+    El paquete de pólizas solo se incluye si alguna de sus cuentas tiene póliza escaneada.
+    """
+    artefactos = {ARCHIVO_HOJA_RUTA: crear_pdf_lista_final(dt_operario, tecnico, col_map)}
+
+    buffer_tabla = io.BytesIO()
+    escribir_tabla_digital(dt_operario, col_map, buffer_tabla)
+    artefactos[ARCHIVO_TABLA_DIGITAL] = buffer_tabla.getvalue()
+
+    paquete = construir_paquete_legalizacion(dt_operario, col_map, mapa_polizas, perfil_movil)
+    if paquete is not None:
+        artefactos[ARCHIVO_PAQUETE] = paquete
+    return artefactos
+
+def _trabajo_artefactos(tarea):
+    """Trabajo de un proceso: (técnico, ruta, col_map, pólizas, perfil) -> (técnico, artefactos)."""
+    tecnico, dt_operario, col_map, polizas, perfil_movil = tarea
+    return tecnico, generar_artefactos_tecnico(dt_operario, tecnico, col_map, polizas, perfil_movil)
+
+def _tareas_artefactos(dataframe_final, col_map, mapa_polizas, perfil_movil=None):
+    for tecnico in tecnicos_con_carga(dataframe_final):
+        dt_operario = ruta_del_tecnico(dataframe_final, tecnico, col_map)
+        yield tecnico, dt_operario, col_map, polizas_de_ruta(dt_operario, col_map, mapa_polizas), perfil_movil
+
+def iterar_artefactos(dataframe_final, col_map, mapa_polizas, procesos=1, perfil_movil=None):
+    """
+    Genera técnico por técnico sus artefactos: produce pares (técnico, { archivo: bytes }).
+    Quien consume los escribe y los suelta, así nunca están todos los paquetes en memoria.
+    Con procesos > 1 los técnicos se reparten entre varios núcleos (a cada proceso solo
+    viajan las pólizas de su ruta, no el banco completo) con a lo sumo procesos * 2 técnicos
+    en vuelo: si quien consume es más lento que los procesos, estos esperan.
+    """
+    tareas = _tareas_artefactos(dataframe_final, col_map, mapa_polizas, perfil_movil)
+    if procesos > 1:
+        en_vuelo = deque()
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            try:
+                for tarea in tareas:
+                    if len(en_vuelo) >= procesos * 2:
+                        yield en_vuelo.popleft().result()
+                    en_vuelo.append(ejecutor.submit(_trabajo_artefactos, tarea))
+                while en_vuelo:
+                    yield en_vuelo.popleft().result()
+            finally:
+                # Consumo interrumpido (cancelación, error al escribir): no se arma lo pendiente
+                for futuro in en_vuelo:
+                    futuro.cancel()
+        return
+
+    for tarea in tareas:
+        yield _trabajo_artefactos(tarea)
+
+def publicar_operacion(carpeta_base, dataframe_final, col_map, mapa_polizas, procesos=1, progreso=None, perfil_movil=None):
+    """
+    Publica el portal de técnicos en una versión nueva y la libera al final (cambio atómico).
+    - progreso: función opcional (hechos, total, técnico) llamada tras cada técnico. Si lanza
+      una excepción (ej: cancelación), la versión a medias se borra y la vigente no cambia.
+    - perfil_movil: paquetes de pólizas livianos para datos móviles (ver perfil_paquete_movil).
+    Retorna el id de la versión liberada.
+    """
+    total = len(tecnicos_con_carga(dataframe_final))
+    carpeta_version = nueva_version(carpeta_base)
+    try:
+        entradas_manifiesto = []
+        artefactos = iterar_artefactos(dataframe_final, col_map, mapa_polizas, procesos=procesos, perfil_movil=perfil_movil)
+        for hechos, (tecnico, artefactos_tecnico) in enumerate(artefactos, start=1):
+            entradas_manifiesto.append(escribir_artefactos(carpeta_version, tecnico, artefactos_tecnico))
+            if progreso is not None:
+                progreso(hechos, total, tecnico)
+        escribir_manifiesto(carpeta_version, entradas_manifiesto)
+
+        # Último punto de control antes de liberar (una publicación reemplazada no debe activarse)
+        if progreso is not None:
+            progreso(total, total, None)
+    except BaseException:
+        shutil.rmtree(carpeta_version, ignore_errors=True)
+        raise
+    return activar_version(carpeta_version, carpeta_base)
+
+@instrumentar("zip_maestro", unidades=lambda r, destino, df, *a, **k: len(df))
+def escribir_zip_maestro(destino, dataframe_final, col_map, mapa_polizas, formatos_consolidado=("XLSX",), artefactos=None,
+                         columnas_laterales=None, libro_rutas=False):
+    """
+    Escribe el ZIP de oficina en 'destino' (ruta o buffer): consolidado general, reporte de
+    pólizas faltantes y una carpeta por técnico con sus tres artefactos.
+    - artefactos: iterable opcional de pares (técnico, artefactos) ya generados
+      (por defecto se generan aquí mismo con iterar_artefactos).
+    - columnas_laterales: columnas no mapeadas de compactar_operacion (vuelven al consolidado).
+    - libro_rutas: agrega en la raíz el libro de rutas para imprimir (crear_libro_rutas).
+    Retorna la lista de avisos no críticos para mostrar al usuario.
+    """
+    avisos = []
+
+    with zipfile.ZipFile(destino, "w") as archivo_z:
+
+        # 1. CONSOLIDADO GENERAL INTACTO (escritura por bloques, memoria constante)
+        # Ocultamos ORDEN_ORIGINAL y CUENTA_NORM del Excel final ya que son de uso interno
+        df_export_maestro = restaurar_columnas(dataframe_final, columnas_laterales).drop(columns=list(COLUMNAS_INTERNAS), errors='ignore')
+        for formato_c in formatos_consolidado:
+            try:
+                exportar_consolidado(df_export_maestro, formato_c, archivo_z)
+            except RuntimeError as e:
+                avisos.append(str(e))
+
+        # 2. LÓGICA DE CRUCE DOCUMENTAL (REPORTE TXT + HALLAZGOS EN CSV Y XLSX)
+        from conciliacion import conciliar, agregar_conciliacion_a_zip
+        agregar_conciliacion_a_zip(conciliar(dataframe_final, col_map, mapa_polizas), archivo_z)
+
+        # 3. LIBRO DE RUTAS PARA IMPRIMIR (todas las hojas en un PDF con marcadores)
+        if libro_rutas:
+            libro = crear_libro_rutas(dataframe_final, col_map)
+            if libro is not None:
+                archivo_z.writestr(ARCHIVO_LIBRO_RUTAS, libro)
+
+        # 4. GENERAR CARPETAS INDIVIDUALES
+        if artefactos is None:
+            artefactos = iterar_artefactos(dataframe_final, col_map, mapa_polizas)
+        for tech_name, artefactos_tecnico in artefactos:
+            for nombre_archivo, contenido in artefactos_tecnico.items():
+                archivo_z.writestr(f"{carpeta_segura(tech_name)}/{nombre_archivo}", contenido)
+
+    return avisos
+
+def generar_zip_maestro(dataframe_final, col_map, mapa_polizas, formatos_consolidado=("XLSX",)):
+    """ZIP de oficina en memoria para el botón de descarga: retorna (bytes_zip, avisos)."""
+    buffer_zip = io.BytesIO()
+    avisos = escribir_zip_maestro(buffer_zip, dataframe_final, col_map, mapa_polizas, formatos_consolidado)
+    return buffer_zip.getvalue(), avisos
@@ -0,0 +1,218 @@
+#########################################################################################
+#                                                                                       #
+#   PORTAL PÚBLICO DE TÉCNICOS - RUTAS Y NOMBRES COMPARTIDOS                            #
+#                                                                                       #
+#   Módulo liviano (solo librería estándar): lo importa la Zona de Descargas, por lo   #
+#   que aquí NO deben entrar pandas, PyMuPDF, FPDF ni xlsxwriter.                       #
+#                                                                                       #
+#   - Escritura de artefactos por técnico + ZIP "todo en uno" prearmado.                #
+#   - Manifiesto de publicación (tamaño, SHA-256 y fecha de cada archivo): el portal    #
+#     lee solo ese JSON y abre los archivos únicamente cuando el técnico descarga.      #
+#   - Publicación sin cortes: cada publicación se arma en su propia carpeta versionada  #
+#     y se libera con un cambio atómico del puntero VIGENTE; la anterior sigue          #
+#     atendiendo descargas mientras tanto y se conserva unos días.                      #
+#                                                                                       #
+#   Estructura en disco:                                                                #
+#     public_files/VIGENTE                      id de la versión liberada (puntero)     #
+#     public_files/actual -> versiones/<id>     enlace simbólico equivalente (si el SO  #
+#                                               lo permite; útil para servidores web)   #
+#     public_files/versiones/<id>/manifiesto.json                                       #
+#     public_files/versiones/<id>/<TECNICO>/...                                         #
+#                                                                                       #
+#########################################################################################
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+# Carpeta donde se publican los archivos para que los técnicos los descarguen en su móvil
+CARPETA_PUBLICA = "public_files"
+
+# Artefactos que recibe cada técnico (mismo nombre en el portal y en el ZIP)
+ARCHIVO_HOJA_RUTA = "1_HOJA_DE_RUTA.pdf"
+ARCHIVO_TABLA_DIGITAL = "2_TABLA_DIGITAL.xlsx"
+ARCHIVO_PAQUETE = "3_PAQUETE_LEGALIZACION.pdf"
+ARCHIVO_REPORTE_FALTANTES = "00_REPORTE_POLIZAS_FALTANTES.txt"
+ARCHIVO_TODO_EN_UNO = "0_TODO_EN_UNO.zip"
+
+# Libro de rutas de la oficina (todas las hojas de ruta en un PDF, solo en el ZIP maestro)
+ARCHIVO_LIBRO_RUTAS = "00_LIBRO_DE_RUTAS.pdf"
+
+# Índice de la publicación: se escribe al final de cada versión
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+
+# Versiones de publicación y puntero a la vigente
+CARPETA_VERSIONES = "versiones"
+ARCHIVO_PUNTERO = "VIGENTE"
+# El enlace no puede llamarse como el puntero en otra caja ("vigente"): en un disco que
+# no distingue mayúsculas (macOS, Windows) reemplazaría el archivo VIGENTE
+ENLACE_ACTUAL = "actual"
+
+# Días que se conservan las publicaciones anteriores (la vigente y la previa nunca se borran)
+DIAS_RETENCION_PUBLICACIONES = float(os.environ.get("ITA_RETENCION_PUBLICACIONES", "3"))
+
+
+def carpeta_segura(tecnico):
+    """Nombre de carpeta del técnico en el portal y en el ZIP."""
+    return str(tecnico).replace(" ","_")
+
+def _escribir_archivo(ruta, contenido):
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    return {
+        "bytes": len(contenido),
+        "sha256": hashlib.sha256(contenido).hexdigest(),
+        "modificado": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def escribir_artefactos(carpeta_base, tecnico, artefactos):
+    """
+    Escribe los artefactos de un técnico en <carpeta_base>/<TECNICO>/ junto con el ZIP
+    "todo en uno" (sin recomprimir: PDF y XLSX ya vienen comprimidos).
+    Retorna la entrada del técnico para el manifiesto.
+    """
+    carpeta = carpeta_segura(tecnico)
+    ruta_carpeta = os.path.join(carpeta_base, carpeta)
+    os.makedirs(ruta_carpeta, exist_ok=True)
+
+    archivos = {}
+    for nombre_archivo, contenido in artefactos.items():
+        archivos[nombre_archivo] = _escribir_archivo(os.path.join(ruta_carpeta, nombre_archivo), contenido)
+
+    buffer_zip = io.BytesIO()
+    with zipfile.ZipFile(buffer_zip, "w", zipfile.ZIP_STORED) as archivo_z:
+        for nombre_archivo, contenido in artefactos.items():
+            archivo_z.writestr(f"{carpeta}/{nombre_archivo}", contenido)
+    archivos[ARCHIVO_TODO_EN_UNO] = _escribir_archivo(os.path.join(ruta_carpeta, ARCHIVO_TODO_EN_UNO), buffer_zip.getvalue())
+
+    return {"tecnico": str(tecnico), "carpeta": carpeta, "archivos": archivos}
+
+def escribir_manifiesto(carpeta_version, entradas, extra=None):
+    """
+    Escribe (de forma atómica) el manifiesto de una versión con las entradas de todos los técnicos.
+    extra: claves adicionales del manifiesto (ej: la receta de una publicación diferida).
+    """
+    manifiesto = {
+        "version": os.path.basename(os.path.normpath(carpeta_version)),
+        "publicado": datetime.now().isoformat(timespec="seconds"),
+        "tecnicos": {e["carpeta"]: e for e in entradas},
+        **(extra or {}),
+    }
+    ruta = os.path.join(carpeta_version, ARCHIVO_MANIFIESTO)
+    ruta_tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+    os.replace(ruta_tmp, ruta)
+    return manifiesto
+
+# ---------------------------------------------------------------------------------------
+# VERSIONES Y LIBERACIÓN ATÓMICA
+# ---------------------------------------------------------------------------------------
+
+def nueva_version(carpeta_base=CARPETA_PUBLICA):
+    """Crea la carpeta de una publicación nueva (aún invisible para los técnicos). Retorna su ruta."""
+    version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    ruta = os.path.join(carpeta_base, CARPETA_VERSIONES, version)
+    os.makedirs(ruta)
+    return ruta
+
+def version_vigente(carpeta_base=CARPETA_PUBLICA):
+    """Id de la versión liberada, o None si nunca se ha publicado."""
+    try:
+        with open(os.path.join(carpeta_base, ARCHIVO_PUNTERO), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def activar_version(carpeta_version, carpeta_base=CARPETA_PUBLICA, dias_retencion=DIAS_RETENCION_PUBLICACIONES):
+    """
+    Libera una versión: reemplaza el puntero VIGENTE en un solo paso (os.replace es atómico),
+    actualiza el enlace 'actual' y purga las versiones vencidas.
+    """
+    version = os.path.basename(os.path.normpath(carpeta_version))
+    ruta_puntero = os.path.join(carpeta_base, ARCHIVO_PUNTERO)
+    ruta_tmp = f"{ruta_puntero}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(ruta_tmp, ruta_puntero)
+
+    # Enlace simbólico equivalente (mismo truco: se crea aparte y se reemplaza de golpe)
+    ruta_enlace = os.path.join(carpeta_base, ENLACE_ACTUAL)
+    enlace_tmp = f"{ruta_enlace}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if os.path.lexists(enlace_tmp):
+            os.remove(enlace_tmp)
+        os.symlink(os.path.join(CARPETA_VERSIONES, version), enlace_tmp)
+        os.replace(enlace_tmp, ruta_enlace)
+    except OSError:
+        pass  # Windows sin permisos de enlaces: el puntero VIGENTE es suficiente
+
+    purgar_versiones(carpeta_base, dias_retencion)
+    return version
+
+def purgar_versiones(carpeta_base=CARPETA_PUBLICA, dias_retencion=DIAS_RETENCION_PUBLICACIONES):
+    """Borra versiones más viejas que la retención, salvo la vigente y la inmediatamente anterior."""
+    carpeta_versiones = os.path.join(carpeta_base, CARPETA_VERSIONES)
+    if not os.path.isdir(carpeta_versiones):
+        return []
+    vigente = version_vigente(carpeta_base)
+    versiones = sorted(os.listdir(carpeta_versiones))
+    protegidas = {vigente}
+    if vigente in versiones and versiones.index(vigente) > 0:
+        protegidas.add(versiones[versiones.index(vigente) - 1])
+
+    limite = time.time() - dias_retencion * 86400
+    borradas = []
+    for version in versiones:
+        ruta = os.path.join(carpeta_versiones, version)
+        if version in protegidas or os.path.getmtime(ruta) >= limite:
+            continue
+        shutil.rmtree(ruta, ignore_errors=True)
+        borradas.append(version)
+    return borradas
+
+def marca_manifiesto(carpeta_base=CARPETA_PUBLICA):
+    """Marca de versión del puntero VIGENTE (mtime en ns) o None si no hay publicación."""
+    try:
+        return os.stat(os.path.join(carpeta_base, ARCHIVO_PUNTERO)).st_mtime_ns
+    except OSError:
+        return None
+
+def leer_manifiesto(carpeta_base=CARPETA_PUBLICA):
+    """Manifiesto de la versión vigente, o None si la operación no ha sido liberada."""
+    version = version_vigente(carpeta_base)
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(carpeta_base, CARPETA_VERSIONES, version, ARCHIVO_MANIFIESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def leer_archivo_publicado(version, carpeta_tecnico, nombre_archivo, carpeta_base=CARPETA_PUBLICA):
+    """
+    Bytes de un archivo publicado (se llama solo cuando el técnico pulsa descargar).
+    Se lee de la versión que el técnico vio en pantalla, aunque ya exista una más nueva.
+    """
+    with open(os.path.join(carpeta_base, CARPETA_VERSIONES, version, carpeta_tecnico, nombre_archivo), "rb") as f:
+        return f.read()
+
+def total_bytes_archivo(manifiesto, nombre_archivo):
+    """Suma del tamaño de un mismo archivo (ej: el paquete de pólizas) en todos los técnicos."""
+    if not manifiesto:
+        return 0
+    return sum(t["archivos"].get(nombre_archivo, {}).get("bytes", 0) for t in manifiesto["tecnicos"].values())
+
+def tamano_legible(num_bytes):
+    """Ej: 1536 -> '1.5 KB'."""
+    if num_bytes < 1024:
+        return f"{num_bytes} B"
+    if num_bytes < 1024 ** 2:
+        return f"{num_bytes / 1024:.1f} KB"
+    return f"{num_bytes / 1024 ** 2:.1f} MB"
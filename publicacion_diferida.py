@@ -0,0 +1,189 @@
+#########################################################################################
+#                                                                                       #
+#   PUBLICACIÓN DIFERIDA DEL PORTAL - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA              #
+#                                                                                       #
+#   Módulo liviano (solo librería estándar al importarlo): lo usan la Zona de Descargas #
+#   y el servidor de descargas; pandas y el motor se importan al armar la primera ruta. #
+#                                                                                       #
+#   - Publicar solo congela la asignación: la operación va en Feather a una versión     #
+#     nueva junto con la receta (columnas, pólizas del almacén, perfil móvil) y se      #
+#     libera al instante con el mismo puntero VIGENTE de portal_publico.py.             #
+#   - La hoja de ruta, la tabla y el paquete de cada técnico se arman la primera vez    #
+#     que alguien los pide y quedan en la carpeta de la versión (caché compartida por   #
+#     la app, el servidor de descargas y todos sus procesos).                           #
+#   - Un solo armado por técnico aunque lleguen varias peticiones a la vez: candado en  #
+#     memoria por hilo y bloqueo de archivo entre procesos; el resto espera y lee.      #
+#     Armados de técnicos distintos en un mismo proceso van uno a la vez (CANDADO_PDF   #
+#     de almacen_polizas.py: PyMuPDF no es seguro entre hilos).                         #
+#   - La carpeta del técnico se arma aparte y se renombra al final: quien la ve         #
+#     completa nunca encuentra un archivo a medio escribir.                             #
+#                                                                                       #
+#   Estructura en disco (además de la de portal_publico.py):                            #
+#     public_files/versiones/<id>/instantanea.feather   asignación congelada            #
+#     public_files/versiones/<id>/<TECNICO>/entrada.json  archivos ya armados           #
+#     public_files/versiones/<id>/.bloqueos/<TECNICO>.lock                              #
+#                                                                                       #
+#########################################################################################
+
+import functools
+import json
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo el candado en memoria (el renombrado final sigue siendo atómico)
+    fcntl = None
+
+from portal_publico import (
+    ARCHIVO_MANIFIESTO,
+    CARPETA_PUBLICA,
+    CARPETA_VERSIONES,
+    activar_version,
+    carpeta_segura,
+    escribir_artefactos,
+    escribir_manifiesto,
+    nueva_version,
+)
+
+ARCHIVO_INSTANTANEA = "instantanea.feather"
+ARCHIVO_ENTRADA = "entrada.json"
+CARPETA_BLOQUEOS = ".bloqueos"
+
+_candado_vuelos = threading.Lock()
+_vuelos = {}            # (versión, carpeta del técnico) -> candado de su armado
+_entradas_listas = {}   # (versión, carpeta del técnico) -> entrada del manifiesto ya armada
+
+def _ruta_version(version, carpeta_base):
+    return os.path.join(os.path.abspath(carpeta_base), CARPETA_VERSIONES, version)
+
+def es_diferida(manifiesto):
+    """True si la versión publicada arma los archivos de cada técnico bajo demanda."""
+    return bool(manifiesto) and "diferida" in manifiesto
+
+def publicar_diferida(carpeta_base, dataframe_final, col_map, mapa_polizas, perfil_movil=None):
+    """
+    Publica sin armar ningún archivo: congela la operación y la receta en una versión nueva
+    y la libera. Las pólizas deben venir del almacén compartido (PolizasAlmacenadas): la
+    versión guarda sus huellas, no los bytes. Retorna el id de la versión liberada.
+    """
+    from motor_logistico import tecnicos_con_carga
+    from punto_control import describir_polizas
+
+    polizas = describir_polizas(mapa_polizas)
+    if mapa_polizas and polizas is None:
+        raise ValueError("La publicación diferida necesita las pólizas en el almacén compartido.")
+
+    carpeta_version = nueva_version(carpeta_base)
+    try:
+        ruta = os.path.join(carpeta_version, ARCHIVO_INSTANTANEA)
+        dataframe_final.reset_index(drop=True).to_feather(f"{ruta}.tmp")
+        os.replace(f"{ruta}.tmp", ruta)
+        entradas = [{"tecnico": str(t), "carpeta": carpeta_segura(t), "archivos": {}}
+                    for t in tecnicos_con_carga(dataframe_final)]
+        escribir_manifiesto(carpeta_version, entradas, extra={"diferida": {
+            "col_map": dict(col_map),
+            "polizas": polizas,
+            "perfil_movil": perfil_movil,
+        }})
+    except BaseException:
+        shutil.rmtree(carpeta_version, ignore_errors=True)
+        raise
+    return activar_version(carpeta_version, carpeta_base)
+
+@functools.lru_cache(maxsize=2)
+def _manifiesto_version(ruta_version):
+    # Las versiones no cambian después de liberadas: una lectura por proceso
+    with open(os.path.join(ruta_version, ARCHIVO_MANIFIESTO), encoding="utf-8") as f:
+        return json.load(f)
+
+_candado_instantanea = threading.Lock()
+
+@functools.lru_cache(maxsize=2)
+def _instantanea_cargada(ruta_version):
+    import pandas as pd
+    from motor_logistico import COLUMNA_CUENTA_NORM
+
+    df_estado = pd.read_feather(os.path.join(ruta_version, ARCHIVO_INSTANTANEA))
+    if COLUMNA_CUENTA_NORM in df_estado.columns:
+        df_estado[COLUMNA_CUENTA_NORM] = df_estado[COLUMNA_CUENTA_NORM].astype(object)
+    return df_estado
+
+def _instantanea(ruta_version):
+    """Operación congelada de una versión, leída una vez por proceso (la comparten todos los técnicos)."""
+    with _candado_instantanea:
+        return _instantanea_cargada(ruta_version)
+
+def _leer_entrada(ruta_carpeta):
+    try:
+        with open(os.path.join(ruta_carpeta, ARCHIVO_ENTRADA), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _armar(ruta_version, receta, tecnico):
+    """Arma los artefactos de un técnico en una carpeta temporal y la pone en su lugar de un solo paso."""
+    from almacen_polizas import CANDADO_PDF, PolizasAlmacenadas
+    from motor_logistico import generar_artefactos_tecnico, polizas_de_ruta, ruta_del_tecnico
+
+    col_map = receta["col_map"]
+    polizas = PolizasAlmacenadas(receta["polizas"]["carpeta"], receta["polizas"]["huellas"]) if receta["polizas"] else {}
+    dt_operario = ruta_del_tecnico(_instantanea(ruta_version), tecnico, col_map)
+    # Técnicos distintos se arman en hilos distintos (servidor, sesiones): uno a la vez con PyMuPDF
+    with CANDADO_PDF:
+        artefactos = generar_artefactos_tecnico(dt_operario, tecnico, col_map, polizas_de_ruta(dt_operario, col_map, polizas),
+                                                receta["perfil_movil"])
+
+    ruta_tmp = os.path.join(ruta_version, f".armando.{os.getpid()}.{threading.get_ident()}")
+    try:
+        entrada = escribir_artefactos(ruta_tmp, tecnico, artefactos)
+        with open(os.path.join(ruta_tmp, entrada["carpeta"], ARCHIVO_ENTRADA), "w", encoding="utf-8") as f:
+            json.dump(entrada, f, ensure_ascii=False)
+        try:
+            os.rename(os.path.join(ruta_tmp, entrada["carpeta"]), os.path.join(ruta_version, entrada["carpeta"]))
+        except OSError:
+            # Sin bloqueo entre procesos otro la puso primero: vale la suya
+            entrada = _leer_entrada(os.path.join(ruta_version, entrada["carpeta"]))
+            if entrada is None:
+                raise
+    finally:
+        shutil.rmtree(ruta_tmp, ignore_errors=True)
+    return entrada
+
+def artefactos_bajo_demanda(version, carpeta_tecnico, carpeta_base=CARPETA_PUBLICA):
+    """
+    Entrada del manifiesto de un técnico con sus archivos armados (los arma si es la primera
+    vez). Si la versión no es diferida retorna la entrada publicada tal cual.
+    Lanza KeyError si el técnico no está en la versión.
+    """
+    ruta_version = _ruta_version(version, carpeta_base)
+    clave = (ruta_version, carpeta_tecnico)
+    entrada = _entradas_listas.get(clave)
+    if entrada is not None:
+        return entrada
+
+    manifiesto = _manifiesto_version(ruta_version)
+    entrada = manifiesto["tecnicos"][carpeta_tecnico]
+    if not es_diferida(manifiesto):
+        return entrada
+
+    with _candado_vuelos:
+        candado = _vuelos.setdefault(clave, threading.Lock())
+    with candado:
+        # Quien esperaba el candado encuentra lo que armó el primero
+        if clave in _entradas_listas:
+            return _entradas_listas[clave]
+        ruta_carpeta = os.path.join(ruta_version, carpeta_tecnico)
+        os.makedirs(os.path.join(ruta_version, CARPETA_BLOQUEOS), exist_ok=True)
+        with open(os.path.join(ruta_version, CARPETA_BLOQUEOS, f"{carpeta_tecnico}.lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Otro proceso pudo armarla mientras se esperaba el bloqueo
+                entrada = _leer_entrada(ruta_carpeta) or _armar(ruta_version, manifiesto["diferida"], entrada["tecnico"])
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        _entradas_listas[clave] = entrada
+    return entrada
@@ -0,0 +1,181 @@
+#########################################################################################
+#                                                                                       #
+#   PUNTO DE CONTROL DE LA OPERACIÓN - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA             #
+#                                                                                       #
+#   - Después de cada distribución y de cada traslado se guarda el estado de trabajo    #
+#     del despacho: df_simulado en Feather (columnar, categorías incluidas) y un JSON   #
+#     pequeño con el resto de la sesión (columnas, cupos, cuadrilla, maestro y las      #
+#     huellas de las pólizas del almacén compartido, no sus bytes).                     #
+#   - Si el servidor se reinicia o la sesión del administrador expira, "Reanudar la     #
+#     operación de hoy" lo recupera en una fracción de segundo, sin volver a subir      #
+#     archivos, escanear PDFs ni repetir los traslados manuales.                        #
+#   - Escritura segura ante cortes: los datos van a archivos con generación propia y    #
+#     el JSON (que apunta a ellos) se reemplaza de forma atómica al final.              #
+#                                                                                       #
+#   Estructura en disco:                                                                #
+#     sesiones/operacion_<AAAAMMDD>.json                 JSON lateral (punto vigente)   #
+#     sesiones/operacion_<AAAAMMDD>.<gen>.feather        df_simulado                    #
+#     sesiones/laterales_<AAAAMMDD>.<gen>.feather        columnas no mapeadas de la ruta#
+#                                                                                       #
+#########################################################################################
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+from almacen_polizas import PolizasAlmacenadas
+from instrumentacion import instrumentar
+from motor_logistico import BOLSA_PENDIENTE, COLUMNA_CUENTA_NORM, tecnicos_con_carga
+
+CARPETA_SESIONES = os.environ.get("ITA_SESIONES", "sesiones")
+
+# Días que se conservan los puntos de control anteriores (solo se ofrece reanudar el de hoy)
+DIAS_RETENCION_SESIONES = 7
+
+VERSION_FORMATO = 1
+
+def _nombre_dia(fecha):
+    return (fecha or date.today()).strftime("%Y%m%d")
+
+def _ruta_json(carpeta, fecha=None):
+    return os.path.join(carpeta, f"operacion_{_nombre_dia(fecha)}.json")
+
+def _escribir_json_atomico(ruta, datos):
+    ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(ruta_tmp, ruta)
+
+def _escribir_feather(ruta, df):
+    ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_feather(ruta_tmp)
+    os.replace(ruta_tmp, ruta)
+
+def describir_polizas(mapa_polizas):
+    """Las pólizas del almacén se guardan como (carpeta, huellas); un diccionario en memoria no se puede reanudar."""
+    if isinstance(mapa_polizas, PolizasAlmacenadas):
+        return {"carpeta": mapa_polizas.carpeta, "huellas": list(mapa_polizas.huellas)}
+    return None
+
+def leer_punto_control(carpeta=CARPETA_SESIONES, fecha=None):
+    """JSON lateral del punto de control del día (None si no hay o está dañado)."""
+    try:
+        with open(_ruta_json(carpeta, fecha), encoding="utf-8") as f:
+            punto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return punto if punto.get("version") == VERSION_FORMATO else None
+
+@instrumentar("punto_control", unidades=lambda r, df, *a, **k: len(df))
+def guardar_punto_control(df_estado, sesion, mapa_polizas=None, columnas_laterales=None, carpeta=CARPETA_SESIONES):
+    """
+    Guarda df_simulado y el resto de la sesión (diccionario serializable en JSON).
+    columnas_laterales: solo cuando cambiaron (tras una distribución); si es None se
+    conserva la tabla lateral del punto anterior, que los traslados no modifican.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    dia = _nombre_dia(None)
+    anterior = leer_punto_control(carpeta) or {}
+    generacion = uuid.uuid4().hex[:8]
+
+    archivo_operacion = f"operacion_{dia}.{generacion}.feather"
+    _escribir_feather(os.path.join(carpeta, archivo_operacion), df_estado.reset_index(drop=True))
+
+    archivo_laterales = anterior.get("archivo_laterales")
+    nombres_laterales = anterior.get("nombres_laterales", [])
+    orden_columnas = anterior.get("orden_columnas", [])
+    if columnas_laterales is not None:
+        # Feather exige nombres de columna de texto; los originales (ej: un año como encabezado) van en el JSON
+        archivo_laterales = f"laterales_{dia}.{generacion}.feather"
+        nombres_laterales = list(columnas_laterales.columns)
+        _escribir_feather(os.path.join(carpeta, archivo_laterales),
+                          columnas_laterales.set_axis([str(c) for c in nombres_laterales], axis=1)
+                          .rename_axis('ORDEN_ORIGINAL').reset_index())
+        orden_columnas = columnas_laterales.attrs.get('orden_columnas', [])
+
+    en_bolsa = int((df_estado['TECNICO_FINAL'] == BOLSA_PENDIENTE).sum())
+    _escribir_json_atomico(_ruta_json(carpeta), {
+        "version": VERSION_FORMATO,
+        "guardado": datetime.now().isoformat(timespec="seconds"),
+        "visitas": len(df_estado),
+        "tecnicos": len(tecnicos_con_carga(df_estado)),
+        "en_bolsa": en_bolsa,
+        "archivo_operacion": archivo_operacion,
+        "archivo_laterales": archivo_laterales,
+        "nombres_laterales": nombres_laterales,
+        "orden_columnas": orden_columnas,
+        "polizas": describir_polizas(mapa_polizas),
+        "sesion": sesion,
+    })
+
+    # Generaciones anteriores del día: ya nadie apunta a ellas
+    vigentes = {archivo_operacion, archivo_laterales}
+    for nombre in os.listdir(carpeta):
+        if dia in nombre and nombre.endswith(".feather") and nombre not in vigentes:
+            os.remove(os.path.join(carpeta, nombre))
+
+@instrumentar("reanudar_operacion", unidades=lambda r, *a, **k: len(r["df_estado"]))
+def cargar_punto_control(carpeta=CARPETA_SESIONES, fecha=None):
+    """
+    Recupera el punto de control del día.
+    Retorna {"df_estado", "columnas_laterales", "mapa_polizas", "polizas_perdidas", "sesion"}.
+    Lanza FileNotFoundError si no hay punto de control para esa fecha.
+    """
+    punto = leer_punto_control(carpeta, fecha)
+    if punto is None:
+        raise FileNotFoundError("No hay una operación guardada para hoy.")
+
+    df_estado = pd.read_feather(os.path.join(carpeta, punto["archivo_operacion"]))
+    if COLUMNA_CUENTA_NORM in df_estado.columns:
+        # Feather la devuelve como texto de Arrow; el cruce con isin es más rápido sobre object
+        df_estado[COLUMNA_CUENTA_NORM] = df_estado[COLUMNA_CUENTA_NORM].astype(object)
+
+    columnas_laterales = None
+    if punto["archivo_laterales"]:
+        columnas_laterales = pd.read_feather(os.path.join(carpeta, punto["archivo_laterales"])).set_index('ORDEN_ORIGINAL')
+        columnas_laterales = columnas_laterales.set_axis(punto["nombres_laterales"], axis=1).rename_axis(None)
+        columnas_laterales.attrs['orden_columnas'] = punto["orden_columnas"]
+
+    # Las pólizas siguen en el almacén compartido salvo que la purga ya haya borrado la fuente
+    mapa_polizas, polizas_perdidas = {}, False
+    if punto["polizas"]:
+        carpeta_almacen, huellas = punto["polizas"]["carpeta"], punto["polizas"]["huellas"]
+        if all(os.path.exists(os.path.join(carpeta_almacen, "indices", f"{h}.json")) for h in huellas):
+            mapa_polizas = PolizasAlmacenadas(carpeta_almacen, huellas)
+        else:
+            polizas_perdidas = True
+
+    return {
+        "df_estado": df_estado,
+        "columnas_laterales": columnas_laterales,
+        "mapa_polizas": mapa_polizas,
+        "polizas_perdidas": polizas_perdidas,
+        "sesion": punto["sesion"],
+    }
+
+def descartar_punto_control(carpeta=CARPETA_SESIONES, fecha=None):
+    """Borra el punto de control del día (al reiniciar el sistema para un día nuevo)."""
+    if not os.path.isdir(carpeta):
+        return
+    dia = _nombre_dia(fecha)
+    for nombre in os.listdir(carpeta):
+        if dia in nombre:
+            os.remove(os.path.join(carpeta, nombre))
+
+def purgar_puntos_control(carpeta=CARPETA_SESIONES, dias=DIAS_RETENCION_SESIONES):
+    """Borra los puntos de control de días anteriores con más de 'dias' días."""
+    if not os.path.isdir(carpeta):
+        return 0
+    limite = time.time() - dias * 86400
+    borrados = 0
+    for nombre in os.listdir(carpeta):
+        ruta = os.path.join(carpeta, nombre)
+        if os.path.getmtime(ruta) < limite:
+            os.remove(ruta)
+            borrados += 1
+    return borrados
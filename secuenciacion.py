@@ -0,0 +1,172 @@
+#########################################################################################
+#                                                                                       #
+#   SECUENCIACIÓN DE VISITAS POR DIRECCIÓN - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA       #
+#                                                                                       #
+#   - Las direcciones de nomenclatura colombiana ("CL 45 # 12-30", "KR 8 # 20-15")      #
+#     se convierten en coordenadas aproximadas de la cuadrícula (extracción regex por   #
+#     columna completa, sin recorrer fila por fila).                                    #
+#   - Cada técnico recibe su recorrido con vecino más cercano + mejora 2-opt sobre la   #
+#     distancia Manhattan en cuadras (la ciudad es una cuadrícula, no una línea recta). #
+#   - Las direcciones que no se pueden leer conservan el orden V74: van justo después   #
+#     de la última parada de su barrio, o al final si su barrio no tiene ninguna.       #
+#                                                                                       #
+#########################################################################################
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import instrumentar
+from motor_logistico import COLUMNA_SECUENCIA, tecnicos_con_carga
+
+# Por encima de este número de paradas solo se aplica vecino más cercano (la matriz del
+# 2-opt crece con el cuadrado de las paradas)
+MAXIMO_PARADAS_2OPT = 1500
+
+# Tope de vueltas de mejora 2-opt por técnico
+MAXIMO_VUELTAS_2OPT = 500
+
+# Vías cuyo número es una calle (eje Y) o una carrera (eje X). Alternativas largas primero.
+_VIAS_CALLE = ["AVENIDA CALLE", "AV CALLE", "CALLE", "CLLE", "CLL", "CL", "AC", "DIAGONAL", "DG"]
+_VIAS_CARRERA = ["AVENIDA CARRERA", "AV CARRERA", "CARRERA", "CARR", "KRA", "KR", "CRA", "CR", "AK",
+                 "TRANSVERSAL", "TRANSV", "TV", "TR"]
+
+_PATRON_DIRECCION = (
+    r"^\s*(?P<via>" + "|".join(_VIAS_CALLE + _VIAS_CARRERA) + r")\.?\s*"
+    r"(?P<num>\d{1,3})\s*(?P<letra>[A-H](?![A-Z]))?\s*(?:BIS\s*(?:[A-H](?![A-Z]))?)?\s*(?:SUR|ESTE)?\s*"
+    r"(?:#|NO\.?|N\.?|NRO\.?|NUMERO)\s*"
+    r"(?P<cruce>\d{1,3})\s*(?P<letra2>[A-H](?![A-Z]))?\s*(?:BIS\s*(?:[A-H](?![A-Z]))?)?\s*[-\s]?\s*(?P<placa>\d{1,3})?"
+)
+
+# Sufijo de la vía como fracción de cuadra: 45A queda entre la 45 y la 46
+_VALOR_LETRA = {letra: (i + 1) / 10 for i, letra in enumerate("ABCDEFGH")}
+
+def _valor_letra(letras):
+    return letras.map(_VALOR_LETRA).fillna(0).astype(float)
+
+def coordenadas_direcciones(direcciones):
+    """
+    Coordenadas aproximadas (X = carrera, Y = calle, en cuadras) de una columna de direcciones.
+    Retorna un DataFrame con X e Y alineado al índice original; NaN si la dirección no se pudo leer.
+    """
+    texto = (
+        direcciones.astype("string").str.upper()
+        .str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True)
+        .str.replace(r"[°º]", "", regex=True)
+    )
+    partes = texto.str.extract(_PATRON_DIRECCION)
+
+    num = pd.to_numeric(partes['num'], errors='coerce') + _valor_letra(partes['letra'])
+    cruce = pd.to_numeric(partes['cruce'], errors='coerce') + _valor_letra(partes['letra2'])
+    # La placa (metros desde la esquina) ubica la casa dentro de la cuadra
+    cruce = cruce + pd.to_numeric(partes['placa'], errors='coerce').fillna(0).clip(upper=99) / 100
+
+    es_calle = partes['via'].isin(_VIAS_CALLE)
+    x = cruce.where(es_calle, num)
+    y = num.where(es_calle, cruce)
+    y = y.mask(texto.str.contains(r"\bSUR\b", na=False), -y)
+    x = x.mask(texto.str.contains(r"\bESTE\b", na=False), -x)
+    return pd.DataFrame({"X": x.astype(float), "Y": y.astype(float)}, index=direcciones.index)
+
+def _vecino_mas_cercano(x, y):
+    """Recorrido abierto desde la parada 0 visitando siempre la más cercana pendiente."""
+    n = len(x)
+    pendientes = np.ones(n, dtype=bool)
+    pendientes[0] = False
+    orden = [0]
+    actual = 0
+    for _ in range(n - 1):
+        distancias = np.abs(x - x[actual]) + np.abs(y - y[actual])
+        distancias[~pendientes] = np.inf
+        actual = int(np.argmin(distancias))
+        pendientes[actual] = False
+        orden.append(actual)
+    return np.array(orden)
+
+def _mejorar_2opt(x, y, orden, max_vueltas=MAXIMO_VUELTAS_2OPT):
+    """
+    2-opt para recorrido abierto con inicio fijo. En cada vuelta evalúa todas las inversiones
+    de tramo a la vez (matriz de ganancias) y aplica juntas las mejores que no se tocan entre
+    sí, hasta que ninguna mejore.
+    """
+    n = len(orden)
+    if n < 4:
+        return orden
+    for _ in range(max_vueltas):
+        px, py = x[orden].astype(np.float32), y[orden].astype(np.float32)
+        # Nodo ficticio al final (distancia 0 a todos) para que el recorrido no tenga que volver
+        d = np.zeros((n + 1, n + 1), dtype=np.float32)
+        d[:n, :n] = np.abs(px[:, None] - px[None, :]) + np.abs(py[:, None] - py[None, :])
+        tramo = np.diagonal(d, offset=1)
+        # Invertir orden[i..j]: ganancia = d(i-1,j) + d(i,j+1) - d(i-1,i) - d(j,j+1)
+        ganancia = d[0:n-1, 1:n] + d[1:n, 2:n+1] - tramo[0:n-1, None] - tramo[None, 1:n]
+        ganancia = np.triu(ganancia, k=1)
+
+        # Mejor inversión por punto de inicio; se aplican las que no comparten aristas
+        mejor_j = np.argmin(ganancia, axis=1)
+        mejor = ganancia[np.arange(n - 1), mejor_j]
+        candidatos = np.flatnonzero(mejor < -1e-4)
+        if not len(candidatos):
+            break
+        ocupado = np.zeros(n + 1, dtype=bool)
+        for fila in candidatos[np.argsort(mejor[candidatos])]:
+            i, j = fila + 1, mejor_j[fila] + 1
+            if ocupado[i - 1:j + 2].any():
+                continue
+            ocupado[i - 1:j + 2] = True
+            orden[i:j+1] = orden[i:j+1][::-1]
+    return orden
+
+@functools.lru_cache(maxsize=1024)
+def _recorrido(coordenadas_bytes, n):
+    """Orden de visita de n paradas; en caché para no recalcular técnicos que no cambiaron."""
+    xy = np.frombuffer(coordenadas_bytes, dtype=float).reshape(2, n)
+    x, y = xy[0], xy[1]
+    orden = _vecino_mas_cercano(x, y)
+    if n <= MAXIMO_PARADAS_2OPT:
+        orden = _mejorar_2opt(x, y, orden)
+    return tuple(orden.tolist())
+
+def distancia_recorrido(x, y):
+    """Cuadras recorridas (Manhattan) siguiendo las paradas en el orden dado."""
+    return float(np.abs(np.diff(x)).sum() + np.abs(np.diff(y)).sum())
+
+@instrumentar("secuenciacion", unidades=lambda r, df, *a, **k: len(df))
+def secuenciar_visitas(df_estado, col_map):
+    """
+    Agrega la columna SECUENCIA (1..N por técnico) con el recorrido sugerido por dirección.
+    La Bolsa Pendiente y los barrios sin asignar quedan sin secuencia (orden V74).
+    """
+    col_barrio = col_map['BARRIO']
+    df_w = df_estado.sort_values(by=['TECNICO_FINAL', col_barrio, 'ORDEN_ORIGINAL'])
+    coordenadas = coordenadas_direcciones(df_w[col_map['DIRECCION']])
+    legible = coordenadas['X'].notna().to_numpy() & coordenadas['Y'].notna().to_numpy()
+    x_todas = coordenadas['X'].to_numpy()
+    y_todas = coordenadas['Y'].to_numpy()
+    barrios = df_w[col_barrio].to_numpy()
+
+    secuencia = np.full(len(df_w), np.nan)
+    grupos = df_w.groupby('TECNICO_FINAL', sort=False, observed=True).indices
+    for tecnico in tecnicos_con_carga(df_w):
+        posiciones = grupos[tecnico]
+        con_direccion = posiciones[legible[posiciones]]
+
+        if len(con_direccion):
+            x, y = x_todas[con_direccion], y_todas[con_direccion]
+            orden = np.array(_recorrido(np.concatenate([x, y]).tobytes(), len(con_direccion)))
+            secuencia[con_direccion[orden]] = np.arange(len(orden))
+
+        # Sin dirección legible: detrás de la última parada de su barrio (o al final), en orden V74
+        ultima_por_barrio = pd.Series(secuencia[con_direccion], index=barrios[con_direccion]).groupby(level=0).max()
+        sin_direccion = posiciones[~legible[posiciones]]
+        secuencia[sin_direccion] = (
+            pd.Series(barrios[sin_direccion]).map(ultima_por_barrio).fillna(len(con_direccion)).to_numpy() + 0.5
+        )
+
+    df_w[COLUMNA_SECUENCIA] = secuencia
+    df_w = df_w.sort_values(by=['TECNICO_FINAL', COLUMNA_SECUENCIA, col_barrio, 'ORDEN_ORIGINAL'], kind='stable')
+    # Numeración limpia 1..N por técnico (lo que verá el operario como número de parada)
+    df_w[COLUMNA_SECUENCIA] = df_w.groupby('TECNICO_FINAL', sort=False, observed=True)[COLUMNA_SECUENCIA].cumcount() + 1
+    df_w.loc[~df_w['TECNICO_FINAL'].isin(tecnicos_con_carga(df_w)), COLUMNA_SECUENCIA] = np.nan
+    return df_w
@@ -0,0 +1,317 @@
+#########################################################################################
+#                                                                                       #
+#   SERVIDOR DE DESCARGAS ESTÁTICAS - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA              #
+#                                                                                       #
+#   Módulo liviano (solo librería estándar): lo importa la Zona de Descargas.           #
+#                                                                                       #
+#   - Servidor HTTP compañero de Streamlit que entrega los archivos publicados como     #
+#     archivos estáticos (sin pasar por el websocket ni re-ejecutar el script).         #
+#   - Enlaces firmados por técnico y versión (HMAC con vencimiento): nadie descarga     #
+#     la carpeta de otro técnico cambiando la URL.                                      #
+#   - ETag (SHA-256 del manifiesto) y Last-Modified: el celular revalida y recibe un    #
+#     304 si el archivo no cambió, en vez de bajarlo de nuevo.                          #
+#   - Range / If-Range: una descarga cortada por el 4G se reanuda donde quedó.          #
+#   - Las versiones publicadas nunca cambian (ver portal_publico.py), así que el        #
+#     navegador puede guardar los archivos en caché mientras el enlace siga vigente.    #
+#   - En una publicación diferida la primera petición de un técnico arma sus archivos   #
+#     (ver publicacion_diferida.py); las siguientes los sirven del disco.               #
+#                                                                                       #
+#   Uso:                                                                                #
+#     python servidor_descargas.py --puerto 8502 --carpeta public_files                 #
+#   y en la app: ITA_URL_DESCARGAS=http://<ip-del-servidor>:8502                        #
+#   (o ITA_PUERTO_DESCARGAS=8502 para levantarlo dentro del proceso de Streamlit).      #
+#                                                                                       #
+#########################################################################################
+
+import argparse
+import functools
+import hashlib
+import hmac
+import json
+import mimetypes
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from portal_publico import ARCHIVO_MANIFIESTO, CARPETA_PUBLICA, CARPETA_VERSIONES
+from publicacion_diferida import artefactos_bajo_demanda
+
+# Dirección pública del servidor para los celulares (si no está, la app usa st.download_button)
+URL_DESCARGAS = os.environ.get("ITA_URL_DESCARGAS", "").rstrip("/") or None
+
+# Puerto para levantar el servidor dentro del proceso de Streamlit (opcional)
+PUERTO_DESCARGAS = int(os.environ.get("ITA_PUERTO_DESCARGAS", "0")) or None
+
+# Horas que vale un enlace contadas desde la publicación de su versión
+HORAS_VIGENCIA_ENLACE = float(os.environ.get("ITA_VIGENCIA_ENLACES_HORAS", "36"))
+
+ARCHIVO_SECRETO = ".secreto_descargas"
+
+_PATRON_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# =======================================================================================
+# ENLACES FIRMADOS
+# =======================================================================================
+
+def secreto_descargas(carpeta_base=CARPETA_PUBLICA):
+    """
+    Clave de firma compartida por Streamlit y el servidor: ITA_SECRETO_DESCARGAS o un
+    archivo oculto en la carpeta pública (fuera de 'versiones', así que nunca se sirve).
+    """
+    if os.environ.get("ITA_SECRETO_DESCARGAS"):
+        return os.environ["ITA_SECRETO_DESCARGAS"].encode()
+    ruta = os.path.join(carpeta_base, ARCHIVO_SECRETO)
+    try:
+        with open(ruta, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(carpeta_base, exist_ok=True)
+    try:
+        descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Otro proceso lo creó en el mismo instante: se usa el suyo
+        time.sleep(0.05)
+        with open(ruta, "rb") as f:
+            return f.read().strip()
+    secreto = secrets.token_hex(32).encode()
+    with os.fdopen(descriptor, "wb") as f:
+        f.write(secreto)
+    return secreto
+
+def vencimiento_enlace(version, horas=HORAS_VIGENCIA_ENLACE):
+    """Vencimiento (epoch) de los enlaces de una versión: fijo por versión, así la URL no cambia entre recargas."""
+    publicada = datetime.strptime(version, "%Y%m%d-%H%M%S-%f").timestamp()
+    return int(publicada + horas * 3600)
+
+def firma(secreto, version, carpeta_tecnico, expira):
+    mensaje = f"{version}/{carpeta_tecnico}/{expira}".encode()
+    return hmac.new(secreto, mensaje, hashlib.sha256).hexdigest()[:32]
+
+def url_descarga(url_base, secreto, version, carpeta_tecnico, nombre_archivo, nombre_descarga):
+    """Enlace firmado a un archivo publicado (vale para todos los archivos del técnico en esa versión)."""
+    expira = vencimiento_enlace(version)
+    return (f"{url_base}/d/{quote(version)}/{quote(carpeta_tecnico)}/{quote(nombre_archivo)}"
+            f"?e={expira}&t={firma(secreto, version, carpeta_tecnico, expira)}&n={quote(nombre_descarga)}")
+
+# =======================================================================================
+# SERVIDOR HTTP
+# =======================================================================================
+
+@functools.lru_cache(maxsize=64)
+def _huellas_version(ruta_manifiesto, _mtime_ns):
+    """(carpeta, archivo) -> sha256 del manifiesto de una versión (en caché mientras no cambie)."""
+    try:
+        with open(ruta_manifiesto, encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {
+        (entrada["carpeta"], nombre): info["sha256"]
+        for entrada in manifiesto.get("tecnicos", {}).values()
+        for nombre, info in entrada.get("archivos", {}).items()
+    }
+
+def _etag(carpeta_version, carpeta_tecnico, nombre_archivo, estado):
+    ruta_manifiesto = os.path.join(carpeta_version, ARCHIVO_MANIFIESTO)
+    try:
+        huellas = _huellas_version(ruta_manifiesto, os.stat(ruta_manifiesto).st_mtime_ns)
+    except OSError:
+        huellas = {}
+    sha = huellas.get((carpeta_tecnico, nombre_archivo))
+    return f'"{sha[:32]}"' if sha else f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+
+def _nombre_seguro(nombre):
+    return bool(nombre) and nombre not in (".", "..") and "/" not in nombre and "\\" not in nombre
+
+class ManejadorDescargas(BaseHTTPRequestHandler):
+    """GET/HEAD de /d/<versión>/<carpeta del técnico>/<archivo>?e=<vence>&t=<firma>&n=<nombre>."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "ITA-Descargas/1.0"
+    carpeta_base = CARPETA_PUBLICA
+    secreto = b""
+    silencioso = True
+
+    def log_message(self, formato, *args):
+        if not self.silencioso:
+            super().log_message(formato, *args)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass  # el celular perdió la señal a mitad de la descarga: volverá con un Range
+
+    def do_HEAD(self):
+        self._atender(enviar_cuerpo=False)
+
+    def do_GET(self):
+        self._atender(enviar_cuerpo=True)
+
+    def _error(self, estado, cabeceras=None):
+        self.send_response(estado)
+        for clave, valor in (cabeceras or {}).items():
+            self.send_header(clave, valor)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _atender(self, enviar_cuerpo):
+        partes_url = urlsplit(self.path)
+        partes = [unquote(p) for p in partes_url.path.split("/")[1:]]
+        if len(partes) != 4 or partes[0] != "d" or not all(_nombre_seguro(p) for p in partes[1:]):
+            return self._error(HTTPStatus.NOT_FOUND)
+        _, version, carpeta_tecnico, nombre_archivo = partes
+
+        # Enlace firmado y vigente
+        consulta = parse_qs(partes_url.query)
+        try:
+            expira = int(consulta["e"][0])
+            token = consulta["t"][0]
+        except (KeyError, ValueError):
+            return self._error(HTTPStatus.FORBIDDEN)
+        if expira < time.time() or not hmac.compare_digest(token, firma(self.secreto, version, carpeta_tecnico, expira)):
+            return self._error(HTTPStatus.FORBIDDEN)
+
+        carpeta_version = os.path.join(self.carpeta_base, CARPETA_VERSIONES, version)
+        ruta = os.path.join(carpeta_version, carpeta_tecnico, nombre_archivo)
+        try:
+            archivo = open(ruta, "rb")
+        except OSError:
+            archivo = self._abrir_diferido(version, carpeta_tecnico, ruta)
+            if archivo is None:
+                return self._error(HTTPStatus.NOT_FOUND)
+
+        with archivo:
+            estado = os.fstat(archivo.fileno())
+            tamano = estado.st_size
+            etag = _etag(carpeta_version, carpeta_tecnico, nombre_archivo, estado)
+            ultima_modificacion = formatdate(estado.st_mtime, usegmt=True)
+            comunes = {
+                "ETag": etag,
+                "Last-Modified": ultima_modificacion,
+                "Accept-Ranges": "bytes",
+                # La versión nunca cambia: el celular puede reutilizarlo sin preguntar hasta que el enlace venza
+                "Cache-Control": f"private, max-age={max(0, expira - int(time.time()))}, immutable",
+            }
+
+            # Revalidación: 304 sin cuerpo si el celular ya tiene este archivo
+            if self._sin_cambios(etag, estado.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                for clave, valor in comunes.items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                return
+
+            inicio, fin = 0, tamano - 1
+            estado_http = HTTPStatus.OK
+            rango = self._rango_pedido(tamano, etag, ultima_modificacion)
+            if rango is not None:
+                inicio, fin = rango
+                if inicio >= tamano or inicio > fin:
+                    return self._error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, {"Content-Range": f"bytes */{tamano}"})
+                fin = min(fin, tamano - 1)
+                estado_http = HTTPStatus.PARTIAL_CONTENT
+
+            nombre_descarga = consulta.get("n", [nombre_archivo])[0]
+            self.send_response(estado_http)
+            for clave, valor in comunes.items():
+                self.send_header(clave, valor)
+            self.send_header("Content-Type", mimetypes.guess_type(nombre_archivo)[0] or "application/octet-stream")
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(nombre_descarga)}")
+            self.send_header("Content-Length", str(fin - inicio + 1 if tamano else 0))
+            if estado_http == HTTPStatus.PARTIAL_CONTENT:
+                self.send_header("Content-Range", f"bytes {inicio}-{fin}/{tamano}")
+            self.end_headers()
+
+            if enviar_cuerpo and tamano:
+                self._enviar(archivo, inicio, fin - inicio + 1)
+
+    def _abrir_diferido(self, version, carpeta_tecnico, ruta):
+        """Publicación diferida: arma los archivos del técnico (una sola vez) y abre el pedido."""
+        try:
+            artefactos_bajo_demanda(version, carpeta_tecnico, self.carpeta_base)
+            return open(ruta, "rb")
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _sin_cambios(self, etag, mtime):
+        si_no_coincide = self.headers.get("If-None-Match")
+        if si_no_coincide is not None:
+            return si_no_coincide.strip() == "*" or etag in [e.strip().removeprefix("W/") for e in si_no_coincide.split(",")]
+        si_modificado = self.headers.get("If-Modified-Since")
+        if si_modificado:
+            try:
+                return int(mtime) <= parsedate_to_datetime(si_modificado).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _rango_pedido(self, tamano, etag, ultima_modificacion):
+        """(inicio, fin) de un rango simple 'bytes=a-b', 'a-' o '-n'; None = archivo completo."""
+        cabecera = self.headers.get("Range")
+        if not cabecera:
+            return None
+        # If-Range: solo se reanuda si el archivo es el mismo que empezó a bajar
+        si_rango = self.headers.get("If-Range")
+        if si_rango and si_rango.strip() not in (etag, ultima_modificacion):
+            return None
+        coincidencia = _PATRON_RANGO.match(cabecera.strip())
+        if coincidencia is None:
+            return None  # Varios rangos u otra unidad: se entrega completo (lo permite el estándar)
+        desde, hasta = coincidencia.groups()
+        if not desde:
+            if not hasta:
+                return None
+            return (max(0, tamano - int(hasta)), tamano - 1)  # sufijo: los últimos n bytes
+        return (int(desde), int(hasta) if hasta else tamano - 1)
+
+    def _enviar(self, archivo, inicio, cantidad):
+        self.wfile.flush()
+        self.connection.sendfile(archivo, inicio, cantidad)
+
+def crear_servidor(puerto, carpeta_base=CARPETA_PUBLICA, host="0.0.0.0", silencioso=True):
+    """Servidor con hilos (uno por conexión) sobre la carpeta pública; no lo arranca."""
+    manejador = type("ManejadorConfigurado", (ManejadorDescargas,), {
+        "carpeta_base": carpeta_base,
+        "secreto": secreto_descargas(carpeta_base),
+        "silencioso": silencioso,
+    })
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+def iniciar_en_segundo_plano(puerto, carpeta_base=CARPETA_PUBLICA, host="0.0.0.0"):
+    """Arranca el servidor en un hilo demonio (para levantarlo junto con Streamlit)."""
+    servidor = crear_servidor(puerto, carpeta_base, host)
+    threading.Thread(target=servidor.serve_forever, name="ita-descargas", daemon=True).start()
+    return servidor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de descargas estáticas del portal de técnicos.")
+    parser.add_argument("--puerto", type=int, default=PUERTO_DESCARGAS or 8502)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--carpeta", default=CARPETA_PUBLICA, help="Carpeta pública que escribe la app.")
+    parser.add_argument("--registro", action="store_true", help="Muestra cada petición en consola.")
+    args = parser.parse_args(argv)
+
+    servidor = crear_servidor(args.puerto, args.carpeta, args.host, silencioso=not args.registro)
+    print(f"Sirviendo {os.path.abspath(args.carpeta)} en http://{args.host}:{args.puerto}/d/ (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
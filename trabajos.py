@@ -0,0 +1,287 @@
+#########################################################################################
+#                                                                                       #
+#   COLA DE TRABAJOS EN SEGUNDO PLANO - PLATAFORMA INTEGRAL DE LOGÍSTICA ITA            #
+#                                                                                       #
+#   - Publicación del portal y ZIP maestro corren en hilos del servidor, no en el hilo  #
+#     del script de Streamlit: el navegador del despacho no se congela y una recarga    #
+#     de página (o un websocket caído) no mata el trabajo.                              #
+#   - Tabla SQLite con estado, avance por técnico y resultado de cada trabajo: la       #
+#     interfaz la consulta periódicamente y la encuentra de nuevo tras recargar.        #
+#   - Cancelación cooperativa y reemplazo: un trabajo nuevo del mismo tipo reemplaza    #
+#     al que estaba corriendo con un estado de asignación anterior.                     #
+#                                                                                       #
+#########################################################################################
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+CARPETA_TRABAJOS = os.environ.get("ITA_TRABAJOS", "trabajos")
+ARCHIVO_BASE = "trabajos.sqlite"
+
+# Días que se conservan los trabajos terminados (y sus archivos de salida)
+DIAS_RETENCION_TRABAJOS = 7
+
+ESTADOS_ACTIVOS = ("PENDIENTE", "EN_CURSO")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id          TEXT PRIMARY KEY,
+    tipo        TEXT NOT NULL,
+    estado      TEXT NOT NULL,
+    huella      TEXT,
+    pid         INTEGER,
+    creado      TEXT NOT NULL,
+    actualizado TEXT NOT NULL,
+    hechos      INTEGER DEFAULT 0,
+    total       INTEGER,
+    detalle     TEXT,
+    resultado   TEXT,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS trabajos_tipo ON trabajos (tipo, creado);
+"""
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro del trabajo cuando alguien lo cancela o lo reemplaza."""
+
+def _ahora():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+
+class ControlTrabajo:
+    """Lo recibe la función del trabajo para informar avance y enterarse de una cancelación."""
+
+    def __init__(self, cola, id_trabajo):
+        self.cola = cola
+        self.id = id_trabajo
+
+    @property
+    def cancelado(self):
+        return self.id in self.cola._cancelaciones
+
+    def avanzar(self, hechos, total=None, detalle=None):
+        """Registra el avance (ej: técnicos listos). Lanza TrabajoCancelado si lo cancelaron."""
+        if self.cancelado:
+            raise TrabajoCancelado()
+        campos = {"hechos": hechos, "detalle": detalle}
+        if total is not None:
+            campos["total"] = total
+        self.cola._actualizar(self.id, **campos)
+
+    def ruta_salida(self, extension):
+        """Ruta para el archivo que produce el trabajo (ej: el ZIP maestro)."""
+        return os.path.join(self.cola.carpeta, f"{self.id}{extension}")
+
+class ColaTrabajos:
+    """Cola local de trabajos: un pool de hilos del servidor + la tabla SQLite compartida."""
+
+    def __init__(self, carpeta=CARPETA_TRABAJOS, hilos=2):
+        self.carpeta = os.path.abspath(carpeta)
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._ruta_base = os.path.join(self.carpeta, ARCHIVO_BASE)
+        self._cancelaciones = {}   # id -> estado final pedido (CANCELADO / REEMPLAZADO)
+        self._candado = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="ita-trabajo")
+
+        with self._conexion() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_ESQUEMA)
+        self._marcar_huerfanos()
+        self.purgar()
+
+    # --- Tabla SQLite ------------------------------------------------------------------
+
+    @contextmanager
+    def _conexion(self):
+        """Conexión corta por operación (sirve desde cualquier hilo); confirma al salir."""
+        con = sqlite3.connect(self._ruta_base, timeout=30)
+        con.row_factory = sqlite3.Row
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _actualizar(self, id_trabajo, **campos):
+        campos["actualizado"] = _ahora()
+        asignaciones = ", ".join(f"{k} = ?" for k in campos)
+        with self._conexion() as con:
+            con.execute(f"UPDATE trabajos SET {asignaciones} WHERE id = ?", [*campos.values(), id_trabajo])
+
+    def _marcar_huerfanos(self):
+        """Trabajos activos de un proceso que ya no existe (reinicio del servidor) quedan como fallidos."""
+        with self._conexion() as con:
+            filas = con.execute(
+                f"SELECT id, pid FROM trabajos WHERE estado IN ({','.join('?' * len(ESTADOS_ACTIVOS))})",
+                ESTADOS_ACTIVOS).fetchall()
+        for fila in filas:
+            if fila["pid"] != os.getpid() and not _proceso_vivo(fila["pid"]):
+                self._actualizar(fila["id"], estado="FALLIDO", error="Interrumpido: el servidor se reinició.")
+
+    def purgar(self, dias=DIAS_RETENCION_TRABAJOS):
+        """Borra los trabajos terminados hace más de 'dias' días y sus archivos de salida."""
+        limite = datetime.fromtimestamp(time.time() - dias * 86400).isoformat(timespec="seconds")
+        with self._conexion() as con:
+            viejos = [f["id"] for f in con.execute(
+                f"SELECT id FROM trabajos WHERE actualizado < ? AND estado NOT IN ({','.join('?' * len(ESTADOS_ACTIVOS))})",
+                [limite, *ESTADOS_ACTIVOS])]
+            con.executemany("DELETE FROM trabajos WHERE id = ?", [(i,) for i in viejos])
+        for nombre in os.listdir(self.carpeta):
+            if nombre.split(".")[0] in viejos:
+                os.remove(os.path.join(self.carpeta, nombre))
+        return len(viejos)
+
+    # --- API ---------------------------------------------------------------------------
+
+    def enviar(self, tipo, funcion, *args, huella=None, **kwargs):
+        """
+        Encola funcion(control, *args, **kwargs) y retorna el id del trabajo.
+        - Si ya hay un trabajo activo del mismo tipo con la misma huella, se reutiliza.
+        - Si la huella cambió (nuevo estado de asignación), el anterior queda REEMPLAZADO.
+        """
+        with self._candado:
+            for activo in self.activos(tipo):
+                if huella is not None and activo["huella"] == huella:
+                    return activo["id"]
+                self.cancelar(activo["id"], estado_final="REEMPLAZADO")
+
+            id_trabajo = uuid.uuid4().hex[:12]
+            with self._conexion() as con:
+                con.execute(
+                    "INSERT INTO trabajos (id, tipo, estado, huella, pid, creado, actualizado) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (id_trabajo, tipo, "PENDIENTE", huella, os.getpid(), _ahora(), _ahora()))
+            self._ejecutor.submit(self._ejecutar, id_trabajo, funcion, args, kwargs)
+            return id_trabajo
+
+    def _ejecutar(self, id_trabajo, funcion, args, kwargs):
+        if id_trabajo in self._cancelaciones:
+            self._actualizar(id_trabajo, estado=self._cancelaciones.pop(id_trabajo))
+            return
+        self._actualizar(id_trabajo, estado="EN_CURSO")
+        try:
+            resultado = funcion(ControlTrabajo(self, id_trabajo), *args, **kwargs)
+        except TrabajoCancelado:
+            self._actualizar(id_trabajo, estado=self._cancelaciones.pop(id_trabajo, "CANCELADO"))
+        except Exception as e:
+            self._cancelaciones.pop(id_trabajo, None)
+            self._actualizar(id_trabajo, estado="FALLIDO", error=f"{type(e).__name__}: {e}")
+        else:
+            estado = self._cancelaciones.pop(id_trabajo, None)
+            self._actualizar(id_trabajo, estado="COMPLETADO" if estado is None else estado,
+                             resultado=json.dumps(resultado, ensure_ascii=False, default=str))
+
+    def cancelar(self, id_trabajo, estado_final="CANCELADO"):
+        """Pide la cancelación; el trabajo se detiene en su próximo avance."""
+        trabajo = self.consultar(id_trabajo)
+        if trabajo is not None and trabajo["estado"] in ESTADOS_ACTIVOS:
+            self._cancelaciones[id_trabajo] = estado_final
+
+    def consultar(self, id_trabajo):
+        with self._conexion() as con:
+            fila = con.execute("SELECT * FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        return _como_dict(fila)
+
+    def ultimo(self, tipo):
+        """Trabajo más reciente de un tipo (lo que la interfaz muestra tras una recarga)."""
+        with self._conexion() as con:
+            fila = con.execute("SELECT * FROM trabajos WHERE tipo = ? ORDER BY creado DESC, rowid DESC LIMIT 1",
+                               (tipo,)).fetchone()
+        return _como_dict(fila)
+
+    def activos(self, tipo):
+        with self._conexion() as con:
+            filas = con.execute(
+                f"SELECT * FROM trabajos WHERE tipo = ? AND estado IN ({','.join('?' * len(ESTADOS_ACTIVOS))})",
+                (tipo, *ESTADOS_ACTIVOS)).fetchall()
+        return [_como_dict(f) for f in filas]
+
+def _como_dict(fila):
+    if fila is None:
+        return None
+    trabajo = dict(fila)
+    trabajo["resultado"] = json.loads(trabajo["resultado"]) if trabajo["resultado"] else None
+    return trabajo
+
+# =======================================================================================
+# TRABAJOS DE LA PLATAFORMA
+# =======================================================================================
+
+def _registrar_historial(dataframe_final, col_map):
+    """Agrega el día al histórico; un fallo aquí no invalida lo ya publicado (queda en el resultado)."""
+    from historial import HistorialOperaciones
+
+    try:
+        return HistorialOperaciones().registrar_dia(dataframe_final, col_map)
+    except (OSError, sqlite3.Error, ValueError) as e:
+        return {"error": str(e)}
+
+def trabajo_publicacion(control, carpeta_base, dataframe_final, col_map, mapa_polizas, procesos=1, perfil_movil=None,
+                        diferida=False):
+    """
+    Publica el portal de técnicos en una versión nueva y la libera al terminar.
+    diferida: solo congela la asignación; los archivos se arman cuando cada técnico los pide.
+    """
+    from instrumentacion import corrida, medir_etapa
+    from motor_logistico import publicar_operacion
+    from portal_publico import ARCHIVO_PAQUETE, leer_manifiesto, total_bytes_archivo
+    from publicacion_diferida import publicar_diferida
+
+    with corrida("PUBLICACION PORTAL"), medir_etapa("publicacion_portal", unidades=len(dataframe_final)):
+        if diferida:
+            version = publicar_diferida(carpeta_base, dataframe_final, col_map, mapa_polizas, perfil_movil=perfil_movil)
+        else:
+            version = publicar_operacion(carpeta_base, dataframe_final, col_map, mapa_polizas,
+                                         procesos=procesos, progreso=control.avanzar, perfil_movil=perfil_movil)
+    return {
+        "version": version,
+        "perfil_movil": perfil_movil,
+        "diferida": diferida,
+        "bytes_paquetes": total_bytes_archivo(leer_manifiesto(carpeta_base), ARCHIVO_PAQUETE),
+        "historial": _registrar_historial(dataframe_final, col_map),
+    }
+
+def trabajo_zip_maestro(control, dataframe_final, col_map, mapa_polizas, formatos_consolidado=("XLSX",), procesos=1,
+                        columnas_laterales=None, libro_rutas=False):
+    """Escribe el ZIP maestro de oficina en la carpeta de trabajos."""
+    from instrumentacion import corrida
+    from motor_logistico import escribir_zip_maestro, iterar_artefactos, tecnicos_con_carga
+    from portal_publico import ARCHIVO_PAQUETE
+
+    total = len(tecnicos_con_carga(dataframe_final))
+    bytes_paquetes = 0
+
+    def con_avance(pares):
+        nonlocal bytes_paquetes
+        for hechos, (tecnico, artefactos) in enumerate(pares, start=1):
+            control.avanzar(hechos, total, tecnico)
+            bytes_paquetes += len(artefactos.get(ARCHIVO_PAQUETE, b""))
+            yield tecnico, artefactos
+
+    ruta_zip = control.ruta_salida(".zip")
+    artefactos = con_avance(iterar_artefactos(dataframe_final, col_map, mapa_polizas, procesos=procesos))
+    with corrida("ZIP MAESTRO"):
+        try:
+            avisos = escribir_zip_maestro(ruta_zip, dataframe_final, col_map, mapa_polizas,
+                                          formatos_consolidado, artefactos=artefactos,
+                                          columnas_laterales=columnas_laterales, libro_rutas=libro_rutas)
+        except TrabajoCancelado:
+            if os.path.exists(ruta_zip):
+                os.remove(ruta_zip)
+            raise
+    return {"archivo": ruta_zip, "avisos": avisos, "bytes_paquetes": bytes_paquetes,
+            "historial": _registrar_historial(dataframe_final, col_map)}